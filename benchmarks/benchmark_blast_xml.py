@@ -0,0 +1,143 @@
+#!/usr/bin/env python
+"""
+Benchmark reading blast xml output with the streaming reader used by
+topiary.ncbi.read_blast_xml versus the biopython records path it replaced
+(records_to_df(_xml_file_to_records(xml_file))). Also reads the same hits
+from tabular output (local_blast output_format="tabular").
+
+usage: python benchmarks/benchmark_blast_xml.py [--queries 10] [--hits 5000]
+"""
+
+from topiary.ncbi.blast.read import _xml_file_to_df
+from topiary.ncbi.blast.read import _xml_file_to_records
+from topiary.ncbi.blast.read import records_to_df
+from topiary.ncbi.blast.read import _tabular_file_to_df
+from topiary.ncbi.blast.read import _TABULAR_FIELDS
+
+import numpy as np
+
+import argparse
+import os
+import shutil
+import tempfile
+import time
+import tracemalloc
+
+def _write_xml(xml_file,num_queries,num_hits,seed=0):
+    """
+    Write a synthetic blastp xml file with num_queries queries, each with
+    num_hits hits.
+    """
+
+    rng = np.random.default_rng(seed)
+    aa = np.array(list("ACDEFGHIKLMNPQRSTVWY"))
+
+    with open(xml_file,"w") as f:
+
+        f.write('<?xml version="1.0"?>\n')
+        f.write('<!DOCTYPE BlastOutput PUBLIC "-//NCBI//NCBI BlastOutput/EN" "http://www.ncbi.nlm.nih.gov/dtd/NCBI_BlastOutput.dtd">\n')
+        f.write("<BlastOutput>\n")
+        f.write("  <BlastOutput_program>blastp</BlastOutput_program>\n")
+        f.write("  <BlastOutput_query-ID>Query_1</BlastOutput_query-ID>\n")
+        f.write("  <BlastOutput_query-def>query0</BlastOutput_query-def>\n")
+        f.write("  <BlastOutput_query-len>300</BlastOutput_query-len>\n")
+        f.write("  <BlastOutput_param>\n")
+        f.write("    <Parameters>\n")
+        f.write("      <Parameters_matrix>BLOSUM62</Parameters_matrix>\n")
+        f.write("      <Parameters_expect>0.001</Parameters_expect>\n")
+        f.write("      <Parameters_gap-open>11</Parameters_gap-open>\n")
+        f.write("      <Parameters_gap-extend>1</Parameters_gap-extend>\n")
+        f.write("      <Parameters_filter>F</Parameters_filter>\n")
+        f.write("    </Parameters>\n")
+        f.write("  </BlastOutput_param>\n")
+        f.write("  <BlastOutput_iterations>\n")
+
+        for q in range(num_queries):
+            f.write("    <Iteration>\n")
+            f.write(f"      <Iteration_iter-num>{q + 1}</Iteration_iter-num>\n")
+            f.write(f"      <Iteration_query-ID>Query_{q + 1}</Iteration_query-ID>\n")
+            f.write(f"      <Iteration_query-def>query{q}</Iteration_query-def>\n")
+            f.write("      <Iteration_query-len>300</Iteration_query-len>\n")
+            f.write("      <Iteration_hits>\n")
+            for h in range(num_hits):
+                seq = "".join(rng.choice(aa,size=300))
+                f.write("        <Hit>\n")
+                f.write(f"          <Hit_num>{h + 1}</Hit_num>\n")
+                f.write(f"          <Hit_id>ref|XP_{h:09d}.1|</Hit_id>\n")
+                f.write(f"          <Hit_def>protein {h} [Genus species{h}]</Hit_def>\n")
+                f.write(f"          <Hit_accession>XP_{h:09d}</Hit_accession>\n")
+                f.write("          <Hit_len>300</Hit_len>\n")
+                f.write("          <Hit_hsps>\n")
+                f.write("            <Hsp>\n")
+                f.write("              <Hsp_num>1</Hsp_num>\n")
+                f.write(f"              <Hsp_bit-score>{rng.random()*500:.4f}</Hsp_bit-score>\n")
+                f.write(f"              <Hsp_evalue>{10**(-rng.random()*100):.3e}</Hsp_evalue>\n")
+                f.write("              <Hsp_query-from>1</Hsp_query-from>\n")
+                f.write("              <Hsp_query-to>300</Hsp_query-to>\n")
+                f.write("              <Hsp_hit-from>1</Hsp_hit-from>\n")
+                f.write("              <Hsp_hit-to>300</Hsp_hit-to>\n")
+                f.write(f"              <Hsp_qseq>{seq}</Hsp_qseq>\n")
+                f.write(f"              <Hsp_hseq>{seq}</Hsp_hseq>\n")
+                f.write(f"              <Hsp_midline>{seq}</Hsp_midline>\n")
+                f.write("            </Hsp>\n")
+                f.write("          </Hit_hsps>\n")
+                f.write("        </Hit>\n")
+            f.write("      </Iteration_hits>\n")
+            f.write("    </Iteration>\n")
+
+        f.write("  </BlastOutput_iterations>\n")
+        f.write("</BlastOutput>\n")
+
+def _measure(fcn):
+    """
+    Return wall time and peak traced memory (MB) for fcn().
+    """
+
+    tracemalloc.start()
+    start = time.perf_counter()
+    fcn()
+    elapsed = time.perf_counter() - start
+    peak = tracemalloc.get_traced_memory()[1]/1024**2
+    tracemalloc.stop()
+
+    return elapsed, peak
+
+def main(argv=None):
+
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--queries",type=int,default=10,
+                        help="number of queries in the xml file")
+    parser.add_argument("--hits",type=int,default=5000,
+                        help="number of hits per query")
+    args = parser.parse_args(argv)
+
+    tmp_dir = tempfile.mkdtemp()
+    try:
+
+        xml_file = os.path.join(tmp_dir,"test.xml")
+        _write_xml(xml_file,args.queries,args.hits)
+        size = os.path.getsize(xml_file)/1024**2
+
+        # Same hits as tabular output
+        tabular_file = os.path.join(tmp_dir,"test.tsv")
+        hits = _xml_file_to_df(xml_file).loc[:,list(_TABULAR_FIELDS.values())]
+        hits.to_csv(tabular_file,sep="\t",header=False,index=False)
+        tabular_size = os.path.getsize(tabular_file)/1024**2
+        queries = [f"query{q}" for q in range(args.queries)]
+
+        print(f"{args.queries} queries x {args.hits} hits ({size:.1f} MB xml, "
+              f"{tabular_size:.1f} MB tabular)")
+        print(f"{'reader':>12s} {'time (s)':>10s} {'peak memory (MB)':>18s}")
+
+        readers = [("biopython",lambda: records_to_df(_xml_file_to_records(xml_file))),
+                   ("streaming",lambda: _xml_file_to_df(xml_file)),
+                   ("tabular",lambda: _tabular_file_to_df(tabular_file,queries))]
+        for name, fcn in readers:
+            elapsed, peak = _measure(fcn)
+            print(f"{name:>12s} {elapsed:10.2f} {peak:18.1f}",flush=True)
+
+    finally:
+        shutil.rmtree(tmp_dir)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,50 @@
+#!/usr/bin/env python
+"""
+Benchmark memory use of topiary dataframes in the default (python object)
+representation versus the compact representation from
+topiary.io.compact_dataframe, and the time to copy and validate each.
+
+usage: python benchmarks/benchmark_compact_dataframe.py [--sizes 10000 100000]
+"""
+
+from topiary.io import compact_dataframe
+from topiary._private.check import check_topiary_dataframe
+
+from benchmark_dataframe_io import _make_dataframe
+from benchmark_dataframe_io import _time
+
+import argparse
+
+def main(argv=None):
+
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--sizes",type=int,nargs="+",default=[10000,100000],
+                        help="number of rows in the test dataframes")
+    parser.add_argument("--repeats",type=int,default=3,
+                        help="number of repeats (best time is reported)")
+    args = parser.parse_args(argv)
+
+    print(f"{'rows':>8s} {'mode':>8s} {'memory (MB)':>12s} {'copy (s)':>10s} "
+          f"{'check (s)':>10s}")
+
+    for num_rows in args.sizes:
+
+        df = _make_dataframe(num_rows)
+        compact = compact_dataframe(df)
+
+        for mode, this_df in [("default",df),("compact",compact)]:
+
+            memory = this_df.memory_usage(deep=True).sum()/1024**2
+            copy_time = _time(lambda: this_df.copy(),args.repeats)
+
+            # Drop the validation fingerprint so the full check runs
+            to_check = this_df.copy()
+            to_check.attrs = {}
+            check_time = _time(lambda: check_topiary_dataframe(to_check),
+                               args.repeats)
+
+            print(f"{num_rows:8d} {mode:>8s} {memory:12.1f} {copy_time:10.3f} "
+                  f"{check_time:10.3f}",flush=True)
+
+if __name__ == "__main__":
+    main()
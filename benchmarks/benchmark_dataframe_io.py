@@ -0,0 +1,109 @@
+#!/usr/bin/env python
+"""
+Benchmark writing and reading topiary dataframes as csv (what the pipelines
+used to checkpoint with) versus the parquet and feather binary formats.
+
+Read times include validation by topiary.read_dataframe.
+
+usage: python benchmarks/benchmark_dataframe_io.py [--sizes 10000 50000 100000]
+"""
+
+import topiary
+from topiary.io import read_dataframe
+from topiary.io import write_dataframe
+
+import numpy as np
+import pandas as pd
+
+import argparse
+import os
+import random
+import shutil
+import tempfile
+import time
+
+def _make_dataframe(num_rows,seed=0):
+    """
+    Synthetic topiary dataframe with sequences, alignments, and BLAST
+    metadata.
+    """
+
+    rng = np.random.default_rng(seed)
+    aa = np.array(list("ACDEFGHIKLMNPQRSTVWY"))
+
+    lengths = rng.integers(250,450,size=num_rows)
+    seqs = ["".join(rng.choice(aa,size=l)) for l in lengths]
+
+    align_length = 600
+    alignment = []
+    for s in seqs:
+        gaps = np.sort(rng.choice(align_length,size=align_length - len(s),replace=False))
+        a = np.array(list(s.ljust(align_length,"-")))
+        a[gaps] = "-"
+        alignment.append("".join(a))
+
+    species = [f"Genus species{i}" for i in rng.integers(0,2000,size=num_rows)]
+
+    df = pd.DataFrame({"keep":rng.random(num_rows) > 0.1,
+                       "species":species,
+                       "name":[f"protein {i}" for i in range(num_rows)],
+                       "sequence":seqs,
+                       "uid":topiary._private.generate_uid(num_rows),
+                       "accession":[f"XP_{i:09d}.1" for i in range(num_rows)],
+                       "evalue":10**(-rng.random(num_rows)*100),
+                       "start":rng.integers(0,50,size=num_rows),
+                       "end":lengths,
+                       "partial":rng.random(num_rows) > 0.9,
+                       "ott":[f"ott{i}" for i in rng.integers(1,10**6,size=num_rows)],
+                       "recip_paralog":rng.choice(["LY96","LY86","unassigned"],size=num_rows),
+                       "recip_prob_match":rng.random(num_rows),
+                       "alignment":alignment})
+
+    return read_dataframe(df)
+
+def _time(fcn,repeats):
+
+    best = None
+    for _ in range(repeats):
+        start = time.perf_counter()
+        fcn()
+        elapsed = time.perf_counter() - start
+        if best is None or elapsed < best:
+            best = elapsed
+
+    return best
+
+def main(argv=None):
+
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--sizes",type=int,nargs="+",default=[10000,50000,100000],
+                        help="number of rows in the test dataframes")
+    parser.add_argument("--repeats",type=int,default=3,
+                        help="number of repeats (best time is reported)")
+    args = parser.parse_args(argv)
+
+    tmp_dir = tempfile.mkdtemp()
+    try:
+
+        print(f"{'rows':>8s} {'format':>8s} {'write (s)':>10s} {'read (s)':>10s} "
+              f"{'size (MB)':>10s}")
+
+        for num_rows in args.sizes:
+
+            df = _make_dataframe(num_rows)
+            for ext in ["csv","parquet","feather"]:
+
+                out_file = os.path.join(tmp_dir,f"df.{ext}")
+                write_time = _time(lambda: write_dataframe(df,out_file,overwrite=True),
+                                   args.repeats)
+                read_time = _time(lambda: read_dataframe(out_file),args.repeats)
+                size = os.path.getsize(out_file)/1024**2
+
+                print(f"{num_rows:8d} {ext:>8s} {write_time:10.3f} {read_time:10.3f} "
+                      f"{size:10.1f}",flush=True)
+
+    finally:
+        shutil.rmtree(tmp_dir)
+
+if __name__ == "__main__":
+    main()
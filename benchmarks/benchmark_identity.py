@@ -0,0 +1,87 @@
+#!/usr/bin/env python
+"""
+Benchmark topiary.quality.score_localxx against the Bio.pairwise2 call it
+replaces.
+
+usage: python benchmarks/benchmark_identity.py [--length 350] [--repeats 3]
+"""
+
+from topiary.quality.identity import score_localxx
+from topiary.quality.identity import _score_localxx_int
+from topiary.quality.identity import _score_localxx_numpy
+from topiary.quality.identity import encode_sequence
+
+from Bio import pairwise2
+
+import numpy as np
+
+import argparse
+import random
+import time
+
+def _mutate(seq,rng,fraction):
+
+    aa = "ACDEFGHIKLMNPQRSTVWY"
+    seq = list(seq)
+    for i in range(len(seq)):
+        if rng.random() < fraction:
+            seq[i] = rng.choice(aa)
+
+    return "".join(seq)
+
+def _time(fcn,repeats):
+
+    best = None
+    for _ in range(repeats):
+        start = time.perf_counter()
+        fcn()
+        elapsed = time.perf_counter() - start
+        if best is None or elapsed < best:
+            best = elapsed
+
+    return best
+
+def main(argv=None):
+
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--length",type=int,default=350,
+                        help="length of the test sequences")
+    parser.add_argument("--repeats",type=int,default=3,
+                        help="number of repeats (best time is reported)")
+    args = parser.parse_args(argv)
+
+    rng = random.Random(0)
+    aa = "ACDEFGHIKLMNPQRSTVWY"
+    query = "".join(rng.choice(aa) for _ in range(args.length))
+
+    print(f"query length: {args.length}")
+    print(f"{'targets':>8s} {'pairwise2 (s)':>14s} {'int (s)':>10s} "
+          f"{'numpy (s)':>10s} {'auto (s)':>10s} {'speedup':>8s}")
+
+    for num_targets in [1,4,16,64,256,1024]:
+
+        targets = [_mutate(query,rng,rng.random()) for _ in range(num_targets)]
+        encoded_query = encode_sequence(query)
+        encoded = [encode_sequence(t) for t in targets]
+
+        expected = [pairwise2.align.localxx(query,t,score_only=True)
+                    for t in targets]
+        assert list(score_localxx(query,targets)) == expected
+
+        # pairwise2 is slow; time a subset of targets and scale
+        subset = targets[:min(num_targets,64)]
+        pw2 = _time(lambda: [pairwise2.align.localxx(query,t,score_only=True)
+                             for t in subset],args.repeats)
+        pw2 = pw2*num_targets/len(subset)
+
+        int_time = _time(lambda: _score_localxx_int(encoded_query,encoded),
+                         args.repeats)
+        np_time = _time(lambda: _score_localxx_numpy(encoded_query,encoded),
+                        args.repeats)
+        auto_time = _time(lambda: score_localxx(query,targets),args.repeats)
+
+        print(f"{num_targets:>8d} {pw2:>14.5f} {int_time:>10.5f} "
+              f"{np_time:>10.5f} {auto_time:>10.5f} {pw2/auto_time:>7.1f}x")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,62 @@
+#!/usr/bin/env python
+"""
+Benchmark topiary.ncbi.merge_blast_df on synthetic blast output from several
+queries hitting an overlapping set of accessions.
+
+usage: python benchmarks/benchmark_merge_blast_df.py [--queries 10] [--hits 5000]
+"""
+
+from topiary.ncbi.blast.merge import merge_blast_df
+
+import numpy as np
+import pandas as pd
+
+import argparse
+import time
+
+def _make_blast_dfs(num_queries,num_hits,num_accessions,seed=0):
+    """
+    One dataframe of hits per query. Hits land at random positions on
+    num_accessions subjects, so some overlap and some do not.
+    """
+
+    rng = np.random.default_rng(seed)
+
+    blast_dfs = []
+    for q in range(num_queries):
+
+        accession = rng.integers(0,num_accessions,size=num_hits)
+        start = rng.integers(1,2000,size=num_hits)
+        end = start + rng.integers(50,400,size=num_hits)
+
+        blast_dfs.append(pd.DataFrame({"accession":[f"XP_{a:09d}" for a in accession],
+                                       "hit_def":[f"protein {a}" for a in accession],
+                                       "subject_start":start,
+                                       "subject_end":end,
+                                       "query":f"query{q}",
+                                       "e_value":10**(-rng.random(num_hits)*100)}))
+
+    return blast_dfs
+
+def main(argv=None):
+
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--queries",type=int,default=10,
+                        help="number of blast queries")
+    parser.add_argument("--hits",type=int,default=5000,
+                        help="number of hits per query")
+    parser.add_argument("--accessions",type=int,default=20000,
+                        help="number of distinct subject accessions")
+    args = parser.parse_args(argv)
+
+    blast_dfs = _make_blast_dfs(args.queries,args.hits,args.accessions)
+
+    start = time.perf_counter()
+    merged = merge_blast_df(blast_dfs)
+    elapsed = time.perf_counter() - start
+
+    print(f"{args.queries} queries x {args.hits} hits -> {len(merged)} merged "
+          f"hits in {elapsed:.3f} s")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,86 @@
+#!/usr/bin/env python
+"""
+Benchmark matching paralog patterns against reciprocal blast hits, either
+query-by-query (one pattern search per paralog per hit) or all at once with
+the shared hits x paralogs matrix used by _make_recip_blast_calls.
+
+usage: python benchmarks/benchmark_recip_patterns.py [--queries 5000] [--hits 50]
+"""
+
+from topiary.ncbi.blast.recip import _get_pattern_matrix
+from topiary.ncbi.blast.recip import _calc_hit_post_prob
+
+import numpy as np
+import pandas as pd
+
+import argparse
+import re
+import time
+
+def _make_hit_dfs(num_queries,num_hits,num_paralogs,seed=0):
+    """
+    One dataframe of reciprocal blast hits per query. Hits are drawn from a
+    shared pool of subject descriptions, some naming a paralog.
+    """
+
+    rng = np.random.default_rng(seed)
+
+    pool = [f"PREDICTED: paralog {i} isoform X{j} [Homo sapiens]"
+            for i in range(num_paralogs) for j in range(5)]
+    pool.extend([f"uncharacterized protein LOC{i} [Homo sapiens]"
+                 for i in range(10*num_paralogs)])
+    pool = np.array(pool)
+
+    hit_dfs = []
+    for _ in range(num_queries):
+        hit_dfs.append(pd.DataFrame({"hit_def":rng.choice(pool,size=num_hits),
+                                     "bits":rng.random(num_hits)*500,
+                                     "e_value":10**(-rng.random(num_hits)*100)}))
+
+    return hit_dfs
+
+def _per_query(hit_dfs,paralog_patterns):
+
+    for hits in hit_dfs:
+
+        paralogs = list(paralog_patterns.keys())
+        paralogs.sort()
+        for p in paralogs:
+            for idx in hits.index:
+                paralog_patterns[p].search(hits.loc[idx,"hit_def"])
+
+def _all_at_once(hit_dfs,paralog_patterns):
+
+    descriptions = []
+    for hits in hit_dfs:
+        descriptions.extend(hits.loc[:,"hit_def"])
+    _, pattern_matrix = _get_pattern_matrix(descriptions,paralog_patterns)
+
+    offsets = np.cumsum([0] + [len(hits) for hits in hit_dfs])
+    for i, hits in enumerate(hit_dfs):
+        _calc_hit_post_prob(hits,paralog_patterns,1,
+                            pattern_matrix=pattern_matrix[offsets[i]:offsets[i+1]])
+
+def main(argv=None):
+
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--queries",type=int,default=5000,
+                        help="number of query sequences")
+    parser.add_argument("--hits",type=int,default=50,
+                        help="number of reciprocal blast hits per query")
+    parser.add_argument("--paralogs",type=int,default=12,
+                        help="number of paralog patterns")
+    args = parser.parse_args(argv)
+
+    hit_dfs = _make_hit_dfs(args.queries,args.hits,args.paralogs)
+    paralog_patterns = {f"P{i}":re.compile(f"paralog {i}\\b",flags=re.IGNORECASE)
+                        for i in range(args.paralogs)}
+
+    for name, fcn in [("per query",_per_query),("all at once",_all_at_once)]:
+        start = time.perf_counter()
+        fcn(hit_dfs,paralog_patterns)
+        elapsed = time.perf_counter() - start
+        print(f"{name:>12s}: {elapsed:.3f} s",flush=True)
+
+if __name__ == "__main__":
+    main()
@@ -2,10 +2,66 @@ import pytest
 
 import topiary
 from topiary._private.check import check_topiary_dataframe
+from topiary._private.check.topiary_dataframe import _get_fingerprint
+from topiary._private.check.topiary_dataframe import _is_compact_string
+from topiary._private.check.topiary_dataframe import _is_empty_string
+import topiary._private.check.topiary_dataframe as topiary_dataframe
 
 import numpy as np
 import pandas as pd
 
+def test__get_fingerprint(test_dataframes):
+
+    df = test_dataframes["good-df"].copy()
+    fingerprint = _get_fingerprint(df)
+    assert issubclass(type(fingerprint),str)
+
+    # Same contents (even with a different index), same fingerprint
+    assert _get_fingerprint(df.copy()) == fingerprint
+    assert _get_fingerprint(df.set_index(df.index + 10)) == fingerprint
+
+    # Changing a value, a dtype, or a column name changes the fingerprint
+    changed = df.copy()
+    changed.loc[0,"sequence"] = "MLPFLFF"
+    assert _get_fingerprint(changed) != fingerprint
+
+    changed = df.copy()
+    changed["keep"] = changed["keep"].astype(int)
+    assert _get_fingerprint(changed) != fingerprint
+
+    assert _get_fingerprint(df.rename(columns={"name":"other"})) != fingerprint
+
+    # Unhashable values
+    changed = df.copy()
+    changed["test"] = [[1] for _ in range(len(df))]
+    assert _get_fingerprint(changed) is None
+
+def test__is_empty_string():
+
+    column = pd.Series(["A","  ","",np.nan,1,None,"\t"],dtype=object)
+    out = _is_empty_string(column)
+    assert np.array_equal(out,[False,True,True,False,False,False,True])
+
+    out = _is_empty_string(pd.Series([1.0,np.nan]))
+    assert np.array_equal(out,[False,False])
+
+    # Compact string columns
+    column = pd.Series(["A","  ",None,"\t"],dtype=pd.StringDtype())
+    out = _is_empty_string(column)
+    assert np.array_equal(out,[False,True,False,True])
+
+    column = pd.Series(["A","  ",None,"A"],dtype="category")
+    out = _is_empty_string(column)
+    assert np.array_equal(out,[False,True,False,False])
+
+def test__is_compact_string():
+
+    assert _is_compact_string(pd.Series(["A","B"],dtype=pd.StringDtype()))
+    assert _is_compact_string(pd.Series(["A","B"],dtype="category"))
+    assert not _is_compact_string(pd.Series([1,2],dtype="category"))
+    assert not _is_compact_string(pd.Series(["A","B"],dtype=object))
+    assert not _is_compact_string(pd.Series([1.0,2.0]))
+
 def test_check_topiary_dataframe(test_dataframes):
     """
     Test check for topiary dataframe.
@@ -98,3 +154,37 @@ def test_check_topiary_dataframe(test_dataframes):
     assert checked_df["alignment"].iloc[0] == "MLPFLFF--"
     assert input_df["alignment"].iloc[-1] == "MLPFLFF-TL"
     assert checked_df["alignment"].iloc[-1] == "MLPFLFFTL"
+
+    # Validated dataframe carries a fingerprint
+    df = check_topiary_dataframe(test_dataframes["good-df"])
+    assert df.attrs["topiary_fingerprint"] == _get_fingerprint(df)
+
+    # Fast path returns a copy without re-validating. Force full validation to
+    # fail to make sure it is skipped.
+    original = topiary_dataframe._is_empty_string
+    try:
+        def _fail(*args,**kwargs):
+            raise RuntimeError
+        topiary_dataframe._is_empty_string = _fail
+
+        out = check_topiary_dataframe(df)
+        assert out is not df
+        assert out.equals(df)
+        assert out.attrs["topiary_fingerprint"] == df.attrs["topiary_fingerprint"]
+
+        # Same contents with a different index come back with a fresh index
+        out = check_topiary_dataframe(df.set_index(df.index + 10))
+        assert np.array_equal(out.index,np.arange(len(df)))
+
+        # After editing, must be re-validated
+        edited = df.copy()
+        edited.loc[0,"sequence"] = "  M L "
+        with pytest.raises(RuntimeError):
+            check_topiary_dataframe(edited)
+
+    finally:
+        topiary_dataframe._is_empty_string = original
+
+    edited = check_topiary_dataframe(edited)
+    assert edited.loc[0,"sequence"] == "ML"
+    assert edited.attrs["topiary_fingerprint"] == _get_fingerprint(edited)
@@ -0,0 +1,120 @@
+
+import pytest
+
+from topiary._private.alignment_matrix import AlignmentMatrix
+
+import numpy as np
+import pandas as pd
+
+import os
+
+def test_AlignmentMatrix(tmpdir):
+
+    seqs = ["A-C-X","A-CD-","--X-X"]
+
+    m = AlignmentMatrix(seqs,uid=["a","b","c"])
+    assert m.shape == (3,5)
+    assert len(m) == 3
+    assert m.codes.dtype == np.uint8
+    assert np.array_equal(m.codes[0],[ord(c) for c in "A-C-X"])
+    assert list(m.uid) == ["a","b","c"]
+    assert m.uid_index == {"a":0,"b":1,"c":2}
+    assert m.to_strings() == seqs
+
+    # Default uid
+    assert list(AlignmentMatrix(seqs).uid) == ["0","1","2"]
+
+    # Already encoded
+    m2 = AlignmentMatrix(m.codes,uid=m.uid)
+    assert m2.to_strings() == seqs
+
+    # Masks and column statistics
+    assert np.array_equal(m.gap_mask[2],[True,True,False,True,False])
+    assert np.array_equal(m.x_mask[2],[False,False,True,False,True])
+    assert np.array_equal(m.column_gap_counts,[1,3,0,2,1])
+    assert np.allclose(m.column_gap_fraction,[1/3,1,0,2/3,1/3])
+    assert np.array_equal(m.gap_only_columns,[False,True,False,False,False])
+    assert np.array_equal(m.gap_or_x_only_columns,[False,True,False,False,True])
+    assert not m[[1]].gap_or_x_only_columns[2]
+
+    assert m.drop_gap_only_columns().to_strings() == ["AC-X","ACD-","-X-X"]
+
+    # Slicing by index and by uid
+    assert m[1].to_strings() == ["A-CD-"]
+    assert list(m["b"].uid) == ["b"]
+    assert m[["c","a"]].to_strings() == ["--X-X","A-C-X"]
+    assert list(m[["c","a"]].uid) == ["c","a"]
+    assert m[np.array(["c"],dtype=object)].to_strings() == ["--X-X"]
+    assert m[:,1:3].to_strings() == ["-C","-C","-X"]
+    assert m[0,4].to_strings() == ["X"]
+    assert m[1:,np.array([True,False,False,False,True])].to_strings() == ["A-","-X"]
+    with pytest.raises(KeyError):
+        m["not_a_uid"]
+
+    # Empty
+    empty = AlignmentMatrix([])
+    assert empty.shape == (0,0)
+    assert empty.to_strings() == []
+
+    with pytest.raises(ValueError):
+        AlignmentMatrix(["AC","A"])
+    with pytest.raises(ValueError):
+        AlignmentMatrix(seqs,uid=["a"])
+    with pytest.raises(ValueError):
+        AlignmentMatrix(np.zeros(5,dtype=np.uint8))
+
+    # From dataframe
+    df = pd.DataFrame({"uid":["a","b","c"],
+                       "keep":[True,False,True],
+                       "alignment":seqs})
+    m = AlignmentMatrix.from_dataframe(df)
+    assert list(m.uid) == ["a","c"]
+    assert m.to_strings() == [seqs[0],seqs[2]]
+    m = AlignmentMatrix.from_dataframe(df,only_keep=False)
+    assert list(m.uid) == ["a","b","c"]
+    with pytest.raises(ValueError):
+        AlignmentMatrix.from_dataframe(df,column="not_a_column")
+
+    # From files
+    cwd = os.getcwd()
+    os.chdir(tmpdir)
+
+    with open("test.phy","w") as f:
+        f.write("3 5\n\n")
+        for u, s in zip(["a","b","c"],seqs):
+            f.write(f"{u}\n{s}\n")
+    m = AlignmentMatrix.from_file("test.phy")
+    assert list(m.uid) == ["a","b","c"]
+    assert m.to_strings() == seqs
+
+    with open("test-interleaved.phy","w") as f:
+        f.write("3 5\n")
+        for u, s in zip(["a","b","c"],seqs):
+            f.write(f"{u}   {s}\n")
+    m = AlignmentMatrix.from_file("test-interleaved.phy")
+    assert list(m.uid) == ["a","b","c"]
+    assert m.to_strings() == seqs
+
+    with open("bad-header.phy","w") as f:
+        f.write("4 5\n\n")
+        for u, s in zip(["a","b","c"],seqs):
+            f.write(f"{u}\n{s}\n")
+    with pytest.raises(ValueError):
+        AlignmentMatrix.from_file("bad-header.phy")
+
+    # No header (names and sequences on alternating lines)
+    with open("no-header.phy","w") as f:
+        f.write("\n\n")
+        for u, s in zip(["a","b","c"],seqs):
+            f.write(f"{u}\n{s}\n")
+    m = AlignmentMatrix.from_file("no-header.phy")
+    assert list(m.uid) == ["a","b","c"]
+
+    with open("test.fasta","w") as f:
+        for u, s in zip(["a","b","c"],seqs):
+            f.write(f">{u}|some description\n{s[:2]}\n{s[2:]}\n")
+    m = AlignmentMatrix.from_file("test.fasta")
+    assert list(m.uid) == ["a","b","c"]
+    assert m.to_strings() == seqs
+
+    os.chdir(cwd)
@@ -0,0 +1,172 @@
+import pytest
+
+from topiary._private import cache
+from topiary._private import threads
+
+import numpy as np
+
+import os
+import pickle
+import sqlite3
+
+def test_get_digest():
+
+    a = cache.get_digest("TEST")
+    b = cache.get_digest("TEST")
+    c = cache.get_digest("TAST")
+
+    assert a == b
+    assert a != c
+    assert len(a) == 32
+
+def _function_to_use_cache(disk_cache,key,value):
+    """
+    Function for testing DiskCache across processes.
+    """
+
+    out = disk_cache.get(key)
+    if out is None:
+        disk_cache.put(key,value)
+    disk_cache.flush()
+
+    return out
+
+def test_DiskCache(tmpdir):
+
+    cache_file = os.path.join(tmpdir,"some-dir","cache.sqlite")
+
+    with cache.DiskCache(cache_file) as disk_cache:
+
+        assert os.path.isfile(cache_file)
+
+        # Miss
+        assert disk_cache.get("a") is None
+        assert disk_cache.misses == 1
+
+        # Pending value is seen before flush
+        disk_cache.put("a",1.5)
+        assert disk_cache.get("a") == 1.5
+        assert disk_cache.hits == 1
+
+        disk_cache.put("b","some string")
+        disk_cache.put("c",b"some bytes")
+        disk_cache.flush()
+
+        assert disk_cache.get("a") == 1.5
+        assert disk_cache.get("b") == "some string"
+        assert disk_cache.get("c") == b"some bytes"
+        assert disk_cache.get_counts() == (4,1)
+
+    # Values persist after closing
+    with cache.DiskCache(cache_file) as disk_cache:
+        assert disk_cache.get("a") == 1.5
+        assert disk_cache.get_counts() == (1,0)
+
+    # Copies in other processes see the same cache and report counts back
+    with cache.DiskCache(cache_file) as disk_cache:
+
+        # pickles by file, not contents
+        copied = pickle.loads(pickle.dumps(disk_cache))
+        assert copied.get("b") == "some string"
+        copied.close()
+
+        kwargs_list = [{"disk_cache":disk_cache,"key":f"k{i}","value":i}
+                       for i in range(4)]
+        kwargs_list.append({"disk_cache":disk_cache,"key":"a","value":0})
+
+        out = threads.thread_manager(kwargs_list,
+                                     _function_to_use_cache,
+                                     num_threads=2,
+                                     progress_bar=False)
+        assert out == [None,None,None,None,1.5]
+
+        assert disk_cache.get("k3") == 3
+        assert disk_cache.get_counts() == (3,4)
+
+    # Counts removed from database on close
+    conn = sqlite3.connect(cache_file)
+    assert conn.execute("SELECT COUNT(*) FROM counts").fetchone()[0] == 0
+    conn.close()
+
+    with pytest.raises(ValueError):
+        cache.DiskCache(cache_file,max_size=0)
+
+def test_DiskCache_evict(tmpdir):
+
+    cache_file = os.path.join(tmpdir,"cache.sqlite")
+
+    # Each entry is 2 (key) + 8 (float) = 10 bytes. Cap at 100 bytes.
+    with cache.DiskCache(cache_file,max_size=100) as disk_cache:
+
+        for i in range(10):
+            disk_cache.put(f"{i:02d}",float(i))
+            disk_cache.flush()
+
+        # Touch the oldest entry so it becomes most recently used
+        assert disk_cache.get("00") == 0.0
+        disk_cache.flush()
+
+        # Push over cap. Should evict down to 90 bytes, dropping least
+        # recently used entries
+        disk_cache.put("10",10.0)
+        disk_cache.put("11",11.0)
+        disk_cache.flush()
+
+        conn = sqlite3.connect(cache_file)
+        keys = [k[0] for k in conn.execute("SELECT key FROM cache")]
+        total = conn.execute("SELECT SUM(size) FROM cache").fetchone()[0]
+        conn.close()
+
+        assert total <= 90
+        assert "00" in keys
+        assert "10" in keys
+        assert "11" in keys
+        assert "01" not in keys
+        assert "02" not in keys
+
+def test_DiskCache_total_size(tmpdir):
+
+    cache_file = os.path.join(tmpdir,"cache.sqlite")
+
+    def _get_sizes():
+        conn = sqlite3.connect(cache_file)
+        total = conn.execute("SELECT COALESCE(SUM(size),0) FROM cache").fetchone()[0]
+        running = conn.execute("SELECT value FROM metadata "
+                               "WHERE key='total_size'").fetchone()[0]
+        conn.close()
+        return total, running
+
+    with cache.DiskCache(cache_file,max_size=100) as disk_cache:
+
+        assert _get_sizes() == (0,0)
+
+        disk_cache.put("a","xxxx")
+        disk_cache.put("b",1.0)
+        disk_cache.flush()
+        assert _get_sizes() == (14,14)
+
+        # Replacing an entry replaces its size
+        disk_cache.put("a","xxxxxxxx")
+        disk_cache.flush()
+        assert _get_sizes() == (18,18)
+
+        # Eviction
+        for i in range(20):
+            disk_cache.put(f"{i:02d}",float(i))
+        disk_cache.flush()
+        total, running = _get_sizes()
+        assert total == running
+        assert total <= 90
+
+    # Cache written before the running total existed is totaled on open
+    conn = sqlite3.connect(cache_file)
+    with conn:
+        conn.execute("DROP TABLE metadata")
+        conn.execute("DROP TRIGGER cache_insert")
+        conn.execute("DROP TRIGGER cache_delete")
+    conn.close()
+
+    with cache.DiskCache(cache_file,max_size=100) as disk_cache:
+        total, running = _get_sizes()
+        assert total == running
+        assert total > 0
@@ -10,6 +10,50 @@ def test_MockLock():
 
     pass
 
+def _function_to_write_shared(shared,index,value):
+    """
+    Function for testing SharedArray with thread_manager.
+    """
+
+    shared[index] = value
+
+def test_SharedArray():
+
+    array = np.arange(10,dtype=float)
+    with threads.SharedArray(array) as shared:
+
+        # Copy of data, not a view
+        assert np.array_equal(np.array(shared),array)
+        array[0] = 100
+        assert shared[0] == 0
+
+        shared[1] = -1
+        assert shared[1] == -1
+        assert len(shared) == 10
+
+        # Writes in worker processes should be seen by the parent
+        kwargs_list = [{"shared":shared,"index":i,"value":2*i} for i in range(10)]
+        threads.thread_manager(kwargs_list,
+                               _function_to_write_shared,
+                               num_threads=2,
+                               progress_bar=False)
+        assert np.array_equal(np.array(shared),2*np.arange(10))
+
+        # Single thread path
+        kwargs_list = [{"shared":shared,"index":i,"value":3*i} for i in range(10)]
+        threads.thread_manager(kwargs_list,
+                               _function_to_write_shared,
+                               num_threads=1,
+                               progress_bar=False)
+        assert np.array_equal(np.array(shared),3*np.arange(10))
+
+    # Released after context
+    assert shared.array is None
+
+    # Empty arrays allowed
+    with threads.SharedArray(np.zeros(0,dtype=bool)) as shared:
+        assert len(shared) == 0
+
 def test_get_num_threads():
 
     num_threads = threads.get_num_threads(-1,manual_num_cores=10)
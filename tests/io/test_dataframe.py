@@ -2,6 +2,13 @@ import pytest
 
 from topiary.io import read_dataframe
 from topiary.io import write_dataframe
+from topiary.io import compact_dataframe
+from topiary.io.dataframe import _to_arrow_compatible
+from topiary.io.dataframe import _read_arrow
+from topiary.io.dataframe import _get_checkpoint_file
+from topiary.io.dataframe import _write_checkpoint
+from topiary.io.dataframe import _read_checkpoint
+from topiary.io.dataframe import _is_fresh_checkpoint
 import numpy as np
 import pandas as pd
 
@@ -92,3 +99,152 @@ def test_write_dataframe(test_dataframes,tmpdir):
     out = os.path.join(tmpdir,"some_file.xlsx")
     write_dataframe(df,out_file=out)
     assert os.path.exists(out)
+
+    # Binary columnar formats round trip with the same values and dtypes
+    expected = read_dataframe(df)
+    for ext in ["parquet","feather"]:
+        out = os.path.join(tmpdir,f"some_file.{ext}")
+        write_dataframe(df,out_file=out)
+        assert os.path.exists(out)
+
+        pd.testing.assert_frame_equal(read_dataframe(out),expected)
+
+        # Fingerprint stored in the file, so no re-validation needed on read
+        assert _read_arrow(out,ext).attrs["topiary_fingerprint"] == expected.attrs["topiary_fingerprint"]
+
+        with pytest.raises(FileExistsError):
+            write_dataframe(df,out_file=out)
+
+    # Mixed-type columns only written as strings if requested
+    mixed = df.copy()
+    mixed["mixed"] = ["a"] + [1]*(len(df) - 1)
+    out = os.path.join(tmpdir,"mixed.parquet")
+    with pytest.raises(ValueError):
+        write_dataframe(mixed,out_file=out)
+    assert not os.path.exists(out)
+    write_dataframe(mixed,out_file=out,stringify_mixed=True)
+    assert list(read_dataframe(out)["mixed"]) == ["a"] + ["1"]*(len(df) - 1)
+
+def test_compact_dataframe(test_dataframes):
+
+    df = read_dataframe(test_dataframes["good-df"])
+    df["ott"] = [f"ott{i}" for i in range(len(df))]
+    df["recip_paralog"] = "LY96"
+    df["partial"] = [0,1,0] + [0]*(len(df) - 3)
+
+    compact = compact_dataframe(df)
+
+    for c in ["species","ott","recip_paralog"]:
+        assert isinstance(compact[c].dtype,pd.CategoricalDtype)
+    for c in ["name","sequence"]:
+        assert isinstance(compact[c].dtype,pd.StringDtype)
+    assert compact["partial"].dtype == bool
+    assert compact["keep"].dtype == bool
+
+    # Same values
+    assert np.array_equal(np.array(compact.astype(object)),
+                          np.array(df.astype({"partial":bool}).astype(object)))
+
+    # Validation keeps compact dtypes (both re-validating and fast path)
+    for checked in [read_dataframe(compact),read_dataframe(compact.copy(deep=True).assign(test=1))]:
+        assert isinstance(checked["species"].dtype,pd.CategoricalDtype)
+        assert isinstance(checked["sequence"].dtype,pd.StringDtype)
+
+    # Missing values in a compact required column are still caught
+    bad = compact.copy()
+    bad["name"] = bad["name"].astype(object)
+    bad.loc[0,"name"] = ""
+    bad["name"] = bad["name"].astype(pd.StringDtype())
+    with pytest.raises(ValueError):
+        read_dataframe(bad)
+
+    # Flag columns with missing values are left alone
+    df["partial"] = [np.nan] + [0]*(len(df) - 1)
+    compact = compact_dataframe(df)
+    assert compact["partial"].dtype != bool
+
+    # read_dataframe compact flag
+    compact = read_dataframe(test_dataframes["good-df"],compact=True)
+    assert isinstance(compact["species"].dtype,pd.CategoricalDtype)
+
+def test__to_arrow_compatible():
+
+    df = pd.DataFrame({"mixed":["a",1,None,2.5],
+                       "numbers":pd.Series([1,2.5,None,3],dtype=object),
+                       "bools":pd.Series([True,None,False,True],dtype=object),
+                       "strings":["a","b",np.nan,"d"],
+                       "floats":[1.0,2.0,np.nan,4.0]})
+    df.index = [5,6,7,8]
+
+    # Column mixing strings and numbers
+    with pytest.raises(ValueError):
+        _to_arrow_compatible(df)
+
+    out = _to_arrow_compatible(df,stringify_mixed=True)
+    assert out is not df
+    assert np.array_equal(out.index,[0,1,2,3])
+    assert list(out.mixed) == ["a","1",None,"2.5"]
+    assert out.numbers.dtype == float
+    assert np.array_equal(out.numbers[[0,1,3]],[1,2.5,3])
+    assert np.isnan(out.numbers[2])
+    assert list(out.bools) == [True,None,False,True]
+    assert list(out.strings) == ["a","b",None,"d"]
+    assert out.floats.dtype == float
+
+    # Input not changed
+    assert list(df.mixed) == ["a",1,None,2.5]
+
+def test__get_checkpoint_file():
+
+    assert _get_checkpoint_file("test.csv") == "test.parquet"
+    assert _get_checkpoint_file(os.path.join("a","01_test.csv")) == os.path.join("a","01_test.parquet")
+
+def test__write_checkpoint(test_dataframes,tmpdir):
+
+    df = read_dataframe(test_dataframes["good-df"])
+
+    csv_file = os.path.join(tmpdir,"test.csv")
+    _write_checkpoint(df,csv_file)
+    assert os.path.isfile(csv_file)
+    assert os.path.isfile(_get_checkpoint_file(csv_file))
+    assert _is_fresh_checkpoint(csv_file)
+
+    with pytest.raises(FileExistsError):
+        _write_checkpoint(df,csv_file)
+    _write_checkpoint(df,csv_file,overwrite=True)
+
+    # Mixed-type column: csv only, stale checkpoint removed
+    df["mixed"] = ["a"] + [1]*(len(df) - 1)
+    _write_checkpoint(df,csv_file,overwrite=True)
+    assert os.path.isfile(csv_file)
+    assert not os.path.isfile(_get_checkpoint_file(csv_file))
+
+def test__read_checkpoint(test_dataframes,tmpdir):
+
+    df = read_dataframe(test_dataframes["good-df"])
+
+    csv_file = os.path.join(tmpdir,"test.csv")
+    checkpoint_file = _get_checkpoint_file(csv_file)
+    _write_checkpoint(df,csv_file)
+
+    # Reads checkpoint
+    pd.testing.assert_frame_equal(_read_checkpoint(csv_file),df)
+    os.remove(csv_file)
+    pd.testing.assert_frame_equal(_read_checkpoint(csv_file),df)
+
+    # csv edited after checkpoint was written: read csv
+    _write_checkpoint(df,csv_file,overwrite=True)
+    edited = df.copy()
+    edited.loc[:,"name"] = "edited"
+    write_dataframe(edited,csv_file,overwrite=True)
+    mtime = os.path.getmtime(checkpoint_file)
+    os.utime(csv_file,(mtime + 10,mtime + 10))
+
+    assert not _is_fresh_checkpoint(csv_file)
+    out = _read_checkpoint(csv_file)
+    assert np.all(out.name == "edited")
+
+    # No checkpoint: read csv
+    os.remove(checkpoint_file)
+    out = _read_checkpoint(csv_file)
+    assert np.all(out.name == "edited")
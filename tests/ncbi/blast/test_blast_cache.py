@@ -0,0 +1,159 @@
+
+import pytest
+
+from topiary.ncbi.blast.cache import _get_db_fingerprint
+from topiary.ncbi.blast.cache import _get_hit_kwargs
+from topiary.ncbi.blast.cache import _get_blast_key
+from topiary.ncbi.blast.cache import _hits_to_bytes
+from topiary.ncbi.blast.cache import _bytes_to_hits
+from topiary.ncbi.blast.cache import _get_blast_cache
+from topiary.ncbi.blast.read import _columns_to_df, _BLAST_COLUMNS
+from topiary._private.cache import DiskCache
+
+import numpy as np
+import pandas as pd
+
+import os
+import time
+
+def test__get_db_fingerprint(tmpdir):
+
+    db = os.path.join(tmpdir,"test-db")
+    for ext in ["pin","psq","phr"]:
+        with open(f"{db}.{ext}","w") as f:
+            f.write("x"*10)
+
+    a = _get_db_fingerprint(local_blast_db=db)
+    assert a == _get_db_fingerprint(local_blast_db=db)
+    assert a.startswith("local:")
+
+    # Rebuilding the database changes the fingerprint
+    time.sleep(0.01)
+    with open(f"{db}.psq","w") as f:
+        f.write("x"*20)
+    assert _get_db_fingerprint(local_blast_db=db) != a
+
+    # Different database
+    assert _get_db_fingerprint(local_blast_db=os.path.join(tmpdir,"other")) != a
+
+    # Remote databases are stamped with the current ncbi_max_age-day period
+    old_env = os.environ.pop("TOPIARY_BLAST_CACHE_NCBI_MAX_DAYS",None)
+    try:
+
+        period = int(time.time()//86400)//30
+        a = _get_db_fingerprint(ncbi_blast_db="nr")
+        assert a in [f"ncbi:nr:30:{period}",f"ncbi:nr:30:{period + 1}"]
+        assert _get_db_fingerprint(ncbi_blast_db="refseq_protein").startswith("ncbi:refseq_protein:30:")
+
+        assert _get_db_fingerprint(ncbi_blast_db="nr",ncbi_max_age=1).startswith("ncbi:nr:1:")
+
+        os.environ["TOPIARY_BLAST_CACHE_NCBI_MAX_DAYS"] = "7"
+        assert _get_db_fingerprint(ncbi_blast_db="nr").startswith("ncbi:nr:7:")
+
+        os.environ["TOPIARY_BLAST_CACHE_NCBI_MAX_DAYS"] = "0"
+        with pytest.raises(ValueError):
+            _get_db_fingerprint(ncbi_blast_db="nr")
+
+        with pytest.raises(ValueError):
+            _get_db_fingerprint(ncbi_blast_db="nr",ncbi_max_age=0)
+
+    finally:
+        os.environ.pop("TOPIARY_BLAST_CACHE_NCBI_MAX_DAYS",None)
+        if old_env is not None:
+            os.environ["TOPIARY_BLAST_CACHE_NCBI_MAX_DAYS"] = old_env
+
+def test__get_hit_kwargs():
+
+    kwargs = {"matrix":"BLOSUM45","scratch_dir":"tmp","use_pipes":True,
+              "use_async":True}
+    assert _get_hit_kwargs(kwargs) == {"matrix":"BLOSUM45"}
+    assert len(kwargs) == 4
+    assert _get_hit_kwargs({}) == {}
+
+def test__get_blast_key():
+
+    args = {"blast_program":"blastp","hitlist_size":10,"gapcosts":(11,1),
+            "kwargs":{}}
+
+    a = _get_blast_key("MLPFLFF","ncbi:nr",args)
+    assert a == _get_blast_key("MLPFLFF","ncbi:nr",dict(args))
+    assert len(a) == 32
+
+    # Argument order does not matter
+    assert a == _get_blast_key("MLPFLFF","ncbi:nr",dict(reversed(list(args.items()))))
+
+    assert a != _get_blast_key("MLPFLFA","ncbi:nr",args)
+    assert a != _get_blast_key("MLPFLFF","ncbi:refseq_protein",args)
+
+    other_args = dict(args)
+    other_args["hitlist_size"] = 50
+    assert a != _get_blast_key("MLPFLFF","ncbi:nr",other_args)
+
+    other_args = dict(args)
+    other_args["kwargs"] = {"matrix":"BLOSUM45"}
+    assert a != _get_blast_key("MLPFLFF","ncbi:nr",other_args)
+
+def test__hits_to_bytes(recip_blast_hit_dfs):
+
+    # Round trip saved hits
+    for blast_type in recip_blast_hit_dfs:
+        for hits in recip_blast_hit_dfs[blast_type]:
+            value = _hits_to_bytes(hits)
+            assert type(value) is bytes
+
+            out = _bytes_to_hits(value)
+            pd.testing.assert_frame_equal(out,hits.reset_index(drop=True))
+
+    # Round trip typed hits, including missing values
+    columns = {c:[None,None] for c in _BLAST_COLUMNS}
+    columns["accession"] = ["XP_1","XP_2"]
+    columns["hit_def"] = ["protein A",None]
+    columns["length"] = ["100",None]
+    columns["e_value"] = ["1e-10",None]
+    columns["bits"] = ["50.5","20"]
+    columns["subject_start"] = ["1","5"]
+    hits = _columns_to_df(columns)
+
+    out = _bytes_to_hits(_hits_to_bytes(hits))
+    pd.testing.assert_frame_equal(out,hits)
+    assert out.loc[1,"hit_def"] is pd.NA
+    assert out["length"].dtype == "Int64"
+    assert out["subject_start"].dtype == np.int64
+
+    # No hits
+    out = _bytes_to_hits(_hits_to_bytes(pd.DataFrame()))
+    assert len(out) == 0
+    assert len(out.columns) == 0
+
+def test__get_blast_cache(tmpdir):
+
+    env_keys = ["TOPIARY_BLAST_CACHE","TOPIARY_BLAST_CACHE_MAX_MB"]
+    old_env = {k:os.environ.pop(k) for k in env_keys if k in os.environ}
+
+    try:
+
+        assert _get_blast_cache() is None
+
+        blast_cache = _get_blast_cache(os.path.join(tmpdir,"cache"))
+        assert isinstance(blast_cache,DiskCache)
+        blast_cache.close()
+        assert os.path.isfile(os.path.join(tmpdir,"cache","blast-cache.sqlite"))
+
+        os.environ["TOPIARY_BLAST_CACHE"] = os.path.join(tmpdir,"env-cache")
+        os.environ["TOPIARY_BLAST_CACHE_MAX_MB"] = "10"
+        blast_cache = _get_blast_cache()
+        assert blast_cache._max_size == 10000000
+        blast_cache.close()
+        assert os.path.isfile(os.path.join(tmpdir,"env-cache","blast-cache.sqlite"))
+
+        os.environ["TOPIARY_BLAST_CACHE_MAX_MB"] = "not_an_int"
+        with pytest.raises(ValueError):
+            _get_blast_cache()
+
+        with pytest.raises(ValueError):
+            _get_blast_cache(1)
+
+    finally:
+        for k in env_keys:
+            os.environ.pop(k,None)
+        os.environ.update(old_env)
@@ -8,13 +8,50 @@ from topiary.ncbi.blast.local import _prepare_for_blast as _pfb
 from topiary.ncbi.blast.local import _construct_args as _ca
 from topiary.ncbi.blast.local import _combine_hits
 from topiary.ncbi.blast.local import _local_blast_thread_function
+from topiary.ncbi.blast.local import _get_db_size
+from topiary.ncbi.blast.local import _get_process_layout
+from topiary.ncbi.blast.local import _LARGE_BLAST_DB
+from topiary.ncbi.blast.read import _TABULAR_OUTFMT
 
 import Bio.Blast.Applications as apps
 
 import numpy as np
 import pandas as pd
 
-import copy, os
+import copy, os, shutil
+
+def test__get_db_size(tmpdir):
+
+    db = os.path.join(tmpdir,"test_db")
+    for ext, size in [("psq",10),("pin",5),("00.psq",20)]:
+        with open(f"{db}.{ext}","w") as f:
+            f.write("x"*size)
+
+    # Not part of database
+    with open(os.path.join(tmpdir,"test_db_other.psq"),"w") as f:
+        f.write("x"*100)
+
+    assert _get_db_size(db) == 35
+    assert _get_db_size(os.path.join(tmpdir,"not_a_db")) == 0
+
+def test__get_process_layout():
+
+    # Many blocks, small db: one single-threaded process per thread
+    assert _get_process_layout(100,8,0) == (8,1)
+
+    # One block: one process using all threads
+    assert _get_process_layout(1,8,0) == (1,8)
+
+    # Three blocks
+    assert _get_process_layout(3,8,0) == (3,2)
+
+    # Large db: at least 4 threads per process
+    assert _get_process_layout(100,8,_LARGE_BLAST_DB) == (2,4)
+    assert _get_process_layout(100,2,_LARGE_BLAST_DB) == (1,2)
+    assert _get_process_layout(1,16,_LARGE_BLAST_DB) == (1,16)
+
+    # One thread
+    assert _get_process_layout(100,1,0) == (1,1)
 
 def test__prepare_for_blast(test_dataframes,tmpdir):
 
@@ -183,6 +220,24 @@ def test__prepare_for_blast(test_dataframes,tmpdir):
             sequence_list, blast_function, blast_kwargs, return_singleton = _pfb(**kwargs)
 
 
+    # -------------------------------------------------------------------------
+    # output_format
+
+    kwargs = copy.deepcopy(default_kwargs)
+
+    sequence_list, blast_function, blast_kwargs, return_singleton = _pfb(**kwargs)
+    assert blast_kwargs["outfmt"] == 5
+
+    kwargs["output_format"] = "tabular"
+    sequence_list, blast_function, blast_kwargs, return_singleton = _pfb(**kwargs)
+    assert blast_kwargs["outfmt"] == f'"{_TABULAR_OUTFMT}"'
+
+    bad_format = ["not_a_format",1,None,str,{}]
+    for b in bad_format:
+        kwargs["output_format"] = b
+        with pytest.raises(ValueError):
+            sequence_list, blast_function, blast_kwargs, return_singleton = _pfb(**kwargs)
+
     # -------------------------------------------------------------------------
     # Extra kwargs
     kwargs = copy.deepcopy(default_kwargs)
@@ -402,6 +457,17 @@ def test__construct_args(test_dataframes,tmpdir):
                                 num_threads=3,
                                 manual_num_cores=None)
     assert all_args[0]["keep_blast_xml"] is True
+    assert all_args[0]["output_format"] == "xml"
+
+    all_args, num_threads = _ca(sequence_list,
+                                blast_function=blast_function,
+                                blast_kwargs=blast_kwargs,
+                                block_size=5,
+                                keep_blast_xml=True,
+                                num_threads=3,
+                                manual_num_cores=None,
+                                output_format="tabular")
+    assert all_args[0]["output_format"] == "tabular"
 
 
     bad_bool = [1.5,[],None,str,"",{}]
@@ -428,6 +494,73 @@ def test__construct_args(test_dataframes,tmpdir):
                                 num_threads=3,
                                 manual_num_cores=1000)
     assert num_threads == 3
+    assert all_args[0]["blast_kwargs"]["num_threads"] == 1
+
+    # One block: single process with all threads given to blast
+    all_args, num_threads = _ca(sequence_list,
+                                blast_function=blast_function,
+                                blast_kwargs=blast_kwargs,
+                                block_size=20,
+                                keep_blast_xml=False,
+                                num_threads=8,
+                                manual_num_cores=1000)
+    assert num_threads == 1
+    assert all_args[0]["blast_kwargs"]["num_threads"] == 8
+    assert "num_threads" not in blast_kwargs
+
+    # Large database: fewer processes, more blast threads
+    all_args, num_threads = _ca(sequence_list,
+                                blast_function=blast_function,
+                                blast_kwargs=blast_kwargs,
+                                block_size=1,
+                                keep_blast_xml=False,
+                                num_threads=8,
+                                manual_num_cores=1000,
+                                db_size=_LARGE_BLAST_DB)
+    assert num_threads == 2
+    assert len(all_args) == 5
+    assert all_args[0]["blast_kwargs"]["num_threads"] == 4
+
+    # Final partial block counts as a block: 5 sequences in blocks of 2 is
+    # three blocks, so three processes with two blast threads each
+    all_args, num_threads = _ca(sequence_list,
+                                blast_function=blast_function,
+                                blast_kwargs=blast_kwargs,
+                                block_size=2,
+                                keep_blast_xml=False,
+                                num_threads=6,
+                                manual_num_cores=1000)
+    assert num_threads == 3
+    assert len(all_args) == 3
+    assert all_args[0]["blast_kwargs"]["num_threads"] == 2
+
+    # Block count matches the windows actually built: 21 sequences in blocks
+    # of 20 is one window (the remainder folds in), so one process gets all
+    # twelve threads.
+    long_list = [sequence_list[0] for _ in range(21)]
+    all_args, num_threads = _ca(long_list,
+                                blast_function=blast_function,
+                                blast_kwargs=blast_kwargs,
+                                block_size=20,
+                                keep_blast_xml=False,
+                                num_threads=-1,
+                                manual_num_cores=12)
+    assert len(all_args) == 1
+    assert num_threads*all_args[0]["blast_kwargs"]["num_threads"] == 12
+
+    # 45 sequences in blocks of 20 is two windows: two processes with six
+    # blast threads each
+    long_list = [sequence_list[0] for _ in range(45)]
+    all_args, num_threads = _ca(long_list,
+                                blast_function=blast_function,
+                                blast_kwargs=blast_kwargs,
+                                block_size=20,
+                                keep_blast_xml=False,
+                                num_threads=-1,
+                                manual_num_cores=12)
+    assert len(all_args) == 2
+    assert num_threads == 2
+    assert all_args[0]["blast_kwargs"]["num_threads"] == 6
 
 
     bad_int = [0,False,[],-2,None,str,"",{},int]
@@ -442,6 +575,44 @@ def test__construct_args(test_dataframes,tmpdir):
                                         num_threads=b,
                                         manual_num_cores=None)
 
+    # -------------------------------------------------------------------------
+    # scratch_dir and use_pipes
+
+    all_args, num_threads = _ca(sequence_list,
+                                blast_function=blast_function,
+                                blast_kwargs=blast_kwargs)
+    assert all_args[0]["scratch_dir"] is None
+    assert all_args[0]["use_pipes"] is False
+
+    all_args, num_threads = _ca(sequence_list,
+                                blast_function=blast_function,
+                                blast_kwargs=blast_kwargs,
+                                scratch_dir=str(tmpdir),
+                                use_pipes=True)
+    assert all_args[0]["scratch_dir"] == str(tmpdir)
+    assert all_args[0]["use_pipes"] is True
+
+    bad_dir = [os.path.join(tmpdir,"not_a_dir"),1,False,[]]
+    for b in bad_dir:
+        with pytest.raises(ValueError):
+            _ca(sequence_list,
+                blast_function=blast_function,
+                blast_kwargs=blast_kwargs,
+                scratch_dir=b)
+
+    with pytest.raises(ValueError):
+        _ca(sequence_list,
+            blast_function=blast_function,
+            blast_kwargs=blast_kwargs,
+            use_pipes="test")
+
+    with pytest.raises(ValueError):
+        _ca(sequence_list,
+            blast_function=blast_function,
+            blast_kwargs=blast_kwargs,
+            keep_blast_xml=True,
+            use_pipes=True)
+
 def test__combine_hits(local_blast_output):
 
     # This is a set of two dataframes that have three and two outputs,
@@ -464,9 +635,131 @@ def test__combine_hits(local_blast_output):
     assert type(df_list) is list
     assert len(df_list) == 1
 
-def test__local_blast_thread_function():
-
-    pass
+class _FakeBlast:
+    """
+    Stand-in for a biopython blast command line. When called, writes the
+    blast output file named in the "out" keyword argument, or returns the
+    output as stdout if there is no "out" argument.
+    """
+
+    def __init__(self,out_contents,**kwargs):
+        self._out_contents = out_contents
+        self._kwargs = kwargs
+
+    def __call__(self,stdin=None,stdout=True,stderr=True):
+
+        if "out" not in self._kwargs:
+            assert stdin.startswith(">count")
+            return self._out_contents, ""
+
+        assert os.path.isfile(self._kwargs["query"])
+        with open(self._kwargs["out"],"w") as f:
+            f.write(self._out_contents)
+
+        return "", ""
+
+def test__local_blast_thread_function(xml,tmpdir):
+
+    cwd = os.getcwd()
+    os.chdir(tmpdir)
+
+    sequence_list = ["MLPFLFF","MSTQPQ","MLPFL"]
+
+    # xml output
+    with open(xml["good.xml"]) as f:
+        xml_contents = f.read()
+
+    def blast_function(**kwargs):
+        return _FakeBlast(xml_contents,**kwargs)
+
+    out_df = _local_blast_thread_function(sequence_list,
+                                          index=(0,1),
+                                          blast_function=blast_function,
+                                          blast_kwargs={"outfmt":5},
+                                          keep_blast_xml=False)
+    assert len(out_df) == 19
+    assert len([f for f in os.listdir(".") if f.startswith("topiary-tmp")]) == 0
+
+    # tabular output: two hsps for the first hit, no hits for count1
+    lines = ["count0\tXP_1\tref|XP_1.1|\tprotein A [Homo sapiens]\t160\t1e-50\t200\tMLPF\t1\t4\t1\t4",
+             "count0\tXP_1\tref|XP_1.1|\tprotein A [Homo sapiens]\t160\t1e-2\t20\tLP\t2\t3\t2\t3",
+             "count0\tXP_2\tref|XP_2.1|\tprotein B [Homo sapiens]\t150\t1e-40\t150\tMLPF\t1\t4\t1\t4",
+             "count2\tXP_3\tref|XP_3.1|\tprotein C [Homo sapiens]\t140\t1e-30\t100\tMLP\t1\t3\t1\t3"]
+    tabular_contents = "\n".join(lines) + "\n"
+
+    def blast_function(**kwargs):
+        return _FakeBlast(tabular_contents,**kwargs)
+
+    out_df = _local_blast_thread_function(sequence_list,
+                                          index=(0,3),
+                                          blast_function=blast_function,
+                                          blast_kwargs={"outfmt":_TABULAR_OUTFMT},
+                                          keep_blast_xml=True,
+                                          output_format="tabular")
+
+    assert list(out_df["query"]) == ["count0","count0","count1","count2"]
+    assert list(out_df["accession"].iloc[[0,1,3]]) == ["XP_1","XP_2","XP_3"]
+    assert out_df["accession"].iloc[2] is pd.NA
+    assert out_df["bits"].iloc[0] == 200
+    assert out_df["hit_def"].iloc[0] == "protein A [Homo sapiens]"
+    assert out_df["title"].iloc[0] == "ref|XP_1.1| protein A [Homo sapiens]"
+
+    # Kept temporary files
+    tmp_files = [f for f in os.listdir(".") if f.startswith("topiary-tmp")]
+    assert len(tmp_files) == 2
+    assert len([f for f in tmp_files if f.endswith(".tsv")]) == 1
+
+    # Splits into one dataframe per query like xml output
+    df_list = _combine_hits([out_df],return_singleton=False)
+    assert len(df_list) == 3
+    assert len(df_list[0]) == 2
+    assert len(df_list[1]) == 0
+    assert len(df_list[2]) == 1
+
+    # Temporary files in scratch directory
+    scratch_dir = os.path.join(tmpdir,"scratch")
+    os.mkdir(scratch_dir)
+    out_df = _local_blast_thread_function(sequence_list,
+                                          index=(0,3),
+                                          blast_function=blast_function,
+                                          blast_kwargs={"outfmt":_TABULAR_OUTFMT},
+                                          keep_blast_xml=True,
+                                          output_format="tabular",
+                                          scratch_dir=scratch_dir)
+    assert len(out_df) == 4
+    assert len(os.listdir(scratch_dir)) == 2
+    assert len([f for f in os.listdir(".") if f.startswith("topiary-tmp")]) == 2
+
+    # Pipes: no temporary files
+    for output_format, contents, expected_length in [("tabular",tabular_contents,4),
+                                                     ("xml",xml_contents,19)]:
+
+        def blast_function(**kwargs):
+            return _FakeBlast(contents,**kwargs)
+
+        out_df = _local_blast_thread_function(sequence_list,
+                                              index=(0,3),
+                                              blast_function=blast_function,
+                                              blast_kwargs={},
+                                              keep_blast_xml=False,
+                                              output_format=output_format,
+                                              use_pipes=True)
+        assert len(out_df) == expected_length
+
+    assert len([f for f in os.listdir(".") if f.startswith("topiary-tmp")]) == 2
+
+    # Blast did not write anything
+    def blast_function(**kwargs):
+        return _FakeBlast("",**kwargs)
+    with pytest.raises(RuntimeError):
+        _local_blast_thread_function(sequence_list,
+                                     index=(0,3),
+                                     blast_function=blast_function,
+                                     blast_kwargs={},
+                                     keep_blast_xml=False,
+                                     use_pipes=True)
+
+    os.chdir(cwd)
 
 def test_local_blast():
 
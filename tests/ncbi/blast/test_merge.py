@@ -3,51 +3,14 @@
 import pytest
 
 import topiary
-from topiary.ncbi.blast.merge import _check_merge
 from topiary.ncbi.blast.merge import merge_blast_df
 from topiary.ncbi.blast.merge import merge_and_annotate
+from topiary.ncbi.blast.read import _columns_to_df
+from topiary.ncbi.blast.read import _BLAST_COLUMNS
 
 import numpy as np
 import pandas as pd
 
-def test__check_merge():
-
-    to_merge = [None,None,None]
-    index = 1
-    merge_index = 0
-    expected = [0,0,None]
-    to_merge = _check_merge(index,merge_index,to_merge)
-    for i in range(len(to_merge)):
-        assert to_merge[i] == expected[i]
-
-    to_merge = [3,None,3]
-    index = 1
-    merge_index = 0
-
-    expected = [3,3,3]
-    to_merge = _check_merge(index,merge_index,to_merge)
-    for i in range(len(to_merge)):
-        assert to_merge[i] == expected[i]
-
-    to_merge = [3,4,3,4]
-    index = 1
-    merge_index = 0
-
-    expected = [3,3,3,3]
-    to_merge = _check_merge(index,merge_index,to_merge)
-    for i in range(len(to_merge)):
-        assert to_merge[i] == expected[i]
-
-    to_merge = [3,4,3,5,5]
-    index = 1
-    merge_index = 0
-
-    expected = [3,3,3,5,5]
-    to_merge = _check_merge(index,merge_index,to_merge)
-    for i in range(len(to_merge)):
-        assert to_merge[i] == expected[i]
-
-
 def test_merge_blast_df(recip_blast_hit_dfs):
 
     blast_dfs = recip_blast_hit_dfs["ncbi"]
@@ -72,6 +35,47 @@ def test_merge_blast_df(recip_blast_hit_dfs):
     assert len(merged) == 15
     assert len(merged_offset) == len(df_0) + len(df_1)
 
+    # Hand-built hits. A0 hits 1 and 3 overlap only through hit 2; A1 hits do
+    # not overlap; A2 has a single hit.
+    df_0 = pd.DataFrame({"accession":["A0","A1","A2"],
+                         "subject_start":[1,1,5],
+                         "subject_end":[10,10,20],
+                         "query":["q0","q0","q0"],
+                         "e_value":[1e-5,1e-5,1e-5],
+                         "hit_def":["a","b","c"]})
+    df_1 = pd.DataFrame({"accession":["A1","A0","A0"],
+                         "subject_start":[20,30,8],
+                         "subject_end":[30,40,32],
+                         "query":["q1","q1","q1"],
+                         "e_value":[1e-10,1e-3,1e-20],
+                         "hit_def":["d","e","f"]})
+
+    merged = merge_blast_df([df_0,df_1])
+    assert list(merged.columns) == list(df_0.columns)
+    assert list(merged.accession) == ["A1","A2","A1","A0"]
+    assert list(merged.hit_def) == ["b","c","d","f"]
+
+    # Unmerged hits are unchanged
+    assert list(merged["query"].iloc[:3]) == ["q0","q0","q1"]
+
+    # Merged hit covers full range with best e-value
+    assert merged["query"].iloc[3] == "q0|1-10;q1|30-40;q1|8-32"
+    assert merged["subject_start"].iloc[3] == 1
+    assert merged["subject_end"].iloc[3] == 40
+    assert merged["e_value"].iloc[3] == 1e-20
+
+    # Touching ranges merge
+    df_1.loc[0,"subject_start"] = 10
+    merged = merge_blast_df([df_0,df_1])
+    assert len(merged) == 3
+    assert list(merged.accession) == ["A2","A1","A0"]
+    assert merged["query"].iloc[1] == "q0|1-10;q1|10-30"
+
+    # Nothing to merge
+    merged = merge_blast_df([df_0])
+    assert len(merged) == len(df_0)
+    assert list(merged.hit_def) == list(df_0.hit_def)
+
     # Send in garbage
     bad_inputs = [["not","df"],[pd.DataFrame(),pd.DataFrame()],1,None,list,1.5]
     for b in bad_inputs:
@@ -86,5 +90,25 @@ def test_merge_blast_df(recip_blast_hit_dfs):
     with pytest.raises(ValueError):
         merge_blast_df([df_0,df_1])
 
+    # Output straight from the xml reader. A query with no hits gives a row
+    # of missing values, so integer columns come back as nullable Int64.
+    columns = dict([(c,[None,None,None]) for c in _BLAST_COLUMNS])
+    columns["query"] = ["q0","q0","q1"]
+    columns["accession"] = ["A0","A0",None]
+    columns["subject_start"] = ["1","5",None]
+    columns["subject_end"] = ["10","20",None]
+    columns["e_value"] = ["1e-5","1e-10",None]
+    reader_df = _columns_to_df(columns)
+    assert reader_df["subject_start"].dtype == "Int64"
+
+    merged = merge_blast_df([reader_df])
+    assert len(merged) == 2
+    assert merged["query"].iloc[0] == "q0|1-10;q0|5-20"
+    assert merged["subject_start"].iloc[0] == 1
+    assert merged["subject_end"].iloc[0] == 20
+    assert merged["e_value"].iloc[0] == 1e-10
+    assert merged["query"].iloc[1] == "q1"
+    assert pd.isna(merged["accession"].iloc[1])
+
 def test_merge_and_annotate():
     pass
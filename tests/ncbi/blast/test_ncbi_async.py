@@ -0,0 +1,473 @@
+
+import pytest
+
+from topiary.ncbi.blast import ncbi_async
+from topiary.ncbi.blast.ncbi_async import _RateLimiter
+from topiary.ncbi.blast.ncbi_async import _get_request_params
+from topiary.ncbi.blast.ncbi_async import _parse_rid
+from topiary.ncbi.blast.ncbi_async import _parse_status
+from topiary.ncbi.blast.ncbi_async import _post
+from topiary.ncbi.blast.ncbi_async import _parse_result
+from topiary.ncbi.blast.ncbi_async import _run_query
+from topiary.ncbi.blast.ncbi_async import _run_async_blast
+from topiary.ncbi.blast.ncbi import _construct_args
+from topiary.ncbi.blast.ncbi import ncbi_blast
+
+import pandas as pd
+
+import asyncio, glob, os, threading, time, urllib.parse, urllib.error
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+_PUT_RESPONSE = """<html><body>
+<!--QBlastInfoBegin
+    RID = {rid}
+    RTOE = 0
+QBlastInfoEnd
+-->
+</body></html>
+"""
+
+_STATUS_RESPONSE = """<html><body>
+<!--QBlastInfoBegin
+	Status={status}
+QBlastInfoEnd
+-->
+</body></html>
+"""
+
+_XML_HEADER = """<?xml version="1.0"?>
+<!DOCTYPE BlastOutput PUBLIC "-//NCBI//NCBI BlastOutput/EN" "http://www.ncbi.nlm.nih.gov/dtd/NCBI_BlastOutput.dtd">
+<BlastOutput>
+<BlastOutput_program>blastp</BlastOutput_program>
+<BlastOutput_iterations>
+"""
+
+_XML_ITERATION = """<Iteration>
+<Iteration_iter-num>{num}</Iteration_iter-num>
+<Iteration_query-def>{query}</Iteration_query-def>
+<Iteration_hits>
+<Hit>
+<Hit_num>1</Hit_num>
+<Hit_id>ref|XP_{sequence}|</Hit_id>
+<Hit_def>protein {sequence} [Homo sapiens]</Hit_def>
+<Hit_accession>XP_{sequence}</Hit_accession>
+<Hit_len>{length}</Hit_len>
+<Hit_hsps>
+<Hsp>
+<Hsp_bit-score>50.5</Hsp_bit-score>
+<Hsp_evalue>1e-10</Hsp_evalue>
+<Hsp_query-from>1</Hsp_query-from>
+<Hsp_query-to>{length}</Hsp_query-to>
+<Hsp_hit-from>1</Hsp_hit-from>
+<Hsp_hit-to>{length}</Hsp_hit-to>
+<Hsp_hseq>{sequence}</Hsp_hseq>
+</Hsp>
+</Hit_hsps>
+</Hit>
+</Iteration_hits>
+{message}</Iteration>
+"""
+
+_XML_FOOTER = """</BlastOutput_iterations>
+</BlastOutput>
+"""
+
+class _BlastHandler(BaseHTTPRequestHandler):
+    """
+    Stand-in for the NCBI blast server. Mimics the Put (submit, returning an
+    RID), Get SearchInfo (status), and Get (results) protocol. Each search
+    reports WAITING for server.num_waiting polls, then READY. Results have one
+    hit per query, named after the query sequence.
+    """
+
+    def log_message(self,*args):
+        pass
+
+    def _respond(self,text,code=200):
+
+        out = text.encode()
+        self.send_response(code)
+        self.send_header("Content-Type","text/html")
+        self.send_header("Content-Length",str(len(out)))
+        self.end_headers()
+        self.wfile.write(out)
+
+    def do_POST(self):
+
+        length = int(self.headers["Content-Length"])
+        params = dict(urllib.parse.parse_qsl(self.rfile.read(length).decode()))
+
+        server = self.server
+        with server.lock:
+            server.requests.append((time.monotonic(),params))
+
+            if params["CMD"] == "Put":
+
+                if server.num_failed_puts > 0:
+                    server.num_failed_puts -= 1
+                    self._respond("server error",code=500)
+                    return
+
+                rid = f"RID{len(server.searches):04d}"
+                server.searches[rid] = {"query":params["QUERY"],
+                                        "num_polls":0}
+                self._respond(_PUT_RESPONSE.format(rid=rid))
+                return
+
+            search = server.searches.get(params.get("RID"))
+            if search is None:
+                self._respond(_STATUS_RESPONSE.format(status="UNKNOWN"))
+                return
+
+            if params.get("FORMAT_OBJECT") == "SearchInfo":
+                search["num_polls"] += 1
+                if search["num_polls"] <= server.num_waiting:
+                    status = "WAITING"
+                else:
+                    status = "READY"
+                self._respond(_STATUS_RESPONSE.format(status=status))
+                return
+
+            message = ""
+            if server.cpu_limit:
+                message = "<Iteration_message>CPU usage limit was exceeded</Iteration_message>\n"
+
+            records = search["query"].strip().split(">")[1:]
+            xml = [_XML_HEADER]
+            for i, r in enumerate(records):
+                query, sequence = r.strip().split("\n")
+                xml.append(_XML_ITERATION.format(num=i+1,
+                                                 query=query,
+                                                 sequence=sequence,
+                                                 length=len(sequence),
+                                                 message=message))
+            xml.append(_XML_FOOTER)
+
+            self._respond("".join(xml))
+
+@pytest.fixture
+def blast_server():
+    """
+    Local http stand-in for the NCBI blast server, running on its own thread.
+    """
+
+    server = ThreadingHTTPServer(("127.0.0.1",0),_BlastHandler)
+    server.lock = threading.Lock()
+    server.requests = []
+    server.searches = {}
+    server.num_waiting = 2
+    server.num_failed_puts = 0
+    server.cpu_limit = False
+    server.url = f"http://127.0.0.1:{server.server_address[1]}/Blast.cgi"
+
+    thread = threading.Thread(target=server.serve_forever,daemon=True)
+    thread.start()
+
+    yield server
+
+    server.shutdown()
+    server.server_close()
+    thread.join()
+
+def _get_kwargs_list(sequence_list,url,num_tries_allowed=3,keep_blast_xml=False):
+
+    blast_kwargs = {"program":"blastp",
+                    "database":"nr",
+                    "hitlist_size":"10",
+                    "expect":"0.001",
+                    "gapcosts":"11 1",
+                    "url_base":url}
+
+    kwargs_list = []
+    for s in sequence_list:
+        this_kwargs, _ = _construct_args(sequence_list=[s],
+                                         blast_kwargs=blast_kwargs,
+                                         max_query_length=80000,
+                                         num_tries_allowed=num_tries_allowed,
+                                         keep_blast_xml=keep_blast_xml,
+                                         num_threads=1)
+        kwargs_list.extend(this_kwargs)
+
+    return kwargs_list
+
+def test__RateLimiter():
+
+    async def _make_requests(interval,num_requests):
+        rate_limiter = _RateLimiter(interval)
+        loop = asyncio.get_running_loop()
+        times = []
+        async def _one():
+            await rate_limiter.wait()
+            times.append(loop.time())
+        await asyncio.gather(*[_one() for _ in range(num_requests)])
+        return times
+
+    times = asyncio.run(_make_requests(0.05,5))
+    assert len(times) == 5
+    gaps = [times[i+1] - times[i] for i in range(4)]
+    assert min(gaps) >= 0.045
+
+def test__get_request_params():
+
+    this_query = {"program":"blastp",
+                  "database":"nr",
+                  "hitlist_size":"10",
+                  "expect":"0.001",
+                  "gapcosts":"11 1",
+                  "url_base":"http://test/Blast.cgi",
+                  "entrez_query":"txid9606[ORGN]",
+                  "sequence":">count0\nMLPFLFF\n",
+                  "format_type":"Text",
+                  "alignments":100,
+                  "matrix_name":None}
+
+    url, put_params, get_params = _get_request_params(this_query)
+
+    assert url == "http://test/Blast.cgi"
+
+    assert put_params["CMD"] == "Put"
+    assert put_params["PROGRAM"] == "blastp"
+    assert put_params["DATABASE"] == "nr"
+    assert put_params["HITLIST_SIZE"] == "10"
+    assert put_params["EXPECT"] == "0.001"
+    assert put_params["GAPCOSTS"] == "11 1"
+    assert put_params["ENTREZ_QUERY"] == "txid9606[ORGN]"
+    assert put_params["QUERY"] == ">count0\nMLPFLFF\n"
+    assert put_params["TOOL"] == "topiary"
+    assert "URL_BASE" not in put_params
+    assert "SEQUENCE" not in put_params
+    assert "FORMAT_TYPE" not in put_params
+    assert "MATRIX_NAME" not in put_params
+
+    assert get_params["CMD"] == "Get"
+    assert get_params["FORMAT_TYPE"] == "Text"
+    assert get_params["ALIGNMENTS"] == "100"
+    assert get_params["DESCRIPTIONS"] == "500"
+    assert get_params["TOOL"] == "topiary"
+    assert "QUERY" not in get_params
+    assert "RID" not in get_params
+
+    # Input not modified; default url
+    assert "url_base" in this_query
+    this_query.pop("url_base")
+    url, put_params, get_params = _get_request_params(this_query)
+    assert url == "https://blast.ncbi.nlm.nih.gov/Blast.cgi"
+    assert get_params["FORMAT_TYPE"] == "Text"
+
+    this_query.pop("format_type")
+    url, put_params, get_params = _get_request_params(this_query)
+    assert get_params["FORMAT_TYPE"] == "XML"
+
+def test__parse_rid():
+
+    rid, rtoe = _parse_rid(_PUT_RESPONSE.format(rid="8VKZ2GXS016"))
+    assert rid == "8VKZ2GXS016"
+    assert rtoe == 0
+
+    text = "<!--QBlastInfoBegin\n    RID = ABC\n    RTOE = 27\nQBlastInfoEnd\n-->"
+    assert _parse_rid(text) == ("ABC",27)
+
+    assert _parse_rid("<html>error</html>") == (None,0)
+    assert _parse_rid("    RID = \n    RTOE = soon\n") == (None,0)
+
+def test__parse_status():
+
+    for status in ["WAITING","READY","FAILED","UNKNOWN"]:
+        assert _parse_status(_STATUS_RESPONSE.format(status=status)) == status
+
+    assert _parse_status("<html>error</html>") == "UNKNOWN"
+
+def test__post(blast_server):
+
+    text = _post(blast_server.url,{"CMD":"Put","QUERY":">count0\nMLPF\n"})
+    assert _parse_rid(text) == ("RID0000",0)
+
+    params = blast_server.requests[-1][1]
+    assert params["CMD"] == "Put"
+    assert params["QUERY"] == ">count0\nMLPF\n"
+
+    text = _post(blast_server.url,{"CMD":"Get","FORMAT_OBJECT":"SearchInfo",
+                                   "RID":"RID0000"})
+    assert _parse_status(text) == "WAITING"
+
+    blast_server.num_failed_puts = 1
+    with pytest.raises(urllib.error.HTTPError):
+        _post(blast_server.url,{"CMD":"Put","QUERY":">count0\nMLPF\n"})
+
+def test__parse_result(xml,tmpdir):
+
+    cwd = os.getcwd()
+    os.chdir(tmpdir)
+
+    try:
+
+        with open(xml["good.xml"]) as f:
+            contents = f.read()
+
+        df = _parse_result(contents,keep_blast_xml=False)
+        assert type(df) is pd.DataFrame
+        assert len(df) == 19
+        assert len(glob.glob("*.xml")) == 0
+
+        df = _parse_result(contents,keep_blast_xml=True)
+        assert len(df) == 19
+        assert len(glob.glob("*_ncbi-blast-result.xml")) == 1
+
+        with open(xml["cpu-limit.xml"]) as f:
+            contents = f.read()
+
+        assert _parse_result(contents,keep_blast_xml=False) is None
+        assert len(glob.glob("*_ncbi-blast-result.xml")) == 1
+
+    finally:
+        os.chdir(cwd)
+
+def test__run_query(blast_server,tmpdir):
+
+    cwd = os.getcwd()
+    os.chdir(tmpdir)
+
+    def _run(this_query,num_tries_allowed):
+        async def _main():
+            rate_limiter = _RateLimiter(0.001)
+            return await _run_query(this_query,
+                                    num_tries_allowed=num_tries_allowed,
+                                    keep_blast_xml=False,
+                                    rate_limiter=rate_limiter,
+                                    poll_interval=0.01,
+                                    max_poll_interval=0.02)
+        return asyncio.run(_main())
+
+    try:
+
+        kwargs = _get_kwargs_list(["MLPFLFF"],blast_server.url)[0]
+        this_query = kwargs["this_query"]
+
+        df = _run(this_query,num_tries_allowed=1)
+        assert len(df) == 1
+        assert df.loc[0,"accession"] == "XP_MLPFLFF"
+        assert df.loc[0,"query"] == "count0"
+
+        # Put, two WAITING polls, one READY poll, Get
+        cmds = [r[1]["CMD"] for r in blast_server.requests]
+        assert cmds == ["Put","Get","Get","Get","Get"]
+        assert blast_server.requests[-1][1]["FORMAT_TYPE"] == "XML"
+        assert blast_server.requests[-1][1]["RID"] == "RID0000"
+        assert "FORMAT_OBJECT" not in blast_server.requests[-1][1]
+
+        # Server errors are retried
+        blast_server.num_failed_puts = 2
+        df = _run(this_query,num_tries_allowed=3)
+        assert df.loc[0,"accession"] == "XP_MLPFLFF"
+
+        blast_server.num_failed_puts = 2
+        with pytest.raises(RuntimeError):
+            _run(this_query,num_tries_allowed=2)
+
+        # Bad server url
+        this_query = dict(this_query)
+        this_query["url_base"] = "http://127.0.0.1:1/Blast.cgi"
+        with pytest.raises(RuntimeError):
+            _run(this_query,num_tries_allowed=2)
+
+        # CPU limit
+        blast_server.cpu_limit = True
+        this_query["url_base"] = blast_server.url
+        assert _run(this_query,num_tries_allowed=1) is None
+
+        assert len(glob.glob("*.xml")) == 0
+
+    finally:
+        os.chdir(cwd)
+
+def test__run_async_blast(blast_server,tmpdir):
+
+    cwd = os.getcwd()
+    os.chdir(tmpdir)
+
+    try:
+
+        sequences = ["MLPFLFF","AAAAAAA","MLPFLFA","WWWWWW","MMMMMM"]
+        kwargs_list = _get_kwargs_list(sequences,blast_server.url)
+
+        blast_server.num_waiting = 3
+        all_hits = _run_async_blast(kwargs_list,
+                                    request_interval=0.01,
+                                    poll_interval=0.05,
+                                    max_poll_interval=0.1)
+
+        # Results come back in query order
+        assert len(all_hits) == len(sequences)
+        for s, df in zip(sequences,all_hits):
+            assert len(df) == 1
+            assert df.loc[0,"accession"] == f"XP_{s}"
+
+        # All searches were submitted before any result was downloaded, so the
+        # searches ran concurrently.
+        cmds = []
+        for _, params in blast_server.requests:
+            if params["CMD"] == "Put":
+                cmds.append("Put")
+            elif params.get("FORMAT_OBJECT") == "SearchInfo":
+                cmds.append("SearchInfo")
+            else:
+                cmds.append("Get")
+        assert cmds.count("Put") == 5
+        assert cmds.count("SearchInfo") == 20
+        assert cmds.count("Get") == 5
+        assert max([i for i, c in enumerate(cmds) if c == "Put"]) < cmds.index("Get")
+
+        # Requests are spaced by the request interval
+        times = [t for t, _ in blast_server.requests]
+        assert times[-1] - times[0] >= 0.9*0.01*(len(times) - 1)
+
+        # Works when called from inside a running event loop (i.e. jupyter)
+        async def _inside_loop():
+            return _run_async_blast(kwargs_list[:2],
+                                    request_interval=0.001,
+                                    poll_interval=0.01,
+                                    max_poll_interval=0.01)
+        all_hits = asyncio.run(_inside_loop())
+        assert all_hits[1].loc[0,"accession"] == "XP_AAAAAAA"
+
+        # CPU limit comes back as None
+        blast_server.cpu_limit = True
+        all_hits = _run_async_blast(kwargs_list[:2],
+                                    request_interval=0.001,
+                                    poll_interval=0.01,
+                                    max_poll_interval=0.01)
+        assert all_hits == [None,None]
+
+    finally:
+        os.chdir(cwd)
+
+def test_ncbi_blast_use_async(blast_server,tmpdir,monkeypatch):
+
+    monkeypatch.setattr(ncbi_async,"_REQUEST_INTERVAL",0.001)
+    monkeypatch.setattr(ncbi_async,"_POLL_INTERVAL",0.01)
+    monkeypatch.setattr(ncbi_async,"_MAX_POLL_INTERVAL",0.01)
+
+    cwd = os.getcwd()
+    os.chdir(tmpdir)
+
+    try:
+
+        sequences = ["MLPFLFF","AAAAAAA","MLPFLFA"]
+        out = ncbi_blast(sequences,url_base=blast_server.url,use_async=True)
+        assert len(out) == 3
+        for s, df in zip(sequences,out):
+            assert df.iloc[0]["accession"] == f"XP_{s}"
+
+        out = ncbi_blast("MLPFLFF",url_base=blast_server.url,use_async=True)
+        assert type(out) is pd.DataFrame
+        assert out.iloc[0]["accession"] == "XP_MLPFLFF"
+
+        with pytest.raises(ValueError):
+            ncbi_blast("MLPFLFF",url_base=blast_server.url,use_async="yes")
+
+        blast_server.cpu_limit = True
+        with pytest.raises(RuntimeError):
+            ncbi_blast(sequences,url_base=blast_server.url,use_async=True)
+
+    finally:
+        os.chdir(cwd)
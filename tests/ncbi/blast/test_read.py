@@ -5,9 +5,114 @@ from topiary.ncbi.blast.read import _clean_xml
 from topiary.ncbi.blast.read import check_for_cpu_limit
 from topiary.ncbi.blast.read import records_to_df
 from topiary.ncbi.blast.read import read_blast_xml
+from topiary.ncbi.blast.read import iter_blast_xml
+from topiary.ncbi.blast.read import _CleanXMLReader
+from topiary.ncbi.blast.read import _iter_xml_columns
+from topiary.ncbi.blast.read import _columns_to_df
+from topiary.ncbi.blast.read import _xml_file_to_df
+from topiary.ncbi.blast.read import _BLAST_COLUMNS
+from topiary.ncbi.blast.read import _tabular_file_to_df
+from topiary.ncbi.blast.read import _TABULAR_FIELDS
+
+import numpy as np
+import pandas as pd
 
 import os, shutil, re
 
+def _write_test_xml(xml_file):
+    """
+    Write a small blast xml file with three queries. The first has two hits
+    (the first with two hsps), the second has no hits, and the third has no
+    query definition and one hit. Also sprinkles in CREATE_VIEW mangling.
+    """
+
+    hsp = """<Hsp>
+  <Hsp_bit-score>{bits}</Hsp_bit-score>
+  <Hsp_evalue>{evalue}</Hsp_evalue>
+  <Hsp_query-from>1</Hsp_query-from>
+  <Hsp_query-to>{length}</Hsp_query-to>
+  <Hsp_hit-from>2</Hsp_hit-from>
+  <Hsp_hit-to>{length}</Hsp_hit-to>
+  <Hsp_hseq>{seq}</Hsp_hseq>
+</Hsp>
+"""
+
+    hit = """<Hit>
+  <Hit_id>ref|{acc}|</Hit_id>
+  <Hit_def>protein [Homo sapiens]</Hit_def>
+  <Hit_accession>{acc}</Hit_accession>
+  <Hit_len>{length}</Hit_len>
+  <Hit_hsps>
+{hsps}
+  </Hit_hsps>
+</Hit>
+"""
+
+    hit_1 = hit.format(acc="XP_1",length=5,
+                       hsps=hsp.format(bits=50.5,evalue=1e-10,length=5,seq="MLPFL") + \
+                            hsp.format(bits=10.1,evalue=0.1,length=3,seq="MLP"))
+    hit_2 = hit.format(acc="XP_2",length=4,
+                       hsps=hsp.format(bits=20.5,evalue=1e-5,length=4,seq="MLPF"))
+
+    with open(xml_file,"w") as f:
+        f.write(f"""<?xml version="1.0"?>
+<!DOCTYPE BlastOutput PUBLIC "-//NCBI//NCBI BlastOutput/EN" "http://www.ncbi.nlm.nih.gov/dtd/NCBI_BlastOutput.dtd">
+<BlastOutput>
+  <BlastOutput_program>blastp</BlastOutput_program>
+  <BlastOutput_query-ID>Query_1</BlastOutput_query-ID>
+  <BlastOutput_query-def>header query</BlastOutput_query-def>
+  <BlastOutput_query-len>5</BlastOutput_query-len>
+  <BlastOutput_param>
+    <Parameters>
+      <Parameters_expect>0.001</Parameters_expect>
+    </Parameters>
+  </BlastOutput_param>
+CREATE_VIEW
+
+<BlastOutput_iterations>
+<Iteration>
+  <Iteration_query-ID>Query_1</Iteration_query-ID>
+  <Iteration_query-def>query 1</Iteration_query-def>
+  <Iteration_query-len>5</Iteration_query-len>
+  <Iteration_hits>
+{hit_1}{hit_2}
+  </Iteration_hits>
+</Iteration>
+<Iteration>
+  <Iteration_query-ID>Query_2</Iteration_query-ID>
+  <Iteration_query-def>query 2</Iteration_query-def>
+  <Iteration_query-len>5</Iteration_query-len>
+  <Iteration_hits>
+  </Iteration_hits>
+  <Iteration_message>No hits found</Iteration_message>
+</Iteration>
+CREATE_VIEW
+<Iteration>
+  <Iteration_query-ID>Query_3</Iteration_query-ID>
+  <Iteration_query-len>5</Iteration_query-len>
+  <Iteration_hits>
+{hit_2}
+  </Iteration_hits>
+</Iteration>
+</BlastOutput_iterations>
+</BlastOutput>
+""")
+
+def _assert_blast_df_equal(df, expected):
+    """
+    Make sure dataframes hold the same values (ignoring dtype).
+    """
+
+    assert list(df.columns) == list(expected.columns)
+    assert len(df) == len(expected)
+    for c in df.columns:
+        a = np.array(df[c].astype(object))
+        b = np.array(expected[c].astype(object))
+        a_null = np.array(pd.isnull(a),dtype=bool)
+        b_null = np.array(pd.isnull(b),dtype=bool)
+        assert np.array_equal(a_null,b_null)
+        assert np.array_equal(a[~a_null],b[~b_null])
+
 def test__clean_xml(user_xml_files):
 
     for f in user_xml_files:
@@ -41,6 +146,200 @@ def test__xml_file_to_records(user_xml_files):
         for o in out[:1]:
             assert len(list(o.alignments)) == expected_length
 
+def test__CleanXMLReader(user_xml_files):
+
+    for f in user_xml_files:
+
+        expected = _clean_xml(f)
+
+        # Read in small and large chunks
+        for size in [10,100000]:
+            with open(f) as g:
+                reader = _CleanXMLReader(g)
+                chunks = []
+                while True:
+                    chunk = reader.read(size)
+                    if chunk == "":
+                        break
+                    chunks.append(chunk)
+
+            assert "".join(chunks) == expected
+
+        with open(f) as g:
+            assert _CleanXMLReader(g).read() == expected
+
+def test__iter_xml_columns(tmpdir):
+
+    xml_file = os.path.join(tmpdir,"test.xml")
+    _write_test_xml(xml_file)
+
+    out = list(_iter_xml_columns(xml_file))
+    assert len(out) == 3
+    for o in out:
+        assert list(o.keys()) == _BLAST_COLUMNS
+
+    # First query: two hits, first hsp only
+    assert out[0]["accession"] == ["XP_1","XP_2"]
+    assert out[0]["hit_id"] == ["ref|XP_1|","ref|XP_2|"]
+    assert out[0]["title"] == ["ref|XP_1| protein [Homo sapiens]",
+                               "ref|XP_2| protein [Homo sapiens]"]
+    assert out[0]["sequence"] == ["MLPFL","MLPF"]
+    assert out[0]["bits"] == ["50.5","20.5"]
+    assert out[0]["subject_start"] == ["2","2"]
+    assert out[0]["query_end"] == ["5","4"]
+    assert out[0]["query"] == ["query 1","query 1"]
+
+    # Second query: no hits
+    assert out[1]["query"] == ["query 2"]
+    for c in _BLAST_COLUMNS[:-1]:
+        assert out[1][c] == [None]
+
+    # Third query: no query-def, fall back to header
+    assert out[2]["accession"] == ["XP_2"]
+    assert out[2]["query"] == ["header query"]
+
+    # Bad file
+    bad_file = os.path.join(tmpdir,"bad.xml")
+    with open(bad_file,"w") as f:
+        f.write("<BlastOutput><Iteration></BlastOutput>")
+    with pytest.raises(ValueError):
+        list(_iter_xml_columns(bad_file))
+
+def test__columns_to_df():
+
+    columns = {"accession":["XP_1","XP_2"],
+               "hit_def":["a","b"],
+               "hit_id":["c","d"],
+               "title":["c a","d b"],
+               "length":["5","4"],
+               "e_value":["1e-10","0.1"],
+               "bits":["50.5","10"],
+               "sequence":["MLPFL","MLPF"],
+               "subject_start":["1","2"],
+               "subject_end":["5","4"],
+               "query_start":["1","1"],
+               "query_end":["5","4"],
+               "query":["q","q"]}
+
+    df = _columns_to_df(columns)
+    assert list(df.columns) == _BLAST_COLUMNS
+    assert df["length"].dtype == np.int64
+    assert df["e_value"].dtype == float
+    assert np.array_equal(df["subject_start"],[1,2])
+    assert np.array_equal(df["e_value"],[1e-10,0.1])
+    assert list(df["accession"]) == ["XP_1","XP_2"]
+
+    # Missing values
+    for c in columns:
+        if c != "query":
+            columns[c][1] = None
+
+    df = _columns_to_df(columns)
+    assert df["length"].dtype == "Int64"
+    assert df["length"][0] == 5
+    assert df["length"][1] is pd.NA
+    assert np.isnan(df["bits"][1])
+    assert df["accession"][1] is pd.NA
+    assert list(df["query"]) == ["q","q"]
+
+    df = _columns_to_df(dict([(c,[]) for c in _BLAST_COLUMNS]))
+    assert len(df) == 0
+    assert list(df.columns) == _BLAST_COLUMNS
+
+def test_iter_blast_xml(tmpdir,user_xml_files):
+
+    with pytest.raises(FileNotFoundError):
+        next(iter_blast_xml("stupid"))
+
+    xml_file = os.path.join(tmpdir,"test.xml")
+    _write_test_xml(xml_file)
+
+    out = list(iter_blast_xml(xml_file))
+    assert len(out) == 3
+    assert [len(o) for o in out] == [2,1,1]
+    assert out[1]["accession"][0] is pd.NA
+
+    for f in user_xml_files:
+        out = list(iter_blast_xml(f))
+        assert len(out) == user_xml_files[f]["queries"]
+        assert len(out[0]) == user_xml_files[f]["length"]
+
+def test__xml_file_to_df(xml,tmpdir,user_xml_files):
+
+    xml_file = os.path.join(tmpdir,"test.xml")
+    _write_test_xml(xml_file)
+
+    # Should match the biopython-based reader
+    to_check = [xml_file,xml["good.xml"],xml["cpu-limit.xml"],xml["nr_clustered.xml"]]
+    to_check.extend(list(user_xml_files.keys()))
+    for f in to_check:
+        df = _xml_file_to_df(f)
+        expected = records_to_df(_xml_file_to_records(f))
+        _assert_blast_df_equal(df,expected)
+
+    with pytest.raises(ValueError):
+        _xml_file_to_df(xml["bad.xml"])
+
+def test__tabular_file_to_df(tmpdir,user_xml_files):
+
+    # Write hits parsed from xml as tabular output, then make sure they come
+    # back the same.
+    for f in user_xml_files:
+
+        expected = _xml_file_to_df(f)
+
+        # Tabular query id is the first word of the query fasta header
+        queries = list(dict.fromkeys(expected["query"]))
+        expected["query"] = [f"count{queries.index(q)}" for q in expected["query"]]
+        queries = [f"count{i}" for i in range(len(queries))]
+
+        hits = expected.loc[np.logical_not(pd.isnull(expected["accession"])),:]
+        hits = hits.loc[:,list(_TABULAR_FIELDS.values())]
+
+        # Stick an extra (worse) hsp for the first hit on the end, plus a
+        # comment line like -outfmt 7
+        extra_hsp = hits.iloc[:1,:].copy()
+        extra_hsp["bits"] = 1.0
+        hits = pd.concat([hits,extra_hsp])
+
+        tabular_file = os.path.join(tmpdir,"test.tsv")
+        with open(tabular_file,"w") as g:
+            g.write("# BLASTP 2.13.0+\n")
+            hits.to_csv(g,sep="\t",header=False,index=False)
+
+        df = _tabular_file_to_df(tabular_file,queries=queries)
+        assert list(df.columns) == _BLAST_COLUMNS
+        _assert_blast_df_equal(df,expected)
+
+        # No queries: no rows for queries without hits
+        df = _tabular_file_to_df(tabular_file)
+        assert len(df) == len(hits) - 1
+
+    # Query with no hits
+    df = _tabular_file_to_df(tabular_file,queries=["not_a_query"] + queries)
+    assert df["query"].iloc[0] == "not_a_query"
+    assert df["accession"].iloc[0] is pd.NA
+    assert df["length"].dtype == "Int64"
+
+    # Empty file
+    empty_file = os.path.join(tmpdir,"empty.tsv")
+    with open(empty_file,"w") as g:
+        g.write("")
+    df = _tabular_file_to_df(empty_file)
+    assert len(df) == 0
+    assert list(df.columns) == _BLAST_COLUMNS
+
+    df = _tabular_file_to_df(empty_file,queries=["count0","count1"])
+    assert list(df["query"]) == ["count0","count1"]
+    assert np.sum(pd.isnull(df["accession"])) == 2
+
+    # Wrong number of columns
+    bad_file = os.path.join(tmpdir,"bad.tsv")
+    with open(bad_file,"w") as g:
+        g.write("count0\tXP_1\t1\n")
+    with pytest.raises(ValueError):
+        _tabular_file_to_df(bad_file)
+
 def test_check_for_cpu_limit(xml):
 
     with pytest.raises(FileNotFoundError):
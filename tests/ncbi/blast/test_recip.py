@@ -2,9 +2,14 @@ import pytest
 from conftest import get_public_param_defaults
 
 from topiary.ncbi.blast.recip import recip_blast
+from topiary.ncbi.blast.recip import _get_pattern_matrix
 from topiary.ncbi.blast.recip import _calc_hit_post_prob
+from topiary.ncbi.blast.recip import _get_best_combination
 from topiary.ncbi.blast.recip import _prepare_for_blast
 from topiary.ncbi.blast.recip import _run_blast
+from topiary.ncbi.blast.recip import warm_recip_blast_cache
+from topiary.ncbi.blast import recip as recip_module
+from topiary._private.cache import DiskCache
 from topiary.ncbi.blast.recip import recip_blast
 from topiary.ncbi.blast.recip import _make_recip_blast_calls
 
@@ -12,7 +17,7 @@ from topiary.io.paralog_patterns import load_paralog_patterns
 
 import numpy as np
 import pandas as pd
-import copy, re
+import copy, re, itertools, os
 
 def test__prepare_for_blast(test_dataframes):
 
@@ -306,6 +311,119 @@ def test__calc_hit_post_prob():
     assert np.isclose(pp[0],0)
     assert np.isclose(pp[1],0)
 
+    # Pre-computed pattern matrix gives same result as matching hits directly
+    hits = pd.DataFrame({"bits":[10,5,1],
+                         "hit_def":["A","B","AB"],
+                         "e_value":[5,10,15]})
+    paralogs, pp, masks = _calc_hit_post_prob(hits,patterns,partition_temp=10)
+    _, matrix = _get_pattern_matrix(hits["hit_def"],patterns)
+    paralogs2, pp2, masks2 = _calc_hit_post_prob(hits,patterns,partition_temp=10,
+                                                 pattern_matrix=matrix)
+    assert np.array_equal(paralogs,paralogs2)
+    assert np.allclose(pp,pp2)
+    for m1, m2 in zip(masks,masks2):
+        assert np.array_equal(m1,m2)
+    assert np.array_equal(masks[0],[True,False,True])
+    assert np.array_equal(masks[1],[False,True,True])
+
+def test__get_pattern_matrix():
+
+    patterns = {"B":re.compile("B",flags=re.IGNORECASE),
+                "A":re.compile("A",flags=re.IGNORECASE)}
+
+    paralogs, matrix = _get_pattern_matrix(["a","xb","xx","ab","a"],patterns)
+    assert np.array_equal(paralogs,["A","B"])
+    assert matrix.dtype == bool
+    assert np.array_equal(matrix,[[True,False],
+                                  [False,True],
+                                  [False,False],
+                                  [True,True],
+                                  [True,False]])
+
+    # Missing descriptions match nothing
+    paralogs, matrix = _get_pattern_matrix(pd.Series(["a",None,np.nan]),patterns)
+    assert np.array_equal(matrix,[[True,False],
+                                  [False,False],
+                                  [False,False]])
+
+    # No descriptions
+    paralogs, matrix = _get_pattern_matrix([],patterns)
+    assert matrix.shape == (0,2)
+
+
+def _enumerate_best_combination(posterior_prob,drop_combo_fx):
+    """
+    Reference implementation: enumerate and sort all combinations of paralogs.
+    """
+
+    combinations = []
+    indexes = range(len(posterior_prob))
+    for i in range(1,len(indexes)+1):
+        combinations.extend(list(itertools.combinations(indexes,i)))
+
+    combo_pp = []
+    for i, c in enumerate(combinations):
+        idx = np.array(c,dtype=int)
+        combo_pp.append((np.sum(posterior_prob[idx]),i))
+
+    combo_pp.sort(reverse=True)
+    best_combo_index = 0
+    for i in range(1,len(combo_pp)):
+        this_pp = combo_pp[best_combo_index][0]
+        if not np.isclose(this_pp,0):
+            if combo_pp[i][0]/combo_pp[best_combo_index][0] > drop_combo_fx:
+                best_combo_index = i
+
+    recip_prob_match, best_combo = combo_pp[best_combo_index]
+
+    return recip_prob_match, np.array(combinations[best_combo],dtype=int)
+
+def test__get_best_combination():
+
+    # One paralog dominates
+    pp, combo = _get_best_combination(np.array([0.95,0.03,0.0]),0.9)
+    assert np.isclose(pp,0.95)
+    assert np.array_equal(combo,[0])
+
+    # Two paralogs equally good --> call both
+    pp, combo = _get_best_combination(np.array([0.0,0.5,0.5]),0.9)
+    assert np.isclose(pp,1.0)
+    assert np.array_equal(combo,[1,2])
+
+    # Never step down if drop_combo_fx is 1
+    pp, combo = _get_best_combination(np.array([0.95,0.0,0.0]),1)
+    assert np.array_equal(combo,[0,1,2])
+
+    # No matches at all
+    pp, combo = _get_best_combination(np.array([0.0,0.0]),0.9)
+    assert pp == 0
+    assert np.array_equal(combo,[0,1])
+
+    # Best combo is not always the top-k paralogs: 0.82 --> 0.79 --> stop
+    pp, combo = _get_best_combination(np.array([0.7,0.12,0.09]),0.9)
+    assert np.isclose(pp,0.79)
+    assert np.array_equal(combo,[0,2])
+
+    # Same calls as enumerating all combinations, including ties and zeros
+    rng = np.random.default_rng(0)
+    tests = [(np.array([0.6,0.3,0.1]),0.5),
+             (np.array([0.25,0.25,0.25,0.25]),0.7),
+             (np.array([1e-10,0.0,0.0]),0.9)]
+    for _ in range(1000):
+        num_paralogs = rng.integers(1,8)
+        posterior_prob = rng.random(num_paralogs)
+        posterior_prob[rng.random(num_paralogs) < 0.4] = 0
+        posterior_prob[rng.random(num_paralogs) < 0.2] = posterior_prob[0]
+        if np.sum(posterior_prob) > 0:
+            posterior_prob = posterior_prob/np.sum(posterior_prob)*rng.random()
+        tests.append((posterior_prob,rng.choice([0,0.5,0.8,0.9,0.95,1])))
+
+    for posterior_prob, drop_combo_fx in tests:
+        expected_pp, expected_combo = _enumerate_best_combination(posterior_prob,
+                                                                  drop_combo_fx)
+        pp, combo = _get_best_combination(posterior_prob,drop_combo_fx)
+        assert pp == expected_pp
+        assert np.array_equal(combo,expected_combo)
 
 def test__make_recip_blast_calls(test_dataframes,recip_blast_hit_dfs):
 
@@ -383,7 +501,174 @@ def test__make_recip_blast_calls(test_dataframes,recip_blast_hit_dfs):
 
 def test__run_blast():
 
-    pass
+    # Tabular output is only available for local blast. Should fail before
+    # trying to hit the ncbi server.
+    with pytest.raises(ValueError):
+        _run_blast(["MLPFLFF"],
+                   local_blast_db=None,
+                   ncbi_blast_db="nr",
+                   ncbi_taxid=None,
+                   hitlist_size=10,
+                   e_value_cutoff=0.01,
+                   gapcosts=(11,1),
+                   num_threads=1,
+                   keep_blast_xml=False,
+                   blast_output_format="tabular")
+
+def _fake_local_blast(calls):
+    """
+    Stand-in for local_blast that records the sequences it was asked to blast
+    and returns one hit per sequence (none for sequences starting with X).
+    """
+
+    def _local_blast(sequence_list,**kwargs):
+
+        calls.append(list(sequence_list))
+
+        hit_dfs = []
+        for i, seq in enumerate(sequence_list):
+            if seq.startswith("X"):
+                hit_dfs.append(pd.DataFrame())
+                continue
+            hit_dfs.append(pd.DataFrame({"accession":[f"XP_{seq}"],
+                                         "hit_def":[f"hit to {seq}"],
+                                         "bits":[float(len(seq))],
+                                         "query":[f"count{i}"]}))
+
+        return hit_dfs
+
+    return _local_blast
+
+def test__run_blast_cache(tmpdir,monkeypatch):
+
+    calls = []
+    monkeypatch.setattr(recip_module,"local_blast",_fake_local_blast(calls))
+
+    db = os.path.join(tmpdir,"test-db")
+    with open(f"{db}.pin","w") as f:
+        f.write("x")
+
+    kwargs = {"local_blast_db":db,
+              "ncbi_blast_db":None,
+              "ncbi_taxid":None,
+              "hitlist_size":10,
+              "e_value_cutoff":0.01,
+              "gapcosts":(11,1),
+              "num_threads":1,
+              "keep_blast_xml":False}
+
+    # Identical sequences are only blasted once, even without a cache
+    hit_dfs = _run_blast(["MLP","MLPF","MLP","XXX"],**kwargs)
+    assert calls == [["MLP","MLPF","XXX"]]
+    assert len(hit_dfs) == 4
+    assert list(hit_dfs[0]["accession"]) == ["XP_MLP"]
+    assert list(hit_dfs[2]["accession"]) == ["XP_MLP"]
+    assert list(hit_dfs[2]["query"]) == ["count2"]
+    assert list(hit_dfs[1]["query"]) == ["count1"]
+    assert len(hit_dfs[3]) == 0
+
+    cache_file = os.path.join(tmpdir,"cache","blast-cache.sqlite")
+
+    # Fill cache
+    calls.clear()
+    with DiskCache(cache_file) as blast_cache:
+        first = _run_blast(["MLP","MLPF","XXX"],blast_cache=blast_cache,**kwargs)
+        assert calls == [["MLP","MLPF","XXX"]]
+        assert blast_cache.get_counts() == (0,3)
+
+    # Only cache misses are blasted. Hits come back the same.
+    calls.clear()
+    with DiskCache(cache_file) as blast_cache:
+        second = _run_blast(["XXX","MLPFL","MLP","MLPF"],blast_cache=blast_cache,**kwargs)
+        assert calls == [["MLPFL"]]
+        assert blast_cache.get_counts() == (3,1)
+
+    assert len(second[0]) == 0
+    pd.testing.assert_frame_equal(second[2].drop(columns="query").reset_index(drop=True),
+                                  first[0].drop(columns="query").reset_index(drop=True))
+    assert list(second[2]["query"]) == ["count2"]
+    assert list(second[3]["query"]) == ["count3"]
+    assert list(second[3]["accession"]) == ["XP_MLPF"]
+
+    # Arguments that do not change the hits still hit the cache
+    calls.clear()
+    with DiskCache(cache_file) as blast_cache:
+        _run_blast(["MLP"],blast_cache=blast_cache,use_pipes=True,
+                   scratch_dir=str(tmpdir),**kwargs)
+        assert calls == []
+
+    # Different blast arguments miss the cache
+    calls.clear()
+    with DiskCache(cache_file) as blast_cache:
+        new_kwargs = copy.deepcopy(kwargs)
+        new_kwargs["hitlist_size"] = 50
+        _run_blast(["MLP"],blast_cache=blast_cache,**new_kwargs)
+        assert calls == [["MLP"]]
+
+    # Rebuilt database misses the cache
+    calls.clear()
+    with open(f"{db}.pin","w") as f:
+        f.write("xx")
+    with DiskCache(cache_file) as blast_cache:
+        _run_blast(["MLP"],blast_cache=blast_cache,**kwargs)
+        assert calls == [["MLP"]]
+
+def test_warm_recip_blast_cache(tmpdir,monkeypatch):
+
+    calls = []
+    monkeypatch.setattr(recip_module,"local_blast",_fake_local_blast(calls))
+
+    db = os.path.join(tmpdir,"test-db")
+    with open(f"{db}.pin","w") as f:
+        f.write("x")
+    cache_dir = os.path.join(tmpdir,"cache")
+
+    hits, misses = warm_recip_blast_cache(["MLP","MLPF"," MLP "],
+                                          blast_cache=cache_dir,
+                                          local_blast_db=db)
+    assert (hits, misses) == (0,2)
+    assert calls == [["MLP","MLPF"]]
+
+    calls.clear()
+    hits, misses = warm_recip_blast_cache(["MLP","MLPFL"],
+                                          blast_cache=cache_dir,
+                                          local_blast_db=db)
+    assert (hits, misses) == (1,1)
+    assert calls == [["MLPFL"]]
+
+    # Lookups from recip blast (same default blast arguments) hit the cache
+    calls.clear()
+    with DiskCache(os.path.join(cache_dir,"blast-cache.sqlite")) as blast_cache:
+        _run_blast(["MLP","MLPF","MLPFL"],
+                   local_blast_db=db,
+                   ncbi_blast_db=None,
+                   ncbi_taxid=None,
+                   hitlist_size=10,
+                   e_value_cutoff=0.01,
+                   gapcosts=(11,1),
+                   num_threads=-1,
+                   keep_blast_xml=False,
+                   blast_cache=blast_cache)
+        assert calls == []
+        assert blast_cache.get_counts() == (3,0)
+
+    with pytest.raises(ValueError):
+        warm_recip_blast_cache("MLP",blast_cache=cache_dir,local_blast_db=db)
+    with pytest.raises(ValueError):
+        warm_recip_blast_cache(["MLP",""],blast_cache=cache_dir,local_blast_db=db)
+    with pytest.raises(ValueError):
+        warm_recip_blast_cache(["MLP"],blast_cache=cache_dir)
+    with pytest.raises(ValueError):
+        warm_recip_blast_cache(["MLP"],blast_cache=cache_dir,
+                               local_blast_db=db,ncbi_blast_db="nr")
+
+    old_env = os.environ.pop("TOPIARY_BLAST_CACHE",None)
+    try:
+        with pytest.raises(ValueError):
+            warm_recip_blast_cache(["MLP"],local_blast_db=db)
+    finally:
+        if old_env is not None:
+            os.environ["TOPIARY_BLAST_CACHE"] = old_env
 
 def test_recip_blast():
 
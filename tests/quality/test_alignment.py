@@ -3,11 +3,14 @@ import pytest
 
 import topiary
 from topiary.quality.alignment import _get_sparse_columns, _rle, _drop_gaps_only
+from topiary.quality.alignment import _encode_alignment
 #from topiary.quality.alignment import _find_too_many_sparse, _find_too_few_dense
 #from topiary.quality.alignment import _find_long_insertions
 from topiary.quality.alignment import AA_TO_INT, INT_TO_AA
 from topiary.quality.alignment import score_alignment
 
+from topiary._private.alignment_matrix import AlignmentMatrix
+
 import numpy as np
 import pandas as pd
 
@@ -25,6 +28,26 @@ def data_for_test():
 
     return np.array(seqs)
 
+def test__encode_alignment():
+
+    seqs = data_for_test()
+    alignment = ["".join([INT_TO_AA[c] for c in row]) for row in seqs]
+
+    encoded = _encode_alignment(alignment)
+    assert encoded.dtype == np.uint8
+    assert np.array_equal(encoded,seqs)
+
+    # Trimming
+    encoded = _encode_alignment(alignment,front_index=2,back_index=10)
+    assert np.array_equal(encoded,seqs[:,2:10])
+
+    # Characters not in AA (lowercase, X, *, non-ascii) are gaps
+    encoded = _encode_alignment(["AxX*éC"])
+    assert np.array_equal(encoded,[[AA_TO_INT["A"],20,20,20,20,AA_TO_INT["C"]]])
+
+    encoded = _encode_alignment([])
+    assert encoded.shape == (0,0)
+
 def test__get_sparse_columns():
 
     seqs = data_for_test()
@@ -73,6 +96,48 @@ def test__drop_gaps_only():
     assert new_seqs.shape[1] == 5
 
 
-def test_score_alignment():
-
-    pass
+def test_score_alignment(test_dataframes):
+
+    df = test_dataframes["good-df"].copy()
+    df = df.iloc[:3].copy()
+
+    # Column 2 is sparse, column 5 is gaps only and dropped. x is a gap.
+    df["alignment"] = ["AC-DE-","AC-DE-","ACWDx-"]
+
+    out = score_alignment(df,sparse_column_cutoff=0.5,align_trim=(0,1))
+    assert np.allclose(out.fx_in_sparse,[0,0,1/5])
+    assert np.allclose(out.fx_missing_dense,[0,0,1/4])
+    assert np.array_equal(out.sparse_run_length,[0,0,1])
+
+    # Longest of several sparse runs, counted over non-continuous columns
+    df["alignment"] = ["A--C---D","A--C---D","AW-CWW-D"]
+    out = score_alignment(df,sparse_column_cutoff=0.5,align_trim=(0,1))
+    assert np.array_equal(out.sparse_run_length,[0,0,2])
+
+    # No sparse columns
+    df["alignment"] = ["ACDE","ACDE","ACDE"]
+    out = score_alignment(df,sparse_column_cutoff=0.5,align_trim=(0,1))
+    assert np.array_equal(out.sparse_run_length,[0,0,0])
+    assert np.array_equal(out.fx_missing_dense,[0,0,0])
+
+    # Different length alignments
+    df["alignment"] = ["ACDE","ACDE","ACD"]
+    with pytest.raises(ValueError):
+        score_alignment(df)
+
+    # Pre-built alignment matrix gives the same answer, even with extra rows
+    # in a different order
+    df["alignment"] = ["AC-DE-","AC-DE-","ACWDx-"]
+    expected = score_alignment(df,sparse_column_cutoff=0.5,align_trim=(0,1))
+    extra = AlignmentMatrix(["ACWDx-","AAAAAA","AC-DE-","AC-DE-"],
+                            uid=[df.uid.iloc[2],"extra",df.uid.iloc[1],df.uid.iloc[0]])
+    out = score_alignment(df,sparse_column_cutoff=0.5,align_trim=(0,1),
+                          alignment_matrix=extra[[0,2,3]])
+    assert np.allclose(out.fx_in_sparse,expected.fx_in_sparse)
+    assert np.allclose(out.fx_missing_dense,expected.fx_missing_dense)
+    assert np.array_equal(out.sparse_run_length,expected.sparse_run_length)
+
+    with pytest.raises(ValueError):
+        score_alignment(df,alignment_matrix=extra[[0,1]])
+    with pytest.raises(ValueError):
+        score_alignment(df,alignment_matrix="not_a_matrix")
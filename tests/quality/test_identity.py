@@ -0,0 +1,126 @@
+
+import pytest
+
+from topiary.quality.identity import encode_sequence
+from topiary.quality.identity import _score_localxx_int
+from topiary.quality.identity import _score_localxx_numpy
+from topiary.quality.identity import score_localxx
+import topiary.quality.identity as identity
+
+from Bio import pairwise2
+
+import numpy as np
+
+import random
+
+def _random_sequences(num_seqs,seed,max_length=200):
+    """
+    Random sequences with random lengths and alphabet sizes. Small alphabets
+    give long runs of matches, large alphabets give sparse matches.
+    """
+
+    rng = random.Random(seed)
+    aa = "ACDEFGHIKLMNPQRSTVWY"
+
+    seqs = []
+    for _ in range(num_seqs):
+        alphabet = aa[:rng.randint(1,len(aa))]
+        length = rng.randint(1,max_length)
+        seqs.append("".join(rng.choice(alphabet) for _ in range(length)))
+
+    return seqs
+
+def _pairwise2_scores(query,targets):
+
+    return [pairwise2.align.localxx(query,t,score_only=True) for t in targets]
+
+def test_encode_sequence():
+
+    encoded = encode_sequence("ACD")
+    assert encoded.dtype == np.uint8
+    assert np.array_equal(encoded,np.array([65,67,68],dtype=np.uint8))
+
+    # Already encoded
+    assert encode_sequence(encoded) is encoded
+
+    assert len(encode_sequence("")) == 0
+
+    bad_sequences = [None,1,["A","C"],np.array([1,2],dtype=int),
+                     np.zeros((2,2),dtype=np.uint8)]
+    for b in bad_sequences:
+        print(b)
+        with pytest.raises(ValueError):
+            encode_sequence(b)
+
+def test__score_localxx_int():
+
+    seqs = _random_sequences(50,seed=0)
+    encoded = [encode_sequence(s) for s in seqs]
+
+    for i in range(0,len(seqs),5):
+        scores = _score_localxx_int(encoded[i],encoded)
+        assert list(scores) == _pairwise2_scores(seqs[i],seqs)
+
+def test__score_localxx_numpy():
+
+    # Lengths around 64 catch errors in carries between words
+    seqs = _random_sequences(50,seed=1,max_length=300)
+    seqs.extend(["A"*63,"A"*64,"A"*65,"A"*128,"A"*129,"AC"*100])
+    encoded = [encode_sequence(s) for s in seqs]
+
+    for i in range(0,len(seqs),5):
+        scores = _score_localxx_numpy(encoded[i],encoded)
+        assert list(scores) == _pairwise2_scores(seqs[i],seqs)
+
+    # Single target
+    scores = _score_localxx_numpy(encoded[0],encoded[1:2])
+    assert list(scores) == _pairwise2_scores(seqs[0],seqs[1:2])
+
+def test_score_localxx(monkeypatch):
+
+    # Property test: identical to pairwise2 for many random queries and
+    # batches of targets, through both the small- and large-batch paths
+    rng = random.Random(2)
+    for trial in range(100):
+        query = _random_sequences(1,seed=rng.random())[0]
+        num_targets = rng.choice([1,2,10,80])
+        targets = _random_sequences(num_targets,seed=rng.random())
+
+        scores = score_localxx(query,targets)
+        assert scores.dtype == int
+        assert list(scores) == _pairwise2_scores(query,targets)
+
+        # Symmetric
+        assert score_localxx(targets[0],[query])[0] == scores[0]
+
+    # Encoded input gives same result
+    targets = _random_sequences(30,seed=3)
+    scores = score_localxx(encode_sequence(query),
+                           [encode_sequence(t) for t in targets])
+    assert list(scores) == _pairwise2_scores(query,targets)
+
+    # Works with numpy object array of strings
+    scores = score_localxx(query,np.array(targets,dtype=object))
+    assert list(scores) == _pairwise2_scores(query,targets)
+
+    # Empty sequences have no matches
+    assert len(score_localxx("ACD",[])) == 0
+    assert np.array_equal(score_localxx("",["ACD","A"]),[0,0])
+    assert np.array_equal(score_localxx("ACD",["","A"]),[0,1])
+    assert np.array_equal(score_localxx("ACD",["","A"]*40),[0,1]*40)
+
+    # Large batches are scored in chunks. Last chunk is small enough to go
+    # through the python integer path.
+    monkeypatch.setattr(identity,"_MAX_NUMPY_BATCH",70)
+    targets = _random_sequences(150,seed=4)
+    scores = score_localxx(query,targets)
+    assert list(scores) == _pairwise2_scores(query,targets)
+    monkeypatch.undo()
+
+    # targets must be a list of sequences
+    with pytest.raises(ValueError):
+        score_localxx("ACD","ACD")
+    with pytest.raises(ValueError):
+        score_localxx("ACD",encode_sequence("ACD"))
+    with pytest.raises(ValueError):
+        score_localxx(None,["ACD"])
@@ -1,11 +1,42 @@
 import pytest
 
 import topiary
+from topiary._private.alignment_matrix import AlignmentMatrix
 from topiary.quality.polish import _get_cutoff
 from topiary.quality.polish import polish_alignment
 
+import numpy as np
+import pandas as pd
+
 def test__get_cutoff():
     pass
 
-def test_polish_alignment():
-    pass
+def test_polish_alignment(test_dataframes):
+
+    df = test_dataframes["good-df_real-alignment"].copy()
+    df["always_keep"] = False
+    df["partial"] = True
+
+    # Does not touch the alignment
+    out = polish_alignment(df,realign=False,fx_missing_percentile=0.5)
+    assert out.attrs["polish_alignment"] == "none"
+    assert np.sum(out.keep) == 2
+
+    # Drops 6/8 sequences. Below realign_cutoff, so project existing alignment
+    out = polish_alignment(df,realign_cutoff=0.8,fx_missing_percentile=0.5)
+    assert out.attrs["polish_alignment"] == "projected"
+    assert np.sum(out.keep) == 2
+
+    aln = AlignmentMatrix.from_dataframe(out)
+    assert not np.any(aln.gap_only_columns)
+    ungapped = [s.replace("-","") for s in aln.to_strings()]
+    assert ungapped == list(out.loc[out.keep,"sequence"])
+
+    # Dropped sequences are no longer aligned
+    assert np.all(pd.isnull(out.loc[np.logical_not(out.keep),"alignment"]))
+
+    bad_realign_cutoff = [-1,1.1,"test",[]]
+    for b in bad_realign_cutoff:
+        print(b)
+        with pytest.raises(ValueError):
+            polish_alignment(df,realign_cutoff=b)
@@ -4,14 +4,40 @@ import pytest
 import topiary
 from topiary.quality import remove_redundancy
 from topiary.quality.redundancy import _get_quality_scores
+from topiary.quality.redundancy import _get_composition_index
+from topiary.quality.redundancy import _get_candidates
+from topiary.quality.redundancy import _get_tiles
 from topiary.quality.redundancy import _construct_args
 from topiary.quality.redundancy import _compare_seqs
+from topiary.quality.redundancy import _get_pair_key
+from topiary.quality.redundancy import _get_identities
+from topiary.quality.redundancy import _get_identity
+from topiary.quality.redundancy import _compare_quality
 from topiary.quality.redundancy import _redundancy_thread_function
+from topiary.quality.redundancy import _summarize_tile_stats
+from topiary.quality.redundancy import _check_representatives
+from topiary.quality.redundancy import _greedy_thread_function
+from topiary.quality.redundancy import _greedy_redundancy
+from topiary.quality.redundancy import _partition_thread_function
+from topiary.quality.redundancy import _partitioned_redundancy
+from topiary.quality.redundancy import _get_identity_matrix
+from topiary.quality.redundancy import _apply_identity_cutoff
+from topiary.quality.redundancy import _get_quality_array
+from topiary.quality.redundancy import _exhaustive_redundancy
+from topiary.quality.redundancy import _get_identity_cache
+from topiary.quality.redundancy import _pair_identity_thread_function
+from topiary.quality.redundancy import _get_sketch_pairs
+from topiary.quality.redundancy import _sketch_redundancy
+from topiary.quality.redundancy import _get_sketch_recall
+from topiary.quality.redundancy import find_redundancy_cutoff
 from topiary.quality.redundancy import _EXPECTED_COLUMNS
 
 import numpy as np
 import pandas as pd
 
+from unittest import mock
+import os
+
 def test__get_quality_scores(test_dataframes):
 
     # Get copy of the dataframe -- we're going to hack it
@@ -50,6 +76,95 @@ def test__get_quality_scores(test_dataframes):
     df["always_keep"] = True # always keep True
     assert _get_quality_scores(df.loc[0,:])[0] == 0
 
+def test__get_composition_index():
+
+    sequence_array = np.array(["AAC","CDA","E"])
+    composition, lengths = _get_composition_index(sequence_array)
+
+    assert np.array_equal(lengths,[3,3,1])
+
+    # Columns are letters A, C, D, E in sorted order
+    assert composition.shape == (3,4)
+    assert np.array_equal(composition[0],[2,1,0,0])
+    assert np.array_equal(composition[1],[1,1,1,0])
+    assert np.array_equal(composition[2],[0,0,0,1])
+
+def test__get_candidates(test_dataframes):
+
+    # Composition bound must never be below the real localxx score, so any
+    # pair that is not a candidate must be kept by _compare_seqs.
+    df = test_dataframes["good-df"].copy()
+    sequence_array = np.array(df.sequence)
+    sequence_array = np.concatenate((sequence_array,["MLPFLFFS","STARE","EERATS"]))
+    composition, lengths = _get_composition_index(sequence_array)
+
+    qual = np.ones(len(_EXPECTED_COLUMNS) + 2,dtype=float)
+
+    L = len(sequence_array)
+    for cutoff in [0.2,0.5,0.9,0.95,0.99]:
+        for i in range(L):
+            candidates = _get_candidates(i,(0,L),composition,lengths,cutoff)
+            assert np.all(candidates > i)
+            for j in range(i+1,L):
+                if j in candidates:
+                    continue
+                a1, a2 = _compare_seqs(sequence_array[i],
+                                       sequence_array[j],
+                                       qual,qual,cutoff)
+                assert a1 is True
+                assert a2 is True
+
+    # Nothing on or below diagonal
+    candidates = _get_candidates(L-1,(0,L),composition,lengths,0.0)
+    assert len(candidates) == 0
+
+    # Only sequences within the block
+    candidates = _get_candidates(0,(2,4),composition,lengths,0.0)
+    assert np.array_equal(candidates,[2,3])
+
+def test__get_tiles():
+
+    # Small problem -- single tile
+    tiles, num_threads = _get_tiles(4,num_threads=2)
+    assert num_threads == 1
+    assert len(tiles) == 1
+    assert np.array_equal(tiles[0][0],(0,4))
+    assert np.array_equal(tiles[0][1],(0,4))
+
+    # One thread -- single tile regardless of size
+    tiles, num_threads = _get_tiles(1000,num_threads=1)
+    assert num_threads == 1
+    assert len(tiles) == 1
+
+    # Make sure tiles tile over upper triangle for bigger problem. Use
+    # get_num_threads to figure out how many threads we will really have.
+    for tiles_per_thread in [1,4]:
+        tiles, num_threads = _get_tiles(101,num_threads=-1,
+                                        tiles_per_thread=tiles_per_thread)
+        max_threads = topiary._private.threads.get_num_threads(-1)
+        assert num_threads == np.min((max_threads,2))
+
+        if num_threads > 1:
+            num_windows = num_threads*tiles_per_thread
+            assert len(tiles) == (num_windows**2 + num_windows)//2
+
+        seen = set()
+        costs = []
+        for i_block, j_block in tiles:
+            cost = 0
+            for i in range(i_block[0],i_block[1]):
+                for j in range(j_block[0],j_block[1]):
+                    if j > i:
+                        assert (i,j) not in seen
+                        seen.add((i,j))
+                        cost += 1
+            costs.append(cost)
+
+        assert len(seen) == 101*100//2
+
+        # Most expensive first
+        assert np.array_equal(costs,sorted(costs,reverse=True))
+
 def test__construct_args():
 
     sequence_array = np.array(["STARE" for _ in range(4)])
@@ -170,12 +285,577 @@ def test__compare_seqs(test_dataframes):
     assert a1 is True
     assert a2 is True
 
-def test__redundancy_thread_function():
+def test__get_pair_key():
+
+    assert _get_pair_key("TEST","TAST") == _get_pair_key("TAST","TEST")
+    assert _get_pair_key("TEST","TAST") != _get_pair_key("TEST","TEST")
+
+def test__get_identities(tmpdir):
+
+    B_seqs = ["TEST","TAST","TESTTEST","WWWW",""]
+    norm = _get_identities("TEST",B_seqs)
+    assert np.array_equal(norm,[1.0,0.75,1.0,0.0,0.0])
+
+    norm = _get_identities("TEST",np.array(B_seqs,dtype=object))
+    assert np.array_equal(norm,[1.0,0.75,1.0,0.0,0.0])
+
+    assert len(_get_identities("TEST",[])) == 0
+
+    cache_file = os.path.join(tmpdir,"cache.sqlite")
+    with topiary._private.cache.DiskCache(cache_file) as identity_cache:
+
+        norm = _get_identities("TEST",B_seqs,identity_cache=identity_cache)
+        assert np.array_equal(norm,[1.0,0.75,1.0,0.0,0.0])
+        assert identity_cache.misses == 5
+
+        # Mix of cached and uncached
+        norm = _get_identities("TEST",["TAST","TEAT"],
+                               identity_cache=identity_cache)
+        assert np.array_equal(norm,[0.75,0.75])
+        assert identity_cache.hits == 1
+        assert identity_cache.misses == 6
 
-    pass
+def test__get_identity(tmpdir):
 
+    assert _get_identity("TEST","TEST") == 1.0
+    assert _get_identity("TEST","TAST") == 0.75
+    assert _get_identity("TEST","TESTTEST") == 1.0
 
-def test_remove_redundancy(test_dataframes):
+    cache_file = os.path.join(tmpdir,"cache.sqlite")
+    with topiary._private.cache.DiskCache(cache_file) as identity_cache:
+
+        assert _get_identity("TEST","TAST",identity_cache=identity_cache) == 0.75
+        assert identity_cache.misses == 1
+
+        # Cached raw score, normalized for this pair
+        assert _get_identity("TAST","TEST",identity_cache=identity_cache) == 0.75
+        assert identity_cache.hits == 1
+
+        # Make sure we are really reading from the cache
+        identity_cache.put(_get_pair_key("TEST","WWWW"),4)
+        assert _get_identity("TEST","WWWW",identity_cache=identity_cache) == 1.0
+
+def test__compare_quality():
+
+    A_qual = np.ones(len(_EXPECTED_COLUMNS) + 2,dtype=float)
+    B_qual = np.ones(len(_EXPECTED_COLUMNS) + 2,dtype=float)
+
+    # Identical -- keep A
+    assert _compare_quality(A_qual,B_qual) == (True,False)
+
+    # B better
+    A_qual[3] = 2
+    assert _compare_quality(A_qual,B_qual) == (False,True)
+
+    # Both key species
+    A_qual[1] = 0
+    B_qual[1] = 0
+    assert _compare_quality(A_qual,B_qual) == (True,True)
+    assert _compare_quality(A_qual,B_qual,discard_key=True) == (False,True)
+
+    # Both always keep
+    A_qual[0] = 0
+    B_qual[0] = 0
+    assert _compare_quality(A_qual,B_qual,discard_key=True) == (True,True)
+
+def test__redundancy_thread_function(test_dataframes):
+
+    df = test_dataframes["good-df"].copy()
+    sequence_array = np.array(df.sequence)
+    quality_array = np.ones((len(sequence_array),len(_EXPECTED_COLUMNS) + 2),
+                            dtype=float)
+    composition, lengths = _get_composition_index(sequence_array)
+    L = len(sequence_array)
+
+    # Compare against exhaustive comparison of all pairs without prefilter
+    for cutoff in [0.5,0.9,0.95,0.96,0.99]:
+
+        expected = np.ones(L,dtype=int)
+        for i in range(L):
+            if not expected[i]:
+                continue
+            for j in range(i+1,L):
+                if not expected[j]:
+                    continue
+                a1, a2 = _compare_seqs(sequence_array[i],sequence_array[j],
+                                       quality_array[i],quality_array[j],
+                                       cutoff)
+                expected[i] = expected[i] and a1
+                expected[j] = expected[j] and a2
+                if not expected[i]:
+                    break
+
+        keep_array = np.ones(L,dtype=bool)
+        tile_stats = _redundancy_thread_function(i_block=(0,L),
+                                                 j_block=(0,L),
+                                                 sequence_array=sequence_array,
+                                                 quality_array=quality_array,
+                                                 composition=composition,
+                                                 lengths=lengths,
+                                                 keep_array=keep_array,
+                                                 cutoff=cutoff,
+                                                 discard_key=False)
+
+        assert np.array_equal(keep_array,expected)
+        assert tile_stats["i_block"] == (0,L)
+        assert tile_stats["j_block"] == (0,L)
+        assert tile_stats["num_compared"] <= L*(L-1)//2
+        assert tile_stats["time"] >= 0
+
+        # Should work the same on a shared array
+        with topiary._private.threads.SharedArray(np.ones(L,dtype=bool)) as shared:
+            _redundancy_thread_function(i_block=(0,L),
+                                        j_block=(0,L),
+                                        sequence_array=sequence_array,
+                                        quality_array=quality_array,
+                                        composition=composition,
+                                        lengths=lengths,
+                                        keep_array=shared,
+                                        cutoff=cutoff,
+                                        discard_key=False)
+            assert np.array_equal(np.array(shared),expected)
+
+
+def _mutated_sequences(num_seqs,seed=0):
+    """
+    Generate a set of related sequences by mutating a random sequence.
+    """
+
+    rng = np.random.default_rng(seed)
+    aa = np.array(list("ACDEFGHIKLMNPQRSTVWY"))
+    base = rng.choice(aa,size=80)
+
+    seqs = []
+    for _ in range(num_seqs):
+        s = base.copy()
+        num_muts = rng.integers(0,25)
+        s[rng.integers(0,len(s),size=num_muts)] = rng.choice(aa,size=num_muts)
+        seqs.append("".join(s[:rng.integers(60,80)]))
+
+    return np.array(seqs)
+
+def test__check_representatives():
+
+    sequence_array = np.array(["TEST","TAST","WWWW"])
+    quality_array = np.ones((3,len(_EXPECTED_COLUMNS) + 2),dtype=float)
+    composition, lengths = _get_composition_index(sequence_array)
+
+    # No representatives
+    assert _check_representatives(1,np.zeros(0,dtype=int),sequence_array,
+                                  quality_array,composition,lengths,
+                                  0.5,False) is True
+
+    # Redundant with representative
+    assert _check_representatives(1,np.array([0]),sequence_array,
+                                  quality_array,composition,lengths,
+                                  0.5,False) is False
+
+    # Not redundant
+    assert _check_representatives(1,np.array([0]),sequence_array,
+                                  quality_array,composition,lengths,
+                                  0.9,False) is True
+    assert _check_representatives(2,np.array([0,1]),sequence_array,
+                                  quality_array,composition,lengths,
+                                  0.5,False) is True
+
+    # Both always keep -- keep
+    quality_array[:,0] = 0
+    assert _check_representatives(1,np.array([0]),sequence_array,
+                                  quality_array,composition,lengths,
+                                  0.5,False) is True
+
+def test__greedy_thread_function():
+
+    sequence_array = np.array(["TEST","TAST","WWWW","TEST"])
+    quality_array = np.ones((4,len(_EXPECTED_COLUMNS) + 2),dtype=float)
+    composition, lengths = _get_composition_index(sequence_array)
+
+    keep = _greedy_thread_function(candidates=np.array([1,2,3]),
+                                   representatives=np.array([0]),
+                                   sequence_array=sequence_array,
+                                   quality_array=quality_array,
+                                   composition=composition,
+                                   lengths=lengths,
+                                   cutoff=0.5,
+                                   discard_key=False)
+    assert np.array_equal(keep,[False,True,False])
+
+def test__greedy_redundancy():
+
+    sequence_array = _mutated_sequences(170)
+    L = len(sequence_array)
+
+    rng = np.random.default_rng(1)
+    quality_array = np.ones((L,len(_EXPECTED_COLUMNS) + 2),dtype=float)
+    quality_array[:,1] = rng.choice([0,1],size=L)
+    quality_array[:,2:-1] = rng.choice([0,1],size=(L,len(_EXPECTED_COLUMNS) - 1))
+    quality_array[:,-1] = 1/np.array([len(s) for s in sequence_array])
+
+    for cutoff in [0.5,0.8,0.9]:
+        for discard_key in [True,False]:
+
+            # Simple, serial greedy clustering
+            order = sorted(range(L),key=lambda k: tuple(quality_array[k]))
+            reps = []
+            for s in order:
+                keep = True
+                for r in reps:
+                    _, s_keep = _compare_seqs(sequence_array[r],
+                                              sequence_array[s],
+                                              quality_array[r],
+                                              quality_array[s],
+                                              cutoff,
+                                              discard_key=discard_key)
+                    if not s_keep:
+                        keep = False
+                        break
+                if keep:
+                    reps.append(s)
+
+            expected = np.zeros(L,dtype=bool)
+            expected[reps] = True
+
+            # Batches of 50 -- three batches
+            keep_array = _greedy_redundancy(sequence_array,
+                                            quality_array,
+                                            cutoff,
+                                            discard_key,
+                                            num_threads=1,
+                                            progress_bar=False)
+
+            assert np.array_equal(keep_array,expected)
+
+    # Empty
+    keep_array = _greedy_redundancy(np.zeros(0,dtype=str),
+                                    np.zeros((0,9)),
+                                    0.9,
+                                    False,
+                                    num_threads=1,
+                                    progress_bar=False)
+    assert len(keep_array) == 0
+
+def test__summarize_tile_stats():
+
+    tile_stats = [{"i_block":(0,2),"j_block":(0,2),"pid":1,"num_compared":1,"time":1.0},
+                  {"i_block":(0,2),"j_block":(2,4),"pid":2,"num_compared":4,"time":2.0},
+                  {"i_block":(2,4),"j_block":(2,4),"pid":1,"num_compared":1,"time":0.5}]
+
+    summary = _summarize_tile_stats(tile_stats)
+    assert np.array_equal(summary.pid,[1,2])
+    assert np.array_equal(summary.num_tiles,[2,1])
+    assert np.array_equal(summary.num_compared,[2,4])
+    assert np.allclose(summary.time,[1.5,2.0])
+
+def test__exhaustive_redundancy():
+
+    sequence_array = _mutated_sequences(60)
+    L = len(sequence_array)
+    quality_array = np.ones((L,len(_EXPECTED_COLUMNS) + 2),dtype=float)
+
+    keep_array = _exhaustive_redundancy(sequence_array,
+                                        quality_array,
+                                        cutoff=0.8,
+                                        discard_key=False,
+                                        num_threads=1,
+                                        progress_bar=False)
+
+    expected = _partition_thread_function(sequence_array,
+                                          quality_array,
+                                          cutoff=0.8,
+                                          discard_key=False,
+                                          method="exhaustive")
+
+    assert np.array_equal(keep_array,expected)
+
+def test__get_identity_cache(tmpdir):
+
+    with mock.patch.dict(os.environ,{}):
+        os.environ.pop("TOPIARY_IDENTITY_CACHE",None)
+        assert _get_identity_cache(None) is None
+
+        identity_cache = _get_identity_cache(str(tmpdir))
+        assert os.path.isfile(os.path.join(tmpdir,"identity-cache.sqlite"))
+        identity_cache.close()
+
+        with pytest.raises(ValueError):
+            _get_identity_cache(1)
+
+        env_dir = os.path.join(tmpdir,"from_env")
+        os.environ["TOPIARY_IDENTITY_CACHE"] = env_dir
+        os.environ["TOPIARY_IDENTITY_CACHE_MAX_MB"] = "5"
+        identity_cache = _get_identity_cache(None)
+        assert os.path.isfile(os.path.join(env_dir,"identity-cache.sqlite"))
+        assert identity_cache._max_size == 5000000
+        identity_cache.close()
+
+def test__get_quality_array(test_dataframes):
+
+    for key in ["good-df","good-df_only-required-columns"]:
+
+        df = test_dataframes[key].copy()
+        df = topiary._private.check.check_topiary_dataframe(df)
+
+        species = list(df.species)
+        lengths = [len(s) for s in df.sequence]
+
+        variants = []
+
+        # As is
+        variants.append(df.copy())
+
+        # Key species with varied lengths and some always_keep
+        this_df = df.copy()
+        this_df["key_species"] = False
+        this_df.loc[this_df.index[:2],"key_species"] = True
+        this_df.loc[this_df.index[-1],"sequence"] = this_df.sequence.iloc[-1][:20]
+        this_df["always_keep"] = False
+        this_df.loc[this_df.index[1],"always_keep"] = True
+        variants.append(this_df)
+
+        for this_df in variants:
+            for target_length_cutoff in [None,0.01,0.25]:
+
+                out_df, all_quality_array = _get_quality_array(this_df.copy(),
+                                                               target_length_cutoff)
+
+                # Build expected with row-by-row function
+                try:
+                    key_mask = out_df["key_species"] == True
+                    key_species = dict([(k,None) for k in np.unique(out_df.loc[key_mask,"species"])])
+                except KeyError:
+                    key_species = {}
+
+                if len(key_species) > 0 and target_length_cutoff is not None:
+                    key_lengths = np.array([len(s) for s in out_df.loc[out_df.species.isin(list(key_species)),"sequence"]])
+                    counts, edges = np.histogram(key_lengths,
+                                                 bins=int(np.round(2*np.sqrt(len(key_lengths)),0)))
+                    target_length = edges[np.argmax(counts)]
+                    pct_length_cutoff = target_length_cutoff
+                else:
+                    target_length = None
+                    pct_length_cutoff = None
+
+                for i in range(len(out_df)):
+                    expected = _get_quality_scores(out_df.iloc[i,:],
+                                                   key_species=key_species,
+                                                   target_length=target_length,
+                                                   pct_length_cutoff=pct_length_cutoff)
+                    assert np.array_equal(all_quality_array[i],expected)
+
+    # Bad column type
+    df = test_dataframes["good-df"].copy()
+    df = topiary._private.check.check_topiary_dataframe(df)
+    df["partial"] = "test"
+    with pytest.raises(ValueError):
+        _get_quality_array(df)
+
+def test__partition_thread_function():
+
+    sequence_array = np.array(["TEST","TAST","WWWW","TEST"])
+    quality_array = np.ones((4,len(_EXPECTED_COLUMNS) + 2),dtype=float)
+
+    for method in ["exhaustive","greedy"]:
+        keep_array = _partition_thread_function(sequence_array,
+                                                quality_array,
+                                                cutoff=0.5,
+                                                discard_key=False,
+                                                method=method)
+        assert np.array_equal(keep_array,[True,False,True,False])
+
+def test__partitioned_redundancy():
+
+    sequence_array = _mutated_sequences(120)
+    L = len(sequence_array)
+    quality_array = np.ones((L,len(_EXPECTED_COLUMNS) + 2),dtype=float)
+    quality_array[:,-1] = 1/np.array([len(s) for s in sequence_array])
+
+    rng = np.random.default_rng(2)
+    partition_array = rng.choice(["A","B","C","D"],size=L)
+    partition_array[0] = "lonely"
+
+    for method in ["exhaustive","greedy"]:
+
+        keep_array = _partitioned_redundancy(sequence_array,
+                                             quality_array,
+                                             partition_array,
+                                             cutoff=0.8,
+                                             discard_key=False,
+                                             method=method,
+                                             num_threads=1,
+                                             progress_bar=False)
+
+        # Should match running each partition on its own
+        assert keep_array[0] == True
+        for p in ["A","B","C","D"]:
+            mask = partition_array == p
+            expected = _partition_thread_function(sequence_array[mask],
+                                                  quality_array[mask],
+                                                  cutoff=0.8,
+                                                  discard_key=False,
+                                                  method=method)
+            assert np.array_equal(keep_array[mask],expected)
+
+    # All partitions unique -- keep everything
+    keep_array = _partitioned_redundancy(sequence_array,
+                                         quality_array,
+                                         np.arange(L),
+                                         cutoff=0.0,
+                                         discard_key=False,
+                                         num_threads=1,
+                                         progress_bar=False)
+    assert np.sum(keep_array) == L
+
+def test__get_identity_matrix(test_dataframes):
+
+    df = test_dataframes["good-df"].copy()
+    sequence_array = np.array(df.sequence)
+    L = len(sequence_array)
+
+    pair_i, pair_j, identity = _get_identity_matrix(sequence_array,
+                                                    min_cutoff=0.0,
+                                                    num_threads=1)
+
+    # All pairs above diagonal, sorted by i then j
+    expected = [(i,j) for i in range(L) for j in range(i+1,L)]
+    assert np.array_equal(list(zip(pair_i,pair_j)),expected)
+    assert np.all(identity > 0.9)
+    assert np.all(identity < 0.99)
+
+    # Only pairs above min_cutoff
+    pair_i, pair_j, identity = _get_identity_matrix(sequence_array,
+                                                    min_cutoff=0.96,
+                                                    num_threads=1)
+    assert len(pair_i) < len(expected)
+    assert np.all(identity > 0.96)
+
+def test__apply_identity_cutoff(test_dataframes):
+
+    # Thresholding the identity matrix should give the same result as
+    # a single-threaded remove_redundancy call at the same cutoff.
+    for key in ["good-df","good-df_only-required-columns"]:
+
+        df = test_dataframes[key].copy()
+        df = topiary._private.check.check_topiary_dataframe(df)
+        df, all_quality_array = _get_quality_array(df.copy())
+        sequence_array = np.array(df.loc[df.keep,"sequence"])
+        quality_array = all_quality_array[df.keep]
+
+        pair_i, pair_j, identity = _get_identity_matrix(sequence_array,
+                                                        min_cutoff=0.2,
+                                                        num_threads=1)
+
+        for cutoff in [0.2,0.5,0.9,0.92,0.95,0.96,0.97,0.99]:
+            for discard_key in [True,False]:
+                keep_array = _apply_identity_cutoff(pair_i,
+                                                    pair_j,
+                                                    identity,
+                                                    quality_array,
+                                                    cutoff=cutoff,
+                                                    discard_key=discard_key)
+
+                out_df = remove_redundancy(df.copy(),
+                                           cutoff=cutoff,
+                                           discard_key=discard_key,
+                                           silent=True,
+                                           num_threads=1)
+
+                assert np.array_equal(keep_array,out_df.loc[df.keep,"keep"])
+
+def test__pair_identity_thread_function():
+
+    sequence_array = _mutated_sequences(20)
+    pair_i = np.array([0,0,0,3,3,7])
+    pair_j = np.array([1,5,9,4,19,8])
+
+    identity = _pair_identity_thread_function(pair_i,pair_j,sequence_array)
+    for k in range(len(pair_i)):
+        assert identity[k] == _get_identity(sequence_array[pair_i[k]],
+                                            sequence_array[pair_j[k]])
+
+    identity = _pair_identity_thread_function(np.zeros(0,dtype=int),
+                                              np.zeros(0,dtype=int),
+                                              sequence_array)
+    assert len(identity) == 0
+
+def test__get_sketch_pairs():
+
+    sequence_array = _mutated_sequences(40)
+
+    # Every pair above a high cutoff should be proposed
+    pair_i, pair_j = _get_sketch_pairs(sequence_array,cutoff=0.95)
+    exact_i, exact_j, _ = _get_identity_matrix(sequence_array,
+                                               min_cutoff=0.95,
+                                               num_threads=1)
+    assert len(exact_i) > 0
+    assert set(zip(exact_i,exact_j)) <= set(zip(pair_i,pair_j))
+    assert np.all(pair_i < pair_j)
+
+    # Unrelated sequences are not proposed
+    sequence_array = np.array(["ACDEFGHIKLMNPQRSTVWY",
+                               "WWWWWWWWWWWWWWWWWWWW",
+                               "ACDEFGHIKLMNPQRSTVWY"])
+    pair_i, pair_j = _get_sketch_pairs(sequence_array,cutoff=0.5)
+    assert list(zip(pair_i,pair_j)) == [(0,2)]
+
+def test__sketch_redundancy():
+
+    sequence_array = _mutated_sequences(60,seed=1)
+    quality_array = np.ones((60,len(_EXPECTED_COLUMNS) + 2),dtype=float)
+    quality_array[:,-1] = np.arange(60)
+
+    # With all redundant pairs found, same result as exhaustive
+    for cutoff in [0.95,0.97]:
+        keep_array = _sketch_redundancy(sequence_array,
+                                        quality_array,
+                                        cutoff=cutoff,
+                                        discard_key=False,
+                                        num_threads=1,
+                                        progress_bar=False)
+        expected = _partition_thread_function(sequence_array,
+                                              quality_array,
+                                              cutoff=cutoff,
+                                              discard_key=False,
+                                              method="exhaustive")
+        assert np.array_equal(keep_array,expected)
+
+    # Nothing above cutoff
+    keep_array = _sketch_redundancy(np.array(["ACDEFGHIKLMNPQRSTVWY",
+                                              "WWWWWWWWWWWWWWWWWWWW"]),
+                                    quality_array[:2],
+                                    cutoff=0.9,
+                                    discard_key=False,
+                                    num_threads=1,
+                                    progress_bar=False)
+    assert np.array_equal(keep_array,[True,True])
+
+def test__get_sketch_recall():
+
+    sequence_array = _mutated_sequences(60,seed=2)
+
+    recall = _get_sketch_recall(sequence_array,cutoff=0.95,num_threads=1)
+    assert recall["sample_size"] == 60
+    assert recall["num_pairs"] > 0
+    assert recall["num_found"] == recall["num_pairs"]
+    assert recall["recall"] == 1.0
+
+    recall = _get_sketch_recall(sequence_array,cutoff=0.95,sample_size=20,
+                                num_threads=1,seed=0)
+    assert recall["sample_size"] == 20
+
+    # Recall drops at a low cutoff with a single band (only sequences with
+    # identical signatures are proposed)
+    recall = _get_sketch_recall(sequence_array,cutoff=0.5,sketch_size=128,
+                                sketch_bands=1,num_threads=1)
+    assert recall["recall"] < 1.0
+
+    # No pairs above cutoff
+    recall = _get_sketch_recall(np.array(["ACDEFGHIKLMNPQRSTVWY",
+                                          "WWWWWWWWWWWWWWWWWWWW"]),
+                                cutoff=0.9,num_threads=1)
+    assert recall["num_pairs"] == 0
+    assert recall["recall"] == 1.0
+
+def test_remove_redundancy(test_dataframes,tmpdir):
 
     df = test_dataframes["good-df"].copy()
 
@@ -210,6 +890,113 @@ def test_remove_redundancy(test_dataframes):
         remove_redundancy(df=df,silent=g)
 
 
+    bad_method = [None,1,"test",int,{"test":1}]
+    for b in bad_method:
+        with pytest.raises(ValueError):
+            remove_redundancy(df=df,method=b)
+
+    bad_sketch = [None,0,-1,"test",1.5,int]
+    for b in bad_sketch:
+        with pytest.raises(ValueError):
+            remove_redundancy(df=df,method="sketch",sketch_size=b)
+        with pytest.raises(ValueError):
+            remove_redundancy(df=df,method="sketch",sketch_bands=b)
+
+    # bands must evenly divide sketch size
+    with pytest.raises(ValueError):
+        remove_redundancy(df=df,method="sketch",sketch_size=128,sketch_bands=3)
+
+    # -------------------------------------------------------------------------
+    # Identity cache. Second run should give same result from cache.
+
+    cache_dir = os.path.join(tmpdir,"identity-cache")
+    for method in ["exhaustive","greedy"]:
+        out_df1 = remove_redundancy(df=df,cutoff=0.96,method=method,
+                                    identity_cache=cache_dir)
+        out_df2 = remove_redundancy(df=df,cutoff=0.96,method=method,
+                                    identity_cache=cache_dir)
+        assert np.array_equal(out_df1.keep,out_df2.keep)
+
+    identity_cache = _get_identity_cache(cache_dir)
+    num_cached = identity_cache._get_connection().execute("SELECT COUNT(*) FROM cache").fetchone()[0]
+    identity_cache.close()
+    assert num_cached > 0
+
+    # -------------------------------------------------------------------------
+    # Partitioned
+
+    bad_partition = [1,"not_a_column",int,{"test":1}]
+    for b in bad_partition:
+        with pytest.raises(ValueError):
+            remove_redundancy(df=df,partition_column=b)
+
+    with pytest.raises(ValueError):
+        remove_redundancy(df=df,only_in_species="test")
+
+    with pytest.raises(ValueError):
+        remove_redundancy(df=df,only_in_species=True,partition_column="name")
+
+    # Every sequence is from a different species, so nothing removed
+    out_df = remove_redundancy(df=df,cutoff=0.50,only_in_species=True)
+    assert np.sum(out_df.keep) == np.sum(df.keep)
+
+    out_df = remove_redundancy(df=df,cutoff=0.50,partition_column="species")
+    assert np.sum(out_df.keep) == np.sum(df.keep)
+
+    # Put everyone in same partition
+    df_partition = df.copy()
+    df_partition["block"] = "A"
+    out_df = remove_redundancy(df=df_partition,cutoff=0.50,partition_column="block")
+    assert np.sum(out_df.keep) == 1
+
+    # -------------------------------------------------------------------------
+    # Greedy method
+
+    df = test_dataframes["good-df"].copy()
+
+    out_df = remove_redundancy(df=df,cutoff=0.99,method="greedy")
+    assert np.sum(out_df.keep) == np.sum(df.keep)
+
+    out_df = remove_redundancy(df=df,cutoff=0.50,method="greedy")
+    assert np.sum(out_df.keep) == 1
+
+    df["key_species"] = True
+    out_df = remove_redundancy(df=df,cutoff=0.50,method="greedy")
+    assert np.sum(out_df.keep) == np.sum(df.keep)
+
+    # -------------------------------------------------------------------------
+    # Sketch method. These sequences are all closely related, so the sketch
+    # should find every redundant pair and match exhaustive.
+
+    df = test_dataframes["good-df"].copy()
+    for cutoff in [0.5,0.9,0.96,0.99]:
+        out_df = remove_redundancy(df=df,cutoff=cutoff,method="sketch")
+        expected = remove_redundancy(df=df,cutoff=cutoff,num_threads=1)
+        assert np.array_equal(out_df.keep,expected.keep)
+
+    out_df = remove_redundancy(df=df,cutoff=0.5,method="sketch",
+                               only_in_species=True)
+    assert np.sum(out_df.keep) == np.sum(df.keep)
+
+    df_partition = df.copy()
+    df_partition["block"] = "A"
+    out_df = remove_redundancy(df=df_partition,cutoff=0.50,method="sketch",
+                               partition_column="block")
+    assert np.sum(out_df.keep) == 1
+
+    # -------------------------------------------------------------------------
+    # Compact dataframes give the same result
+
+    df = test_dataframes["good-df"].copy()
+    compact = topiary.io.compact_dataframe(df)
+    for method in ["exhaustive","greedy","sketch"]:
+        out_df = remove_redundancy(df=compact,cutoff=0.96,method=method)
+        expected = remove_redundancy(df=df,cutoff=0.96,method=method)
+        assert np.array_equal(out_df.keep,expected.keep)
+
+    out_df = remove_redundancy(df=compact,cutoff=0.5,only_in_species=True)
+    assert np.sum(out_df.keep) == np.sum(df.keep)
+
     # -------------------------------------------------------------------------
     # Make sure dropping is happening a sane way that depends on cutoff and
     # key_species.
@@ -280,5 +1067,25 @@ def test_remove_redundancy(test_dataframes):
     out_df = remove_redundancy(df=df,cutoff=0.2)
     assert np.sum(out_df.keep) == 1
 
-def test_find_redundancy_cutoff():
-    pass
\ No newline at end of file
+def test_find_redundancy_cutoff(test_dataframes):
+
+    df = test_dataframes["good-df"].copy()
+
+    # sequences in this dataframe are between 0.9125 and 0.98125 identical.
+    # Asking for all sequences should give max cutoff; asking for one should
+    # give the min cutoff.
+    cutoff = find_redundancy_cutoff(df,len(df),sample_fx=1.0)
+    assert cutoff == 0.99
+
+    cutoff = find_redundancy_cutoff(df,1,sample_fx=1.0)
+    assert cutoff == 0.25
+
+    # Intermediate target should land at an intermediate cutoff that gives
+    # the requested number of sequences
+    cutoff = find_redundancy_cutoff(df,3,sample_fx=1.0)
+    assert 0.9125 <= cutoff <= 0.98125
+    out_df = remove_redundancy(df.copy(),cutoff=cutoff,num_threads=1)
+    assert np.sum(out_df.keep) == 3
+
+    with pytest.raises(ValueError):
+        find_redundancy_cutoff(df,3,min_cutoff=0.9,max_cutoff=0.8)
\ No newline at end of file
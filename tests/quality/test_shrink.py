@@ -2,7 +2,9 @@
 import pytest
 
 import topiary
+from topiary.quality.shrink import shrink_in_species
 from topiary.quality.shrink import shrink_redundant
+from topiary.quality.shrink import _align_blocks
 from topiary.quality.shrink import shrink_aligners
 from topiary.quality.shrink import shrink_dataset
 
@@ -12,8 +14,37 @@ import pandas as pd
 
 import os
 
-def test_shrink_in_species():
-    pass
+def test_shrink_in_species(test_dataframes):
+
+    df = test_dataframes["good-df"].copy()
+
+    # Every sequence in this dataframe is from a different species, so nothing
+    # should be removed even at a low cutoff
+    out_df = shrink_in_species(df,redundancy_cutoff=0.5)
+    assert np.sum(out_df.keep) == len(df)
+
+    # Put all sequences in the same species. Should only keep one
+    df["species"] = df.species.iloc[0]
+    out_df = shrink_in_species(df,redundancy_cutoff=0.5)
+    assert np.sum(out_df.keep) == 1
+
+    # always_keep should be kept
+    df["always_keep"] = False
+    df.loc[df.index[-1],"always_keep"] = True
+    out_df = shrink_in_species(df,redundancy_cutoff=0.5)
+    assert out_df.keep.iloc[-1] == True
+
+    # Sketch method gives same result
+    out_df = shrink_in_species(df,redundancy_cutoff=0.5)
+    sketch_df = shrink_in_species(df,redundancy_cutoff=0.5,
+                                  redundancy_method="sketch")
+    assert np.array_equal(out_df.keep,sketch_df.keep)
+
+    with pytest.raises(ValueError):
+        shrink_in_species(df,redundancy_cutoff=-1)
+
+    with pytest.raises(ValueError):
+        shrink_in_species(df,redundancy_method="not_a_method")
 
 def test_shrink_redundant(for_real_inference):
 
@@ -97,8 +128,59 @@ def test_shrink_redundant(for_real_inference):
     out_df = shrink_redundant(test_df_2,redundancy_cutoff=0.05)
     assert np.array_equal(out_df.keep,np.array([False,True,False,False,False]))
 
-def test_shrink_aligners():
-    pass
+@pytest.mark.skipif(os.name == "nt",reason="muscle cannot be installed via conda on windows")
+def test__align_blocks(for_real_inference,tmpdir):
+
+    current_dir = os.getcwd()
+    os.chdir(tmpdir)
+
+    df = topiary.read_dataframe(for_real_inference["small-pre-redundancy.csv"])
+    block_dfs = [df.iloc[:6].copy(),df.iloc[6:12].copy(),df.iloc[12:].copy()]
+
+    assert _align_blocks([]) == []
+
+    for num_threads in [1,2]:
+        out = _align_blocks(block_dfs,num_threads=num_threads)
+        assert len(out) == 3
+        for o, b in zip(out,block_dfs):
+            assert np.array_equal(o.uid,b.uid)
+            assert len(set([len(a) for a in o.alignment])) == 1
+            assert np.array_equal([a.replace("-","") for a in o.alignment],
+                                  list(b.sequence))
+
+    os.chdir(current_dir)
+
+def test_shrink_aligners(for_real_inference):
+
+    df = topiary.read_dataframe(for_real_inference["small-pre-redundancy.csv"])
+
+    # Fake alignment: pad every sequence out to the same length
+    length = np.max([len(s) for s in df.sequence])
+    df["alignment"] = [s + "-"*(length - len(s)) for s in df.sequence]
+
+    block = shrink_aligners(df.copy(),
+                            target_seq_number=10,
+                            species_tree_aware=False,
+                            align_mode="block")
+    assert np.sum(block.keep) >= 10
+    assert np.all(block.loc[block.key_species,"keep"])
+    assert np.all(block.loc[block.always_keep,"keep"])
+
+    # Scoring blocks on the global alignment gives the same answer
+    glob = shrink_aligners(df.copy(),
+                           target_seq_number=10,
+                           species_tree_aware=False,
+                           align_mode="global")
+    assert np.array_equal(block.keep,glob.keep)
+
+    bad_align_mode = ["not_a_mode",None,1]
+    for b in bad_align_mode:
+        print(b)
+        with pytest.raises(ValueError):
+            shrink_aligners(df.copy(),
+                            target_seq_number=10,
+                            species_tree_aware=False,
+                            align_mode=b)
 
 @pytest.mark.skipif(os.name == "nt",reason="muscle cannot be installed via conda on windows")
 def test_shrink_dataset(for_real_inference,tmpdir):
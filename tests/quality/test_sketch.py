@@ -0,0 +1,145 @@
+
+import pytest
+
+from topiary.quality.sketch import _mix
+from topiary.quality.sketch import _get_kmer_codes
+from topiary.quality.sketch import get_minhash_signatures
+from topiary.quality.sketch import _get_group_pairs
+from topiary.quality.sketch import get_lsh_pairs
+import topiary.quality.sketch
+
+import numpy as np
+
+import random
+
+def _family_sequences(num_families,num_per_family,mutation_rate,seed=0):
+    """
+    Groups of closely related random protein sequences.
+    """
+
+    rng = random.Random(seed)
+    aa = "ACDEFGHIKLMNPQRSTVWY"
+
+    seqs = []
+    family = []
+    for f in range(num_families):
+        parent = "".join(rng.choice(aa) for _ in range(rng.randint(100,300)))
+        for _ in range(num_per_family):
+            child = "".join(c if rng.random() > mutation_rate else rng.choice(aa)
+                            for c in parent)
+            seqs.append(child)
+            family.append(f)
+
+    return np.array(seqs,dtype=object), np.array(family)
+
+def test__mix():
+
+    x = np.arange(1000,dtype=np.uint64)
+    mixed = _mix(x)
+    assert mixed.dtype == np.uint64
+
+    # Deterministic, no collisions, and scrambled
+    assert np.array_equal(mixed,_mix(x))
+    assert len(np.unique(mixed)) == 1000
+    assert not np.array_equal(np.argsort(mixed),np.arange(1000))
+
+def test__get_kmer_codes():
+
+    seqs = np.array(["ACDE","AC","","ACDEF"],dtype=object)
+    codes, starts, num_kmers = _get_kmer_codes(seqs,kmer_size=3)
+
+    assert np.array_equal(num_kmers,[2,1,0,3])
+    assert np.array_equal(starts,[0,2,3,3])
+    assert len(codes) == 6
+
+    def code(kmer):
+        return sum([ord(c) << 8*t for t, c in enumerate(kmer)])
+
+    expected = [code("ACD"),code("CDE"),code("AC"),
+                code("ACD"),code("CDE"),code("DEF")]
+    assert np.array_equal(codes,np.array(expected,dtype=np.uint64))
+
+def test_get_minhash_signatures():
+
+    seqs, family = _family_sequences(5,4,mutation_rate=0.02)
+    seqs = np.concatenate((seqs,["",seqs[0]]))
+
+    sig = get_minhash_signatures(seqs,sketch_size=64)
+    assert sig.shape == (len(seqs),64)
+    assert sig.dtype == np.uint64
+
+    # Identical sequences have identical signatures; empty is all max
+    assert np.array_equal(sig[0],sig[-1])
+    assert np.all(sig[-2] == np.iinfo(np.uint64).max)
+
+    # Signatures estimate Jaccard similarity: same family is similar,
+    # different families are not
+    same = np.mean(sig[0] == sig[1])
+    different = np.mean(sig[0] == sig[4])
+    assert same > 0.5
+    assert different < 0.1
+
+    # Same seed, same signatures. Different seed, different signatures.
+    assert np.array_equal(sig,get_minhash_signatures(seqs,sketch_size=64))
+    assert not np.array_equal(sig,get_minhash_signatures(seqs,sketch_size=64,seed=1))
+
+    # Chunking does not change result
+    original = topiary.quality.sketch._CHUNK_SIZE
+    try:
+        topiary.quality.sketch._CHUNK_SIZE = 64*50
+        assert np.array_equal(sig,get_minhash_signatures(seqs,sketch_size=64))
+    finally:
+        topiary.quality.sketch._CHUNK_SIZE = original
+
+    with pytest.raises(ValueError):
+        get_minhash_signatures(seqs,sketch_size=0)
+    with pytest.raises(ValueError):
+        get_minhash_signatures(seqs,kmer_size=9)
+
+def test__get_group_pairs():
+
+    keys = np.array([5,1,5,2,1,5],dtype=np.uint64)
+    pair_i, pair_j = _get_group_pairs(keys)
+
+    pairs = set(zip(pair_i,pair_j))
+    assert pairs == {(1,4),(0,2),(0,5),(2,5)}
+    assert np.all(pair_i < pair_j)
+
+    pair_i, pair_j = _get_group_pairs(np.arange(5,dtype=np.uint64))
+    assert len(pair_i) == 0
+
+    pair_i, pair_j = _get_group_pairs(np.zeros(0,dtype=np.uint64))
+    assert len(pair_i) == 0
+
+def test_get_lsh_pairs():
+
+    seqs, family = _family_sequences(10,5,mutation_rate=0.02)
+    seqs = np.concatenate((seqs,["",""]))
+
+    sig = get_minhash_signatures(seqs,sketch_size=128)
+    pair_i, pair_j = get_lsh_pairs(sig,num_bands=32)
+
+    # Sorted, i < j
+    assert np.all(pair_i < pair_j)
+    order = np.lexsort((pair_j,pair_i))
+    assert np.array_equal(order,np.arange(len(pair_i)))
+
+    # All pairs within families found, no pairs between families, empty
+    # sequences never paired
+    pairs = set(zip(pair_i,pair_j))
+    for i in range(50):
+        for j in range(i+1,50):
+            if family[i] == family[j]:
+                assert (i,j) in pairs
+            else:
+                assert (i,j) not in pairs
+    assert np.max(pair_j) < 50
+
+    # One band with all rows is exact signature matching
+    pair_i, pair_j = get_lsh_pairs(sig,num_bands=1)
+    assert len(pair_i) == 0
+
+    with pytest.raises(ValueError):
+        get_lsh_pairs(sig,num_bands=3)
+    with pytest.raises(ValueError):
+        get_lsh_pairs(sig,num_bands=0)
@@ -0,0 +1,341 @@
+"""
+Compact representation of a sequence alignment shared by the quality, raxml,
+and pastml code.
+"""
+
+import numpy as np
+
+import os
+
+class AlignmentMatrix():
+    """
+    Sequence alignment stored as a 2D uint8 array of character codes (one row
+    per sequence, one column per alignment column), with the uid (or name) of
+    each row. Gap and X masks and column statistics are calculated the first
+    time they are requested and then cached.
+
+    Build with AlignmentMatrix.from_dataframe, AlignmentMatrix.from_file (.phy
+    or .fasta), or AlignmentMatrix(sequences,uid).
+
+    Parameters
+    ----------
+    sequences : list-like or numpy.ndarray
+        aligned sequences as strings (all the same length) or a 2D uint8
+        array of character codes.
+    uid : list-like, optional
+        uid (or name) of each sequence. If not specified, use "0", "1", ...
+    """
+
+    def __init__(self,sequences,uid=None):
+
+        if issubclass(type(sequences),np.ndarray) and sequences.dtype == np.uint8:
+            if len(sequences.shape) != 2:
+                err = "\ncharacter code array must be two-dimensional\n\n"
+                raise ValueError(err)
+            codes = sequences
+        else:
+            codes = self._encode(sequences)
+
+        if uid is None:
+            uid = [str(i) for i in range(codes.shape[0])]
+
+        uid = np.array([str(u) for u in uid],dtype=object)
+        if len(uid) != codes.shape[0]:
+            err = f"\nnumber of uid ({len(uid)}) does not match the number of\n"
+            err += f"sequences ({codes.shape[0]}).\n\n"
+            raise ValueError(err)
+
+        self._codes = codes
+        self._uid = uid
+        self._uid_index = None
+        self._cache = {}
+
+    @staticmethod
+    def _encode(sequences):
+        """
+        Encode a list of equal-length strings as a uint8 array.
+        """
+
+        sequences = [str(s) for s in sequences]
+        if len(sequences) == 0:
+            return np.zeros((0,0),dtype=np.uint8)
+
+        lengths = set([len(s) for s in sequences])
+        if len(lengths) != 1:
+            err = "\nAll sequences in an alignment must have the same length\n\n"
+            raise ValueError(err)
+
+        # Non-ascii characters become "?" so each character is one byte
+        joined = "".join(sequences).encode("ascii",errors="replace")
+        codes = np.frombuffer(joined,dtype=np.uint8)
+
+        return codes.reshape((len(sequences),-1)).copy()
+
+    @classmethod
+    def from_dataframe(cls,df,column="alignment",only_keep=True):
+        """
+        Build an AlignmentMatrix from a topiary dataframe.
+
+        Parameters
+        ----------
+        df : pandas.DataFrame
+            topiary dataframe
+        column : str, default="alignment"
+            column holding aligned sequences
+        only_keep : bool, default=True
+            only include rows where keep is True
+
+        Returns
+        -------
+        alignment_matrix : AlignmentMatrix
+        """
+
+        if column not in df.columns:
+            err = f"\ncolumn '{column}' not in dataframe.\n\n"
+            raise ValueError(err)
+
+        if only_keep and "keep" in df.columns:
+            df = df.loc[df["keep"],:]
+
+        return cls(list(df[column]),uid=list(df["uid"]))
+
+    @classmethod
+    def from_file(cls,alignment_file):
+        """
+        Build an AlignmentMatrix from a .phy (as written by topiary or raxml)
+        or .fasta file. For fasta files, the uid is the part of the header
+        before the first "|".
+
+        Parameters
+        ----------
+        alignment_file : str
+            alignment file. files ending with .fasta, .fa, .fas, or .faa are
+            read as fasta; anything else is read as phylip.
+
+        Returns
+        -------
+        alignment_matrix : AlignmentMatrix
+        """
+
+        ext = os.path.splitext(alignment_file)[-1].lower()
+        with open(alignment_file) as f:
+            lines = f.readlines()
+
+        if ext in [".fasta",".fa",".fas",".faa"]:
+            return cls._from_fasta_lines(lines)
+
+        return cls._from_phy_lines(lines)
+
+    @classmethod
+    def _from_fasta_lines(cls,lines):
+
+        uid = []
+        seqs = []
+        for line in lines:
+            if line.startswith(">"):
+                uid.append(line[1:].split("|")[0].strip())
+                seqs.append([])
+            elif len(seqs) > 0:
+                seqs[-1].append(line.strip())
+
+        return cls(["".join(s) for s in seqs],uid=uid)
+
+    @classmethod
+    def _from_phy_lines(cls,lines):
+
+        lines = [line.strip() for line in lines]
+        lines = [line for line in lines if line != ""]
+        if len(lines) == 0:
+            err = "\nphy file is empty\n\n"
+            raise ValueError(err)
+
+        # Read header if present. If the first line is not a header, assume
+        # the file has none.
+        try:
+            num_taxa, num_sites = [int(c) for c in lines[0].split()[:2]]
+            body = lines[1:]
+        except ValueError:
+            num_taxa, num_sites = None, None
+            body = lines
+
+        # Names and sequences on alternating lines (how topiary and raxml write
+        # them). Otherwise, name and sequence separated by whitespace.
+        if (num_taxa is None and len(body) % 2 == 0) or len(body) == 2*num_taxa:
+            uid = body[0::2]
+            seqs = body[1::2]
+        else:
+            uid = []
+            seqs = []
+            for line in body:
+                col = line.split()
+                uid.append(col[0])
+                seqs.append("".join(col[1:]))
+
+        alignment_matrix = cls(seqs,uid=uid)
+        if num_taxa is not None and alignment_matrix.shape != (num_taxa,num_sites):
+            err = f"\nphy header says {num_taxa} x {num_sites} but found\n"
+            err += f"{alignment_matrix.shape[0]} x {alignment_matrix.shape[1]}.\n\n"
+            raise ValueError(err)
+
+        return alignment_matrix
+
+    def __getitem__(self,key):
+        """
+        Slice the alignment. Takes numpy-style row and column indexes. Row
+        indexes may also be uid (or a list of uid). Always returns an
+        AlignmentMatrix.
+        """
+
+        if type(key) is tuple:
+            rows, columns = key
+        else:
+            rows, columns = key, slice(None)
+
+        rows = self._get_row_index(rows)
+        if type(rows) is int or issubclass(type(rows),np.integer):
+            rows = [rows]
+        if type(columns) is int or issubclass(type(columns),np.integer):
+            columns = [columns]
+
+        codes = self._codes[rows][:,columns]
+
+        return AlignmentMatrix(np.ascontiguousarray(codes),uid=self._uid[rows])
+
+    def _get_row_index(self,rows):
+        """
+        Convert uid (or list of uid) into row indexes. Anything else is
+        returned unchanged.
+        """
+
+        if type(rows) is str:
+            return self.uid_index[rows]
+
+        if hasattr(rows,"__iter__") and not issubclass(type(rows),np.ndarray):
+            rows = list(rows)
+            if len(rows) > 0 and type(rows[0]) is str:
+                return np.array([self.uid_index[r] for r in rows],dtype=int)
+            return np.array(rows)
+
+        if issubclass(type(rows),np.ndarray) and rows.dtype == object:
+            return np.array([self.uid_index[r] for r in rows],dtype=int)
+
+        return rows
+
+    def __len__(self):
+        return self._codes.shape[0]
+
+    @property
+    def codes(self):
+        """
+        uint8 array of character codes (num_seqs x num_columns).
+        """
+        return self._codes
+
+    @property
+    def uid(self):
+        """
+        uid (or name) for each row.
+        """
+        return self._uid
+
+    @property
+    def uid_index(self):
+        """
+        dictionary mapping uid to row index.
+        """
+        if self._uid_index is None:
+            self._uid_index = dict([(u,i) for i, u in enumerate(self._uid)])
+        return self._uid_index
+
+    @property
+    def shape(self):
+        """
+        (num_seqs,num_columns)
+        """
+        return self._codes.shape
+
+    def _cached(self,name,fcn):
+        if name not in self._cache:
+            self._cache[name] = fcn()
+        return self._cache[name]
+
+    @property
+    def gap_mask(self):
+        """
+        boolean array, True where the alignment has "-".
+        """
+        return self._cached("gap_mask",lambda: self._codes == ord("-"))
+
+    @property
+    def x_mask(self):
+        """
+        boolean array, True where the alignment has "X".
+        """
+        return self._cached("x_mask",lambda: self._codes == ord("X"))
+
+    @property
+    def column_gap_counts(self):
+        """
+        number of gaps in each column.
+        """
+        return self._cached("column_gap_counts",
+                            lambda: np.sum(self.gap_mask,axis=0))
+
+    @property
+    def column_gap_fraction(self):
+        """
+        fraction of sequences with a gap in each column.
+        """
+        def _fcn():
+            if self.shape[0] == 0:
+                return np.zeros(self.shape[1],dtype=float)
+            return self.column_gap_counts/self.shape[0]
+
+        return self._cached("column_gap_fraction",_fcn)
+
+    @property
+    def gap_only_columns(self):
+        """
+        boolean array, True for columns that have only "-".
+        """
+        return self._cached("gap_only_columns",
+                            lambda: np.all(self.gap_mask,axis=0))
+
+    @property
+    def gap_or_x_only_columns(self):
+        """
+        boolean array, True for columns that have only "-" and "X". (RAxML
+        drops these columns.)
+        """
+        return self._cached("gap_or_x_only_columns",
+                            lambda: np.all(np.logical_or(self.gap_mask,
+                                                         self.x_mask),axis=0))
+
+    def drop_gap_only_columns(self):
+        """
+        Get a copy of the alignment without gap-only columns.
+
+        Returns
+        -------
+        alignment_matrix : AlignmentMatrix
+        """
+
+        return self[:,np.logical_not(self.gap_only_columns)]
+
+    def to_strings(self):
+        """
+        Get the aligned sequences as a list of strings.
+
+        Returns
+        -------
+        sequences : list
+            list of aligned sequences
+        """
+
+        if self.shape[1] == 0:
+            return ["" for _ in range(self.shape[0])]
+
+        codes = np.ascontiguousarray(self._codes)
+        as_bytes = codes.view(f"S{self.shape[1]}")[:,0]
+
+        return [b.decode("ascii") for b in as_bytes]
@@ -0,0 +1,280 @@
+"""
+Persistent, size-capped key/value cache stored in an sqlite database.
+"""
+
+from topiary._private import check
+
+import sqlite3
+import hashlib
+import time
+import uuid
+import os
+
+def get_digest(value):
+    """
+    Get a short, stable digest for a string (i.e. a sequence).
+
+    Parameters
+    ----------
+    value : str
+        string to digest
+
+    Returns
+    -------
+    digest : str
+        32 character hex digest
+    """
+
+    return hashlib.blake2b(value.encode(),digest_size=16).hexdigest()
+
+
+class DiskCache():
+    """
+    Key/value cache stored in an sqlite database on disk. Least-recently-used
+    entries are evicted when the cache grows beyond max_size. The object can
+    be passed to worker processes; each copy opens its own connection to the
+    database. Writes and hit/miss counts are buffered in memory until flush()
+    is called.
+
+    Parameters
+    ----------
+    cache_file : str
+        sqlite database file. Created if it does not exist.
+    max_size : int, default=1000000000
+        approximate maximum size of the cache contents in bytes
+    run_id : str, optional
+        identifier used to pool hit/miss counts from copies of this object
+        in other processes. Generated if not specified.
+    """
+
+    def __init__(self,cache_file,max_size=1000000000,run_id=None):
+
+        self._cache_file = os.path.abspath(cache_file)
+        self._max_size = check.check_int(max_size,"max_size",minimum_allowed=1)
+
+        if run_id is None:
+            run_id = uuid.uuid4().hex
+            self._owner = True
+        else:
+            self._owner = False
+        self._run_id = run_id
+
+        cache_dir = os.path.dirname(self._cache_file)
+        if not os.path.isdir(cache_dir):
+            os.makedirs(cache_dir)
+
+        self._conn = None
+        self._pending = {}
+        self._touched = set()
+
+        self.hits = 0
+        self.misses = 0
+        self._unreported_hits = 0
+        self._unreported_misses = 0
+
+        # Create tables
+        conn = self._get_connection()
+        with conn:
+            conn.execute("CREATE TABLE IF NOT EXISTS cache "
+                         "(key TEXT PRIMARY KEY, value, size INTEGER, last_used REAL)")
+            conn.execute("CREATE INDEX IF NOT EXISTS cache_last_used "
+                         "ON cache (last_used)")
+            conn.execute("CREATE TABLE IF NOT EXISTS counts "
+                         "(run_id TEXT, hits INTEGER, misses INTEGER)")
+
+            # Running total of entry sizes, kept up to date by triggers so
+            # eviction does not have to scan the whole table. (INSERT OR
+            # REPLACE fires the delete trigger for the replaced row because
+            # connections turn on recursive_triggers.)
+            conn.execute("CREATE TABLE IF NOT EXISTS metadata "
+                         "(key TEXT PRIMARY KEY, value INTEGER)")
+            conn.execute("CREATE TRIGGER IF NOT EXISTS cache_insert "
+                         "AFTER INSERT ON cache BEGIN "
+                         "UPDATE metadata SET value=value+NEW.size "
+                         "WHERE key='total_size'; END")
+            conn.execute("CREATE TRIGGER IF NOT EXISTS cache_delete "
+                         "AFTER DELETE ON cache BEGIN "
+                         "UPDATE metadata SET value=value-OLD.size "
+                         "WHERE key='total_size'; END")
+            conn.execute("INSERT OR IGNORE INTO metadata (key,value) "
+                         "SELECT 'total_size', COALESCE(SUM(size),0) FROM cache")
+
+    def __reduce__(self):
+        return (DiskCache,(self._cache_file,self._max_size,self._run_id))
+
+    def _get_connection(self):
+        """
+        Connect to the database the first time we need it in this process.
+        """
+
+        if self._conn is None:
+            self._conn = sqlite3.connect(self._cache_file,timeout=600)
+            self._conn.execute("PRAGMA recursive_triggers=ON")
+
+        return self._conn
+
+    def get(self,key):
+        """
+        Get the value for key.
+
+        Parameters
+        ----------
+        key : str
+            key to look up
+
+        Returns
+        -------
+        value :
+            value stored for key. None if key is not in the cache.
+        """
+
+        if key in self._pending:
+            self.hits += 1
+            self._unreported_hits += 1
+            return self._pending[key]
+
+        conn = self._get_connection()
+        row = conn.execute("SELECT value FROM cache WHERE key=?",(key,)).fetchone()
+
+        if row is None:
+            self.misses += 1
+            self._unreported_misses += 1
+            return None
+
+        self.hits += 1
+        self._unreported_hits += 1
+        self._touched.add(key)
+
+        return row[0]
+
+    def put(self,key,value):
+        """
+        Store value for key. The value is written to disk on the next flush().
+
+        Parameters
+        ----------
+        key : str
+            key
+        value : str, bytes, int, or float
+            value to store
+        """
+
+        self._pending[key] = value
+
+    def flush(self):
+        """
+        Write pending values, update last-used times, record hit/miss counts,
+        and evict the least-recently-used entries if the cache is too large.
+        """
+
+        conn = self._get_connection()
+
+        now = time.time()
+        with conn:
+
+            if len(self._pending) > 0:
+                rows = []
+                for key in self._pending:
+                    value = self._pending[key]
+                    if isinstance(value,(str,bytes)):
+                        size = len(key) + len(value)
+                    else:
+                        size = len(key) + 8
+                    rows.append((key,value,size,now))
+
+                conn.executemany("INSERT OR REPLACE INTO cache "
+                                 "(key,value,size,last_used) VALUES (?,?,?,?)",
+                                 rows)
+
+            if len(self._touched) > 0:
+                conn.executemany("UPDATE cache SET last_used=? WHERE key=?",
+                                 [(now,key) for key in self._touched])
+
+            if self._unreported_hits > 0 or self._unreported_misses > 0:
+                conn.execute("INSERT INTO counts (run_id,hits,misses) VALUES (?,?,?)",
+                             (self._run_id,
+                              self._unreported_hits,
+                              self._unreported_misses))
+
+        self._pending = {}
+        self._touched = set()
+        self._unreported_hits = 0
+        self._unreported_misses = 0
+
+        self._evict()
+
+    def _evict(self):
+        """
+        Remove least-recently-used entries until the cache is under 90% of
+        max_size.
+        """
+
+        conn = self._get_connection()
+        with conn:
+
+            total = conn.execute("SELECT value FROM metadata "
+                                 "WHERE key='total_size'").fetchone()[0]
+            if total <= self._max_size:
+                return
+
+            to_remove = total - int(0.9*self._max_size)
+
+            removed = 0
+            keys = []
+            for key, size in conn.execute("SELECT key, size FROM cache "
+                                          "ORDER BY last_used ASC"):
+                keys.append((key,))
+                removed += size
+                if removed >= to_remove:
+                    break
+
+            conn.executemany("DELETE FROM cache WHERE key=?",keys)
+
+    def get_counts(self):
+        """
+        Get the total number of cache hits and misses for this object and all
+        copies of it that have been flushed in other processes.
+
+        Returns
+        -------
+        hits : int
+            number of cache hits
+        misses : int
+            number of cache misses
+        """
+
+        self.flush()
+
+        conn = self._get_connection()
+        hits, misses = conn.execute("SELECT SUM(hits), SUM(misses) FROM counts "
+                                    "WHERE run_id=?",(self._run_id,)).fetchone()
+        if hits is None:
+            hits = 0
+            misses = 0
+
+        return hits, misses
+
+    def close(self):
+        """
+        Flush pending writes and close the connection to the database.
+        """
+
+        if self._conn is None:
+            return
+
+        self.flush()
+
+        # The owner cleans up the shared hit/miss counts
+        if self._owner:
+            with self._conn:
+                self._conn.execute("DELETE FROM counts WHERE run_id=?",
+                                   (self._run_id,))
+
+        self._conn.close()
+        self._conn = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self,*args):
+        self.close()
@@ -4,12 +4,76 @@ Function to check/process topiary dataframes.
 
 from topiary import _private
 from .standard import column_to_bool
+from topiary._private.alignment_matrix import AlignmentMatrix
 
 import pandas as pd
 import numpy as np
 
+import hashlib
 import re
 
+# Key in df.attrs holding the fingerprint of a validated dataframe
+_FINGERPRINT_KEY = "topiary_fingerprint"
+
+def _get_fingerprint(df):
+    """
+    Get a cheap content fingerprint for a dataframe: a digest of the column
+    names, dtypes, and pandas row hashes. Returns None if the dataframe cannot
+    be hashed (e.g. unhashable cell values).
+    """
+
+    try:
+        row_hashes = pd.util.hash_pandas_object(df,index=False,categorize=False)
+    except (TypeError,ValueError):
+        return None
+
+    digest = hashlib.blake2b(digest_size=16)
+    digest.update(repr([(str(c),str(t)) for c, t in df.dtypes.items()]).encode())
+    digest.update(np.ascontiguousarray(row_hashes.values).tobytes())
+
+    return digest.hexdigest()
+
+def _is_compact_string(column):
+    """
+    Whether column holds strings in one of the compact dtypes used by
+    topiary.io.compact_dataframe (categorical with string categories or pandas
+    string).
+    """
+
+    if isinstance(column.dtype,pd.StringDtype):
+        return True
+
+    if isinstance(column.dtype,pd.CategoricalDtype):
+        return pd.api.types.infer_dtype(column.cat.categories) in ["string","empty"]
+
+    return False
+
+def _is_empty_string(column):
+    """
+    Boolean mask that is True for entries in column that are strings with
+    only whitespace.
+    """
+
+    # Pandas string column: use vectorized string methods
+    if isinstance(column.dtype,pd.StringDtype):
+        empty = (column.str.strip() == "").fillna(False)
+        return pd.Series(np.array(empty,dtype=bool),index=column.index)
+
+    # Categorical: check the categories, then map back onto the rows
+    if isinstance(column.dtype,pd.CategoricalDtype):
+        categories = pd.Series(column.cat.categories.astype(object))
+        empty_categories = np.append(np.array(_is_empty_string(categories),dtype=bool),
+                                     False)
+        return pd.Series(empty_categories[column.cat.codes],index=column.index)
+
+    if not (column.dtype == object or pd.api.types.is_string_dtype(column)):
+        return pd.Series(np.zeros(len(column),dtype=bool),index=column.index)
+
+    is_str = column.map(type) == str
+    stripped = column.where(is_str,"x").astype(str).str.strip()
+
+    return np.logical_and(is_str,stripped == "")
+
 def check_topiary_dataframe(df):
     """
     Check to make sure topiary dataframe is valid, adding standard columns if
@@ -57,6 +121,11 @@ def check_topiary_dataframe(df):
         + `name`
         + `sequence`
         + all other columns, in order they came in
+
+    + Stores a content fingerprint of the validated dataframe in
+      `df.attrs`. If a dataframe passed in carries a fingerprint that still
+      matches its contents, it has not been changed since it was validated
+      and is returned (as a copy) without re-validating.
     """
 
     # Make sure type is right
@@ -64,44 +133,24 @@ def check_topiary_dataframe(df):
         err = "\ndf must be a pandas dataframe.\n\n"
         raise ValueError(err)
 
+    # Fast path: dataframe already validated and not changed since
+    fingerprint = df.attrs.get(_FINGERPRINT_KEY,None)
+    if fingerprint is not None and fingerprint == _get_fingerprint(df):
+        df = df.copy()
+        if not df.index.equals(pd.RangeIndex(len(df))):
+            df = df.reset_index(drop=True)
+        df.attrs[_FINGERPRINT_KEY] = fingerprint
+        return df
+
     # Drop duplicates
     df = df.drop_duplicates(ignore_index=True)
 
-    # Get mask for cells that are either null or nan
-    bad_mask = np.logical_or(pd.isnull(df),pd.isna(df))
-    idx = list(df.index)
-    final_mask = []
-    for i in range(len(bad_mask)):
-
-        # Grab row
-        row = df.loc[idx[i],:]
-
-        # Get all non-null and non-na entries from the row
-        mask = np.logical_not(np.logical_or(pd.isnull(row),pd.isna(row)))
-        not_null = row[mask]
-
-        # Default to not keeping a row
-        keep = False
-
-        # If there are any non-null entries left...
-        if len(not_null) > 0:
-
-            # Loop will end up with keep = False if only columns remaining are
-            # type string and "".
-            for n in not_null:
-
-                # If an empty string, this is basically a null.
-                if issubclass(type(n),str) and n.strip() == "":
-                    continue
-
-                # If we get here, we have some kind of non-empty cell. Break out
-                # and keep row
-                keep = True
-                break
-
-        final_mask.append(keep)
-
-    final_mask = np.array(final_mask,dtype=bool)
+    # A cell is empty if it is null/nan or a string with only whitespace. Keep
+    # rows with at least one non-empty cell.
+    not_empty = np.logical_not(pd.isnull(df))
+    for c in df.columns:
+        not_empty.loc[_is_empty_string(df[c]),c] = False
+    final_mask = np.array(np.any(not_empty,axis=1),dtype=bool)
 
     # Let user know we're dropping lines
     if np.sum(np.logical_not(final_mask)) > 0:
@@ -123,31 +172,42 @@ def check_topiary_dataframe(df):
             err = f"\n\nA topiary dataframe must have a {c} column.\n\n"
             raise ValueError(err)
 
+        # Compact string columns (see topiary.io.compact_dataframe) already
+        # hold only strings; leave their dtype alone.
+        column = df.loc[:,c]
+        is_compact = _is_compact_string(column)
+
         # Do a pass trying to infer the datatype of c. (Important in case we
         # dropped empty rows)
-        df.loc[:,c] = df.loc[:,c].infer_objects()
-        casted = []
-        for v in df.loc[:,c]:
-            if pd.isna(v) or pd.isnull(v) or v is None or not v or v == "":
-                err = f"\nMissing value in required column '{c}'.\n\n"
-                raise ValueError(err)
+        if not is_compact:
+            column = column.infer_objects()
+
+        # Null and falsy ("", 0, False, ...) values are missing
+        missing = np.array(pd.isnull(column),dtype=bool)
+        if not np.any(missing):
+            if is_compact:
+                missing = np.array(column.str.len() == 0,dtype=bool)
+            else:
+                missing = np.logical_not(np.array(column,dtype=bool))
+        if np.any(missing):
+            err = f"\nMissing value in required column '{c}'.\n\n"
+            raise ValueError(err)
 
-            try:
-                casted.append(str(v))
-            except (TypeError,ValueError):
-                err = f"\nColumn '{c}' must have only strings.\n\n"
-                raise ValueError(err)
+        if is_compact:
+            continue
 
-        df.loc[:,c] = casted
+        try:
+            df[c] = column.astype(str)
+        except (TypeError,ValueError):
+            err = f"\nColumn '{c}' must have only strings.\n\n"
+            raise ValueError(err)
 
     # -------------------------------------------------------------------------
     # Process sequence column
 
     # stripping leading/trailing whitespace and removing any in the middle. This
     # is safe because operation above casted to string
-    for idx in df.index:
-        sequence = str(df.loc[idx,"sequence"]).strip()
-        df.loc[idx,"sequence"] = "".join(sequence.split())
+    df["sequence"] = df["sequence"].str.replace(r"\s+","",regex=True)
 
     # -------------------------------------------------------------------------
     # Process keep column
@@ -180,29 +240,23 @@ def check_topiary_dataframe(df):
 
     if uid is not None:
 
-        # Look for a-z and A-Z (only allowed characters in uid)
-        p = re.compile("[^a-z]",re.IGNORECASE)
-
-        final_uid = []
+        # Only a-z and A-Z allowed, length must be 10
+        uid = uid.astype(str)
+        bad_char = uid.str.contains("[^a-z]",flags=re.IGNORECASE,regex=True)
+        bad_mask = np.array(np.logical_or(bad_char,uid.str.len() != 10),dtype=bool)
 
-        # Go through uid...
-        for u in uid:
+        if np.any(bad_mask):
+            new_uid = _private.generate_uid(int(np.sum(bad_mask)))
+            if issubclass(type(new_uid),str):
+                new_uid = [new_uid]
 
-            # Force to be a spring
-            if not issubclass(type(u),str):
-                u = str(u)
+            for u, n in zip(uid[bad_mask],new_uid):
+                warn_uid += f"  + uid '{u}' is invalid. Replacing with '{n}'\n"
 
-            # Disallowed character(s) in uid or uid not right length
-            if p.search(u) or len(u) != 10:
-
-                new_uid = _private.generate_uid()
-                warn_uid += f"  + uid '{u}' is invalid. Replacing with '{new_uid}'\n"
-                final_uid.append(new_uid)
-
-            else:
-                final_uid.append(u)
+            uid = np.array(uid,dtype=object)
+            uid[bad_mask] = new_uid
 
-        df.loc[:,"uid"] = final_uid
+        df.loc[:,"uid"] = list(uid)
 
     # Make sure uid are unique
     uid, counts = np.unique(df.loc[:,"uid"],return_counts=True)
@@ -236,31 +290,30 @@ def check_topiary_dataframe(df):
 
     if ott is not None:
 
-        for index in df.index:
-
-            # Get ott id
-            o = df.loc[index,"ott"]
-
-            # Missing value is okay --> make sure it's a pandas NULL datatype
-            if pd.isna(o) or pd.isnull(o) or o is None or not o or o in ["","none","None"]:
-                df.loc[index,"ott"] = pd.NA
-                continue
-
-            # If there is an ott that is not a null, make sure it is sane and
-            # readable.
-            failed = False
-            if issubclass(type(o),str) and o[:3] == "ott":
-                try:
-                    int(o[3:])
-                except ValueError:
-                    failed = True
-            else:
-                failed = True
-
-            if failed:
-                err = "\n\nott column must have format 'ottINTEGER', where \n"
-                err += "INTEGER is a the integer OTT accession number.\n"
-                raise ValueError(err)
+        # Check categorical values as plain objects
+        if isinstance(ott.dtype,pd.CategoricalDtype):
+            ott = ott.astype(object)
+
+        # Missing values are okay --> make sure they are a pandas NULL datatype
+        ott_null = np.array(pd.isnull(ott),dtype=bool)
+        not_null = ott[np.logical_not(ott_null)]
+        falsy = np.logical_not(np.array(not_null,dtype=bool))
+        falsy = np.logical_or(falsy,not_null == "none")
+        falsy = np.logical_or(falsy,not_null == "None")
+        ott_null[np.logical_not(ott_null)] = falsy
+
+        if np.any(ott_null):
+            df.loc[ott_null,"ott"] = pd.NA
+
+        # If there is an ott that is not a null, make sure it is sane and
+        # readable (ottINTEGER)
+        to_check = ott[np.logical_not(ott_null)]
+        is_str = to_check.map(type) == str
+        good = to_check.where(is_str,"").astype(str).str.fullmatch(r"ott\s*[+-]?\d+\s*")
+        if not np.all(np.logical_and(is_str,good)):
+            err = "\n\nott column must have format 'ottINTEGER', where \n"
+            err += "INTEGER is a the integer OTT accession number.\n"
+            raise ValueError(err)
 
     # -------------------------------------------------------------------------
     # Check alignment column
@@ -280,42 +333,16 @@ def check_topiary_dataframe(df):
         # Make sure alignment column has at least one kept row
         if len(align_mask) > 0 and np.sum(align_mask) > 0:
 
-            # Create matrix holding alignment, rows are sequences, columns are columns
-            align_matrix = []
-            for row in df.alignment[align_mask]:
-                align_matrix.append(list(row))
-
-            # Make sure all alignment rows are the same length
-            unique_row_length = set([len(row) for row in align_matrix])
-            if len(unique_row_length) != 1:
-                err = "\nAll sequences in the 'alignment' column must have the\n"
-                err += "same length\n\n"
-                raise ValueError(err)
-
-            # Convert to a matrix
-            align_matrix = np.array(align_matrix)
-
-            # Create mask for good columns -- columns with more than just "-"
-            good_column_mask = []
-            for i in range(align_matrix.shape[1]):
-                u = np.unique(align_matrix[:,i])
-                if len(u) == 1 and u[0] == "-":
-                    good_column_mask.append(False)
-                else:
-                    good_column_mask.append(True)
-
-            good_column_mask = np.array(good_column_mask,dtype=bool)
+            # Create matrix holding alignment, rows are sequences, columns are
+            # columns. Raises ValueError if rows have different lengths.
+            align_matrix = AlignmentMatrix(df.alignment[align_mask])
 
             # Whack out columns that are only "-"
-            align_matrix = align_matrix[:,good_column_mask]
+            if np.any(align_matrix.gap_only_columns):
+                align_matrix = align_matrix.drop_gap_only_columns()
 
-            # Convert alignment matrix back to an array of strings
-            new_align = []
-            for i in range(align_matrix.shape[0]):
-                new_align.append("".join(align_matrix[i,:]))
-
-            # Store in dataframe
-            df.loc[align_mask,"alignment"] = new_align
+                # Store in dataframe
+                df.loc[align_mask,"alignment"] = align_matrix.to_strings()
 
     # -------------------------------------------------------------------------
     # Make sure columns have order nickname, keep, species, name, sequence
@@ -330,4 +357,9 @@ def check_topiary_dataframe(df):
         if c not in output_order:
             output_order.append(c)
 
-    return df.loc[:,output_order]
+    df = df.loc[:,output_order]
+
+    # Record that this dataframe has been validated
+    df.attrs[_FINGERPRINT_KEY] = _get_fingerprint(df)
+
+    return df
@@ -3,6 +3,10 @@ import topiary
 from topiary._private.interface import gen_seed
 from topiary._private.interface import rmtree
 from topiary._private import check
+from topiary.io.dataframe import _write_checkpoint
+from topiary.io.dataframe import _read_checkpoint
+from topiary.io.dataframe import _is_fresh_checkpoint
+from topiary.io.dataframe import _get_checkpoint_file
 
 import os
 import json
@@ -148,7 +152,7 @@ class Supervisor:
         # Read df_file if it exists
         df_file = os.path.join(self._calc_dir,"input","dataframe.csv")
         if os.path.isfile(df_file):
-            self._df = topiary.read_dataframe(df_file)
+            self._df = _read_checkpoint(df_file)
 
 
     def _increment(self,new_calc_dir):
@@ -279,7 +283,14 @@ class Supervisor:
             if os.path.isfile(prev_df):
                 input_df = os.path.join(input_dir,"dataframe.csv")
                 shutil.copy(prev_df,input_df)
-                self._df = topiary.read_dataframe(input_df)
+
+                # Bring along the binary checkpoint (copied after the csv so
+                # it stays newer) if it is up to date
+                if _is_fresh_checkpoint(prev_df):
+                    shutil.copy(_get_checkpoint_file(prev_df),
+                                _get_checkpoint_file(input_df))
+
+                self._df = _read_checkpoint(input_df)
 
             trees = ["gene-tree.newick","species-tree.newick","reconciled-tree.newick"]
             for t in trees:
@@ -295,8 +306,8 @@ class Supervisor:
 
         if df is not None:
             df = topiary.read_dataframe(df)
-            topiary.write_dataframe(df,os.path.join(input_dir,"dataframe.csv"),
-                                    overwrite=True)
+            _write_checkpoint(df,os.path.join(input_dir,"dataframe.csv"),
+                              overwrite=True)
             self._df = df
 
         tree_names = ["gene-tree","species-tree","reconciled-tree"]
@@ -346,9 +357,13 @@ class Supervisor:
         for n in glob.glob(os.path.join(self.input_dir,"*.newick")):
             self.stash(n)
 
-        # Finaly get input/dataframe.csv if one was passed in
+        # Finaly get input/dataframe.csv (and its checkpoint) if one was
+        # passed in
+        df_file = os.path.join(self.input_dir,"dataframe.csv")
         try:
-            self.stash(os.path.join(self.input_dir,"dataframe.csv"))
+            self.stash(df_file)
+            if _is_fresh_checkpoint(df_file):
+                self.stash(_get_checkpoint_file(df_file))
         except FileNotFoundError:
             pass
 
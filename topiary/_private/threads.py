@@ -8,6 +8,7 @@ import numpy as np
 
 import os
 import multiprocessing as mp
+from multiprocessing import shared_memory
 from tqdm.auto import tqdm
 
 class MockLock():
@@ -25,6 +26,103 @@ class MockLock():
         pass
 
 
+class SharedArray():
+    """
+    Numpy array stored in a multiprocessing.shared_memory block. When passed
+    to a worker process, the object is pickled by name, so the worker attaches
+    to the same memory rather than receiving a copy. Reads and writes of
+    individual elements go straight to memory without a manager process or
+    lock. Use as a context manager in the process that creates the array so
+    the shared block is released when the calculation finishes.
+
+    Parameters
+    ----------
+    array : numpy.ndarray
+        array to copy into shared memory
+    """
+
+    def __init__(self,array):
+
+        array = np.asarray(array)
+
+        # shared_memory does not allow zero-sized blocks
+        self._shm = shared_memory.SharedMemory(create=True,
+                                               size=max(array.nbytes,1))
+        self._owner = True
+
+        self.array = np.ndarray(array.shape,dtype=array.dtype,buffer=self._shm.buf)
+        self.array[...] = array[...]
+
+    @classmethod
+    def _attach(cls,name,shape,dtype):
+        """
+        Attach to an existing shared memory block. Used when unpickling in a
+        worker process.
+        """
+
+        obj = cls.__new__(cls)
+
+        # Do not register with the resource tracker; the owner is responsible
+        # for unlinking the block. (python < 3.13 does not have the track
+        # argument, but workers share the owner's resource tracker, so the
+        # duplicate registration is harmless.)
+        try:
+            obj._shm = shared_memory.SharedMemory(name=name,track=False)
+        except TypeError:
+            obj._shm = shared_memory.SharedMemory(name=name)
+
+        obj._owner = False
+        obj.array = np.ndarray(shape,dtype=dtype,buffer=obj._shm.buf)
+
+        return obj
+
+    def __reduce__(self):
+        return (SharedArray._attach,
+                (self._shm.name,self.array.shape,self.array.dtype.str))
+
+    def __getitem__(self,key):
+        return self.array[key]
+
+    def __setitem__(self,key,value):
+        self.array[key] = value
+
+    def __len__(self):
+        return len(self.array)
+
+    def __array__(self,dtype=None,copy=None):
+        return np.asarray(self.array,dtype=dtype)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self,*args):
+        self.close()
+
+    def __del__(self):
+
+        # Copies attached in worker processes are never explicitly closed;
+        # release them when they go out of scope.
+        if not self._owner:
+            try:
+                self.close()
+            except (BufferError,OSError):
+                pass
+
+    def close(self):
+        """
+        Release the shared memory. If this object created the block, remove
+        it from the system.
+        """
+
+        # Drop numpy view so the buffer can be released
+        self.array = None
+
+        self._shm.close()
+        if self._owner:
+            self._shm.unlink()
+            self._owner = False
+
+
 def get_num_threads(num_threads,manual_num_cores=None):
     """
     Get the number of cores availble for a multithreaded calculation.
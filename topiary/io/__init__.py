@@ -4,6 +4,7 @@ Input/output functions for topiary.
 
 from .dataframe import read_dataframe
 from .dataframe import write_dataframe
+from .dataframe import compact_dataframe
 from .alignments import write_fasta
 from .alignments import write_phy
 from .alignments import read_fasta_into
@@ -4,6 +4,8 @@ Functions for reading and writing dataframes.
 
 import topiary
 from topiary._private import check
+from topiary._private.check.topiary_dataframe import _get_fingerprint
+from topiary._private.check.topiary_dataframe import _FINGERPRINT_KEY
 
 import pandas as pd
 import numpy as np
@@ -11,11 +13,23 @@ import numpy as np
 import os
 import csv
 
-def read_dataframe(input,remove_extra_index=True):
+# Columns stored as categoricals by compact_dataframe (few unique values)
+_CATEGORICAL_COLUMNS = ["nickname","species","orig_species","recip_paralog","ott"]
+
+# Columns stored as bool by compact_dataframe. (Flags used by
+# topiary.quality.remove_redundancy, plus keep flags.)
+_FLAG_COLUMNS = ["keep","always_keep","key_species",
+                 "low_quality","partial","predicted","precursor",
+                 "hypothetical","isoform","structure","recip_found_paralog"]
+
+# Columns stored as arrow-backed strings by compact_dataframe
+_ARROW_STRING_COLUMNS = ["name","sequence","alignment"]
+
+def read_dataframe(input,remove_extra_index=True,compact=False):
     """
-    Read a topiary spreadsheet. Handles .csv, .tsv, .xlsx/.xls. If extension is
-    not one of these, attempts to parse text as a spreadsheet using
-    `pandas.read_csv(sep=None)`.
+    Read a topiary spreadsheet. Handles .csv, .tsv, .xlsx/.xls, and the binary
+    columnar formats .parquet and .feather. If extension is not one of these,
+    attempts to parse text as a spreadsheet using `pandas.read_csv(sep=None)`.
 
     Parameters
     ----------
@@ -24,6 +38,8 @@ def read_dataframe(input,remove_extra_index=True):
     remove_extra_index : bool, default=True
         look for the 'Unnamed: 0' column that pandas writes out for
         pandas.to_csv(index=True) and, if found, drop column.
+    compact : bool, default=False
+        return a memory-compact dataframe. See topiary.io.compact_dataframe.
 
     Returns
     -------
@@ -44,6 +60,8 @@ def read_dataframe(input,remove_extra_index=True):
             df = pd.read_csv(filename,sep=",")
         elif ext == "tsv":
             df = pd.read_csv(filename,sep="\t")
+        elif ext in ["parquet","feather"]:
+            df = _read_arrow(filename,ext)
         else:
             # Fall back -- try to guess delimiter
             df = pd.read_csv(filename,sep=None,engine="python")
@@ -71,13 +89,58 @@ def read_dataframe(input,remove_extra_index=True):
     # Validate the dataframe
     df = check.check_topiary_dataframe(df)
 
+    if compact:
+        df = compact_dataframe(df)
+
+    return df
+
+def compact_dataframe(df):
+    """
+    Get a memory-compact copy of a topiary dataframe. String columns with few
+    unique values (species, recip_paralog, ott, nickname, ...) are stored as
+    categoricals, flag columns without missing values are stored as bool, and
+    name, sequence, and alignment are stored as arrow-backed strings. The
+    values are unchanged, and topiary functions take compact dataframes
+    directly.
+
+    Parameters
+    ----------
+    df : pandas.DataFrame
+        topiary dataframe
+
+    Returns
+    -------
+    df : pandas.DataFrame
+        validated, compact copy of the dataframe
+    """
+
+    df = check.check_topiary_dataframe(df)
+
+    for c in _CATEGORICAL_COLUMNS:
+        if c in df.columns and not isinstance(df[c].dtype,pd.CategoricalDtype):
+            df[c] = df[c].astype("category")
+
+    for c in _FLAG_COLUMNS:
+        if c in df.columns and df[c].dtype != bool:
+            if not np.any(pd.isnull(df[c])):
+                df[c] = df[c].astype(bool)
+
+    for c in _ARROW_STRING_COLUMNS:
+        if c in df.columns and not isinstance(df[c].dtype,pd.StringDtype):
+            df[c] = df[c].astype(pd.StringDtype("pyarrow"))
+
+    # Values unchanged, so this is still a validated dataframe
+    df.attrs[_FINGERPRINT_KEY] = _get_fingerprint(df)
+
     return df
 
-def write_dataframe(df,out_file,overwrite=False):
+def write_dataframe(df,out_file,overwrite=False,stringify_mixed=False):
     """
     Write a dataframe to an output file. The type of file written depends on the
     extension of out_file. If .csv, write comma-separated. If .tsv, write tab-
-    separated. If .xlsx, write excel. Otherwise, write as a .csv file.
+    separated. If .xlsx, write excel. If .parquet or .feather, write a binary
+    columnar file (requires pyarrow). These are much faster to read and write
+    than text and keep column dtypes. Otherwise, write as a .csv file.
 
     Parameters
     ----------
@@ -87,6 +150,10 @@ def write_dataframe(df,out_file,overwrite=False):
         output file name
     overwrite : bool, default=False
         whether or not to overwrite an existing file
+    stringify_mixed : bool, default=False
+        parquet and feather columns must have a single type. If a column mixes
+        strings with other values, raise an error (default) or, if True, write
+        every value in that column as a string. Ignored for other formats.
 
     Returns
     -------
@@ -102,7 +169,7 @@ def write_dataframe(df,out_file,overwrite=False):
         raise ValueError(err)
 
     ext = out_file.split(".")[-1]
-    if ext not in ["csv","tsv","xlsx"]:
+    if ext not in ["csv","tsv","xlsx","parquet","feather"]:
         print("\n\nOutput file extension not recognized. Will write as csv.\n\n")
         ext = "csv"
 
@@ -118,5 +185,210 @@ def write_dataframe(df,out_file,overwrite=False):
         df.to_csv(out_file,sep=",",index=False,quoting=csv.QUOTE_NONNUMERIC)
     elif ext == "tsv":
         df.to_csv(out_file,sep="\t",index=False,quoting=csv.QUOTE_NONNUMERIC)
+    elif ext in ["parquet","feather"]:
+        _write_arrow(df,out_file,ext,stringify_mixed=stringify_mixed)
     else:
         df.to_excel(out_file,index=False)
+
+def _to_arrow_compatible(df,stringify_mixed=False):
+    """
+    Get a copy of a dataframe that can be written to parquet/feather. Arrow
+    columns must have a single type. Object columns that mix ints and floats
+    become numeric. Object columns that mix strings with other values raise
+    an error unless stringify_mixed is True, in which case they are written as
+    strings. Missing values become None.
+
+    Parameters
+    ----------
+    df : pandas.DataFrame
+        dataframe to convert
+    stringify_mixed : bool, default=False
+        whether to convert columns with mixed types to strings rather than
+        raising an error
+
+    Returns
+    -------
+    df : pandas.DataFrame
+        copy of df with a fresh index and single-type columns
+    """
+
+    df = df.reset_index(drop=True)
+
+    mixed_columns = []
+
+    for c in df.columns:
+
+        if df[c].dtype != object:
+            continue
+
+        column = df[c]
+        not_null = np.logical_not(pd.isnull(column))
+        types = set(column[not_null].map(type))
+
+        column = column.astype(object).where(not_null,None)
+        if len(types) > 1:
+            if types.issubset({int,float,np.int64,np.float64}):
+                column = pd.to_numeric(column)
+            else:
+                mixed_columns.append(c)
+                column[not_null] = column[not_null].astype(str)
+
+        df[c] = column
+
+    if len(mixed_columns) > 0 and not stringify_mixed:
+        err = "\nparquet and feather files cannot hold columns with mixed types.\n"
+        err += "The following columns mix strings with other values:\n\n"
+        for c in mixed_columns:
+            err += f"    {c}\n"
+        err += "\nWrite to a csv file, make each column a single type, or set\n"
+        err += "stringify_mixed=True to write every value in these columns as a\n"
+        err += "string.\n\n"
+        raise ValueError(err)
+
+    return df
+
+def _write_arrow(df,out_file,ext,stringify_mixed=False):
+    """
+    Write a validated topiary dataframe as a parquet or feather file. The
+    fingerprint from check_topiary_dataframe is stored in the file metadata so
+    the dataframe does not have to be re-validated when it is read back in.
+
+    Parameters
+    ----------
+    df : pandas.DataFrame
+        validated topiary dataframe
+    out_file : str
+        output file
+    ext : str
+        "parquet" or "feather"
+    stringify_mixed : bool, default=False
+        whether to write columns with mixed types as strings rather than
+        raising an error
+    """
+
+    import pyarrow as pa
+
+    df = _to_arrow_compatible(df,stringify_mixed=stringify_mixed)
+    table = pa.Table.from_pandas(df,preserve_index=False)
+
+    fingerprint = _get_fingerprint(df)
+    if fingerprint is not None:
+        metadata = dict(table.schema.metadata or {})
+        metadata[_FINGERPRINT_KEY.encode()] = fingerprint.encode()
+        table = table.replace_schema_metadata(metadata)
+
+    if ext == "parquet":
+        import pyarrow.parquet as pq
+        pq.write_table(table,out_file)
+    else:
+        import pyarrow.feather as feather
+        feather.write_feather(table,out_file)
+
+def _read_arrow(filename,ext):
+    """
+    Read a parquet or feather file written by _write_arrow, loading the stored
+    fingerprint into df.attrs.
+
+    Parameters
+    ----------
+    filename : str
+        file to read
+    ext : str
+        "parquet" or "feather"
+
+    Returns
+    -------
+    df : pandas.DataFrame
+        dataframe (not yet validated)
+    """
+
+    if ext == "parquet":
+        import pyarrow.parquet as pq
+        table = pq.read_table(filename)
+    else:
+        import pyarrow.feather as feather
+        table = feather.read_table(filename)
+
+    df = table.to_pandas()
+
+    # check_topiary_dataframe only trusts this if it still matches the contents
+    fingerprint = (table.schema.metadata or {}).get(_FINGERPRINT_KEY.encode(),None)
+    if fingerprint is not None:
+        df.attrs[_FINGERPRINT_KEY] = fingerprint.decode()
+
+    return df
+
+def _get_checkpoint_file(csv_file):
+    """
+    Get the name of the binary checkpoint file that goes with a csv file.
+    """
+
+    return f"{os.path.splitext(csv_file)[0]}.parquet"
+
+def _write_checkpoint(df,csv_file,overwrite=False):
+    """
+    Write a dataframe as a csv file (for humans) and a parquet checkpoint file
+    next to it (for fast, dtype-stable re-reading with _read_checkpoint). If
+    the parquet file cannot be written (e.g. pyarrow is not installed, or a
+    column mixes strings with other values), only the csv file is written.
+
+    Parameters
+    ----------
+    df : pandas.DataFrame
+        topiary dataframe
+    csv_file : str
+        csv file to write. checkpoint has the same name with .parquet.
+    overwrite : bool, default=False
+        whether or not to overwrite existing files
+    """
+
+    write_dataframe(df,csv_file,overwrite=overwrite)
+
+    # Written after the csv, so an up-to-date checkpoint is never older than
+    # its csv file
+    checkpoint_file = _get_checkpoint_file(csv_file)
+    try:
+        write_dataframe(df,checkpoint_file,overwrite=True)
+    except (ImportError,ValueError):
+        if os.path.exists(checkpoint_file):
+            os.remove(checkpoint_file)
+
+def _read_checkpoint(csv_file):
+    """
+    Read a dataframe written by _write_checkpoint. Reads the parquet checkpoint
+    if it exists and is at least as new as the csv file; otherwise, reads the
+    csv file (so edits to the csv file are respected).
+
+    Parameters
+    ----------
+    csv_file : str
+        csv file written by _write_checkpoint
+
+    Returns
+    -------
+    pandas.DataFrame
+        validated topiary dataframe
+    """
+
+    checkpoint_file = _get_checkpoint_file(csv_file)
+    if _is_fresh_checkpoint(csv_file):
+        try:
+            return read_dataframe(checkpoint_file)
+        except ImportError:
+            pass
+
+    return read_dataframe(csv_file)
+
+def _is_fresh_checkpoint(csv_file):
+    """
+    Whether csv_file has a parquet checkpoint at least as new as it.
+    """
+
+    checkpoint_file = _get_checkpoint_file(csv_file)
+    if not os.path.isfile(checkpoint_file):
+        return False
+
+    if not os.path.isfile(csv_file):
+        return True
+
+    return os.path.getmtime(checkpoint_file) >= os.path.getmtime(csv_file)
@@ -7,6 +7,7 @@ Entrez.email = "topiary.phylogenetics@gmail.com"
 
 from ._parse_ncbi_line import parse_ncbi_line
 from .blast import local_blast, ncbi_blast, recip_blast, make_blast_db
-from .blast import records_to_df, read_blast_xml
+from .blast import warm_recip_blast_cache
+from .blast import records_to_df, read_blast_xml, iter_blast_xml
 from .blast import merge_blast_df, merge_and_annotate
 from .entrez import get_sequences, get_taxid, get_proteome
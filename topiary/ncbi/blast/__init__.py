@@ -6,7 +6,7 @@ from .util import _standard_blast_args_checker
 
 from .ncbi import ncbi_blast
 from .local import local_blast
-from .recip import recip_blast
+from .recip import recip_blast, warm_recip_blast_cache
 from .merge import merge_blast_df, merge_and_annotate
 from .make import make_blast_db
-from .read import records_to_df, read_blast_xml, check_for_cpu_limit
+from .read import records_to_df, read_blast_xml, iter_blast_xml, check_for_cpu_limit
@@ -0,0 +1,216 @@
+"""
+On-disk cache of parsed blast hits, keyed by query sequence, database, and
+blast arguments.
+"""
+
+from topiary._private import check
+from topiary._private import environment
+from topiary._private.cache import DiskCache, get_digest
+
+import numpy as np
+import pandas as pd
+
+import glob
+import json
+import os
+import time
+import zlib
+
+# Keyword arguments to the blast functions that change how blast is run but
+# not which hits come back. These are left out of cache keys.
+_NON_HIT_KWARGS = ["scratch_dir","use_pipes","use_async","block_size",
+                   "manual_num_cores","max_query_length","num_tries_allowed",
+                   "verbose"]
+
+def _get_db_fingerprint(local_blast_db=None,ncbi_blast_db=None,ncbi_max_age=None):
+    """
+    Get a fingerprint for a blast database. A local database is identified by
+    the names, sizes, and modification times of its files, so rebuilding the
+    database changes the fingerprint. A remote NCBI database can only be
+    identified by its name, so its fingerprint also holds the current
+    ncbi_max_age-day period. Cached remote hits therefore expire after at most
+    ncbi_max_age days.
+
+    Parameters
+    ----------
+    local_blast_db : str, optional
+        local blast database (path prefix passed to blast via -db)
+    ncbi_blast_db : str, optional
+        ncbi blast database (i.e. "nr")
+    ncbi_max_age : int, optional
+        maximum age (in days) of cached hits from an NCBI database. If None,
+        use the TOPIARY_BLAST_CACHE_NCBI_MAX_DAYS environment variable
+        (default 30).
+
+    Returns
+    -------
+    fingerprint : str
+        fingerprint for the database
+    """
+
+    if ncbi_blast_db is not None:
+
+        if ncbi_max_age is None:
+            ncbi_max_age = environment.load_env_variable("TOPIARY_BLAST_CACHE_NCBI_MAX_DAYS",
+                                                         check_function=check.check_int,
+                                                         check_function_kwargs={"minimum_allowed":1})
+        if ncbi_max_age is None:
+            ncbi_max_age = 30
+
+        ncbi_max_age = check.check_int(ncbi_max_age,
+                                       "ncbi_max_age",
+                                       minimum_allowed=1)
+
+        period = int(time.time()//86400)//ncbi_max_age
+
+        return f"ncbi:{ncbi_blast_db}:{ncbi_max_age}:{period}"
+
+    files = glob.glob(f"{local_blast_db}.*")
+    files.sort()
+
+    to_digest = [os.path.basename(str(local_blast_db))]
+    for f in files:
+        stat = os.stat(f)
+        to_digest.append(f"{os.path.basename(f)}:{stat.st_size}:{stat.st_mtime_ns}")
+
+    return f"local:{get_digest('|'.join(to_digest))}"
+
+def _get_hit_kwargs(kwargs):
+    """
+    Drop keyword arguments that do not change which hits blast returns (see
+    _NON_HIT_KWARGS) so they do not change cache keys.
+
+    Parameters
+    ----------
+    kwargs : dict
+        extra keyword arguments passed to the blast functions
+
+    Returns
+    -------
+    hit_kwargs : dict
+        kwargs without _NON_HIT_KWARGS
+    """
+
+    return {k:kwargs[k] for k in kwargs if k not in _NON_HIT_KWARGS}
+
+def _get_blast_key(sequence,db_fingerprint,blast_args):
+    """
+    Get the cache key for blasting a sequence.
+
+    Parameters
+    ----------
+    sequence : str
+        query sequence
+    db_fingerprint : str
+        fingerprint of the blast database (from _get_db_fingerprint)
+    blast_args : dict
+        blast program and all arguments that change which hits are returned
+
+    Returns
+    -------
+    key : str
+        cache key
+    """
+
+    args = json.dumps(blast_args,sort_keys=True,default=str)
+
+    return get_digest(f"{get_digest(sequence)}|{db_fingerprint}|{args}")
+
+def _hits_to_bytes(hits):
+    """
+    Serialize a dataframe of blast hits into compressed bytes.
+
+    Parameters
+    ----------
+    hits : pandas.DataFrame
+        dataframe of blast hits (or empty dataframe if there were no hits)
+
+    Returns
+    -------
+    value : bytes
+        compressed json holding column names, dtypes, and values
+    """
+
+    out = {"columns":[],"dtypes":[],"data":[]}
+    for c in hits.columns:
+        values = [None if pd.isnull(v) else v for v in hits[c].tolist()]
+        out["columns"].append(str(c))
+        out["dtypes"].append(str(hits[c].dtype))
+        out["data"].append(values)
+
+    # numpy scalars (i.e. from Int64 columns) are written as python scalars
+    def _default(value):
+        if isinstance(value,np.generic):
+            return value.item()
+        raise TypeError(f"{type(value)} cannot be written to the blast cache")
+
+    out = json.dumps(out,separators=(",",":"),default=_default)
+
+    return zlib.compress(out.encode())
+
+def _bytes_to_hits(value):
+    """
+    Read a dataframe of blast hits serialized by _hits_to_bytes.
+
+    Parameters
+    ----------
+    value : bytes
+        compressed json from _hits_to_bytes
+
+    Returns
+    -------
+    hits : pandas.DataFrame
+        dataframe of blast hits
+    """
+
+    out = json.loads(zlib.decompress(value).decode())
+
+    data = {}
+    for c, dtype, values in zip(out["columns"],out["dtypes"],out["data"]):
+        if dtype == "object":
+            values = np.array(values,dtype=object)
+            values[[v is None for v in values]] = pd.NA
+            data[c] = values
+        else:
+            data[c] = pd.Series(values,dtype=dtype)
+
+    return pd.DataFrame(data,columns=out["columns"])
+
+def _get_blast_cache(blast_cache=None):
+    """
+    Open the on-disk cache of blast hits.
+
+    Parameters
+    ----------
+    blast_cache : str, optional
+        directory holding the cache. If None, use the directory in the
+        TOPIARY_BLAST_CACHE environment variable. If that is not defined, do
+        not use a cache. The maximum cache size (in MB) can be set with the
+        TOPIARY_BLAST_CACHE_MAX_MB environment variable (default 1000).
+
+    Returns
+    -------
+    blast_cache : topiary._private.cache.DiskCache or None
+        cache, or None if not using a cache
+    """
+
+    if blast_cache is None:
+        blast_cache = environment.load_env_variable("TOPIARY_BLAST_CACHE")
+
+    if blast_cache is None:
+        return None
+
+    if type(blast_cache) is not str:
+        err = f"\nblast_cache '{blast_cache}' should be a string pointing\n"
+        err += "to a directory.\n\n"
+        raise ValueError(err)
+
+    max_size = environment.load_env_variable("TOPIARY_BLAST_CACHE_MAX_MB",
+                                             check_function=check.check_int,
+                                             check_function_kwargs={"minimum_allowed":1})
+    if max_size is None:
+        max_size = 1000
+
+    cache_file = os.path.join(blast_cache,"blast-cache.sqlite")
+
+    return DiskCache(cache_file,max_size=max_size*1000000)
@@ -6,14 +6,81 @@ import topiary
 from topiary._private import check
 from topiary._private import threads
 from .util import _standard_blast_args_checker
-from .read import read_blast_xml
+from .read import _xml_file_to_df
+from .read import _tabular_file_to_df, _TABULAR_OUTFMT
 
 import Bio.Blast.Applications as apps
 
 import numpy as np
 import pandas as pd
 
-import os, string, random, subprocess, copy
+import os, string, random, subprocess, copy, glob, io
+
+# Databases at least this large (bytes) are searched with at least
+# _LARGE_BLAST_DB_THREADS blast threads per process rather than by many
+# single-threaded processes
+_LARGE_BLAST_DB = 1024**3
+_LARGE_BLAST_DB_THREADS = 4
+
+def _get_db_size(db):
+    """
+    Get the total size (in bytes) of the files making up a local blast
+    database.
+
+    Parameters
+    ----------
+    db : str
+        name of local blast database
+
+    Returns
+    -------
+    db_size : int
+        size of database files
+    """
+
+    db_files = glob.glob(f"{glob.escape(db)}.*")
+
+    return sum([os.path.getsize(f) for f in db_files if os.path.isfile(f)])
+
+def _get_process_layout(num_blocks,num_threads,db_size):
+    """
+    Decide how to split num_threads between separate blast processes and
+    blast's own threads (-num_threads).
+
+    Independent processes scale best when there are many query blocks and the
+    database is small. For a single block, or a large database, fewer
+    processes running more blast threads do better: blast memory-maps the
+    database, so threads in one process share one copy of the database and
+    its lookup tables, and the pages it reads, rather than every process
+    walking the whole database separately.
+
+    Parameters
+    ----------
+    num_blocks : int
+        number of query blocks to blast
+    num_threads : int
+        total number of threads available
+    db_size : int
+        size of the database in bytes (see _get_db_size)
+
+    Returns
+    -------
+    num_processes : int
+        number of blast processes to run at once
+    threads_per_process : int
+        value of blast -num_threads for each process
+    """
+
+    min_threads_per_process = 1
+    if db_size >= _LARGE_BLAST_DB:
+        min_threads_per_process = min(num_threads,_LARGE_BLAST_DB_THREADS)
+
+    num_processes = min(num_blocks,num_threads//min_threads_per_process)
+    num_processes = max(1,num_processes)
+
+    threads_per_process = max(1,num_threads//num_processes)
+
+    return num_processes, threads_per_process
 
 def _prepare_for_blast(sequence,
                        db,
@@ -22,6 +89,7 @@ def _prepare_for_blast(sequence,
                        e_value_cutoff,
                        gapcosts,
                        kwargs,
+                       output_format="xml",
                        test_skip_blast_program_check=False):
     """
     Take inputs to local_blast, check arguments, and do initial processing.
@@ -40,6 +108,7 @@ def _prepare_for_blast(sequence,
         kwargs: extra keyword arguments are passed directly to
                 apps.NcbiblastXXXCommandline, overriding anything constructed
                 above.
+        output_format: blast output format ("xml" or "tabular")
         test_skip_blast_program_check: skip the check for a working blast
                                        program (for testing)
 
@@ -92,10 +161,20 @@ def _prepare_for_blast(sequence,
 
     gaps = '{} {}'.format(*gapcosts)
 
+    # xml (5) or tabular with the columns read by _tabular_file_to_df
+    outfmts = {"xml":5,
+               "tabular":f'"{_TABULAR_OUTFMT}"'}
+    try:
+        outfmt = outfmts[output_format]
+    except (KeyError,TypeError):
+        err = f"\noutput_format '{output_format}' not recognized. Should be\n"
+        err += "'xml' or 'tabular'.\n\n"
+        raise ValueError(err)
+
     # Construct keyword arguments to pass to function
     blast_kwargs = {"cmd":blast_program,
                     "db":db,
-                    "outfmt":5,
+                    "outfmt":outfmt,
                     "max_target_seqs":hitlist_size,
                     "threshold":e_value_cutoff,
                     "gapopen":gapcosts[0],
@@ -112,7 +191,11 @@ def _construct_args(sequence_list,
                     keep_blast_xml=False,
                     block_size=20,
                     num_threads=-1,
-                    manual_num_cores=None):
+                    manual_num_cores=None,
+                    output_format="xml",
+                    db_size=0,
+                    scratch_dir=None,
+                    use_pipes=False):
     """
     Construct a list of arguments to pass to each thread in the pool.
 
@@ -124,10 +207,18 @@ def _construct_args(sequence_list,
         keep_blast_xml: whether or not to keep temporary files
         num_threads: number of threads to use. if -1, use all available.
         block_size: break into block_size sequence chunks
+        output_format: blast output format ("xml" or "tabular")
+        db_size: size of blast database in bytes. used to decide how to split
+                 threads between processes and blast -num_threads.
+        scratch_dir: directory for temporary query/output files. if None,
+                     use the current working directory.
+        use_pipes: pass queries and output to blast through stdin/stdout
+                   rather than temporary files.
 
     Return
     ------
-        list of args to pass for each calculation, number of threads
+        list of args to pass for each calculation, number of processes to run
+        at once
     """
 
     # Validate inputs that have not yet been validated.
@@ -138,18 +229,17 @@ def _construct_args(sequence_list,
     num_threads = threads.get_num_threads(num_threads,manual_num_cores)
 
     keep_blast_xml = check.check_bool(keep_blast_xml,"keep_blast_xml")
+    use_pipes = check.check_bool(use_pipes,"use_pipes")
 
-    # Determine number of threads useful for this problem. It's not worth
-    # chopping up a super small set of comparisons
-    max_useful_threads = len(sequence_list)//block_size
-    if max_useful_threads < 1:
-        max_useful_threads = 1
-    if max_useful_threads > num_threads:
-        max_useful_threads = num_threads
+    if use_pipes and keep_blast_xml:
+        err = "\nkeep_blast_xml cannot be used with use_pipes (no blast output\n"
+        err += "files are written).\n\n"
+        raise ValueError(err)
 
-    # Set number of threads
-    if num_threads > max_useful_threads:
-        num_threads = max_useful_threads
+    if scratch_dir is not None:
+        if not issubclass(type(scratch_dir),str) or not os.path.isdir(scratch_dir):
+            err = f"\nscratch_dir '{scratch_dir}' should be an existing directory\n\n"
+            raise ValueError(err)
 
     # Break sequences up into blocks
     num_sequences = len(sequence_list)
@@ -176,6 +266,15 @@ def _construct_args(sequence_list,
     windows.insert(0,0)
     windows = np.cumsum(windows)
 
+    # Split threads between blast processes and blast's own threads. It's not
+    # worth chopping up a super small set of comparisons
+    num_blocks = len(windows) - 1
+    num_threads, threads_per_process = _get_process_layout(num_blocks,
+                                                           num_threads,
+                                                           db_size)
+    blast_kwargs = copy.deepcopy(blast_kwargs)
+    blast_kwargs["num_threads"] = threads_per_process
+
     # Blocks will allow us to tile over whole sequence
     kwargs_list = []
     for i in range(len(windows)-1):
@@ -186,7 +285,10 @@ def _construct_args(sequence_list,
                             "index":i_block,
                             "blast_function":blast_function,
                             "blast_kwargs":blast_kwargs,
-                            "keep_blast_xml":keep_blast_xml})
+                            "keep_blast_xml":keep_blast_xml,
+                            "output_format":output_format,
+                            "scratch_dir":scratch_dir,
+                            "use_pipes":use_pipes})
 
 
     return kwargs_list, num_threads
@@ -196,7 +298,10 @@ def _local_blast_thread_function(sequence_list,
                                  index,
                                  blast_function,
                                  blast_kwargs,
-                                 keep_blast_xml):
+                                 keep_blast_xml,
+                                 output_format="xml",
+                                 scratch_dir=None,
+                                 use_pipes=False):
     """
     Run local blast on a list of sequences.
 
@@ -212,6 +317,15 @@ def _local_blast_thread_function(sequence_list,
         kwargs to pass to blast function
     keep_blast_xml : bool
         whether or not to keep temporary files
+    output_format : str, default="xml"
+        blast output format ("xml" or "tabular"). Must match the outfmt in
+        blast_kwargs.
+    scratch_dir : str, optional
+        directory for temporary files. If None, use the current working
+        directory.
+    use_pipes : bool, default=False
+        send queries to blast over stdin and read output from stdout rather
+        than using temporary files
 
     Returns
     -------
@@ -219,36 +333,66 @@ def _local_blast_thread_function(sequence_list,
         dataframe containing blast hits
     """
 
-    # make a 10-character random string for temporary files
-    tmp_file_root = "".join([random.choice(string.ascii_letters) for i in range(10)])
-    input_file = "topiary-tmp_{}_blast-in.fasta".format(tmp_file_root)
-    out_file = "topiary-tmp_{}_blast-out.xml".format(tmp_file_root)
-
-    f = open(input_file,'w')
-    for i in range(index[0],index[1]):
-        f.write("".join(f">count{i}\n{sequence_list[i]}\n"))
-    f.close()
+    queries = [f"count{i}" for i in range(index[0],index[1])]
+    fasta = "".join([f">{q}\n{sequence_list[i]}\n"
+                     for q, i in zip(queries,range(index[0],index[1]))])
 
     blast_kwargs = copy.deepcopy(blast_kwargs)
-    blast_kwargs["query"] = input_file
-    blast_kwargs["out"] = out_file
 
-    blast_function(**blast_kwargs)()
+    if use_pipes:
 
-    # Parse output
-    try:
-        out_dfs, xml_files = read_blast_xml(out_file)
-    except FileNotFoundError:
-        err = "\nLocal blast failed on sequence:\n"
-        err += f"    '{sequence_list[i]}'\n\n"
-        raise RuntimeError(err)
-
-    # If parsing successful, nuke temporary file
-    if not keep_blast_xml:
+        stdout, stderr = blast_function(**blast_kwargs)(stdin=fasta)
+        if stdout.strip() == "" and output_format != "tabular":
+            err = "\nLocal blast failed on sequences:\n"
+            err += "".join([f"    '{sequence_list[i]}'\n" for i in range(index[0],index[1])])
+            err += "\n"
+            raise RuntimeError(err)
+
+        blast_output = io.StringIO(stdout)
+
+    else:
+
+        # make a 10-character random string for temporary files
+        tmp_file_root = "".join([random.choice(string.ascii_letters) for i in range(10)])
+        input_file = "topiary-tmp_{}_blast-in.fasta".format(tmp_file_root)
+        if output_format == "tabular":
+            out_file = "topiary-tmp_{}_blast-out.tsv".format(tmp_file_root)
+        else:
+            out_file = "topiary-tmp_{}_blast-out.xml".format(tmp_file_root)
+
+        if scratch_dir is not None:
+            input_file = os.path.join(scratch_dir,input_file)
+            out_file = os.path.join(scratch_dir,out_file)
+
+        with open(input_file,'w') as f:
+            f.write(fasta)
+
+        blast_kwargs["query"] = input_file
+        blast_kwargs["out"] = out_file
+
+        blast_function(**blast_kwargs)()
+
+        if not os.path.isfile(out_file):
+            err = "\nLocal blast failed on sequences:\n"
+            err += "".join([f"    '{sequence_list[i]}'\n" for i in range(index[0],index[1])])
+            err += "\n"
+            raise RuntimeError(err)
+
+        blast_output = out_file
+
+    # Parse output. Queries without hits are not written to tabular output;
+    # pass in the query names so they get empty rows like in xml output.
+    if output_format == "tabular":
+        out_df = _tabular_file_to_df(blast_output,queries=queries)
+    else:
+        out_df = _xml_file_to_df(blast_output)
+
+    # If parsing successful, nuke temporary files
+    if not use_pipes and not keep_blast_xml:
         os.remove(input_file)
         os.remove(out_file)
 
-    return out_dfs[0]
+    return out_df
 
 
 
@@ -306,6 +450,9 @@ def local_blast(sequence,
                 keep_blast_xml=False,
                 num_threads=-1,
                 block_size=20,
+                output_format="xml",
+                scratch_dir=None,
+                use_pipes=False,
                 **kwargs):
     """
     Perform a blast query against a local blast database. Takes a sequence or
@@ -327,11 +474,27 @@ def local_blast(sequence,
     gapcosts : tuple, default=(11,1)
         BLAST gapcosts (length 2 tuple of ints)
     keep_blast_xml : bool, default=False
-        whether or not to keep temporary blast xml files
+        whether or not to keep temporary blast output files
     num_threads : int, default=-1
-        number of threads to use. if -1, use all available.
+        number of threads to use. if -1, use all available. These are split
+        between separate blast processes and blast's own threads
+        (-num_threads) based on the number of query blocks and the size of
+        the database.
     block_size : int, default=20
         run blast in blocks of block_size sequences
+    output_format : str, default="xml"
+        have blast write "xml" or "tabular" output. Tabular output is much
+        smaller and faster to read, giving the same hits in the same
+        dataframe columns. (Tabular e-values and bit scores have fewer
+        significant digits, and hit_def comes from the subject title rather
+        than the xml hit definition.)
+    scratch_dir : str, optional
+        directory for temporary query and blast output files (for example, a
+        fast local disk or /dev/shm). If None, use the current working
+        directory.
+    use_pipes : bool, default=False
+        send queries to blast over stdin and read its output from stdout, so
+        no temporary files are written. Incompatible with keep_blast_xml.
     **kwargs : dict, optional
         extra keyword arguments are passed directly to
         apps.NcbiblastXXXCommandline.
@@ -351,7 +514,8 @@ def local_blast(sequence,
                               hitlist_size=hitlist_size,
                               e_value_cutoff=e_value_cutoff,
                               gapcosts=gapcosts,
-                              kwargs=kwargs)
+                              kwargs=kwargs,
+                              output_format=output_format)
 
     sequence_list = prep[0]
     blast_function = prep[1]
@@ -364,7 +528,11 @@ def local_blast(sequence,
                                                blast_kwargs=blast_kwargs,
                                                keep_blast_xml=keep_blast_xml,
                                                block_size=block_size,
-                                               num_threads=num_threads)
+                                               num_threads=num_threads,
+                                               output_format=output_format,
+                                               db_size=_get_db_size(db),
+                                               scratch_dir=scratch_dir,
+                                               use_pipes=use_pipes)
 
     # Run multi-threaded local blast
     hits = threads.thread_manager(kwargs_list,
@@ -10,47 +10,6 @@ from topiary.ncbi import parse_ncbi_line
 import numpy as np
 import pandas as pd
 
-def _check_merge(merge_this,merge_into,merge_list):
-    """
-    Merge the row given by index into the row given by merge_index. If the row
-    given by merge_index is itself already merging, merge the index row into
-    the existing merge row.
-
-    Parameters
-    ----------
-        index: index of the row we are going to merge
-        merge_index: index of the row we are going to merge INTO
-        to_merge: list of sequences to merge. if to_merge[merge_index] is
-                  already defined, set merge_index -> to_merge[merge_index]
-                  and then do to_merge[index] = merge_index
-
-    Return
-    ------
-        updated to_merge list
-    """
-
-    # If merge_list[merge_into] is not defined, set it to merge_into. If it is
-    # defined, set merge_into to merge_list[merge_into]
-    if merge_list[merge_into] is None:
-        merge_list[merge_into] = merge_into
-    else:
-        merge_into = merge_list[merge_into]
-
-    # If the sequence we're merging has not been merged, just record.
-    if merge_list[merge_this] is None:
-        merge_list[merge_this] = merge_into
-    else:
-
-        # If the current value in merge_list is *not* merge_into, update all
-        # entries that have the current value to be merge_into.
-        if merge_list[merge_this] != merge_into:
-            curr_value = merge_list[merge_this]
-            for i in range(len(merge_list)):
-                if merge_list[i] in [curr_value,merge_into]:
-                    merge_list[i] = merge_into
-
-    return merge_list
-
 def merge_blast_df(blast_df_list):
     """
     Merge dataframes from multiple BLAST queries. Merge happens based on
@@ -58,7 +17,9 @@ def merge_blast_df(blast_df_list):
     from the same accession, merge them together. The merge can include an
     arbitrary number of sequences. This merge will:
 
-    1. Take the longest contiguous hit as the row to keep.
+    1. Keep the last row (in blast_df_list order) of each set of merged hits.
+       Hits are merged if their subject ranges overlap, directly or through
+       other hits (A overlaps B and B overlaps C merges A, B, and C).
     2. Update the "query" column to include all merged queries. For
        example, if the Human and Troll queries gave overlapping hits from
        subject region 1-100 and 2-101, respectively, the merged query will
@@ -117,87 +78,65 @@ def merge_blast_df(blast_df_list):
     # concatenate dataframes
     df = pd.concat(blast_df_list,ignore_index=True)
 
-    # Mask will hold whether to keep each row or not
-    keep_mask = np.ones(len(df.index),dtype=bool)
-
-    # Go over all accessions
-    accessions = np.unique(df.loc[:,"accession"])
-    for a in accessions:
-
-        # Grab every row with this accession
-        mask = df.accession == a
-
-        # If only one row, move on
-        num_entries = np.sum(mask)
-        if num_entries == 1:
-            continue
-
-        # Get copy of dataframe with only this accession
-        this_df = df.loc[mask,:]
-
-        # Compare all entries that have the same accession
-        to_merge = [None for _ in range(num_entries)]
-        for i in range(num_entries):
-
-            i_start = this_df.subject_start.iloc[i]
-            i_end = this_df.subject_end.iloc[i]
-
-            for j in range(i+1,num_entries):
-
-                j_start = this_df.subject_start.iloc[j]
-                j_end = this_df.subject_end.iloc[j]
-
-                # If they overlap, merge them
-                if not (j_end < i_start or i_end < j_start):
-                    to_merge = _check_merge(i,j,to_merge)
-
-        # Get unique overlapping seuqneces
-        clusters = list(set(to_merge))
-        for cluster in clusters:
-
-            # Don't merge; no overlaps detected
-            if cluster is None:
-                continue
-
-            # Get all rows to merge, including the one to keep
-            merge_idx = np.array([cluster == c for c in to_merge],dtype=bool)
-            rows_to_merge = this_df.index[merge_idx]
-            keep_mask[rows_to_merge] = False
-
-            # Get the one row to keep
-            row_to_keep = this_df.index[cluster]
-            keep_mask[row_to_keep] = True
-
-            # Create new start, ends, querie, and e-value for row to keep
-
-            # Get starts, ends, queries, and e-value for the rows to merge
-            starts = this_df.loc[rows_to_merge,"subject_start"]
-            ends = this_df.loc[rows_to_merge,"subject_end"]
-            queries = this_df.loc[rows_to_merge,"query"]
-            e_value = this_df.loc[rows_to_merge,"e_value"]
-
-            # Broadest start to end from the merged set
-            new_start = np.min(starts)
-            new_end = np.max(ends)
-
-            # Lowest e-value from merged set
-            new_evalue = np.min(e_value)
-
-            # Create a new query, merging the queries and starts/stops from the
-            # merged rows.
-            new_query = []
-            for i in range(len(queries)):
-                new_query.append(f"{queries.iloc[i]}|{starts.iloc[i]}-{ends.iloc[i]}")
-            new_query = ";".join(new_query)
-
-            # Update the row to keep with the new query, start, and end
-            df.loc[row_to_keep,"query"] = new_query
-            df.loc[row_to_keep,"subject_start"] = new_start
-            df.loc[row_to_keep,"subject_end"] = new_end
-            df.loc[row_to_keep,"e_value"] = new_evalue
-
-
-    return df.loc[keep_mask,:].reset_index().drop(columns=["index"])
+    # Sort hits by accession and then subject start
+    accession_codes, _ = pd.factorize(df["accession"])
+    starts = df["subject_start"].to_numpy(dtype=float,na_value=np.nan)
+    ends = df["subject_end"].to_numpy(dtype=float,na_value=np.nan)
+    lo = np.minimum(starts,ends)
+    hi = np.maximum(starts,ends)
+
+    good = accession_codes >= 0
+    order = np.lexsort((lo,accession_codes))
+    order = order[good[order]]
+
+    sorted_codes = accession_codes[order]
+    sorted_lo = lo[order]
+
+    # Sweep across each accession. The running maximum end marks the extent of
+    # the current cluster of overlapping hits; a hit that starts past it (or
+    # has a new accession) starts a new cluster.
+    running_hi = pd.Series(hi[order]).groupby(sorted_codes).cummax().to_numpy()
+    new_cluster = np.ones(len(order),dtype=bool)
+    new_cluster[1:] = np.logical_or(sorted_codes[1:] != sorted_codes[:-1],
+                                    sorted_lo[1:] > running_hi[:-1])
+    cluster = np.cumsum(new_cluster) - 1
+
+    # Only clusters with more than one hit get merged
+    cluster_size = np.bincount(cluster)
+    to_merge = cluster_size[cluster] > 1
+    if not np.any(to_merge):
+        return df
+
+    members = pd.DataFrame({"cluster":cluster[to_merge],
+                            "row":order[to_merge]})
+    members = members.sort_values(["cluster","row"])
+    rows = members["row"].to_numpy()
+
+    # Merged query: query|start-end for each hit, in input order
+    pieces = df["query"].iloc[rows].astype(str).to_numpy() + "|" + \
+             df["subject_start"].iloc[rows].astype(str).to_numpy() + "-" + \
+             df["subject_end"].iloc[rows].astype(str).to_numpy()
+    members["query"] = pieces
+    members["subject_start"] = df["subject_start"].iloc[rows].to_numpy()
+    members["subject_end"] = df["subject_end"].iloc[rows].to_numpy()
+    members["e_value"] = df["e_value"].iloc[rows].to_numpy()
+
+    merged = members.groupby("cluster",sort=True).agg(row=("row","max"),
+                                                      query=("query",";".join),
+                                                      subject_start=("subject_start","min"),
+                                                      subject_end=("subject_end","max"),
+                                                      e_value=("e_value","min"))
+
+    # Keep the last row of each merged cluster, updated with merged values
+    keep_mask = np.ones(len(df),dtype=bool)
+    keep_mask[rows] = False
+    keep_mask[merged["row"].to_numpy()] = True
+
+    merged_rows = df.index[merged["row"].to_numpy()]
+    for c in ["query","subject_start","subject_end","e_value"]:
+        df.loc[merged_rows,c] = merged[c].to_numpy()
+
+    return df.loc[keep_mask,:].reset_index(drop=True)
 
 
 def merge_and_annotate(blast_df_list,blast_source_list=None):
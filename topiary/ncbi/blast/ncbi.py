@@ -8,6 +8,7 @@ from topiary._private import animation
 from topiary._private import threads
 
 from .read import read_blast_xml, check_for_cpu_limit
+from .ncbi_async import _run_async_blast
 from .util import _standard_blast_args_checker
 
 from Bio import Entrez
@@ -388,6 +389,79 @@ def _ncbi_blast_thread_function(this_query,num_tries_allowed,keep_blast_xml,lock
     return out_dfs[0]
 
 
+def _ncbi_blast_async(sequence_list,
+                      blast_kwargs,
+                      db,
+                      max_query_length,
+                      num_tries_allowed,
+                      keep_blast_xml):
+    """
+    Submit each sequence as its own search and poll all searches concurrently
+    on one event loop (see ncbi_async._run_async_blast).
+
+    Parameters
+    ----------
+    sequence_list : list
+        list of sequences as strings
+    blast_kwargs : dict
+        keyword arguments to pass to blast call
+    db : str
+        NCBI blast database (for status output)
+    max_query_length : int
+        maximum string length accepted by the server
+    num_tries_allowed : int
+        try num_tries_allowed times in case of timeout
+    keep_blast_xml : bool
+        whether or not to keep temporary blast xml files
+
+    Returns
+    -------
+    all_hits : list
+        list of dataframes with BLAST hits, one per sequence
+    """
+
+    print(f"Submitting {len(sequence_list)} BLAST queries against the NCBI {db}")
+    print("database and waiting for them to finish. Depending on the server")
+    print("load, this could take awhile. This is a good time to grab a cup of")
+    print("coffee.",flush=True)
+
+    a = animation.WaitingAnimation()
+    a.start()
+
+    try:
+
+        # One search per sequence. Each query is named count0, so
+        # _combine_hits keeps results in list order.
+        kwargs_list = []
+        for s in sequence_list:
+            this_kwargs, _ = _construct_args(sequence_list=[s],
+                                             blast_kwargs=blast_kwargs,
+                                             max_query_length=max_query_length,
+                                             num_tries_allowed=num_tries_allowed,
+                                             keep_blast_xml=keep_blast_xml,
+                                             num_threads=1)
+            kwargs_list.extend(this_kwargs)
+
+        all_hits = _run_async_blast(kwargs_list)
+
+    finally:
+        a.stop()
+
+    # Searches are already one sequence each, so we cannot fall back to
+    # sending smaller queries.
+    if sum([h is None for h in all_hits]) > 0:
+        err = "\nCPU limit exceeded. Consider selecting shorter\n"
+        err += "input sequences, fewer input sequences, trying again at\n"
+        err += "a different time (when the NCBI server may be less busy),\n"
+        err += "or running BLAST manually and passing the resulting xml\n"
+        err += "files into topiary via --blast_xml."
+        raise RuntimeError(err)
+
+    print("BLAST query complete.",flush=True)
+
+    return all_hits
+
+
 def _combine_hits(hits,return_singleton):
     """
     Parse a list of hits resulting from a set of blast queries and return a
@@ -451,6 +525,7 @@ def ncbi_blast(sequence,
                num_threads=1,
                verbose=False,
                keep_blast_xml=False,
+               use_async=False,
                **kwargs):
     """
     Perform a blast query against a remote NCBI blast database. Takes a sequence
@@ -490,6 +565,11 @@ def ncbi_blast(sequence,
         whether or not to use verbose output
     keep_blast_xml : bool, default=False
         whether or not to keep raw blast xml output
+    use_async : bool, default=False
+        submit every sequence as its own search, then poll all searches
+        concurrently on a single event loop rather than waiting for each
+        NCBIWWW.qblast call in turn. Requests to the server are spaced at least
+        10 seconds apart. num_threads is ignored.
     **kwargs : dict, optional
         extra keyword arguments are passed directly to Bio.Blast.NCBIWWW.qblast,
         overriding anything constructed above. You could, for example, pass
@@ -521,6 +601,17 @@ def ncbi_blast(sequence,
     blast_kwargs = prep[1]
     return_singleton = prep[2]
 
+    use_async = check.check_bool(use_async,"use_async")
+    if use_async:
+        all_hits = _ncbi_blast_async(sequence_list=sequence_list,
+                                     blast_kwargs=blast_kwargs,
+                                     db=db,
+                                     max_query_length=max_query_length,
+                                     num_tries_allowed=num_tries_allowed,
+                                     keep_blast_xml=keep_blast_xml)
+
+        return _combine_hits(all_hits,return_singleton)
+
     # Run multi-threaded blast
     print(f"Performing {len(sequence_list)} BLAST queries against the NCBI {db} database")
     print(f"on {num_threads} threads. Depending on the server load, this could")
@@ -0,0 +1,414 @@
+"""
+Run BLAST against a remote NCBI database by submitting all queries up front and
+polling them on a single asyncio event loop.
+"""
+
+from .read import read_blast_xml
+
+from Bio import Entrez
+
+import asyncio, concurrent.futures, functools
+import urllib.parse, urllib.request, urllib.error, http.client
+import os, re, random, string
+
+# Minimum number of seconds between requests to the server. NCBI asks that
+# users not contact the server more than once every 10 seconds.
+_REQUEST_INTERVAL = 10
+
+# Seconds to wait before first polling a search (if the server's estimated
+# time is shorter), the maximum time to wait between polls, and the factor by
+# which the wait grows after each poll that finds the search still running.
+_POLL_INTERVAL = 60
+_MAX_POLL_INTERVAL = 300
+_POLL_BACKOFF = 1.5
+
+# Seconds to wait for the server to respond to a single request
+_REQUEST_TIMEOUT = 300
+
+# qblast keyword arguments that control how results are formatted. These are
+# sent with the request that downloads results (CMD=Get) rather than the
+# request that submits the search (CMD=Put).
+_GET_KEYS = ["alignments","alignment_view","descriptions",
+             "entrez_links_new_window","expect_low","expect_high",
+             "format_entrez_query","format_object","format_type","ncbi_gi",
+             "results_file","show_overview"]
+
+# Defaults qblast uses for the results request
+_GET_DEFAULTS = {"FORMAT_TYPE":"XML",
+                 "ALIGNMENTS":"500",
+                 "DESCRIPTIONS":"500"}
+
+# Errors that indicate a problem talking to the server rather than a problem
+# with the query. Searches that hit one of these are re-submitted.
+_SERVER_ERRORS = (urllib.error.URLError,
+                  http.client.HTTPException,
+                  ConnectionError,
+                  TimeoutError)
+
+_RID_PATTERN = re.compile(r"^\s*RID = (.*)$",flags=re.MULTILINE)
+_RTOE_PATTERN = re.compile(r"^\s*RTOE = (.*)$",flags=re.MULTILINE)
+_STATUS_PATTERN = re.compile(r"^\s*Status=(.*)$",flags=re.MULTILINE)
+
+
+class _RateLimiter:
+    """
+    Space out requests made from coroutines on one event loop so no two start
+    less than interval seconds apart.
+
+    Parameters
+    ----------
+    interval : float
+        minimum number of seconds between requests
+    """
+
+    def __init__(self,interval):
+
+        self._interval = interval
+        self._lock = asyncio.Lock()
+        self._last = None
+
+    async def wait(self):
+        """
+        Wait until the next request is allowed.
+        """
+
+        async with self._lock:
+            loop = asyncio.get_running_loop()
+            if self._last is not None:
+                delay = self._last + self._interval - loop.time()
+                if delay > 0:
+                    await asyncio.sleep(delay)
+            self._last = loop.time()
+
+
+def _get_request_params(this_query):
+    """
+    Convert keyword arguments for NCBIWWW.qblast into the parameters sent to
+    the server to submit the search and to download its results.
+
+    Parameters
+    ----------
+    this_query : dict
+        kwargs that would be passed to NCBIWWW.qblast (program, database,
+        sequence, url_base, etc.)
+
+    Returns
+    -------
+    url : str
+        blast server url
+    put_params : dict
+        parameters for the request that submits the search (CMD=Put)
+    get_params : dict
+        parameters for the request that downloads results (CMD=Get), without
+        the RID
+    """
+
+    this_query = dict(this_query)
+    url = this_query.pop("url_base","https://blast.ncbi.nlm.nih.gov/Blast.cgi")
+
+    put_params = {"CMD":"Put"}
+    get_params = {"CMD":"Get"}
+    get_params.update(_GET_DEFAULTS)
+
+    for k in this_query:
+
+        v = this_query[k]
+        if v is None:
+            continue
+
+        if k == "sequence":
+            put_params["QUERY"] = f"{v}"
+        elif k in _GET_KEYS:
+            get_params[k.upper()] = f"{v}"
+        else:
+            put_params[k.upper()] = f"{v}"
+
+    # Identify ourselves to NCBI
+    for params in [put_params,get_params]:
+        params["TOOL"] = "topiary"
+        params["EMAIL"] = Entrez.email
+
+    return url, put_params, get_params
+
+def _parse_rid(text):
+    """
+    Read the request id and estimated time to completion from the server's
+    response to a search submission (CMD=Put).
+
+    Parameters
+    ----------
+    text : str
+        response from server
+
+    Returns
+    -------
+    rid : str or None
+        request id (None if not found)
+    rtoe : int
+        estimated seconds until the search completes (0 if not found)
+    """
+
+    rid = None
+    m = _RID_PATTERN.search(text)
+    if m is not None and m.group(1).strip() != "":
+        rid = m.group(1).strip()
+
+    rtoe = 0
+    m = _RTOE_PATTERN.search(text)
+    if m is not None:
+        try:
+            rtoe = int(m.group(1).strip())
+        except ValueError:
+            pass
+
+    return rid, rtoe
+
+def _parse_status(text):
+    """
+    Read the search status from the server's response to a status request
+    (CMD=Get, FORMAT_OBJECT=SearchInfo).
+
+    Parameters
+    ----------
+    text : str
+        response from server
+
+    Returns
+    -------
+    status : str
+        WAITING, READY, FAILED, or UNKNOWN
+    """
+
+    m = _STATUS_PATTERN.search(text)
+    if m is None:
+        return "UNKNOWN"
+
+    return m.group(1).strip()
+
+def _post(url,params):
+    """
+    Send a POST request to the blast server and return the response body.
+
+    Parameters
+    ----------
+    url : str
+        blast server url
+    params : dict
+        parameters to send
+
+    Returns
+    -------
+    text : str
+        response body
+    """
+
+    message = urllib.parse.urlencode(params).encode()
+    request = urllib.request.Request(url,message,{"User-Agent":"topiary"})
+    with urllib.request.urlopen(request,timeout=_REQUEST_TIMEOUT) as response:
+        text = response.read().decode()
+
+    return text
+
+async def _request(url,params,rate_limiter):
+    """
+    Wait for the rate limiter, then send a request to the blast server without
+    blocking the event loop.
+    """
+
+    await rate_limiter.wait()
+
+    loop = asyncio.get_running_loop()
+    return await loop.run_in_executor(None,functools.partial(_post,url,params))
+
+def _parse_result(xml,keep_blast_xml):
+    """
+    Write blast xml from the server to a file and parse it.
+
+    Parameters
+    ----------
+    xml : str
+        blast xml
+    keep_blast_xml : bool
+        whether or not to keep the xml file
+
+    Returns
+    -------
+    out_df : pandas.DataFrame or None
+        dataframe with BLAST hits. None if the server hit its CPU limit.
+    """
+
+    tmp_root = "".join([random.choice(string.ascii_letters)
+                        for _ in range(10)])
+    tmp_file = f"{tmp_root}_ncbi-blast-result.xml"
+    with open(tmp_file,"w") as f:
+        f.write(xml)
+
+    try:
+        out_dfs, _ = read_blast_xml(tmp_file,do_cpu_check=True)
+    finally:
+        if not keep_blast_xml:
+            os.remove(tmp_file)
+
+    if out_dfs is None:
+        return None
+
+    return out_dfs[0]
+
+async def _run_query(this_query,
+                     num_tries_allowed,
+                     keep_blast_xml,
+                     rate_limiter,
+                     poll_interval,
+                     max_poll_interval):
+    """
+    Submit one blast search, poll it until it finishes, then download and parse
+    the result. Searches that fail on the server or hit a connection problem
+    are re-submitted, up to num_tries_allowed times.
+
+    Parameters
+    ----------
+    this_query : dict
+        kwargs that would be passed to NCBIWWW.qblast
+    num_tries_allowed : int
+        number of tries before giving up
+    keep_blast_xml : bool
+        whether or not to keep blast xml files
+    rate_limiter : _RateLimiter
+        rate limiter shared by all requests to the server
+    poll_interval : float
+        seconds to wait before the first poll if the server estimates the
+        search will finish sooner
+    max_poll_interval : float
+        maximum seconds to wait between polls
+
+    Returns
+    -------
+    out_df : pandas.DataFrame or None
+        dataframe with BLAST hits. None if the server hit its CPU limit.
+    """
+
+    url, put_params, get_params = _get_request_params(this_query)
+
+    tries = 0
+    while tries < num_tries_allowed:
+
+        try:
+
+            # Submit search
+            text = await _request(url,put_params,rate_limiter)
+            rid, rtoe = _parse_rid(text)
+
+            # Poll until ready, waiting longer after each poll
+            status = "UNKNOWN"
+            if rid is not None:
+
+                status_params = {"CMD":"Get",
+                                 "FORMAT_OBJECT":"SearchInfo",
+                                 "RID":rid,
+                                 "TOOL":put_params["TOOL"],
+                                 "EMAIL":put_params["EMAIL"]}
+
+                wait = min(max(rtoe,poll_interval),max_poll_interval)
+                while True:
+                    await asyncio.sleep(wait)
+                    text = await _request(url,status_params,rate_limiter)
+                    status = _parse_status(text)
+                    if status != "WAITING":
+                        break
+                    wait = min(wait*_POLL_BACKOFF,max_poll_interval)
+
+            # Download result
+            if status == "READY":
+                params = dict(get_params)
+                params["RID"] = rid
+                xml = await _request(url,params,rate_limiter)
+
+                # Parse off the event loop so other searches keep polling
+                loop = asyncio.get_running_loop()
+                return await loop.run_in_executor(None,
+                                                  functools.partial(_parse_result,
+                                                                    xml,
+                                                                    keep_blast_xml))
+
+        except _SERVER_ERRORS:
+            pass
+
+        # Search failed; wait before trying again
+        tries += 1
+        if tries < num_tries_allowed:
+            await asyncio.sleep(min(poll_interval*2**(tries - 1),max_poll_interval))
+
+    err = "\nProblem accessing with NCBI server. We got no output after\n"
+    err += f"{num_tries_allowed} attempts. This is likely due to a server\n"
+    err += "timeout. Try again at a later time.\n"
+    raise RuntimeError(err)
+
+async def _run_queries(kwargs_list,request_interval,poll_interval,max_poll_interval):
+    """
+    Run all queries concurrently on the current event loop.
+    """
+
+    rate_limiter = _RateLimiter(request_interval)
+
+    tasks = []
+    for kwargs in kwargs_list:
+        tasks.append(_run_query(rate_limiter=rate_limiter,
+                                poll_interval=poll_interval,
+                                max_poll_interval=max_poll_interval,
+                                **kwargs))
+
+    return await asyncio.gather(*tasks)
+
+def _run_async_blast(kwargs_list,
+                     request_interval=None,
+                     poll_interval=None,
+                     max_poll_interval=None):
+    """
+    Run a set of blast queries against an NCBI server concurrently. All
+    searches are submitted (no faster than one request every request_interval
+    seconds), then polled on a single event loop with a wait that grows after
+    each poll. Each result is parsed as soon as it is downloaded.
+
+    Parameters
+    ----------
+    kwargs_list : list
+        list of dictionaries, one per query, with keys "this_query" (kwargs
+        that would be passed to NCBIWWW.qblast), "num_tries_allowed", and
+        "keep_blast_xml". (Output of ncbi._construct_args).
+    request_interval : float, optional
+        minimum seconds between requests to the server (default 10, as asked
+        by NCBI)
+    poll_interval : float, optional
+        seconds to wait before first polling a search if the server estimates
+        it will finish sooner (default 60)
+    max_poll_interval : float, optional
+        maximum seconds to wait between polls (default 300)
+
+    Returns
+    -------
+    all_hits : list
+        list of dataframes with BLAST hits, in the same order as kwargs_list.
+        An entry is None if that query hit the server's CPU limit.
+    """
+
+    if request_interval is None:
+        request_interval = _REQUEST_INTERVAL
+    if poll_interval is None:
+        poll_interval = _POLL_INTERVAL
+    if max_poll_interval is None:
+        max_poll_interval = _MAX_POLL_INTERVAL
+
+    coro = _run_queries(kwargs_list,
+                        request_interval=request_interval,
+                        poll_interval=poll_interval,
+                        max_poll_interval=max_poll_interval)
+
+    # If an event loop is already running (i.e. in a jupyter notebook), we
+    # cannot start another one on this thread. Run on a fresh thread instead.
+    try:
+        asyncio.get_running_loop()
+    except RuntimeError:
+        return asyncio.run(coro)
+
+    with concurrent.futures.ThreadPoolExecutor(max_workers=1) as executor:
+        return executor.submit(asyncio.run,coro).result()
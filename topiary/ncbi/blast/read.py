@@ -7,7 +7,7 @@ import pandas as pd
 
 from Bio.Blast import NCBIXML
 
-import io, os, glob, re
+import io, os, glob, re, csv, contextlib
 import xml.etree.ElementTree as ET
 
 def _clean_xml(xml_file):
@@ -38,6 +38,328 @@ def _clean_xml(xml_file):
 
     return file_contents
 
+class _CleanXMLReader:
+    """
+    File-like wrapper that streams an xml file, dropping the blank lines and
+    CREATE_VIEW that ncbi sometimes injects (see _clean_xml). Only implements
+    read, which is all ElementTree.iterparse needs.
+    """
+
+    def __init__(self,f):
+        self._f = f
+
+    def read(self,size=-1):
+
+        lines = []
+        num_read = 0
+        for line in self._f:
+            if line.strip() not in ["","CREATE_VIEW"]:
+                lines.append(line)
+                num_read += len(line)
+            if size >= 0 and num_read >= size:
+                break
+
+        return "".join(lines)
+
+# Columns in dataframes built from blast xml output, in order
+_BLAST_COLUMNS = ["accession","hit_def","hit_id","title","length","e_value",
+                  "bits","sequence","subject_start","subject_end",
+                  "query_start","query_end","query"]
+
+# Columns holding integers and floats (everything else is str)
+_BLAST_INT_COLUMNS = ["length","subject_start","subject_end","query_start",
+                      "query_end"]
+_BLAST_FLOAT_COLUMNS = ["e_value","bits"]
+
+# Map between hsp xml tags and dataframe columns
+_HSP_TAGS = {"Hsp_evalue":"e_value",
+             "Hsp_bit-score":"bits",
+             "Hsp_hseq":"sequence",
+             "Hsp_hit-from":"subject_start",
+             "Hsp_hit-to":"subject_end",
+             "Hsp_query-from":"query_start",
+             "Hsp_query-to":"query_end"}
+
+def _iter_xml_columns(xml_file):
+    """
+    Stream through a blast xml file, yielding the hits for one query at a
+    time. Elements are discarded as they are parsed, so memory use does not
+    grow with the number of queries.
+
+    Parameters
+    ----------
+    xml_file : str or file-like
+        xml file to load (or open text stream holding xml)
+
+    Yields
+    ------
+    columns : dict
+        dictionary keying column names (_BLAST_COLUMNS) to lists of values for
+        each hit to the query. Only the first hsp of each hit is recorded. A
+        query with no hits yields one row with only the query set and None
+        for all other values.
+    """
+
+    header_query = ""
+    columns = dict([(c,[]) for c in _BLAST_COLUMNS])
+
+    if hasattr(xml_file,"read"):
+        f_context = contextlib.nullcontext(xml_file)
+    else:
+        f_context = open(xml_file)
+
+    with f_context as f:
+
+        try:
+            for _, elem in ET.iterparse(_CleanXMLReader(f)):
+
+                tag = elem.tag
+
+                if tag == "Hit":
+
+                    hit_id = elem.findtext("Hit_id")
+                    hit_def = elem.findtext("Hit_def")
+
+                    columns["hit_id"].append(hit_id)
+                    columns["hit_def"].append(hit_def)
+                    columns["accession"].append(elem.findtext("Hit_accession"))
+                    columns["length"].append(elem.findtext("Hit_len"))
+
+                    if hit_id is None:
+                        columns["title"].append(None)
+                    else:
+                        columns["title"].append(f"{hit_id} {hit_def or ''}")
+
+                    # Only record first hsp
+                    hsp = elem.find("Hit_hsps/Hsp")
+                    for hsp_tag, c in _HSP_TAGS.items():
+                        if hsp is None:
+                            columns[c].append(None)
+                        else:
+                            columns[c].append(hsp.findtext(hsp_tag))
+
+                    # Drop parsed hit from memory
+                    elem.clear()
+
+                elif tag == "Iteration":
+
+                    query = elem.findtext("Iteration_query-def")
+                    if not query:
+                        query = header_query
+
+                    num_hits = len(columns["accession"])
+                    if num_hits == 0:
+                        for c in _BLAST_COLUMNS:
+                            columns[c].append(None)
+                        num_hits = 1
+
+                    columns["query"] = [query for _ in range(num_hits)]
+
+                    yield columns
+
+                    # Drop parsed query from memory and start next one
+                    elem.clear()
+                    columns = dict([(c,[]) for c in _BLAST_COLUMNS])
+
+                elif tag == "BlastOutput_query-def":
+                    header_query = elem.text or ""
+
+        except ET.ParseError as e:
+            err = f"\nCould not parse blast xml file '{xml_file}':\n\n{e}\n\n"
+            raise ValueError(err) from e
+
+def _columns_to_df(columns):
+    """
+    Convert columns parsed out of blast xml (strings and None) into a typed
+    dataframe. Integer columns are int64 (Int64 if there are missing values),
+    float columns are float64, and string columns are object, with missing
+    values as pd.NA.
+
+    Parameters
+    ----------
+    columns : dict
+        dictionary keying column names (_BLAST_COLUMNS) to lists of values
+
+    Returns
+    -------
+    df : pandas.DataFrame
+        dataframe with _BLAST_COLUMNS
+    """
+
+    data = {}
+    for c in _BLAST_COLUMNS:
+
+        values = columns[c]
+        missing = np.array([v is None for v in values],dtype=bool)
+
+        if c in _BLAST_INT_COLUMNS:
+            if np.any(missing):
+                data[c] = pd.array([None if v is None else int(v) for v in values],
+                                   dtype="Int64")
+            else:
+                data[c] = np.array(values,dtype=np.int64)
+
+        elif c in _BLAST_FLOAT_COLUMNS:
+            data[c] = np.array([np.nan if v is None else v for v in values],
+                               dtype=float)
+
+        else:
+            data[c] = np.array(values,dtype=object)
+            data[c][missing] = pd.NA
+
+    return pd.DataFrame(data)
+
+def iter_blast_xml(xml_file):
+    """
+    Lazily read a blast xml file, yielding one dataframe per query. The file
+    is streamed, so only the query being yielded is held in memory.
+
+    Parameters
+    ----------
+    xml_file : str
+        xml file to load
+
+    Yields
+    ------
+    df : pandas.DataFrame
+        dataframe with all blast hits for a query (same columns as
+        records_to_df)
+    """
+
+    xml_file = str(xml_file)
+    if not os.path.isfile(xml_file):
+        err = f"\nxml_file '{xml_file}' does not exist.\n\n"
+        raise FileNotFoundError(err)
+
+    for columns in _iter_xml_columns(xml_file):
+        yield _columns_to_df(columns)
+
+def _xml_file_to_df(xml_file):
+    """
+    Read all queries in a blast xml file into a single dataframe. Equivalent
+    to records_to_df(_xml_file_to_records(xml_file)), but streams hits
+    straight into column lists rather than building biopython records and a
+    dataframe for each query.
+
+    Parameters
+    ----------
+    xml_file : str or file-like
+        xml file to load (or open text stream holding xml)
+
+    Returns
+    -------
+    df : pandas.DataFrame
+        dataframe with all blast hits
+    """
+
+    all_columns = dict([(c,[]) for c in _BLAST_COLUMNS])
+    for columns in _iter_xml_columns(xml_file):
+        for c in _BLAST_COLUMNS:
+            all_columns[c].extend(columns[c])
+
+    return _columns_to_df(all_columns)
+
+# Fields requested for tabular blast output, in order, mapped to the
+# records_to_df columns they fill.
+_TABULAR_FIELDS = {"qseqid":"query",
+                   "sacc":"accession",
+                   "sseqid":"hit_id",
+                   "stitle":"hit_def",
+                   "slen":"length",
+                   "evalue":"e_value",
+                   "bitscore":"bits",
+                   "sseq":"sequence",
+                   "sstart":"subject_start",
+                   "send":"subject_end",
+                   "qstart":"query_start",
+                   "qend":"query_end"}
+
+# Value to pass to blast -outfmt to get tabular output read by
+# _tabular_file_to_df
+_TABULAR_OUTFMT = "6 " + " ".join(_TABULAR_FIELDS)
+
+def _tabular_file_to_df(tabular_file,queries=None):
+    """
+    Read tabular blast output (-outfmt _TABULAR_OUTFMT; comment lines from
+    -outfmt 7 are ignored) into a dataframe with the same columns as
+    records_to_df. Only the first (best) hsp for each hit is kept. Note that
+    blast writes e-values and bit scores to tabular output with less precision
+    than to xml.
+
+    Parameters
+    ----------
+    tabular_file : str or file-like
+        tabular blast output file (or open text stream holding output)
+    queries : list, optional
+        query names (first word of the query fasta header) in the order they
+        were blasted. If specified, rows are ordered by query and a query with
+        no hits gets a single row with only query set (as in records_to_df).
+
+    Returns
+    -------
+    df : pandas.DataFrame
+        dataframe with all blast hits
+    """
+
+    fields = list(_TABULAR_FIELDS.keys())
+    str_fields = ["qseqid","sacc","sseqid","stitle","sseq"]
+
+    try:
+        df = pd.read_csv(tabular_file,
+                         sep="\t",
+                         header=None,
+                         names=fields,
+                         comment="#",
+                         quoting=csv.QUOTE_NONE,
+                         float_precision="round_trip",
+                         keep_default_na=False,
+                         na_values=dict([(f,[""]) for f in fields
+                                         if f not in str_fields]),
+                         dtype=dict([(f,str) for f in str_fields]))
+    except pd.errors.EmptyDataError:
+        df = pd.DataFrame(dict([(f,[]) for f in fields]))
+
+    if len(df.columns) != len(fields):
+        err = f"\nCould not parse tabular blast output '{tabular_file}'\n\n"
+        raise ValueError(err)
+
+    df = df.rename(columns=_TABULAR_FIELDS)
+
+    # Only keep first hsp for each hit
+    df = df.drop_duplicates(subset=["query","hit_id"],ignore_index=True)
+    df["title"] = df["hit_id"] + " " + df["hit_def"]
+
+    if queries is not None:
+
+        # Add rows for queries without hits
+        found = set(df["query"])
+        missing = [q for q in queries if q not in found]
+        if len(missing) > 0:
+            df = pd.concat([df,pd.DataFrame({"query":missing})],ignore_index=True)
+
+        # Sort by query order (stable, so hits stay in blast order)
+        order = dict([(q,i) for i, q in enumerate(queries)])
+        query_index = np.array([order.get(q,len(queries)) for q in df["query"]])
+        df = df.iloc[np.argsort(query_index,kind="stable"),:]
+        df = df.reset_index(drop=True)
+
+    # Same dtypes as _columns_to_df
+    for c in _BLAST_INT_COLUMNS:
+        if np.any(pd.isnull(df[c])):
+            df[c] = df[c].astype("Int64")
+        else:
+            df[c] = df[c].astype(np.int64)
+
+    for c in _BLAST_FLOAT_COLUMNS:
+        df[c] = df[c].astype(float)
+
+    for c in _BLAST_COLUMNS:
+        if c not in _BLAST_INT_COLUMNS and c not in _BLAST_FLOAT_COLUMNS:
+            df[c] = df[c].astype(object)
+            df.loc[pd.isnull(df[c]),c] = pd.NA
+
+    return df.loc[:,_BLAST_COLUMNS]
+
 def _xml_file_to_records(xml_file):
     """
     Convert the contents of an xml file into a list of blast records. There will
@@ -242,7 +564,6 @@ def read_blast_xml(xml_input,do_cpu_check=False):
     # Actually parse xml files
     all_df = []
     for x in xml_files:
-        records = _xml_file_to_records(x)
-        all_df.append(records_to_df(records))
+        all_df.append(_xml_file_to_df(x))
 
     return all_df, xml_files
@@ -7,6 +7,9 @@ from .ncbi import ncbi_blast
 from .local import local_blast
 from topiary._private import check
 from topiary.io.paralog_patterns import load_paralog_patterns
+from .cache import _get_blast_cache, _get_db_fingerprint, _get_blast_key
+from .cache import _get_hit_kwargs
+from .cache import _hits_to_bytes, _bytes_to_hits
 
 from topiary.ncbi import parse_ncbi_line
 
@@ -16,7 +19,6 @@ import numpy as np
 import re
 import sys
 import copy
-import itertools
 
 def _prepare_for_blast(df,
                        paralog_patterns,
@@ -167,6 +169,56 @@ def _prepare_for_blast(df,
     return df, sequence_list, paralog_patterns, min_call_prob, partition_temp, drop_combo_fx
 
 
+def _blast_sequences(sequence_list,
+                     local_blast_db,
+                     ncbi_blast_db,
+                     ncbi_taxid,
+                     hitlist_size,
+                     e_value_cutoff,
+                     gapcosts,
+                     num_threads,
+                     keep_blast_xml,
+                     blast_output_format,
+                     **kwargs):
+    """
+    Blast sequence_list against a local or ncbi database. Arguments are as in
+    _run_blast, except ncbi_taxid must already be resolved.
+    """
+
+    # NCBI blast
+    if ncbi_blast_db:
+
+        # Warn that NCBI blasting can be slow
+        w = "\nBlasting against the NCBI database can be slow/unstable. Consider\n"
+        w += "creating a local BLAST database for your reciprocal BLAST needs.\n"
+        print(w,flush=True)
+
+        hit_dfs = ncbi_blast(sequence_list,
+                             db=ncbi_blast_db,
+                             taxid=ncbi_taxid,
+                             blast_program="blastp",
+                             hitlist_size=hitlist_size,
+                             e_value_cutoff=e_value_cutoff,
+                             gapcosts=gapcosts,
+                             num_threads=num_threads,
+                             keep_blast_xml=keep_blast_xml,
+                             **kwargs)
+
+    # Local blast
+    else:
+        hit_dfs = local_blast(sequence_list,
+                              db=local_blast_db,
+                              blast_program="blastp",
+                              hitlist_size=hitlist_size,
+                              e_value_cutoff=e_value_cutoff,
+                              gapcosts=gapcosts,
+                              num_threads=num_threads,
+                              keep_blast_xml=keep_blast_xml,
+                              output_format=blast_output_format,
+                              **kwargs)
+
+    return hit_dfs
+
 def _run_blast(sequence_list,
                local_blast_db,
                ncbi_blast_db,
@@ -176,10 +228,13 @@ def _run_blast(sequence_list,
                gapcosts,
                num_threads,
                keep_blast_xml,
+               blast_output_format="xml",
+               blast_cache=None,
                **kwargs):
     """
     Run blast on sequence_sequence list, returning a list of dataframes -- one
-    df of hits for each sequence in sequence_list.
+    df of hits for each sequence in sequence_list. Identical sequences are
+    only blasted once.
 
     Parameters
     ----------
@@ -198,6 +253,13 @@ def _run_blast(sequence_list,
     num_threads : int
         number of threads to use for blast search. if -1, use all available.
     keep_blast_xml: whether or not to keep blast xml
+    blast_output_format : str, default="xml"
+        output format for local blast ("xml" or "tabular"). ncbi blast always
+        uses xml.
+    blast_cache : topiary._private.cache.DiskCache, optional
+        on-disk cache of blast hits. Sequences already in the cache (for the
+        same database and blast arguments) are not blasted; new hits are
+        added to the cache.
     kwargs : dict
         extra keyword arguments are passed directly to biopython
         NcbiblastXXXCommandline (for local blast) or qblast (for remote
@@ -213,6 +275,10 @@ def _run_blast(sequence_list,
     # NCBI blast
     if ncbi_blast_db:
 
+        if blast_output_format != "xml":
+            err = "\nblast_output_format must be 'xml' for an ncbi blast search\n\n"
+            raise ValueError(err)
+
         try:
             taxid = kwargs.pop("taxid")
             if ncbi_taxid is None:
@@ -224,38 +290,109 @@ def _run_blast(sequence_list,
         except KeyError:
             pass
 
-        # Warn that NCBI blasting can be slow
-        w = "\nBlasting against the NCBI database can be slow/unstable. Consider\n"
-        w += "creating a local BLAST database for your reciprocal BLAST needs.\n"
-        print(w,flush=True)
+    # Identical sequences (i.e. the same protein under several accessions)
+    # only need to be blasted once
+    unique_index = {}
+    for seq in sequence_list:
+        if seq not in unique_index:
+            unique_index[seq] = len(unique_index)
+    unique_sequences = list(unique_index.keys())
+    unique_hits = [None for _ in unique_sequences]
+
+    # Look for hits already in the cache
+    if blast_cache is not None:
+
+        db_fingerprint = _get_db_fingerprint(local_blast_db,ncbi_blast_db)
+        blast_args = {"blast_program":"blastp",
+                      "hitlist_size":hitlist_size,
+                      "e_value_cutoff":e_value_cutoff,
+                      "gapcosts":gapcosts,
+                      "ncbi_taxid":ncbi_taxid,
+                      "blast_output_format":blast_output_format,
+                      "kwargs":_get_hit_kwargs(kwargs)}
+        keys = [_get_blast_key(seq,db_fingerprint,blast_args)
+                for seq in unique_sequences]
+
+        for i, key in enumerate(keys):
+            value = blast_cache.get(key)
+            if value is not None:
+                unique_hits[i] = _bytes_to_hits(value)
+
+    # Blast everything not found in the cache
+    to_blast = [i for i in range(len(unique_sequences)) if unique_hits[i] is None]
+    if len(to_blast) > 0:
+
+        new_hits = _blast_sequences([unique_sequences[i] for i in to_blast],
+                                    local_blast_db=local_blast_db,
+                                    ncbi_blast_db=ncbi_blast_db,
+                                    ncbi_taxid=ncbi_taxid,
+                                    hitlist_size=hitlist_size,
+                                    e_value_cutoff=e_value_cutoff,
+                                    gapcosts=gapcosts,
+                                    num_threads=num_threads,
+                                    keep_blast_xml=keep_blast_xml,
+                                    blast_output_format=blast_output_format,
+                                    **kwargs)
+
+        for i, hits in zip(to_blast,new_hits):
+            unique_hits[i] = hits
+            if blast_cache is not None:
+                blast_cache.put(keys[i],_hits_to_bytes(hits))
+
+    if blast_cache is not None:
+        blast_cache.flush()
+
+    # Expand back out to one dataframe per sequence, labeling queries by their
+    # position in sequence_list
+    hit_dfs = []
+    for i, seq in enumerate(sequence_list):
+        hits = unique_hits[unique_index[seq]].copy()
+        if "query" in hits.columns:
+            hits["query"] = f"count{i}"
+        hit_dfs.append(hits)
 
-        hit_dfs = ncbi_blast(sequence_list,
-                             db=ncbi_blast_db,
-                             taxid=ncbi_taxid,
-                             blast_program="blastp",
-                             hitlist_size=hitlist_size,
-                             e_value_cutoff=e_value_cutoff,
-                             gapcosts=gapcosts,
-                             num_threads=num_threads,
-                             keep_blast_xml=keep_blast_xml,
-                             **kwargs)
+    return hit_dfs
 
-    # Local blast
-    else:
-        hit_dfs = local_blast(sequence_list,
-                              db=local_blast_db,
-                              blast_program="blastp",
-                              hitlist_size=hitlist_size,
-                              e_value_cutoff=e_value_cutoff,
-                              gapcosts=gapcosts,
-                              num_threads=num_threads,
-                              keep_blast_xml=keep_blast_xml,
-                              **kwargs)
 
-    return hit_dfs
+def _get_pattern_matrix(descriptions,paralog_patterns):
+    """
+    Search every hit description for every paralog pattern.
 
+    Parameters
+    ----------
+    descriptions : list-like
+        hit descriptions (i.e. the hit_def column from blast output). These
+        can be concatenated from the hits for many queries.
+    paralog_patterns : dict
+        dictionary with paralogs as keys and patterns to look for (as
+        compiled regular expressions) as values
 
-def _calc_hit_post_prob(hits,paralog_patterns,partition_temp):
+    Returns
+    -------
+    paralogs : numpy.ndarray
+        paralogs, sorted alphabetically/numerically
+    pattern_matrix : numpy.ndarray
+        boolean array with shape (num_descriptions,num_paralogs) recording
+        whether each description matches each paralog pattern. Missing
+        descriptions match nothing.
+    """
+
+    paralogs = list(paralog_patterns.keys())
+    paralogs.sort()
+
+    # Blast hits to the same subject from different queries share
+    # descriptions, so only search each unique description once.
+    codes, unique_descriptions = pd.factorize(np.array(descriptions,dtype=object))
+
+    # Extra last row (all False) for missing descriptions (code -1)
+    unique_matrix = np.zeros((len(unique_descriptions) + 1,len(paralogs)),dtype=bool)
+    for j, p in enumerate(paralogs):
+        search = paralog_patterns[p].search
+        unique_matrix[:-1,j] = [search(d) is not None for d in unique_descriptions]
+
+    return np.array(paralogs), unique_matrix[codes]
+
+def _calc_hit_post_prob(hits,paralog_patterns,partition_temp,pattern_matrix=None):
     """
     Calculate the posterior probability for paralog matches.
 
@@ -268,6 +405,9 @@ def _calc_hit_post_prob(hits,paralog_patterns,partition_temp):
         compiled regular expressions) as values
     partition_temp : float
         partition temperature
+    pattern_matrix : numpy.ndarray, optional
+        rows of the matrix from _get_pattern_matrix corresponding to hits. If
+        None, calculate from hits.
 
     Returns
     -------
@@ -282,52 +422,117 @@ def _calc_hit_post_prob(hits,paralog_patterns,partition_temp):
     """
 
     # Get weighted bits for all hits in the dataframe
-    all_weights = np.power(2,hits.loc[:,"bits"]/partition_temp)
+    bits = np.array(hits.loc[:,"bits"],dtype=float)
+    all_weights = np.power(2,bits/partition_temp)
     Q = np.sum(all_weights)
     initial_partition_temp = partition_temp
     while np.isinf(Q):
         partition_temp = partition_temp*2
-        all_weights = np.power(2,hits.loc[:,"bits"]/partition_temp)
+        all_weights = np.power(2,bits/partition_temp)
         Q = np.sum(all_weights)
 
     # if partition_temp != initial_partition_temp:
     #     print(f"Adjusted partition_temp from {initial_partition_temp:.3e} to ")
     #     print(f"{partition_temp:.3e} to avoid a numerical overflow.\n")
 
-    # Go through all patterns
-    pattern_masks = []
-    posterior_prob = []
-    paralogs = list(paralog_patterns.keys())
-    paralogs.sort()
-    for p in paralogs:
-
-        # Make a mask for whether this paralog_patterns hits or not along each
-        # description.
-        mask = []
-        for i in range(len(hits)):
-            description = hits.loc[hits.index[i],"hit_def"]
-            if paralog_patterns[p].search(description):
-                mask.append(True)
-            else:
-                mask.append(False)
-
-        # Final mask is value keyed to paralog name
-        pattern_masks.append(np.array(mask,dtype=bool))
+    # Make a mask for whether each paralog pattern hits along each
+    # description.
+    if pattern_matrix is None:
+        paralogs, pattern_matrix = _get_pattern_matrix(hits.loc[:,"hit_def"],
+                                                       paralog_patterns)
+    else:
+        paralogs = list(paralog_patterns.keys())
+        paralogs.sort()
+        paralogs = np.array(paralogs)
 
-        # Posterior probability is vector with sums of weights for all
-        # hits from this paralog
-        posterior_prob.append(np.sum(all_weights[mask]))
+    pattern_masks = [pattern_matrix[:,j] for j in range(len(paralogs))]
 
-    # Weight posterior probability all hits from each paralog to all other
-    # hits.
-    posterior_prob = np.array(posterior_prob)
+    # Posterior probability for each paralog is the sum of weights for all
+    # hits from this paralog relative to all other hits.
+    posterior_prob = np.dot(all_weights,pattern_matrix)
     posterior_prob = posterior_prob/(np.sum(all_weights))
-    paralogs = np.array(paralogs)
 
     return paralogs, posterior_prob, pattern_masks
 
 
 
+def _get_best_combination(posterior_prob,drop_combo_fx):
+    """
+    Find the best combination of paralogs given their posterior probabilities.
+
+    Parameters
+    ----------
+    posterior_prob : numpy.ndarray
+        array of posterior probabilities for each paralog
+    drop_combo_fx : float
+        when deciding whether to call a paralog as a combo (i.e. A/B) versus
+        singleton (i.e. A), prefer A if pp_A/pp_AB > drop_combo_fx.
+
+    Returns
+    -------
+    combo_pp : float
+        total posterior probability of the best combination
+    paralog_indexes : numpy.ndarray
+        indexes of the paralogs in the best combination (sorted)
+
+    Notes
+    -----
+    Combinations are sorted by total posterior probability from best to worst
+    (ties go to the combination with more paralogs, then to the one later in
+    itertools.combinations order). Starting from the best combination, we step
+    to the next one while pp_next/pp_current > drop_combo_fx.
+
+    Paralogs with zero posterior probability only add combinations that tie
+    with the same combination lacking them. The walk steps through ties, so we
+    only sort combinations of paralogs with nonzero posterior probability and
+    add the rest back if the walk cannot step (drop_combo_fx == 1 or a total
+    of ~0).
+    """
+
+    posterior_prob = np.asarray(posterior_prob,dtype=float)
+    all_indexes = np.arange(len(posterior_prob),dtype=int)
+
+    nonzero = np.flatnonzero(posterior_prob > 0)
+    if drop_combo_fx >= 1 or len(nonzero) == 0:
+        return np.sum(posterior_prob[all_indexes]), all_indexes
+
+    # Every combination of nonzero paralogs as a bitmask. Column k of in_combo
+    # (paralog nonzero[k]) is bit num_nonzero - 1 - k, so a combination that
+    # comes later in itertools.combinations order has a smaller mask than
+    # others of the same size.
+    num_nonzero = len(nonzero)
+    masks = np.arange(1,2**num_nonzero,dtype=np.int64)
+    shifts = np.arange(num_nonzero - 1,-1,-1,dtype=np.int64)
+    in_combo = ((masks[:,np.newaxis] >> shifts) & 1).astype(bool)
+
+    # Total posterior probability, summed in paralog order
+    combo_pp = np.zeros(len(masks),dtype=float)
+    for k in range(num_nonzero):
+        combo_pp += np.where(in_combo[:,k],posterior_prob[nonzero[k]],0.0)
+    combo_size = np.sum(in_combo,axis=1)
+
+    order = np.lexsort((masks,-combo_size,-combo_pp))
+    combo_pp = combo_pp[order]
+
+    # Walk down the sorted combinations until the next one is not basically
+    # as good as the current one
+    with np.errstate(divide="ignore",invalid="ignore"):
+        stop = np.logical_or(np.isclose(combo_pp[:-1],0),
+                             np.logical_not(combo_pp[1:]/combo_pp[:-1] > drop_combo_fx))
+    if np.any(stop):
+        best = np.argmax(stop)
+    else:
+        best = len(combo_pp) - 1
+
+    combo = nonzero[in_combo[order[best]]]
+
+    # The walk stopped on a combo with ~0 total. Ties are not stepped past in
+    # this case, so we land on the version with all zero paralogs included.
+    if np.isclose(combo_pp[best],0):
+        combo = np.union1d(combo,np.setdiff1d(all_indexes,nonzero))
+
+    return np.sum(posterior_prob[combo]), combo
+
 def _make_recip_blast_calls(df,
                             hit_dfs,
                             paralog_patterns,
@@ -380,7 +585,17 @@ def _make_recip_blast_calls(df,
                "recip_prob_match":[],
                "recip_bit_score":[]}
 
-    for _, hits in enumerate(hit_dfs):
+    # Match paralog patterns against the hits for all sequences at once, then
+    # slice out the rows for each sequence below.
+    num_hits = [len(hits) for hits in hit_dfs]
+    descriptions = []
+    for hits in hit_dfs:
+        if len(hits) > 0:
+            descriptions.extend(hits.loc[:,"hit_def"])
+    _, pattern_matrix = _get_pattern_matrix(descriptions,paralog_patterns)
+    offsets = np.cumsum([0] + num_hits)
+
+    for i, hits in enumerate(hit_dfs):
 
         # No recip blast hits at all for this sequence
         if len(hits) == 0:
@@ -391,41 +606,20 @@ def _make_recip_blast_calls(df,
             results["recip_bit_score"].append(np.nan)
             continue
 
+        this_matrix = pattern_matrix[offsets[i]:offsets[i+1]]
         paralogs, posterior_prob, pattern_masks = _calc_hit_post_prob(hits,
                                                                       paralog_patterns,
-                                                                      partition_temp)
-
-        # Get all possible combinations of the paralogs
-        combinations = []
-        indexes = range(len(paralogs))
-        for i in range(1,len(indexes)+1):
-            combinations.extend(list(itertools.combinations(indexes,i)))
-
-        # Get the total posterior probability each combination
-        combo_pp = []
-        for i, c in enumerate(combinations):
-            idx = np.array(c,dtype=int)
-            pp_to_add = posterior_prob[idx]
-            combo_pp.append((np.sum(pp_to_add),i))
-
-        # Sort by total posterior probability from best to worst. Combos with
-        # more paralogs will always be higher, so this will effectively be
-        # ordered from N, N-1, N-2 etc. paralogs included in the combo. This
-        # checks to see if a paralog combo with fewer paralogs is basically
-        # just as good as a paralog with more.
-        combo_pp.sort(reverse=True)
-        best_combo_index = 0
-        for i in range(1,len(combo_pp)):
-            this_pp = combo_pp[best_combo_index][0]
-            if not np.isclose(this_pp,0):
-                if combo_pp[i][0]/combo_pp[best_combo_index][0] > drop_combo_fx:
-                    best_combo_index = i
-
-        # Get best posterior probability, best name of paralog (possibly a
-        # combination of more than one paralog separated by "/"), and mask for
-        # the overall match (possibly a combination of multiple paralog matches)
-        recip_prob_match, best_combo = combo_pp[best_combo_index]
-        paralog_indexes = np.array(combinations[best_combo],dtype=int)
+                                                                      partition_temp,
+                                                                      pattern_matrix=this_matrix)
+
+        # Get the best combination of paralogs and its total posterior
+        # probability
+        recip_prob_match, paralog_indexes = _get_best_combination(posterior_prob,
+                                                                  drop_combo_fx)
+
+        # Get best name of paralog (possibly a combination of more than one
+        # paralog separated by "/"), and mask for the overall match (possibly a
+        # combination of multiple paralog matches)
         best_paralog = "/".join(paralogs[paralog_indexes])
         best_mask = np.ones(len(pattern_masks[0]),dtype=bool)
         for p in paralog_indexes:
@@ -507,6 +701,8 @@ def recip_blast(df,
                 gapcosts=(11,1),
                 num_threads=-1,
                 keep_blast_xml=False,
+                blast_output_format="xml",
+                blast_cache=None,
                 **kwargs):
     """
     Take sequences from a topiary dataframe and do a recip blast analysis
@@ -580,6 +776,20 @@ def recip_blast(df,
         rarely speeds up remote BLAST).
     keep_blast_xml : bool, default=False
         whether or not to keep raw blast xml output
+    blast_output_format : str, default="xml"
+        for a local blast search, have blast write "xml" or "tabular" output.
+        Tabular output is much faster to parse. ncbi blast searches must use
+        "xml".
+    blast_cache : str, optional
+        directory holding an on-disk cache of blast hits. Hits are looked up
+        in the cache by sequence, blast database, and blast arguments before
+        blasting, and new hits are added to it, so reruns do not have to
+        re-blast sequences. If None, use the directory in the
+        TOPIARY_BLAST_CACHE environment variable (if defined). The cache is
+        capped at TOPIARY_BLAST_CACHE_MAX_MB megabytes (default 1000),
+        evicting the least-recently-used hits. Hits from an NCBI database
+        expire after at most TOPIARY_BLAST_CACHE_NCBI_MAX_DAYS days (default
+        30). See warm_recip_blast_cache to fill the cache ahead of time.
     **kwargs : dict, optional
         extra keyword arguments are passed directly to biopython
         blast). These take precedence over anything specified above
@@ -643,18 +853,31 @@ def recip_blast(df,
 
     df, sequence_list, paralog_patterns, min_call_prob, partition_temp, drop_combo_fx = out
 
+    blast_cache = _get_blast_cache(blast_cache)
+
     # Run BLAST on sequence list, returning list of dataframes -- one for each
     # seqeunce in sequence_list
-    hit_dfs = _run_blast(sequence_list,
-                         local_blast_db,
-                         ncbi_blast_db,
-                         ncbi_taxid,
-                         hitlist_size,
-                         e_value_cutoff,
-                         gapcosts,
-                         num_threads,
-                         keep_blast_xml,
-                         **kwargs)
+    try:
+        hit_dfs = _run_blast(sequence_list,
+                             local_blast_db,
+                             ncbi_blast_db,
+                             ncbi_taxid,
+                             hitlist_size,
+                             e_value_cutoff,
+                             gapcosts,
+                             num_threads,
+                             keep_blast_xml,
+                             blast_output_format,
+                             blast_cache=blast_cache,
+                             **kwargs)
+
+        if blast_cache is not None:
+            hits, misses = blast_cache.get_counts()
+            print(f"BLAST cache: {hits} hits, {misses} misses.",flush=True)
+
+    finally:
+        if blast_cache is not None:
+            blast_cache.close()
 
 
     num_keep_at_start = np.sum(df.keep)
@@ -677,3 +900,108 @@ def recip_blast(df,
     print("",flush=True)
 
     return out_df
+
+
+def warm_recip_blast_cache(sequences,
+                           blast_cache=None,
+                           local_blast_db=None,
+                           ncbi_blast_db=None,
+                           ncbi_taxid=None,
+                           hitlist_size=10,
+                           e_value_cutoff=0.01,
+                           gapcosts=(11,1),
+                           num_threads=-1,
+                           blast_output_format="xml",
+                           **kwargs):
+    """
+    Blast sequences and store the hits in the reciprocal blast cache, so a
+    later recip_blast call with the same database and blast arguments does not
+    have to blast them. Sequences already in the cache are not blasted again.
+
+    Parameters
+    ----------
+    sequences : list
+        list of sequences (str) to blast
+    blast_cache : str, optional
+        directory holding the on-disk cache of blast hits. If None, use the
+        directory in the TOPIARY_BLAST_CACHE environment variable.
+    local_blast_db : str or None, default=None
+        Local blast database to use. If None, use an NCBI database. Incompatible
+        with ncbi_blast_db.
+    ncbi_blast_db : str or None, default=None
+        NCBI blast database to use. If None, use a local database. Incompatible
+        with local_blast_db.
+    ncbi_taxid : str or int or list or None, default=None
+        limit ncbi blast search to specified taxid.
+    hitlist_size : int, default=10
+        return only the top hitlist_size hits
+    e_value_cutoff : float, default=0.01
+        only return hits with e_value better than e_value_cutoff
+    gapcosts : tuple, default=(11,1)
+        BLAST gapcosts (length 2 tuple of ints)
+    num_threads : int, default=-1
+        number of threads to use. if -1, use all available.
+    blast_output_format : str, default="xml"
+        for a local blast search, have blast write "xml" or "tabular" output.
+    **kwargs : dict, optional
+        extra keyword arguments are passed directly to biopython blast.
+
+    Returns
+    -------
+    hits : int
+        number of sequences found in the cache
+    misses : int
+        number of sequences that had to be blasted
+
+    Notes
+    -----
+    The blast arguments must match the ones later passed to recip_blast for
+    its lookups to hit the cache.
+    """
+
+    if type(sequences) is str or not hasattr(sequences,"__iter__"):
+        err = "\nsequences must be a list of sequences\n\n"
+        raise ValueError(err)
+
+    sequence_list = []
+    for seq in sequences:
+        if type(seq) is not str or seq.strip() == "":
+            err = "\nsequences must be a list of non-empty strings\n\n"
+            raise ValueError(err)
+        sequence_list.append(seq.strip())
+
+    if ncbi_blast_db is None and local_blast_db is None:
+        err = "\nPlease specificy either ncbi_blast_db OR local_blast_db\n\n"
+        raise ValueError(err)
+
+    if ncbi_blast_db is not None and local_blast_db is not None:
+        err = "\nPlease specificy either ncbi_blast_db OR\n"
+        err += "local_blast_db, but not both.\n\n"
+        raise ValueError(err)
+
+    blast_cache = _get_blast_cache(blast_cache)
+    if blast_cache is None:
+        err = "\nPlease specify blast_cache (or set the TOPIARY_BLAST_CACHE\n"
+        err += "environment variable).\n\n"
+        raise ValueError(err)
+
+    try:
+        _run_blast(sequence_list,
+                   local_blast_db,
+                   ncbi_blast_db,
+                   ncbi_taxid,
+                   hitlist_size,
+                   e_value_cutoff,
+                   gapcosts,
+                   num_threads,
+                   False,
+                   blast_output_format,
+                   blast_cache=blast_cache,
+                   **kwargs)
+
+        hits, misses = blast_cache.get_counts()
+
+    finally:
+        blast_cache.close()
+
+    return hits, misses
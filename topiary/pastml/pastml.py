@@ -2,6 +2,8 @@
 Interface to pastml library.
 """
 
+from topiary._private.alignment_matrix import AlignmentMatrix
+
 import pastml
 from pastml import acr
 
@@ -18,8 +20,9 @@ def get_ancestral_gaps(alignment_file,tree_file,prediction_method="DOWNPASS"):
 
     Parameters
     ----------
-    alignment_file : str
-        phy file used to generate ancestors in RAxML
+    alignment_file : str or AlignmentMatrix
+        phy file used to generate ancestors in RAxML (or the alignment already
+        loaded from it)
     tree_file : str
         output tree file with labeled internal nodes
     prediction_method : str, default="DOWNPASS"
@@ -33,40 +36,17 @@ def get_ancestral_gaps(alignment_file,tree_file,prediction_method="DOWNPASS"):
     """
 
     # Read the alignment file
-    counter = 0
-    leaf_names = []
-    with open(alignment_file) as f:
-        for line in f:
-
-            # First line
-            if counter == 0:
-                col = line.split()
-                num_taxa = int(col[0])
-                num_sites = int(col[1])
-                counter += 1
-
-                char_matrix = np.zeros((num_taxa,num_sites),dtype=np.uint8)
-                continue
-
-            # Next, blank line
-            if line.strip() == "":
-                counter += 1
-                continue
-
-            # Alternating leaf id and sequence lines
-            if counter % 2 == 0:
-                leaf_names.append(line.strip())
-                counter += 1
-            else:
-                index = (counter - 3)//2
-                char_matrix[index,:] = np.array([c == "-" for c in line.strip()])
-                counter += 1
+    if issubclass(type(alignment_file),AlignmentMatrix):
+        alignment_matrix = alignment_file
+    else:
+        alignment_matrix = AlignmentMatrix.from_file(alignment_file)
+
+    leaf_names = list(alignment_matrix.uid)
+    char_matrix = alignment_matrix.gap_mask.astype(np.uint8)
 
     # Create a data frame where indexes are leaf names and columns are each gap
-    out_dict = {}
-    for i in range(char_matrix.shape[1]):
-        out_dict[f"g{i}"] = char_matrix[:,i]
-    gap_df = pd.DataFrame(out_dict)
+    gap_df = pd.DataFrame(char_matrix,
+                          columns=[f"g{i}" for i in range(char_matrix.shape[1])])
     gap_df.index = leaf_names
 
     # Gaps, named as column names
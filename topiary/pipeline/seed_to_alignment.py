@@ -10,6 +10,8 @@ from topiary._private import installed
 from topiary._private import check
 from topiary._private import run_cleanly
 from topiary._private.interface import rmtree
+from topiary.io.dataframe import _write_checkpoint
+from topiary.io.dataframe import _read_checkpoint
 
 import random
 import string
@@ -115,6 +117,7 @@ def seed_to_alignment(seed_df,
                       worst_align_drop_fx=0.1,
                       sparse_column_cutoff=0.80,
                       align_trim=(0.05,0.95),
+                      realign_cutoff=None,
                       force_species_aware=False,
                       force_not_species_aware=False,
                       ncbi_blast_db=None,
@@ -171,6 +174,12 @@ def seed_to_alignment(seed_df,
         of the alignment. Interpreted like a python list slice, but with
         percentages. (0.0,1.0) would not trim; (0.05,0,98) would trim the first
         0.05 off the front and the last 0.02 off the back.
+    realign_cutoff : float, optional
+        When polishing the alignment, only re-run muscle if the fraction of
+        sequences removed or the fraction of alignment columns that become
+        gap-only exceeds realign_cutoff. Otherwise, remove the dropped
+        sequences and gap-only columns from the existing alignment. If not
+        specified, always re-run muscle.
 
     force_species_aware : bool, default=False
         Lower redundancy in a species-aware fashion, regardless of dataset type.
@@ -247,6 +256,9 @@ def seed_to_alignment(seed_df,
         Restart the pipeline from where it stopped in :code:`out_dir`. To use 
         this option, :code:`out_dir` must be specified and point to an existing
         calculation. This option is incompatible with :code:`overwrite = True`.
+        Each step writes its dataframe as a .csv file and a .parquet
+        checkpoint; on restart, the checkpoint is read unless the .csv file
+        has been edited more recently.
     overwrite : bool, default=False
         Overwrite :code:`out_dir` if it already exists. This is incompatible
         with :code:`restart = True`.
@@ -375,11 +387,11 @@ def seed_to_alignment(seed_df,
         paralog_patterns = out[2]
         species_aware = out[3]
 
-        topiary.write_dataframe(df,expected_output)
+        _write_checkpoint(df,expected_output)
 
     else:
         print(f"Loading existing file {expected_output}.")
-        df = topiary.read_dataframe(expected_output)
+        df = _read_checkpoint(expected_output)
 
     step_counter += 1
     expected_output = f"{step_counter:02d}_recip-blast-dataframe.csv"
@@ -427,11 +439,11 @@ def seed_to_alignment(seed_df,
                                  num_threads=num_local_blast_threads,
                                  keep_blast_xml=keep_recip_blast_xml)
 
-        topiary.write_dataframe(df,expected_output)
+        _write_checkpoint(df,expected_output)
 
     else:
         print(f"Loading existing file {expected_output}.")
-        df = topiary.read_dataframe(expected_output)
+        df = _read_checkpoint(expected_output)
 
 
     # --------------------------------------------------------------------------
@@ -458,11 +470,11 @@ def seed_to_alignment(seed_df,
                   "align_trim":align_trim}
 
         df = topiary.quality.shrink_dataset(**kwargs)
-        topiary.write_dataframe(df,expected_output)
+        _write_checkpoint(df,expected_output)
 
     else:
         print(f"Loading existing file {expected_output}.")
-        df = topiary.read_dataframe(expected_output)
+        df = _read_checkpoint(expected_output)
 
     step_counter += 1
     expected_output = f"{step_counter:02d}_aligned-dataframe.csv"
@@ -476,11 +488,12 @@ def seed_to_alignment(seed_df,
         print("",flush=True)
 
         df = topiary.muscle.align(df)
-        topiary.write_dataframe(df,expected_output)
+        _write_checkpoint(df,expected_output)
         step_counter += 1
 
     else:
         print(f"Loading existing file {expected_output}.")
+        df = _read_checkpoint(expected_output)
 
     expected_output = f"{step_counter:02d}_clean-aligned-dataframe.csv"
     run_calc = _check_restart(expected_output,restart)
@@ -497,10 +510,11 @@ def seed_to_alignment(seed_df,
                   "sparse_run_percentile":(1 - worst_align_drop_fx),
                   "fx_missing_percentile":(1 - worst_align_drop_fx),
                   "realign":True,
+                  "realign_cutoff":realign_cutoff,
                   "sparse_column_cutoff":sparse_column_cutoff}
 
         df = topiary.quality.polish_alignment(**kwargs)
-        topiary.write_dataframe(df,expected_output)
+        _write_checkpoint(df,expected_output)
         pretty_name = os.path.join(out_dir,expected_output)
         step_counter += 1
 
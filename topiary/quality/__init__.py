@@ -4,6 +4,7 @@ Functions for doing quality control on sequences in a dataframe.
 
 from .redundancy import remove_redundancy
 from .alignment import score_alignment
+from .identity import score_localxx
 from .taxonomic import get_merge_blocks
 
 from .shrink import shrink_dataset
@@ -4,17 +4,54 @@ Functions for scoring alignment quality.
 
 import topiary
 from topiary._private import check
+from topiary._private.alignment_matrix import AlignmentMatrix
 
 import pandas as pd
 import numpy as np
 
-import re
-
 # structures to convert amino acid sequences to integers and back
 AA = "ACDEFGHIKLMNPQRSTVWY-"
 AA_TO_INT = dict([(a,i) for i, a in enumerate(AA)])
 INT_TO_AA = list(AA)
 
+# Lookup table taking a byte to its integer in AA. Anything not in AA is
+# treated as a gap.
+AA_LOOKUP = np.full(256,AA_TO_INT["-"],dtype=np.uint8)
+for _a in AA:
+    AA_LOOKUP[ord(_a)] = AA_TO_INT[_a]
+
+def _encode_alignment(alignment,front_index=0,back_index=None):
+    """
+    Encode aligned sequences as a 2D array of integers (see AA).
+
+    Parameters
+    ----------
+    alignment : list-like or AlignmentMatrix
+        aligned sequences. all must have the same length.
+    front_index : int, default=0
+        only encode columns starting at front_index
+    back_index : int, optional
+        only encode columns before back_index
+
+    Returns
+    -------
+    seqs : numpy.ndarray
+        uint8 array with shape (num_sequences,num_columns)
+    """
+
+    if issubclass(type(alignment),AlignmentMatrix):
+        return AA_LOOKUP[alignment.codes[:,front_index:back_index]]
+
+    alignment = [a[front_index:back_index] for a in alignment]
+    if len(alignment) == 0:
+        return np.zeros((0,0),dtype=np.uint8)
+
+    # Non-ascii characters become "?" (one byte each) and are then gaps
+    joined = "".join(alignment).encode("ascii",errors="replace")
+    seqs = AA_LOOKUP[np.frombuffer(joined,dtype=np.uint8)]
+
+    return seqs.reshape((len(alignment),-1))
+
 def _get_sparse_columns(seqs,sparse_column_cutoff=0.80):
     """
     Get True/False array for whether each column is less than cutoff % gaps.
@@ -31,10 +68,7 @@ def _get_sparse_columns(seqs,sparse_column_cutoff=0.80):
         True/False numpy array mask
     """
 
-    column_scores = []
-    for c in range(seqs.shape[1]):
-        column_scores.append(np.sum(seqs[:,c] == 20)/seqs.shape[0])
-    column_scores = np.array(column_scores)
+    column_scores = np.mean(seqs == 20,axis=0)
 
     sparse_columns = column_scores >= sparse_column_cutoff
 
@@ -107,15 +141,7 @@ def _drop_gaps_only(seqs):
     """
 
     # Create True/False mask for columns with more than just "-"
-    not_just_gaps = []
-    for i in range(seqs.shape[1]):
-        u = np.unique(seqs[:,i])
-        if len(u) == 1 and u[0] == 20:
-            not_just_gaps.append(False)
-        else:
-            not_just_gaps.append(True)
-
-    not_just_gaps = np.array(not_just_gaps,dtype=bool)
+    not_just_gaps = np.any(seqs != 20,axis=0)
 
     # Whack out columns that are only "-"
     seqs = seqs[:,not_just_gaps]
@@ -125,7 +151,8 @@ def _drop_gaps_only(seqs):
 def score_alignment(df,
                     sparse_column_cutoff=0.80,
                     align_trim=(0.1,0.9),
-                    silent=False):
+                    silent=False,
+                    alignment_matrix=None):
     """
     Calculate alignment quality scores for each sequence in the dataframe. The
     resulting scores are loaded as columns into the dataframe. In all cases, a
@@ -158,6 +185,10 @@ def score_alignment(df,
         front and the last 0.02 off the back.
     silent : bool, default=False
         whether or not to silence muscle output
+    alignment_matrix : AlignmentMatrix, optional
+        already parsed alignment holding (at least) the kept sequences in df,
+        matched by uid. If specified, this is scored rather than the
+        'alignment' column.
 
     Returns
     -------
@@ -170,24 +201,42 @@ def score_alignment(df,
 
     df = df.loc[df.keep,:]
 
-    # Check for alignment. If not done, align sequences using muscle super5.
-    try:
-        aln = df.loc[:,"alignment"]
-    except KeyError:
-        df = topiary.align(df,super5=True,silent=silent)
-        aln = df.loc[:,"alignment"]
-
-    # Get length of sequence column
-    try:
-        col_lengths = list(set([len(s) for s in aln]))
-        if len(col_lengths) != 1:
-            err = f"\nall sequences in 'alignment' column do not have the same legnth\n\n"
+    if alignment_matrix is None:
+
+        # Check for alignment. If not done, align sequences using muscle super5.
+        try:
+            aln = df.loc[:,"alignment"]
+        except KeyError:
+            df = topiary.align(df,super5=True,silent=silent)
+            aln = df.loc[:,"alignment"]
+
+        # Get length of sequence column
+        try:
+            col_lengths = list(set([len(s) for s in aln]))
+            if len(col_lengths) != 1:
+                err = f"\nall sequences in 'alignment' column do not have the same legnth\n\n"
+                raise ValueError(err)
+
+        except TypeError:
+            err = f"\n'alignment' column could not be interpreted as sequences\n\n"
             raise ValueError(err)
-        align_length = col_lengths[0]
 
-    except TypeError:
-        err = f"\n'alignment' column could not be interpreted as sequences\n\n"
-        raise ValueError(err)
+        alignment_matrix = AlignmentMatrix(list(aln),uid=list(df.uid))
+
+    else:
+
+        if not issubclass(type(alignment_matrix),AlignmentMatrix):
+            err = "\nalignment_matrix must be an AlignmentMatrix\n\n"
+            raise ValueError(err)
+
+        # Grab rows for the sequences in the dataframe, in dataframe order
+        try:
+            alignment_matrix = alignment_matrix[list(df.uid)]
+        except KeyError as e:
+            err = f"\nuid {e} is not in alignment_matrix\n\n"
+            raise ValueError(err)
+
+    align_length = alignment_matrix.shape[1]
 
     # Check float inputs
     sparse_column_cutoff = check.check_float(sparse_column_cutoff,
@@ -223,14 +272,9 @@ def score_alignment(df,
             back_index += 1
 
     # Generate an array of sequences as integers.
-    seqs = []
-    for i in df.index:
-        if not df.loc[i,"keep"]:
-            continue
-        this_seq = re.sub(f"[^{AA}]","-",df.loc[i,"alignment"][front_index:back_index])
-        seqs.append([AA_TO_INT[c] for c in list(this_seq)])
-
-    seqs = np.array(seqs,dtype=int)
+    seqs = _encode_alignment(alignment_matrix,
+                             front_index=front_index,
+                             back_index=back_index)
 
     # Drop gaps only columns
     seqs = _drop_gaps_only(seqs)
@@ -243,22 +287,14 @@ def score_alignment(df,
     gap_dense = np.logical_and(seqs == 20,dense_columns)
     fx_missing_dense = np.sum(gap_dense,axis=1)/np.sum(dense_columns)
 
+    # Count non-gap characters each sequence has in each run of columns, then
+    # take the largest count over the runs of sparse columns.
     sparse_run_length = np.zeros(len(seqs))
     run_lengths, start_positions, values = _rle(dense_columns)
-    for i in range(len(run_lengths)):
-
-        # If the this is a run of sparse columns
-        if values[i] == False:
-
-            # Grab indexes for start and stop of sparse column run
-            s = start_positions[i]
-            e = s + run_lengths[i]
-
-            # Go through every sequence
-            for j in range(len(seqs)):
-                in_sparse_run = np.sum(seqs[j,s:e] != 20)
-                if in_sparse_run > sparse_run_length[j]:
-                    sparse_run_length[j] = in_sparse_run
+    sparse_runs = np.logical_not(values)
+    if np.any(sparse_runs):
+        run_counts = np.add.reduceat(seqs != 20,start_positions,axis=1,dtype=int)
+        sparse_run_length[:] = np.max(run_counts[:,sparse_runs],axis=1)
 
     # Load quality data into the dataframe
     df["fx_in_sparse"] = np.nan
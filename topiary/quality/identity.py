@@ -0,0 +1,205 @@
+"""
+Fast scoring of the number of matches in localxx alignments.
+
+Bio.pairwise2.align.localxx(A,B,score_only=True) scores +1 per match with no
+mismatch or gap penalties. Its score is therefore the length of the longest
+common subsequence (LCS) of A and B, which can be calculated with the
+bit-parallel algorithm of Allison & Dix (1986) as improved by Hyyrö (2004).
+Each target sequence is encoded as a bit vector; the query is then scanned
+one residue at a time, updating the bit vectors of all targets at once.
+"""
+
+import numpy as np
+
+# Below this many targets, the fixed cost of the numpy operations is higher
+# than scoring each target with python integers.
+_MIN_NUMPY_BATCH = 64
+
+# Score at most this many targets per numpy pass so the padded target and
+# match arrays stay small no matter how many targets are passed in.
+_MAX_NUMPY_BATCH = 4096
+
+def encode_sequence(sequence):
+    """
+    Encode a sequence as a uint8 array for use with score_localxx.
+
+    Parameters
+    ----------
+    sequence : str or numpy.ndarray
+        sequence to encode. if a uint8 numpy array, return as is.
+
+    Returns
+    -------
+    encoded : numpy.ndarray
+        uint8 array with one value per residue
+    """
+
+    if issubclass(type(sequence),np.ndarray):
+        if sequence.dtype != np.uint8 or len(sequence.shape) != 1:
+            err = "\nencoded sequences must be one-dimensional uint8 arrays\n\n"
+            raise ValueError(err)
+        return sequence
+
+    if not issubclass(type(sequence),str):
+        err = f"\nsequence '{sequence}' must be a string or uint8 array\n\n"
+        raise ValueError(err)
+
+    return np.frombuffer(sequence.encode(),dtype=np.uint8)
+
+def _score_localxx_int(query,targets):
+    """
+    Bit-parallel LCS using python integers as arbitrarily long bit vectors.
+    Fastest for small numbers of targets.
+
+    Parameters
+    ----------
+    query : numpy.ndarray
+        uint8 encoded query sequence
+    targets : list
+        list of uint8 encoded target sequences
+
+    Returns
+    -------
+    scores : numpy.ndarray
+        number of matches between query and each target
+    """
+
+    query = query.tolist()
+
+    scores = np.zeros(len(targets),dtype=int)
+    for k, target in enumerate(targets):
+
+        n = target.shape[0]
+        if n == 0:
+            continue
+
+        # Bit i of match[c] is set if target[i] == c
+        match = {}
+        for i, c in enumerate(target.tolist()):
+            match[c] = match.get(c,0) | (1 << i)
+
+        mask = (1 << n) - 1
+        V = mask
+        for c in query:
+            U = V & match.get(c,0)
+            V = ((V + U) | (V - U)) & mask
+
+        scores[k] = n - bin(V).count("1")
+
+    return scores
+
+def _score_localxx_numpy(query,targets):
+    """
+    Bit-parallel LCS using uint64 numpy arrays as bit vectors, one row per
+    target. Fastest for large numbers of targets.
+
+    Parameters
+    ----------
+    query : numpy.ndarray
+        uint8 encoded query sequence
+    targets : list
+        list of uint8 encoded target sequences
+
+    Returns
+    -------
+    scores : numpy.ndarray
+        number of matches between query and each target
+    """
+
+    num_targets = len(targets)
+    lengths = np.array([t.shape[0] for t in targets],dtype=int)
+    num_words = max(1,int(np.ceil(np.max(lengths)/64)))
+
+    # Only residues seen in the query matter. Pad targets with a value not in
+    # the query so padding never matches.
+    codes, query_index = np.unique(query,return_inverse=True)
+    pad = np.setdiff1d(np.arange(256,dtype=np.uint8),codes)[0]
+
+    target_array = np.full((num_targets,num_words*64),pad,dtype=np.uint8)
+    for k, t in enumerate(targets):
+        target_array[k,:lengths[k]] = t
+
+    # match[c,k,w] holds the bits for target k, word w that match code c.
+    # Build one code at a time to avoid a full codes x targets x residues
+    # boolean array.
+    match = np.empty((len(codes),num_targets,num_words),dtype="<u8")
+    for i, c in enumerate(codes):
+        match[i] = np.packbits(target_array == c,
+                               axis=-1,
+                               bitorder="little").view("<u8")
+
+    V = np.full((num_targets,num_words),np.iinfo(np.uint64).max,dtype="<u8")
+    for c in query_index:
+
+        U = V & match[c]
+        X = V ^ U
+        S = V + U
+
+        # Propagate carries between 64-bit words. Carries out of the last
+        # word only affect bits past the end of the target and are dropped.
+        if num_words > 1:
+            carry = S < V
+            while np.any(carry[:,:-1]):
+                carry_in = np.zeros(carry.shape,dtype=np.uint64)
+                carry_in[:,1:] = carry[:,:-1]
+                S_new = S + carry_in
+                carry = S_new < S
+                S = S_new
+
+        V = S | X
+
+    # Matches are the zero bits within the length of each target
+    bits = np.unpackbits(V.view(np.uint8),axis=-1,bitorder="little")
+    in_target = np.arange(num_words*64)[np.newaxis,:] < lengths[:,np.newaxis]
+
+    return np.sum((bits == 0) & in_target,axis=1)
+
+def score_localxx(query,targets):
+    """
+    Get the number of matches in the best local alignment of query against
+    each of the targets. The result is identical to calling
+    Bio.pairwise2.align.localxx(query,target,score_only=True) for each target,
+    but is much faster.
+
+    Parameters
+    ----------
+    query : str or numpy.ndarray
+        query sequence (string or uint8 array from encode_sequence)
+    targets : list
+        list of target sequences (strings or uint8 arrays from
+        encode_sequence)
+
+    Returns
+    -------
+    scores : numpy.ndarray
+        integer array with the number of matches between query and each target
+    """
+
+    query = encode_sequence(query)
+
+    # A single sequence rather than a list of sequences
+    if issubclass(type(targets),str) or \
+       (issubclass(type(targets),np.ndarray) and targets.dtype == np.uint8):
+        err = "\ntargets must be a list of sequences\n\n"
+        raise ValueError(err)
+
+    targets = [encode_sequence(t) for t in targets]
+
+    if len(targets) == 0:
+        return np.zeros(0,dtype=int)
+
+    if query.shape[0] == 0:
+        return np.zeros(len(targets),dtype=int)
+
+    if len(targets) < _MIN_NUMPY_BATCH:
+        return _score_localxx_int(query,targets)
+
+    scores = np.zeros(len(targets),dtype=int)
+    for i in range(0,len(targets),_MAX_NUMPY_BATCH):
+        batch = targets[i:(i + _MAX_NUMPY_BATCH)]
+        if len(batch) < _MIN_NUMPY_BATCH:
+            scores[i:(i + len(batch))] = _score_localxx_int(query,batch)
+        else:
+            scores[i:(i + len(batch))] = _score_localxx_numpy(query,batch)
+
+    return scores
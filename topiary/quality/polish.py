@@ -6,6 +6,7 @@ are missing sequence.
 import topiary
 from topiary._private import check
 from topiary.quality.alignment import score_alignment
+from topiary._private.alignment_matrix import AlignmentMatrix
 
 import numpy as np
 import pandas as pd
@@ -56,6 +57,7 @@ def _get_cutoff(x,avg_bin_contents=None,pct=0.975):
 
 def polish_alignment(df,
                      realign=True,
+                     realign_cutoff=None,
                      sparse_column_cutoff=0.80,
                      align_trim=(0,1),
                      fx_sparse_percentile=0.90,
@@ -71,6 +73,12 @@ def polish_alignment(df,
         topiary dataframe
     realign : bool, default=True
         align after dropping columns
+    realign_cutoff : float, optional
+        if specified (and realign is True), only re-run muscle if the fraction
+        of kept sequences removed or the fraction of alignment columns that
+        become gap-only exceeds realign_cutoff. Otherwise, project the existing
+        alignment: remove the dropped sequences and collapse gap-only columns.
+        If not specified, always re-run muscle.
     sparse_column_cutoff : float, default=0.80
         when checking alignment quality, a column is sparse if it has gaps in
         more than sparse_column_cutoff sequences.
@@ -102,10 +110,20 @@ def polish_alignment(df,
     It drops sequences that have BOTH large fx_sparse AND large sparse_run. It
     also drops sequences that have BOTH large fx_missing AND are flagged as
     partial in the original NCBI entry.
+
+    How the final alignment was made is recorded in
+    :code:`df.attrs["polish_alignment"]`: "realigned" (muscle was re-run),
+    "projected" (existing alignment with dropped rows and gap-only columns
+    removed), or "none" (realign=False).
     """
 
     df = check.check_topiary_dataframe(df)
     realign = check.check_int(realign,"realign")
+    if realign_cutoff is not None:
+        realign_cutoff = check.check_float(realign_cutoff,
+                                           "realign_cutoff",
+                                           minimum_allowed=0,
+                                           maximum_allowed=1)
     # sparse_column_cutoff and align_trim checked immediately by score_alignment
     fx_sparse_percentile = check.check_float(fx_sparse_percentile,
                                              "fx_sparse_percentile",
@@ -165,7 +183,33 @@ def polish_alignment(df,
     print(f"Reduced {starting_keep} sequences to {current_keep}\n")
 
     # Realign, if requested
+    path = "none"
     if realign:
-        full_df = topiary.muscle.align(full_df)
+
+        # Can only project if every kept sequence is already in the alignment
+        path = "realigned"
+        has_alignment = np.logical_not(pd.isnull(full_df.loc[full_df.keep,"alignment"]))
+        if realign_cutoff is not None and np.all(has_alignment):
+
+            # Fraction of sequences removed and fraction of alignment columns
+            # that are only gaps in the remaining sequences
+            aln = AlignmentMatrix.from_dataframe(full_df)
+            fx_seqs_removed = 1 - current_keep/starting_keep
+            fx_columns_removed = np.mean(aln.gap_only_columns)
+
+            if max(fx_seqs_removed,fx_columns_removed) <= realign_cutoff:
+
+                aln = aln.drop_gap_only_columns()
+                full_df.loc[full_df.keep,"alignment"] = aln.to_strings()
+
+                # Dropped sequences are no longer in the alignment
+                full_df.loc[np.logical_not(full_df.keep),"alignment"] = pd.NA
+                path = "projected"
+
+        if path == "realigned":
+            full_df = topiary.muscle.align(full_df)
+
+    print(f"Final alignment: {path}\n",flush=True)
+    full_df.attrs["polish_alignment"] = path
 
     return full_df
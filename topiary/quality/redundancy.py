@@ -6,14 +6,21 @@ import topiary
 from topiary._private import check
 from topiary._private import threads
 from topiary._private import interface
-
-from Bio import pairwise2
+from topiary._private import environment
+from topiary._private.cache import DiskCache, get_digest
+from topiary.quality.identity import score_localxx
+from topiary.quality.sketch import get_minhash_signatures
+from topiary.quality.sketch import get_lsh_pairs
 
 import pandas as pd
 import numpy as np
 from tqdm.auto import tqdm
 
 import os
+import time
+
+# Number of sequences to sample when estimating the recall of method="sketch"
+_SKETCH_RECALL_SAMPLE = 500
 
 # Columns to check in order
 _EXPECTED_COLUMNS = ["low_quality","partial","predicted",
@@ -42,58 +49,1374 @@ def _get_quality_scores(row,
 
     Returns
     -------
-    scores : numpy.ndarray
-        float array for the sequence
+    scores : numpy.ndarray
+        float array for the sequence
+    """
+
+    try:
+        if row.always_keep:
+            values = [0]
+        else:
+            values = [1]
+    except AttributeError:
+        values = [1]
+
+    # See if this is a key species
+    try:
+        key_species[row.species]
+        values.append(0)
+    except KeyError:
+        values.append(1)
+
+    # Put in target length information if requested
+    if target_length is not None:
+        if pct_length_cutoff is None:
+            err = "\n\npct_length_cutoff must be specified if target_length is\n"
+            err += "specified.\n"
+            raise ValueError(err)
+
+        diff = np.abs(len(row.sequence) - target_length)
+        pct_diff = diff/target_length
+        if pct_diff < pct_length_cutoff:
+            values.append(0)
+        else:
+            values.append(1)
+
+    # Add values for expected columns
+    values.extend(list(row[_EXPECTED_COLUMNS]))
+
+    # Flip length column
+    values.append(1/len(row.sequence))
+
+    return np.array(values,dtype=float)
+
+def _get_composition_index(sequence_array):
+    """
+    Build a residue composition index over all sequences in sequence_array.
+    The number of matches in a localxx alignment between two sequences can be
+    no larger than the number of letters they share, so the composition index
+    gives a cheap upper bound on the alignment score for any pair of sequences.
+
+    Parameters
+    ----------
+    sequence_array : numpy.ndarray
+        array holding sequences to compare.
+
+    Returns
+    -------
+    composition : numpy.ndarray
+        (num_sequences,num_letters) integer array holding the number of times
+        each letter is seen in each sequence
+    lengths : numpy.ndarray
+        integer array holding the length of each sequence
+    """
+
+    # Encode sequences as bytes. A character match implies all of its bytes
+    # match, so byte counts remain an upper bound even for odd characters.
+    encoded = [s.encode() for s in sequence_array]
+    lengths = np.array([len(s) for s in sequence_array],dtype=int)
+    byte_lengths = np.array([len(e) for e in encoded],dtype=int)
+
+    all_bytes = np.frombuffer(b"".join(encoded),dtype=np.uint8)
+
+    # Map each byte seen onto a compact letter index
+    letters = np.unique(all_bytes)
+    lookup = np.zeros(256,dtype=int)
+    lookup[letters] = np.arange(len(letters))
+
+    # Count letters in each sequence with a single bincount
+    seq_index = np.repeat(np.arange(len(encoded)),byte_lengths)
+    flat = seq_index*len(letters) + lookup[all_bytes]
+    composition = np.bincount(flat,minlength=len(encoded)*len(letters))
+    composition = composition.reshape((len(encoded),len(letters)))
+
+    return composition, lengths
+
+def _get_composition_bound(i,
+                           j_indexes,
+                           composition,
+                           lengths):
+    """
+    Get an upper bound on the normalized localxx score between sequence i and
+    the sequences in j_indexes from the residue composition index.
+
+    Parameters
+    ----------
+    i : int
+        index of sequence to compare
+    j_indexes : numpy.ndarray or slice
+        indexes of sequences to compare against i
+    composition : numpy.ndarray
+        residue composition index built by _get_composition_index
+    lengths : numpy.ndarray
+        length of each sequence
+
+    Returns
+    -------
+    bound : numpy.ndarray
+        float array holding the upper bound on normalized score for each j
+    """
+
+    shared = np.sum(np.minimum(composition[i],composition[j_indexes]),axis=1)
+    min_length = np.minimum(lengths[i],lengths[j_indexes])
+
+    return shared/min_length
+
+def _get_candidates(i,
+                    j_block,
+                    composition,
+                    lengths,
+                    cutoff):
+    """
+    Get the indexes j in j_block (with j > i) whose composition upper bound
+    on the normalized localxx score with sequence i is above cutoff. Pairs
+    that are not returned are guaranteed to be kept by _compare_seqs.
+
+    Parameters
+    ----------
+    i : int
+        index of sequence to compare
+    j_block : tuple
+        tuple holding indexes over which to interate in j
+    composition : numpy.ndarray
+        residue composition index built by _get_composition_index
+    lengths : numpy.ndarray
+        length of each sequence
+    cutoff : float
+        cutoff between 0 and 1 indicating the fractional similarity between two
+        sequences above which they are considered redundant.
+
+    Returns
+    -------
+    candidates : numpy.ndarray
+        sorted array of j indexes that must be compared to i
+    """
+
+    j_start = np.max((j_block[0],i + 1))
+    j_end = j_block[1]
+    if j_start >= j_end:
+        return np.zeros(0,dtype=int)
+
+    bound = _get_composition_bound(i,
+                                   slice(j_start,j_end),
+                                   composition,
+                                   lengths)
+
+    return np.nonzero(bound > cutoff)[0] + j_start
+
+def _get_tiles(num_seqs,num_threads=-1,tiles_per_thread=4):
+    """
+    Break the num_seqs x num_seqs comparison matrix into tiles that cover the
+    upper triangle of the matrix. When running on more than one thread, the
+    matrix is cut into many small tiles so threads pulling tiles from a shared
+    queue finish at about the same time. Tiles are returned with the most
+    expensive (most comparisons) first.
+
+    Parameters
+    ----------
+    num_seqs : int
+        number of sequences being compared
+    num_threads : int, default=-1
+        number of threads to use. if -1 use all available
+    tiles_per_thread : int, default=4
+        split each axis of the matrix into tiles_per_thread*num_threads windows
+
+    Returns
+    -------
+    tiles : list
+        list of (i_block,j_block) tuples sorted by estimated cost. Each block
+        is a tuple holding the first and last+1 indexes of the block.
+    num_threads : int
+        number of threads to use for the calculation
+    """
+
+    # Get number of threads from machine
+    num_threads = threads.get_num_threads(num_threads)
+
+    # Determine number of threads useful for this problem. It's not worth
+    # chopping up a super small set of comparisons
+    max_useful_threads = num_seqs//50
+    if max_useful_threads < 1:
+        max_useful_threads = 1
+
+    # Set number of threads
+    if num_threads > max_useful_threads:
+        num_threads = max_useful_threads
+
+    # One thread: no reason to break up the problem
+    if num_threads == 1:
+        num_windows = 1
+    else:
+        num_windows = np.min((num_threads*tiles_per_thread,num_seqs))
+
+    # Calculate window sizes to cover whole L x L array, where L is number
+    # of sequences
+    windows = np.zeros(num_windows,dtype=int)
+    windows[:] = num_seqs//num_windows
+
+    # This call spreads remainder of L/num_windows evenly across first
+    # remainder windows
+    windows[:(num_seqs % num_windows)] += 1
+    edges = np.concatenate(([0],np.cumsum(windows)))
+
+    tiles = []
+    costs = []
+    for i in range(num_windows):
+        for j in range(i,num_windows):
+
+            i_block = (edges[i],edges[i+1])
+            j_block = (edges[j],edges[j+1])
+            tiles.append((i_block,j_block))
+
+            # Diagonal tiles only do the upper half of their comparisons
+            if i == j:
+                costs.append(windows[i]*(windows[i] - 1)//2)
+            else:
+                costs.append(windows[i]*windows[j])
+
+    # Most expensive tiles first; stable sort keeps tiles with equal cost in
+    # row order.
+    order = np.argsort(-np.array(costs),kind="stable")
+    tiles = [tiles[k] for k in order]
+
+    return tiles, num_threads
+
+def _construct_args(sequence_array,
+                    quality_array,
+                    keep_array,
+                    cutoff,
+                    discard_key,
+                    num_threads=-1,
+                    progress_bar=True,
+                    identity_cache=None):
+    """
+    Break sequence_array into tiles given the number of threads and construct
+    a list of keyword arguments to pass to _redundancy_thread_function, one
+    entry per tile.
+
+    Parameters
+    ----------
+    sequence_array : numpy.ndarray
+        array holding sequences to compare.
+    quality_array : numpy.ndarray
+        array holding vectors of quality scores, one vector for each sequence
+    keep_array : numpy.ndarray
+        array holding whether or not to keep each sequence. boolean.
+        This array is updated and is the primary output of this function.
+    cutoff : float
+        cutoff between 0 and 1 indicating the fractional similarity between two
+        sequences above which they are considered redundant.
+    discard_key : bool, default=False
+        whether or not to discard sequences from key species
+    num_threads : int, default=-1
+        number of threads to use. if -1 use all available
+    progress_bar : bool, default=True
+        whether or not to show a progress bar
+    identity_cache : topiary._private.cache.DiskCache, optional
+        on-disk cache of localxx scores to check before aligning
+
+    Returns
+    -------
+    kwargs_list : list
+        list of dictionaries of keyword arguments to pass to
+        _redundancy_thread_function, one entry per tile
+    num_threads : int
+        number of threads to use for the calculation
+    """
+
+    tiles, num_threads = _get_tiles(len(sequence_array),num_threads)
+
+    # Build composition index once so each block can skip pairs that cannot
+    # possibly be above cutoff without aligning them.
+    composition, lengths = _get_composition_index(sequence_array)
+
+    # Tiles cover the whole redundancy matrix. thread_manager hands them out to
+    # threads one at a time as each thread frees up.
+    kwargs_list = []
+    for i_block, j_block in tiles:
+        kwargs_list.append({"i_block":i_block,
+                            "j_block":j_block,
+                            "sequence_array":sequence_array,
+                            "quality_array":quality_array,
+                            "composition":composition,
+                            "lengths":lengths,
+                            "keep_array":keep_array,
+                            "cutoff":cutoff,
+                            "discard_key":discard_key,
+                            "identity_cache":identity_cache})
+
+    return kwargs_list, num_threads
+
+def _get_pair_key(A_seq,B_seq):
+    """
+    Get a key for the unordered pair of sequences A and B.
+
+    Parameters
+    ----------
+    A_seq : str
+        sequence A
+    B_seq : str
+        sequence B
+
+    Returns
+    -------
+    key : str
+        key built from the sorted digests of the two sequences
+    """
+
+    digests = sorted([get_digest(A_seq),get_digest(B_seq)])
+
+    return "".join(digests)
+
+def _get_identities(A_seq,B_seqs,identity_cache=None):
+    """
+    Get the normalized identity between sequence A and each sequence in
+    B_seqs: the number of matches in a localxx alignment divided by the length
+    of the shorter sequence. Sequences in B_seqs are scored as a single batch.
+
+    Parameters
+    ----------
+    A_seq : str
+        sequence A
+    B_seqs : list or numpy.ndarray
+        sequences to compare to A
+    identity_cache : topiary._private.cache.DiskCache, optional
+        on-disk cache of localxx scores to check before aligning
+
+    Returns
+    -------
+    norm : numpy.ndarray
+        normalized identity (between 0 and 1) for each sequence in B_seqs
+    """
+
+    scores = np.zeros(len(B_seqs),dtype=float)
+
+    # Look for raw scores in cache
+    if identity_cache is not None:
+        keys = [_get_pair_key(A_seq,B_seq) for B_seq in B_seqs]
+        to_score = []
+        for k, key in enumerate(keys):
+            score = identity_cache.get(key)
+            if score is None:
+                to_score.append(k)
+            else:
+                scores[k] = score
+    else:
+        to_score = list(range(len(B_seqs)))
+
+    if len(to_score) > 0:
+        new_scores = score_localxx(A_seq,[B_seqs[k] for k in to_score])
+        scores[to_score] = new_scores
+        if identity_cache is not None:
+            for k, score in zip(to_score,new_scores):
+                identity_cache.put(keys[k],float(score))
+
+    # Get a normalized score: matches/len(shortest)
+    lengths = np.array([len(B_seq) for B_seq in B_seqs],dtype=int)
+    lengths = np.minimum(lengths,len(A_seq))
+    norm = np.zeros(len(B_seqs),dtype=float)
+    norm[lengths > 0] = scores[lengths > 0]/lengths[lengths > 0]
+
+    return norm
+
+def _get_identity(A_seq,B_seq,identity_cache=None):
+    """
+    Get the normalized identity between sequences A and B: the number of
+    matches in a localxx alignment divided by the length of the shorter
+    sequence.
+
+    Parameters
+    ----------
+    A_seq : str
+        sequence A
+    B_seq : str
+        sequence B
+    identity_cache : topiary._private.cache.DiskCache, optional
+        on-disk cache of localxx scores to check before aligning
+
+    Returns
+    -------
+    norm : float
+        normalized identity (between 0 and 1)
+    """
+
+    norm = _get_identities(A_seq,[B_seq],identity_cache=identity_cache)
+
+    return float(norm[0])
+
+def _compare_quality(A_qual,B_qual,discard_key=False):
+    """
+    Decide which of two redundant sequences to keep given their quality
+    scores. Scores have left-right priority.  Will select sequence with the
+    first element with a lower score. If sequences have equal scores, choose A.
+
+    Parameters
+    ----------
+    A_qual : array
+        quality scores for A
+    B_qual : array
+        quality scores for B
+    discard_key : bool, default=False
+        whether or not to discard sequences from key species
+
+    Returns
+    -------
+    bool, bool
+        True, True: keep both
+        True, False: keep A
+        False, True: keep B
+    """
+
+    # If both always keep, return that we keep both
+    if A_qual[0] == 0 and B_qual[0] == 0:
+        return True, True
+
+    # If we are not discarding key sequences and both sequences are
+    # from key species, automatically keep both.
+    if not discard_key:
+        if A_qual[1] == 0 and B_qual[1] == 0:
+            return True, True
+
+    # Compare two vectors. Identify first element that differs.
+    comp = np.zeros(A_qual.shape[0],dtype=np.int8)
+    comp[B_qual > A_qual] = 1
+    comp[B_qual < A_qual] = -1
+    diffs = np.nonzero(comp)[0]
+
+    # No difference, keep A arbitrarily
+    if diffs.shape[0] == 0:
+        return True, False
+
+    # B > A at first difference, keep A
+    elif comp[diffs[0]] == 1:
+        return True, False
+
+    # B < A at first difference, keep B
+    else:
+        return False, True
+
+def _compare_seqs(A_seq,B_seq,A_qual,B_qual,cutoff,discard_key=False,
+                  identity_cache=None):
+    """
+    Compare sequence A and B based on alignment. If the sequences are
+    similar within cutoff, compare A_stats and B_stats and take the sequence
+    with the lower score. Scores have left-right priority.  Will select
+    sequence with the first element with a lower score. If sequences are
+    similar within cutoff and have equal scores, choose A.
+
+    Parameters
+    ----------
+    A_seq : array
+        sequence A
+    B_seq : array
+        sequence B
+    A_qual : array
+        quality scores for A
+    B_qual : array
+        quality scores for B
+    cutoff : float
+        cutoff for sequence comparison (~seq identity. between 0 and 1)
+    discard_key : bool, default=False
+        whether or not to discard sequences from key species
+    identity_cache : topiary._private.cache.DiskCache, optional
+        on-disk cache of localxx scores to check before aligning
+
+    Returns
+    -------
+    bool, bool
+        True, True: keep both
+        True, False: keep A
+        False, True: keep B
+    """
+
+    norm = _get_identity(A_seq,B_seq,identity_cache=identity_cache)
+
+    # If sequence similarity is less than the cutoff, keep both
+    if norm <= cutoff:
+        return True, True
+
+    # If sequence similarity is greater than the cutoff, select one.
+    return _compare_quality(A_qual,B_qual,discard_key=discard_key)
+
+def _redundancy_thread_function(i_block,
+                                j_block,
+                                sequence_array,
+                                quality_array,
+                                composition,
+                                lengths,
+                                keep_array,
+                                cutoff,
+                                discard_key,
+                                identity_cache=None):
+    """
+    Check for redundancy within a tile of the sequence by sequence matrix.
+    Updates keep_array in place. Generally should be called by
+    threads.thread_manager.
+
+    Parameters
+    ----------
+    i_block : tuple
+        tuple holding indexes over which to iterate in i
+    j_block : tuple
+        tuple holding indexes over which to interate in j
+    sequence_array : numpy.ndarray
+        array holding sequences to compare.
+    quality_array : numpy.ndarray
+        array holding vectors of quality scores, one vector for each sequence
+    composition : numpy.ndarray
+        residue composition index built by _get_composition_index
+    lengths : numpy.ndarray
+        length of each sequence
+    keep_array : numpy.ndarray or threads.SharedArray
+        array holding whether or not to keep each sequence. boolean. This array
+        is updated in place and is the primary output of this function. Values
+        are only ever changed from True to False, so threads can read and write
+        single elements without a lock.
+    cutoff : float
+        cutoff between 0 and 1 indicating the fractional similarity between two
+        sequences above which they are considered redundant.
+    discard_key : bool, default=False
+        whether or not to discard sequences from key species
+    identity_cache : topiary._private.cache.DiskCache, optional
+        on-disk cache of localxx scores to check before aligning
+
+    Returns
+    -------
+    tile_stats : dict
+        dictionary with the tile blocks, the process id that ran the tile,
+        the number of alignments done, and the wall time for the tile
+    """
+
+    start_time = time.time()
+    num_compared = 0
+
+    # Loop over block in i
+    for i in range(i_block[0],i_block[1]):
+
+        # Skip if we already know we're not keeping i
+        if not keep_array[i]:
+            continue
+
+        # Only loop over j in block that could be above cutoff. Everything
+        # else is kept by _compare_seqs, so we do not need to align it.
+        candidates = _get_candidates(i,
+                                     j_block,
+                                     composition,
+                                     lengths,
+                                     cutoff)
+
+        # Skip j we already know we're not keeping, then score the rest of
+        # the candidates against i as one batch
+        candidates = candidates[np.asarray(keep_array[candidates],dtype=bool)]
+        norms = _get_identities(sequence_array[i],
+                                sequence_array[candidates],
+                                identity_cache=identity_cache)
+        num_compared += len(candidates)
+
+        for j, norm in zip(candidates,norms):
+
+            # Skip if another thread dropped j while we were scoring
+            if not keep_array[j]:
+                continue
+
+            # If sequence similarity is less than the cutoff, keep both
+            if norm <= cutoff:
+                continue
+
+            # Make comparison
+            i_keep, j_keep = _compare_quality(quality_array[i],
+                                              quality_array[j],
+                                              discard_key=discard_key)
+
+            # Record any sequences we are dropping
+            if not i_keep:
+                keep_array[i] = False
+            if not j_keep:
+                keep_array[j] = False
+
+            # Not keeping i, we don't need to keep going
+            if not keep_array[i]:
+                break
+
+    # Write any new scores to disk
+    if identity_cache is not None:
+        identity_cache.flush()
+
+    tile_stats = {"i_block":(int(i_block[0]),int(i_block[1])),
+                  "j_block":(int(j_block[0]),int(j_block[1])),
+                  "pid":os.getpid(),
+                  "num_compared":num_compared,
+                  "time":time.time() - start_time}
+
+    return tile_stats
+
+def _summarize_tile_stats(tile_stats):
+    """
+    Summarize how the work in a redundancy calculation was spread over the
+    worker processes.
+
+    Parameters
+    ----------
+    tile_stats : list
+        list of dictionaries returned by _redundancy_thread_function
+
+    Returns
+    -------
+    summary : pandas.DataFrame
+        dataframe with one row per worker process holding the number of tiles
+        it ran, the number of alignments it did, and its total busy time
+    """
+
+    tile_df = pd.DataFrame(tile_stats,columns=["i_block","j_block","pid",
+                                               "num_compared","time"])
+
+    summary = tile_df.groupby("pid").agg(num_tiles=("time","size"),
+                                         num_compared=("num_compared","sum"),
+                                         time=("time","sum"))
+
+    return summary.reset_index()
+
+def _identity_thread_function(i_block,
+                              j_block,
+                              sequence_array,
+                              composition,
+                              lengths,
+                              cutoff,
+                              identity_cache=None):
+    """
+    Calculate the normalized identity for all pairs in a block of the sequence
+    by sequence matrix that could be above cutoff. Generally should be called
+    by threads.thread_manager.
+
+    Parameters
+    ----------
+    i_block : tuple
+        tuple holding indexes over which to iterate in i
+    j_block : tuple
+        tuple holding indexes over which to interate in j
+    sequence_array : numpy.ndarray
+        array holding sequences to compare.
+    composition : numpy.ndarray
+        residue composition index built by _get_composition_index
+    lengths : numpy.ndarray
+        length of each sequence
+    cutoff : float
+        only record pairs with normalized identity above this value
+    identity_cache : topiary._private.cache.DiskCache, optional
+        on-disk cache of localxx scores to check before aligning
+
+    Returns
+    -------
+    pair_i : numpy.ndarray
+        index i for each recorded pair
+    pair_j : numpy.ndarray
+        index j for each recorded pair
+    identity : numpy.ndarray
+        normalized identity for each recorded pair
+    """
+
+    pair_i = []
+    pair_j = []
+    identity = []
+    for i in range(i_block[0],i_block[1]):
+
+        candidates = _get_candidates(i,
+                                     j_block,
+                                     composition,
+                                     lengths,
+                                     cutoff)
+        norms = _get_identities(sequence_array[i],
+                                sequence_array[candidates],
+                                identity_cache=identity_cache)
+
+        above = norms > cutoff
+        pair_i.extend([i]*int(np.sum(above)))
+        pair_j.extend(candidates[above])
+        identity.extend(norms[above])
+
+    if identity_cache is not None:
+        identity_cache.flush()
+
+    return (np.array(pair_i,dtype=int),
+            np.array(pair_j,dtype=int),
+            np.array(identity,dtype=float))
+
+def _get_identity_matrix(sequence_array,
+                         min_cutoff=0.0,
+                         num_threads=-1,
+                         progress_bar=False,
+                         identity_cache=None):
+    """
+    Calculate a sparse matrix of normalized identities between all sequences
+    in sequence_array, only recording pairs with identity above min_cutoff.
+    Once built, this can be thresholded at any cutoff >= min_cutoff with
+    _apply_identity_cutoff without re-aligning any sequences.
+
+    Parameters
+    ----------
+    sequence_array : numpy.ndarray
+        array holding sequences to compare.
+    min_cutoff : float, default=0.0
+        only record pairs with normalized identity above this value
+    num_threads : int, default=-1
+        number of threads to use. if -1 use all available
+    progress_bar : bool, default=False
+        whether or not to show a progress bar
+    identity_cache : topiary._private.cache.DiskCache, optional
+        on-disk cache of localxx scores to check before aligning
+
+    Returns
+    -------
+    pair_i : numpy.ndarray
+        index i for each recorded pair (i < j). Pairs are sorted by i, then j.
+    pair_j : numpy.ndarray
+        index j for each recorded pair
+    identity : numpy.ndarray
+        normalized identity for each recorded pair
+    """
+
+    tiles, num_threads = _get_tiles(len(sequence_array),num_threads)
+    composition, lengths = _get_composition_index(sequence_array)
+
+    kwargs_list = []
+    for i_block, j_block in tiles:
+        kwargs_list.append({"i_block":i_block,
+                            "j_block":j_block,
+                            "sequence_array":sequence_array,
+                            "composition":composition,
+                            "lengths":lengths,
+                            "cutoff":min_cutoff,
+                            "identity_cache":identity_cache})
+
+    results = threads.thread_manager(kwargs_list,
+                                     _identity_thread_function,
+                                     num_threads,
+                                     progress_bar=progress_bar)
+
+    pair_i = np.concatenate([r[0] for r in results])
+    pair_j = np.concatenate([r[1] for r in results])
+    identity = np.concatenate([r[2] for r in results])
+
+    # Sort pairs so they are visited in the same order as a serial
+    # _redundancy_thread_function pass
+    order = np.lexsort((pair_j,pair_i))
+
+    return pair_i[order], pair_j[order], identity[order]
+
+def _apply_identity_cutoff(pair_i,
+                           pair_j,
+                           identity,
+                           quality_array,
+                           cutoff,
+                           discard_key=False):
+    """
+    Decide which sequences to keep at cutoff using a sparse identity matrix
+    built by _get_identity_matrix. Gives the same result as a single-threaded
+    _redundancy_thread_function pass over the same sequences.
+
+    Parameters
+    ----------
+    pair_i : numpy.ndarray
+        index i for each pair, sorted by i then j
+    pair_j : numpy.ndarray
+        index j for each pair
+    identity : numpy.ndarray
+        normalized identity for each pair
+    quality_array : numpy.ndarray
+        array holding vectors of quality scores, one vector for each sequence
+    cutoff : float
+        cutoff between 0 and 1 indicating the fractional similarity between two
+        sequences above which they are considered redundant.
+    discard_key : bool, default=False
+        whether or not to discard sequences from key species
+
+    Returns
+    -------
+    keep_array : numpy.ndarray
+        boolean array holding whether or not to keep each sequence
+    """
+
+    keep_array = np.ones(len(quality_array),dtype=bool)
+
+    above = np.nonzero(identity > cutoff)[0]
+    for i, j in zip(pair_i[above],pair_j[above]):
+
+        # Skip if we already know we're not keeping one of the pair
+        if not keep_array[i] or not keep_array[j]:
+            continue
+
+        i_keep, j_keep = _compare_quality(quality_array[i],
+                                          quality_array[j],
+                                          discard_key=discard_key)
+        keep_array[i] = i_keep
+        keep_array[j] = j_keep
+
+    return keep_array
+
+def _check_representatives(s,
+                           representatives,
+                           sequence_array,
+                           quality_array,
+                           composition,
+                           lengths,
+                           cutoff,
+                           discard_key,
+                           identity_cache=None):
+    """
+    Check whether sequence s should be kept given a set of representative
+    sequences that are all of equal or better quality than s.
+
+    Parameters
+    ----------
+    s : int
+        index of sequence to check
+    representatives : numpy.ndarray
+        indexes of representative sequences
+    sequence_array : numpy.ndarray
+        array holding sequences to compare.
+    quality_array : numpy.ndarray
+        array holding vectors of quality scores, one vector for each sequence
+    composition : numpy.ndarray
+        residue composition index built by _get_composition_index
+    lengths : numpy.ndarray
+        length of each sequence
+    cutoff : float
+        cutoff between 0 and 1 indicating the fractional similarity between two
+        sequences above which they are considered redundant.
+    discard_key : bool
+        whether or not to discard sequences from key species
+    identity_cache : topiary._private.cache.DiskCache, optional
+        on-disk cache of localxx scores to check before aligning
+
+    Returns
+    -------
+    keep : bool
+        whether or not to keep sequence s
+    """
+
+    if len(representatives) == 0:
+        return True
+
+    bound = _get_composition_bound(s,representatives,composition,lengths)
+    to_check = representatives[bound > cutoff]
+
+    norms = _get_identities(sequence_array[s],
+                            sequence_array[to_check],
+                            identity_cache=identity_cache)
+
+    for r in to_check[norms > cutoff]:
+        r_keep, s_keep = _compare_quality(quality_array[r],
+                                          quality_array[s],
+                                          discard_key=discard_key)
+        if not s_keep:
+            return False
+
+    return True
+
+def _greedy_thread_function(candidates,
+                            representatives,
+                            sequence_array,
+                            quality_array,
+                            composition,
+                            lengths,
+                            cutoff,
+                            discard_key,
+                            identity_cache=None):
+    """
+    Check a batch of candidate sequences against the current set of
+    representative sequences. Generally should be called by
+    threads.thread_manager.
+
+    Parameters
+    ----------
+    candidates : numpy.ndarray
+        indexes of sequences to check
+    representatives : numpy.ndarray
+        indexes of representative sequences
+    sequence_array : numpy.ndarray
+        array holding sequences to compare.
+    quality_array : numpy.ndarray
+        array holding vectors of quality scores, one vector for each sequence
+    composition : numpy.ndarray
+        residue composition index built by _get_composition_index
+    lengths : numpy.ndarray
+        length of each sequence
+    cutoff : float
+        cutoff between 0 and 1 indicating the fractional similarity between two
+        sequences above which they are considered redundant.
+    discard_key : bool
+        whether or not to discard sequences from key species
+    identity_cache : topiary._private.cache.DiskCache, optional
+        on-disk cache of localxx scores to check before aligning
+
+    Returns
+    -------
+    keep : numpy.ndarray
+        boolean array indicating whether each candidate survives comparison to
+        the representatives
+    """
+
+    keep = np.ones(len(candidates),dtype=bool)
+    for k, s in enumerate(candidates):
+        keep[k] = _check_representatives(s,
+                                         representatives,
+                                         sequence_array,
+                                         quality_array,
+                                         composition,
+                                         lengths,
+                                         cutoff,
+                                         discard_key,
+                                         identity_cache=identity_cache)
+
+    if identity_cache is not None:
+        identity_cache.flush()
+
+    return keep
+
+def _greedy_redundancy(sequence_array,
+                       quality_array,
+                       cutoff,
+                       discard_key,
+                       num_threads=-1,
+                       progress_bar=True,
+                       identity_cache=None):
+    """
+    Remove redundancy by greedy clustering (similar to CD-HIT). Sequences are
+    sorted by quality and visited once. Each sequence is compared only to the
+    representatives accepted so far and becomes a new representative if none
+    of them makes it redundant. Sequences are processed in batches, with each
+    batch compared to the existing representatives in parallel.
+
+    Parameters
+    ----------
+    sequence_array : numpy.ndarray
+        array holding sequences to compare.
+    quality_array : numpy.ndarray
+        array holding vectors of quality scores, one vector for each sequence
+    cutoff : float
+        cutoff between 0 and 1 indicating the fractional similarity between two
+        sequences above which they are considered redundant.
+    discard_key : bool
+        whether or not to discard sequences from key species
+    num_threads : int, default=-1
+        number of threads to use. if -1 use all available
+    progress_bar : bool, default=True
+        whether or not to show a progress bar
+    identity_cache : topiary._private.cache.DiskCache, optional
+        on-disk cache of localxx scores to check before aligning
+
+    Returns
+    -------
+    keep_array : numpy.ndarray
+        boolean array holding whether or not to keep each sequence
+    """
+
+    num_threads = threads.get_num_threads(num_threads)
+    composition, lengths = _get_composition_index(sequence_array)
+
+    # Sort by quality, with left-right priority. Best sequences come first.
+    # Ties keep their original order.
+    if len(sequence_array) > 0:
+        order = np.lexsort(quality_array.T[::-1])
+    else:
+        order = np.zeros(0,dtype=int)
+
+    # Each worker gets ~50 sequences per batch
+    batch_size = 50*num_threads
+
+    if progress_bar:
+        pbar = tqdm(total=len(order))
+    else:
+        pbar = interface.MockTqdm(total=len(order))
+
+    representatives = np.zeros(0,dtype=int)
+    with pbar:
+        for start in range(0,len(order),batch_size):
+
+            batch = order[start:(start + batch_size)]
+
+            # Compare batch to representatives accepted in previous batches,
+            # splitting batch across threads
+            kwargs_list = []
+            for candidates in np.array_split(batch,num_threads):
+                if len(candidates) == 0:
+                    continue
+                kwargs_list.append({"candidates":candidates,
+                                    "representatives":representatives,
+                                    "sequence_array":sequence_array,
+                                    "quality_array":quality_array,
+                                    "composition":composition,
+                                    "lengths":lengths,
+                                    "cutoff":cutoff,
+                                    "discard_key":discard_key,
+                                    "identity_cache":identity_cache})
+
+            results = threads.thread_manager(kwargs_list,
+                                             _greedy_thread_function,
+                                             np.min((num_threads,len(kwargs_list))),
+                                             progress_bar=False)
+            survivors = batch[np.concatenate(results)]
+
+            # Now compare survivors to representatives accepted earlier within
+            # this batch.
+            new_representatives = []
+            for s in survivors:
+                keep = _check_representatives(s,
+                                              np.array(new_representatives,dtype=int),
+                                              sequence_array,
+                                              quality_array,
+                                              composition,
+                                              lengths,
+                                              cutoff,
+                                              discard_key,
+                                              identity_cache=identity_cache)
+                if keep:
+                    new_representatives.append(s)
+
+            representatives = np.concatenate((representatives,
+                                              np.array(new_representatives,dtype=int)))
+
+            pbar.update(n=len(batch))
+
+    if identity_cache is not None:
+        identity_cache.flush()
+
+    keep_array = np.zeros(len(sequence_array),dtype=bool)
+    keep_array[representatives] = True
+
+    return keep_array
+
+def _partition_thread_function(sequence_array,
+                               quality_array,
+                               cutoff,
+                               discard_key,
+                               method,
+                               sketch_size=128,
+                               sketch_bands=32,
+                               identity_cache=None):
+    """
+    Remove redundancy within a single partition of sequences. Generally should
+    be called by threads.thread_manager.
+
+    Parameters
+    ----------
+    sequence_array : numpy.ndarray
+        array holding sequences in the partition
+    quality_array : numpy.ndarray
+        array holding vectors of quality scores, one vector for each sequence
+    cutoff : float
+        cutoff between 0 and 1 indicating the fractional similarity between two
+        sequences above which they are considered redundant.
+    discard_key : bool
+        whether or not to discard sequences from key species
+    method : str
+        "exhaustive", "greedy", or "sketch" (see remove_redundancy)
+    sketch_size : int, default=128
+        number of hashes in each MinHash signature (method="sketch")
+    sketch_bands : int, default=32
+        number of LSH bands (method="sketch")
+    identity_cache : topiary._private.cache.DiskCache, optional
+        on-disk cache of localxx scores to check before aligning
+
+    Returns
+    -------
+    keep_array : numpy.ndarray
+        boolean array holding whether or not to keep each sequence
+    """
+
+    if method == "sketch":
+        return _sketch_redundancy(sequence_array=sequence_array,
+                                  quality_array=quality_array,
+                                  cutoff=cutoff,
+                                  discard_key=discard_key,
+                                  sketch_size=sketch_size,
+                                  sketch_bands=sketch_bands,
+                                  num_threads=1,
+                                  progress_bar=False,
+                                  identity_cache=identity_cache)
+
+    if method == "greedy":
+        return _greedy_redundancy(sequence_array=sequence_array,
+                                  quality_array=quality_array,
+                                  cutoff=cutoff,
+                                  discard_key=discard_key,
+                                  num_threads=1,
+                                  progress_bar=False,
+                                  identity_cache=identity_cache)
+
+    composition, lengths = _get_composition_index(sequence_array)
+    keep_array = np.ones(len(sequence_array),dtype=bool)
+
+    L = len(sequence_array)
+    _redundancy_thread_function(i_block=(0,L),
+                                j_block=(0,L),
+                                sequence_array=sequence_array,
+                                quality_array=quality_array,
+                                composition=composition,
+                                lengths=lengths,
+                                keep_array=keep_array,
+                                cutoff=cutoff,
+                                discard_key=discard_key,
+                                identity_cache=identity_cache)
+
+    return keep_array
+
+def _partitioned_redundancy(sequence_array,
+                            quality_array,
+                            partition_array,
+                            cutoff,
+                            discard_key,
+                            method="exhaustive",
+                            sketch_size=128,
+                            sketch_bands=32,
+                            num_threads=-1,
+                            progress_bar=True,
+                            identity_cache=None):
+    """
+    Remove redundancy only between sequences that share the same value in
+    partition_array. Partitions are independent, so they are run in parallel,
+    largest partitions first.
+
+    Parameters
+    ----------
+    sequence_array : numpy.ndarray
+        array holding sequences to compare.
+    quality_array : numpy.ndarray
+        array holding vectors of quality scores, one vector for each sequence
+    partition_array : numpy.ndarray
+        array holding the partition (i.e. species) of each sequence
+    cutoff : float
+        cutoff between 0 and 1 indicating the fractional similarity between two
+        sequences above which they are considered redundant.
+    discard_key : bool
+        whether or not to discard sequences from key species
+    method : str, default="exhaustive"
+        "exhaustive", "greedy", or "sketch" (see remove_redundancy)
+    sketch_size : int, default=128
+        number of hashes in each MinHash signature (method="sketch")
+    sketch_bands : int, default=32
+        number of LSH bands (method="sketch")
+    num_threads : int, default=-1
+        number of threads to use. if -1 use all available
+    progress_bar : bool, default=True
+        whether or not to show a progress bar
+    identity_cache : topiary._private.cache.DiskCache, optional
+        on-disk cache of localxx scores to check before aligning
+
+    Returns
+    -------
+    keep_array : numpy.ndarray
+        boolean array holding whether or not to keep each sequence
+    """
+
+    keep_array = np.ones(len(sequence_array),dtype=bool)
+
+    # Get indexes of sequences in each partition
+    codes, _ = pd.factorize(partition_array)
+    order = np.argsort(codes,kind="stable")
+    boundaries = np.nonzero(np.diff(codes[order]))[0] + 1
+    partitions = np.split(order,boundaries)
+
+    # Only partitions with more than one sequence need any work. Put the
+    # biggest partitions first so they do not end up running alone at the end.
+    partitions = [p for p in partitions if len(p) > 1]
+    partitions.sort(key=len,reverse=True)
+
+    if len(partitions) == 0:
+        return keep_array
+
+    kwargs_list = []
+    for idx in partitions:
+        kwargs_list.append({"sequence_array":sequence_array[idx],
+                            "quality_array":quality_array[idx],
+                            "cutoff":cutoff,
+                            "discard_key":discard_key,
+                            "method":method,
+                            "sketch_size":sketch_size,
+                            "sketch_bands":sketch_bands,
+                            "identity_cache":identity_cache})
+
+    num_threads = threads.get_num_threads(num_threads)
+    if num_threads > len(kwargs_list):
+        num_threads = len(kwargs_list)
+
+    results = threads.thread_manager(kwargs_list,
+                                     _partition_thread_function,
+                                     num_threads,
+                                     progress_bar=progress_bar)
+
+    for idx, partition_keep in zip(partitions,results):
+        keep_array[idx] = partition_keep
+
+    return keep_array
+
+def _exhaustive_redundancy(sequence_array,
+                           quality_array,
+                           cutoff,
+                           discard_key,
+                           num_threads=-1,
+                           progress_bar=True,
+                           identity_cache=None):
+    """
+    Remove redundancy by comparing every sequence to every other sequence,
+    split into tiles run in parallel.
+
+    Parameters
+    ----------
+    sequence_array : numpy.ndarray
+        array holding sequences to compare.
+    quality_array : numpy.ndarray
+        array holding vectors of quality scores, one vector for each sequence
+    cutoff : float
+        cutoff between 0 and 1 indicating the fractional similarity between two
+        sequences above which they are considered redundant.
+    discard_key : bool
+        whether or not to discard sequences from key species
+    num_threads : int, default=-1
+        number of threads to use. if -1 use all available
+    progress_bar : bool, default=True
+        whether or not to show a progress bar and report how work was split
+        between threads
+    identity_cache : topiary._private.cache.DiskCache, optional
+        on-disk cache of localxx scores to check before aligning
+
+    Returns
+    -------
+    keep_array : numpy.ndarray
+        boolean array holding whether or not to keep each sequence
+    """
+
+    # Put keep_array in shared memory so all threads read and write the same
+    # array directly.
+    with threads.SharedArray(np.ones(len(sequence_array),dtype=bool)) as keep_array:
+
+        kwargs_list, num_threads = _construct_args(sequence_array=sequence_array,
+                                                   quality_array=quality_array,
+                                                   keep_array=keep_array,
+                                                   cutoff=cutoff,
+                                                   discard_key=discard_key,
+                                                   num_threads=num_threads,
+                                                   identity_cache=identity_cache)
+
+        tile_stats = threads.thread_manager(kwargs_list,
+                                            _redundancy_thread_function,
+                                            num_threads,
+                                            progress_bar=progress_bar)
+
+        # Copy out of shared memory before it is released
+        keep_array = np.array(keep_array,dtype=bool)
+
+    # Report how evenly the work was split between threads
+    if progress_bar and num_threads > 1:
+        summary = _summarize_tile_stats(tile_stats)
+        busy = np.array(summary["time"])
+        print(f"Compared {np.sum(summary.num_compared)} sequence pairs in "
+              f"{len(tile_stats)} tiles on {len(summary)} threads. Thread busy "
+              f"time (s): min {np.min(busy):.2f}, mean {np.mean(busy):.2f}, "
+              f"max {np.max(busy):.2f}.",flush=True)
+
+    return keep_array
+
+def _pair_identity_thread_function(pair_i,
+                                   pair_j,
+                                   sequence_array,
+                                   identity_cache=None):
+    """
+    Calculate the normalized identity for a list of sequence pairs. Pairs
+    that share i are scored as a batch. Generally should be called by
+    threads.thread_manager.
+
+    Parameters
+    ----------
+    pair_i : numpy.ndarray
+        index i for each pair, sorted by i
+    pair_j : numpy.ndarray
+        index j for each pair
+    sequence_array : numpy.ndarray
+        array holding sequences to compare.
+    identity_cache : topiary._private.cache.DiskCache, optional
+        on-disk cache of localxx scores to check before aligning
+
+    Returns
+    -------
+    identity : numpy.ndarray
+        normalized identity for each pair
     """
 
-    try:
-        if row.always_keep:
-            values = [0]
-        else:
-            values = [1]
-    except AttributeError:
-        values = [1]
+    identity = np.zeros(len(pair_i),dtype=float)
 
-    # See if this is a key species
-    try:
-        key_species[row.species]
-        values.append(0)
-    except KeyError:
-        values.append(1)
+    boundaries = np.nonzero(np.diff(pair_i))[0] + 1
+    for idx in np.split(np.arange(len(pair_i)),boundaries):
+        if len(idx) == 0:
+            continue
 
-    # Put in target length information if requested
-    if target_length is not None:
-        if pct_length_cutoff is None:
-            err = "\n\npct_length_cutoff must be specified if target_length is\n"
-            err += "specified.\n"
-            raise ValueError(err)
+        identity[idx] = _get_identities(sequence_array[pair_i[idx[0]]],
+                                        sequence_array[pair_j[idx]],
+                                        identity_cache=identity_cache)
 
-        diff = np.abs(len(row.sequence) - target_length)
-        pct_diff = diff/target_length
-        if pct_diff < pct_length_cutoff:
-            values.append(0)
-        else:
-            values.append(1)
+    if identity_cache is not None:
+        identity_cache.flush()
 
-    # Add values for expected columns
-    values.extend(list(row[_EXPECTED_COLUMNS]))
+    return identity
 
-    # Flip length column
-    values.append(1/len(row.sequence))
+def _get_sketch_pairs(sequence_array,
+                      cutoff,
+                      sketch_size=128,
+                      sketch_bands=32):
+    """
+    Propose pairs of sequences that could be redundant using MinHash
+    signatures and locality sensitive hashing. Proposed pairs that cannot be
+    above cutoff given their residue composition are dropped.
 
-    return np.array(values,dtype=float)
+    Parameters
+    ----------
+    sequence_array : numpy.ndarray
+        array holding sequences to compare.
+    cutoff : float
+        cutoff between 0 and 1 indicating the fractional similarity between two
+        sequences above which they are considered redundant.
+    sketch_size : int, default=128
+        number of hashes in each MinHash signature
+    sketch_bands : int, default=32
+        number of LSH bands. must evenly divide sketch_size
 
-def _construct_args(sequence_array,
-                    quality_array,
-                    keep_array,
-                    cutoff,
-                    discard_key,
-                    num_threads=-1,
-                    progress_bar=True):
+    Returns
+    -------
+    pair_i : numpy.ndarray
+        index i for each candidate pair (i < j). Pairs are sorted by i, then j.
+    pair_j : numpy.ndarray
+        index j for each candidate pair
+    """
+
+    signatures = get_minhash_signatures(sequence_array,sketch_size=sketch_size)
+    pair_i, pair_j = get_lsh_pairs(signatures,num_bands=sketch_bands)
+
+    # Exact composition bound (see _get_composition_bound), vectorized over
+    # all pairs at once
+    composition, lengths = _get_composition_index(sequence_array)
+    shared = np.sum(np.minimum(composition[pair_i],composition[pair_j]),axis=1)
+    shortest = np.minimum(lengths[pair_i],lengths[pair_j])
+    bound = np.zeros(len(pair_i),dtype=float)
+    bound[shortest > 0] = shared[shortest > 0]/shortest[shortest > 0]
+
+    mask = bound > cutoff
+
+    return pair_i[mask], pair_j[mask]
+
+def _sketch_redundancy(sequence_array,
+                       quality_array,
+                       cutoff,
+                       discard_key,
+                       sketch_size=128,
+                       sketch_bands=32,
+                       num_threads=-1,
+                       progress_bar=True,
+                       identity_cache=None):
     """
-    Break sequence_array into a rational number of blocks given the number of
-    threads and construct a list of keyword arguments to pass to
-    _check_block_redundancy, one entry per block.
+    Remove redundancy, only aligning pairs of sequences proposed by MinHash
+    sketches (see topiary.quality.sketch). Pairs that are not proposed are
+    assumed to be below cutoff. Gives the same result as _exhaustive_redundancy
+    with num_threads=1 if every pair above cutoff is proposed.
 
     Parameters
     ----------
@@ -101,242 +1424,286 @@ def _construct_args(sequence_array,
         array holding sequences to compare.
     quality_array : numpy.ndarray
         array holding vectors of quality scores, one vector for each sequence
-    keep_array : numpy.ndarray
-        array holding whether or not to keep each sequence. boolean.
-        This array is updated and is the primary output of this function.
     cutoff : float
         cutoff between 0 and 1 indicating the fractional similarity between two
         sequences above which they are considered redundant.
-    discard_key : bool, default=False
+    discard_key : bool
         whether or not to discard sequences from key species
+    sketch_size : int, default=128
+        number of hashes in each MinHash signature
+    sketch_bands : int, default=32
+        number of LSH bands. must evenly divide sketch_size
     num_threads : int, default=-1
         number of threads to use. if -1 use all available
     progress_bar : bool, default=True
         whether or not to show a progress bar
+    identity_cache : topiary._private.cache.DiskCache, optional
+        on-disk cache of localxx scores to check before aligning
 
     Returns
     -------
-    kwargs_list : list
-        list of dictionaries of keyword arguments to pass to
-        _check_block_redundancy, one entry per block
-    num_threads : int
-        number of threads to use for the calculation
+    keep_array : numpy.ndarray
+        boolean array holding whether or not to keep each sequence
     """
 
-    # Get number of threads from machine
-    num_threads = threads.get_num_threads(num_threads)
-
-    # Determine number of threads useful for this problem. It's not worth
-    # chopping up a super small set of comparisons
-    max_useful_threads = len(sequence_array)//50
-    if max_useful_threads < 1:
-        max_useful_threads = 1
-
-    # Set number of threads
-    if num_threads > max_useful_threads:
-        num_threads = max_useful_threads
-
-    num_blocks = (num_threads**2 - num_threads)//2 + num_threads
-    block_size = len(sequence_array)//num_threads
+    pair_i, pair_j = _get_sketch_pairs(sequence_array,
+                                       cutoff=cutoff,
+                                       sketch_size=sketch_size,
+                                       sketch_bands=sketch_bands)
 
-    # Calculate window sizes to cover whole L x L array, where L is number
-    # of sequences
-    windows = np.zeros(num_threads,dtype=int)
-    windows[:] = len(sequence_array)//num_threads
+    if len(pair_i) == 0:
+        return np.ones(len(sequence_array),dtype=bool)
 
-    # This call spreads remainder of L/num_threads evenly across first
-    # remainder windows
-    windows[:(len(sequence_array) % num_threads)] += 1
+    num_threads = threads.get_num_threads(num_threads)
 
-    # Blocks will allow us to tile over whole redundancy matrix
+    # Split pairs into chunks for the threads, never splitting pairs that
+    # share i.
+    num_chunks = min(num_threads*4,len(pair_i))
+    split_at = np.searchsorted(pair_i,
+                               pair_i[np.linspace(0,len(pair_i),num_chunks + 1,
+                                                  dtype=int)[1:-1]])
     kwargs_list = []
-    for i in range(num_threads):
-        for j in range(i,num_threads):
-
-            i_block = (np.sum(windows[:i]),np.sum(windows[:i+1]))
-            j_block = (np.sum(windows[:j]),np.sum(windows[:j+1]))
-
-            kwargs_list.append({"i_block":i_block,
-                                "j_block":j_block,
-                                "sequence_array":sequence_array,
-                                "quality_array":quality_array,
-                                "keep_array":keep_array,
-                                "cutoff":cutoff,
-                                "discard_key":discard_key})
-
-    return kwargs_list, num_threads
-
-def _compare_seqs(A_seq,B_seq,A_qual,B_qual,cutoff,discard_key=False):
+    for idx in np.split(np.arange(len(pair_i)),np.unique(split_at)):
+        if len(idx) == 0:
+            continue
+        kwargs_list.append({"pair_i":pair_i[idx],
+                            "pair_j":pair_j[idx],
+                            "sequence_array":sequence_array,
+                            "identity_cache":identity_cache})
+
+    if len(kwargs_list) < num_threads:
+        num_threads = len(kwargs_list)
+
+    results = threads.thread_manager(kwargs_list,
+                                     _pair_identity_thread_function,
+                                     num_threads,
+                                     progress_bar=progress_bar)
+    identity = np.concatenate(results)
+
+    if progress_bar:
+        print(f"Sketch proposed {len(pair_i)} of "
+              f"{len(sequence_array)*(len(sequence_array) - 1)//2} sequence "
+              "pairs for alignment.",flush=True)
+
+    return _apply_identity_cutoff(pair_i,
+                                  pair_j,
+                                  identity,
+                                  quality_array,
+                                  cutoff=cutoff,
+                                  discard_key=discard_key)
+
+def _get_sketch_recall(sequence_array,
+                       cutoff,
+                       sketch_size=128,
+                       sketch_bands=32,
+                       sample_size=500,
+                       num_threads=-1,
+                       identity_cache=None,
+                       seed=None):
     """
-    Compare sequence A and B based on alignment. If the sequences are
-    similar within cutoff, compare A_stats and B_stats and take the sequence
-    with the lower score. Scores have left-right priority.  Will select
-    sequence with the first element with a lower score. If sequences are
-    similar within cutoff and have equal scores, choose A.
+    Estimate how many of the sequence pairs above cutoff are proposed by the
+    MinHash sketch, comparing to exact identities for a random sample of the
+    sequences.
 
     Parameters
     ----------
-    A_seq : array
-        sequence A
-    B_seq : array
-        sequence B
-    A_qual : array
-        quality scores for A
-    B_qual : array
-        quality scores for B
+    sequence_array : numpy.ndarray
+        array holding sequences to compare.
     cutoff : float
-        cutoff for sequence comparison (~seq identity. between 0 and 1)
-    discard_key : bool, default=False
-        whether or not to discard sequences from key species
+        cutoff between 0 and 1 indicating the fractional similarity between two
+        sequences above which they are considered redundant.
+    sketch_size : int, default=128
+        number of hashes in each MinHash signature
+    sketch_bands : int, default=32
+        number of LSH bands. must evenly divide sketch_size
+    sample_size : int, default=500
+        number of sequences to sample
+    num_threads : int, default=-1
+        number of threads to use. if -1 use all available
+    identity_cache : topiary._private.cache.DiskCache, optional
+        on-disk cache of localxx scores to check before aligning
+    seed : int, optional
+        seed for the random sample
 
     Returns
     -------
-    bool, bool
-        True, True: keep both
-        True, False: keep A
-        False, True: keep B
+    recall : dict
+        dictionary with the number of sequences sampled ("sample_size"), the
+        number of pairs above cutoff in the sample ("num_pairs"), the number
+        of those pairs proposed by the sketch ("num_found") and their ratio
+        ("recall"; 1.0 if there are no pairs above cutoff).
     """
 
-    # Get a normalized score: matches/len(shortest)
-    score = pairwise2.align.localxx(A_seq,B_seq,score_only=True)
-    norm = score/np.min((len(A_seq),len(B_seq)))
+    rng = np.random.default_rng(seed)
+    if len(sequence_array) > sample_size:
+        sample = np.sort(rng.choice(len(sequence_array),sample_size,replace=False))
+    else:
+        sample = np.arange(len(sequence_array))
+    sample_array = sequence_array[sample]
+
+    exact_i, exact_j, _ = _get_identity_matrix(sample_array,
+                                               min_cutoff=cutoff,
+                                               num_threads=num_threads,
+                                               identity_cache=identity_cache)
+
+    sketch_i, sketch_j = _get_sketch_pairs(sample_array,
+                                           cutoff=cutoff,
+                                           sketch_size=sketch_size,
+                                           sketch_bands=sketch_bands)
+
+    L = len(sample_array)
+    found = np.isin(exact_i*L + exact_j,sketch_i*L + sketch_j)
+
+    num_pairs = len(exact_i)
+    num_found = int(np.sum(found))
+    if num_pairs > 0:
+        recall = num_found/num_pairs
+    else:
+        recall = 1.0
 
-    # If sequence similarity is less than the cutoff, keep both
-    if norm <= cutoff:
-        return True, True
+    return {"sample_size":L,
+            "num_pairs":num_pairs,
+            "num_found":num_found,
+            "recall":recall}
 
-    # If sequence similarity is greater than the cutoff, select one.
-    else:
+def _get_identity_cache(identity_cache=None):
+    """
+    Open the on-disk cache of pairwise localxx scores.
 
-        # If both always keep, return that we keep both
-        if A_qual[0] == 0 and B_qual[0] == 0:
-            return True, True
+    Parameters
+    ----------
+    identity_cache : str, optional
+        directory holding the cache. If None, use the directory in the
+        TOPIARY_IDENTITY_CACHE environment variable. If that is not defined,
+        do not use a cache. The maximum cache size (in MB) can be set with the
+        TOPIARY_IDENTITY_CACHE_MAX_MB environment variable (default 1000).
 
-        # If we are not discarding key sequences and both sequences are
-        # from key species, automatically keep both.
-        if not discard_key:
-            if A_qual[1] == 0 and B_qual[1] == 0:
-                return True, True
+    Returns
+    -------
+    identity_cache : topiary._private.cache.DiskCache or None
+        cache, or None if not using a cache
+    """
 
-        # Compare two vectors. Identify first element that differs.
-        comp = np.zeros(A_qual.shape[0],dtype=np.int8)
-        comp[B_qual > A_qual] = 1
-        comp[B_qual < A_qual] = -1
-        diffs = np.nonzero(comp)[0]
+    if identity_cache is None:
+        identity_cache = environment.load_env_variable("TOPIARY_IDENTITY_CACHE")
 
-        # No difference, keep A arbitrarily
-        if diffs.shape[0] == 0:
-            return True, False
+    if identity_cache is None:
+        return None
 
-        # B > A at first difference, keep A
-        elif comp[diffs[0]] == 1:
-            return True, False
+    if type(identity_cache) is not str:
+        err = f"\nidentity_cache '{identity_cache}' should be a string pointing\n"
+        err += "to a directory.\n\n"
+        raise ValueError(err)
 
-        # B < A at first difference, keep B
-        else:
-            return False, True
+    max_size = environment.load_env_variable("TOPIARY_IDENTITY_CACHE_MAX_MB",
+                                             check_function=check.check_int,
+                                             check_function_kwargs={"minimum_allowed":1})
+    if max_size is None:
+        max_size = 1000
 
-def _redundancy_thread_function(i_block,
-                                j_block,
-                                sequence_array,
-                                quality_array,
-                                keep_array,
-                                cutoff,
-                                discard_key,
-                                lock):
+    cache_file = os.path.join(identity_cache,"identity-cache.sqlite")
+
+    return DiskCache(cache_file,max_size=max_size*1000000)
+
+def _get_quality_array(df,target_length_cutoff=0.25):
     """
-    Check for redundancy within a block of the sequence by sequence matrix.
-    Updates keep_array in a thread-safe manner. Generally should be called by
-    threads.thread_manager.
+    Get the quality score vector (see _get_quality_scores) for every sequence
+    in a topiary dataframe.
 
     Parameters
     ----------
-    i_block : tuple
-        tuple holding indexes over which to iterate in i
-    j_block : tuple
-        tuple holding indexes over which to interate in j
-    sequence_array : numpy.ndarray
-        array holding sequences to compare.
-    quality_array : numpy.ndarray
-        array holding vectors of quality scores, one vector for each sequence
-    keep_array : numpy.ndarray
-        array holding whether or not to keep each sequence. boolean. This array
-        is updated and is the primary output of this function.
-    cutoff : float
-        cutoff between 0 and 1 indicating the fractional similarity between two
-        sequences above which they are considered redundant.
-    discard_key : bool, default=False
-        whether or not to discard sequences from key species
-    lock : multiprocessing.Lock
-        lock controls access to keep_array
+    df : pandas.DataFrame
+        topiary data frame with sequences
+    target_length_cutoff : float, default=0.25
+        Give a higher quality to any sequence whose length is within
+        target_length_cutoff pct of the median key_species sequence length. To
+        disable, set to None.
+
+    Returns
+    -------
+    df : pandas.DataFrame
+        dataframe with any missing _EXPECTED_COLUMNS set to False
+    all_quality_array : numpy.ndarray
+        (num_sequences,num_scores) float array of quality scores, one row for
+        each row in df
     """
 
-    # Loop over block in i
-    for i in range(i_block[0],i_block[1]):
+    # Extract key species from dataframe
+    try:
+        key_mask = df.loc[:,"key_species"] == True
+        key_species_list = list(np.unique(df.loc[key_mask,"species"]))
+    except KeyError:
+        key_species_list = []
 
-        # Skip if we already know we're not keeping i
-        if not keep_array[i]:
-            continue
+    # Make sure the dataframe has the columns needed for this comparison. If
+    # the dataframe does not have the column, simply set to False. If the
+    # dataframe has the column with an unexpected type, die.
+    for e in _EXPECTED_COLUMNS:
 
-        # Loop over block in j
-        for j in range(j_block[0],j_block[1]):
+        try:
+            v = df[e]
+            v*1.0
 
-            # Skip if we're below or at diagonal
-            if j <= i:
-                continue
+        # Column doesn't exist -- record as False
+        except KeyError:
+            df[e] = False
 
-            # Skip if we already know we're not keeping j
-            if not keep_array[j]:
-                continue
+        # Column exists but can't be interpreted as float. Throw error.
+        except TypeError:
+            err = "\nThe remove_redundancy function expects a dataframe with \n"
+            err += f"column '{e}' that can be interpreted as a number. This\n"
+            err += f"column exists but has datatype '{df.loc[:,e].dtype}'.\n"
+            err += "To fix, please rename this column and re-run this function.\n\n"
+            raise ValueError(err)
 
-            # Make comparison
-            i_keep, j_keep = _compare_seqs(sequence_array[i],
-                                           sequence_array[j],
-                                           quality_array[i],
-                                           quality_array[j],
-                                           cutoff,
-                                           discard_key=discard_key)
-
-            # Both false
-            if not i_keep and not j_keep:
-                lock.acquire()
-                try:
-                    keep_array[i] = 0
-                    keep_array[j] = 0
-                finally:
-                    lock.release()
-
-            # i false
-            elif not i_keep:
-                lock.acquire()
-                try:
-                    keep_array[i] = 0
-                finally:
-                    lock.release()
-
-            # j false
-            elif not j_keep:
-                lock.acquire()
-                try:
-                    keep_array[j] = 0
-                finally:
-                    lock.release()
+    seq_lengths = np.array(df["sequence"].str.len(),dtype=int)
+    in_key_species = np.array(df["species"].isin(key_species_list),dtype=bool)
 
-            else:
-                pass
+    # Determine median sequence length for the sequences from key species
+    use_target_length = len(key_species_list) > 0 and target_length_cutoff is not None
+    if use_target_length:
 
-            # Not keeping i, we don't need to keep going
-            if not keep_array[i]:
-                break
+        lengths = seq_lengths[in_key_species]
+        hist_counts, hist_lengths = np.histogram(lengths,
+                                                 bins=int(np.round(2*np.sqrt(len(lengths)),0)))
+        target_length = hist_lengths[np.argmax(hist_counts)]
 
-    # Return the updated keep array
-    return keep_array
+    # Build quality scores column by column. Same scores, in the same order,
+    # as _get_quality_scores gives for each row.
+    columns = []
+
+    # always_keep (0) or not (1)
+    if "always_keep" in df.columns:
+        columns.append(np.where(np.array(df["always_keep"],dtype=bool),0,1))
+    else:
+        columns.append(np.ones(len(df),dtype=int))
+
+    # key species (0) or not (1)
+    columns.append(np.where(in_key_species,0,1))
+
+    # within pct_length_cutoff of target length (0) or not (1)
+    if use_target_length:
+        pct_diff = np.abs(seq_lengths - target_length)/target_length
+        columns.append(np.where(pct_diff < target_length_cutoff,0,1))
+
+    all_quality_array = np.column_stack(columns).astype(float)
+    all_quality_array = np.hstack((all_quality_array,
+                                   np.array(df[_EXPECTED_COLUMNS],dtype=float),
+                                   (1/seq_lengths)[:,np.newaxis]))
+
+    return df, all_quality_array
 
 
 def remove_redundancy(df,
                       cutoff=0.95,
                       target_length_cutoff=0.25,
                       discard_key=False,
+                      method="exhaustive",
+                      sketch_size=128,
+                      sketch_bands=32,
+                      only_in_species=False,
+                      partition_column=None,
+                      identity_cache=None,
                       silent=False,
                       num_threads=-1):
     """
@@ -369,11 +1736,41 @@ def remove_redundancy(df,
         disable, set to None.
     discard_key : bool, default=False
         whether or not to discard sequences from key species
-    silent : bool, default=False
-        whether to print output and use status bars
+    method : str, default="exhaustive"
+        how to compare sequences. "exhaustive" compares every kept sequence to
+        every other kept sequence. "greedy" sorts sequences by the criteria
+        above, walks through them once, and only compares each sequence to the
+        representative sequences kept so far (similar to CD-HIT). "greedy" is
+        much faster for large, highly redundant datasets. "sketch" uses MinHash
+        signatures of each sequence's 4-mers to propose pairs that might be
+        redundant, and only aligns those pairs. "sketch" is much faster for
+        very large datasets but can miss redundant pairs; when not silent, it
+        reports its recall against "exhaustive" on a random sample of the
+        sequences.
+    sketch_size : int, default=128
+        number of hashes in each MinHash signature (method="sketch"). Larger
+        sketches estimate similarity more accurately but take longer to build.
+    sketch_bands : int, default=32
+        number of bands the signatures are cut into for locality sensitive
+        hashing (method="sketch"). Must evenly divide sketch_size. More bands
+        propose more pairs, increasing recall at the cost of speed.
     only_in_species : bool, default=False
         only reduce redundancy within species; do not compare sequences between
-        species
+        species. Species are processed in parallel.
+    partition_column : str, optional
+        only reduce redundancy within groups of sequences that have the same
+        value in this column. only_in_species=True is equivalent to
+        partition_column="species".
+    identity_cache : str, optional
+        directory holding an on-disk cache of pairwise alignment scores. Scores
+        are looked up in the cache before aligning and new scores are added
+        to it, so repeated runs on overlapping sets of sequences do not have to
+        re-align. If None, use the directory in the TOPIARY_IDENTITY_CACHE
+        environment variable (if defined). The cache is capped at
+        TOPIARY_IDENTITY_CACHE_MAX_MB megabytes (default 1000), evicting the
+        least-recently-used scores.
+    silent : bool, default=False
+        whether to print output and use status bars
     num_threads : int, default=-1
         number of threads to use. If -1, use all available
 
@@ -395,69 +1792,39 @@ def remove_redundancy(df,
                                                  "target_length_cutoff",
                                                  minimum_allowed=0.)
 
-    silent = check.check_bool(silent,"silent")
-
-    # If not more than one seq, don't do anything
-    if len(df) < 2:
-        return df
-
-    # Extract key species from dataframe and encode as dictionary for fast
-    # lookup
-    try:
-        key_mask = df.loc[:,"key_species"] == True
-        key_species = np.unique(df.loc[key_mask,"species"])
-        key_species = dict([(k,None) for k in key_species])
-    except KeyError:
-        key_species = {}
-
-    # Make sure the dataframe has the columns needed for this comparison. If
-    # the dataframe does not have the column, simply set to False. If the
-    # dataframe has the column with an unexpected type, die.
-    for e in _EXPECTED_COLUMNS:
-
-        try:
-            v = df[e]
-            v*1.0
+    if method not in ["exhaustive","greedy","sketch"]:
+        err = f"\nmethod '{method}' not recognized. Should be 'exhaustive',\n"
+        err += "'greedy', or 'sketch'.\n\n"
+        raise ValueError(err)
 
-        # Column doesn't exist -- record as False
-        except KeyError:
-            df[e] = False
+    sketch_size = check.check_int(sketch_size,"sketch_size",minimum_allowed=1)
+    sketch_bands = check.check_int(sketch_bands,"sketch_bands",minimum_allowed=1)
+    if sketch_size % sketch_bands != 0:
+        err = f"\nsketch_bands ({sketch_bands}) must evenly divide sketch_size\n"
+        err += f"({sketch_size}).\n\n"
+        raise ValueError(err)
 
-        # Column exists but can't be interpreted as float. Throw error.
-        except TypeError:
-            err = "\nThe remove_redundancy function expects a dataframe with \n"
-            err += f"column '{e}' that can be interpreted as a number. This\n"
-            err += f"column exists but has datatype '{df.loc[:,e].dtype}'.\n"
-            err += "To fix, please rename this column and re-run this function.\n\n"
+    only_in_species = check.check_bool(only_in_species,"only_in_species")
+    if only_in_species:
+        if partition_column not in [None,"species"]:
+            err = "\nonly_in_species cannot be combined with a partition_column\n"
+            err += "other than 'species'.\n\n"
             raise ValueError(err)
+        partition_column = "species"
 
-    # Determine median sequence length for the sequences from key species
-    key_species_list = list(key_species.keys())
-    if len(key_species_list) > 0:
-
-        key_mask = df["species"].isin(key_species_list)
-        lengths = np.array([len(s) for s in df.loc[key_mask,"sequence"]],dtype=int)
-        hist_counts, hist_lengths = np.histogram(lengths,
-                                                 bins=int(np.round(2*np.sqrt(len(lengths)),0)))
-        median_length = hist_lengths[np.argmax(hist_counts)]
+    if partition_column is not None:
+        if type(partition_column) is not str or partition_column not in df.columns:
+            err = f"\npartition_column '{partition_column}' not in dataframe.\n\n"
+            raise ValueError(err)
 
-        target_length = median_length
-        pct_length_cutoff = target_length_cutoff
+    silent = check.check_bool(silent,"silent")
 
-    else:
-        target_length = None
-        pct_length_cutoff = None
+    # If not more than one seq, don't do anything
+    if len(df) < 2:
+        return df
 
     # Get quality scores for each sequence
-    all_quality_array = []
-    for i in range(len(df)):
-        q = _get_quality_scores(df.iloc[i,:],
-                                key_species=key_species,
-                                target_length=target_length,
-                                pct_length_cutoff=pct_length_cutoff)
-        all_quality_array.append(q)
-
-    all_quality_array = np.array(all_quality_array)
+    df, all_quality_array = _get_quality_array(df,target_length_cutoff)
 
     progress_bar = not silent
 
@@ -466,27 +1833,74 @@ def remove_redundancy(df,
     sequence_array = np.array(df.loc[df.keep,"sequence"])
     quality_array = all_quality_array[df.keep]
 
-    keep_array = np.ones(len(sequence_array),dtype=int)
+    identity_cache = _get_identity_cache(identity_cache)
 
-    kwargs_list, num_threads = _construct_args(sequence_array=sequence_array,
-                                               quality_array=quality_array,
-                                               keep_array=keep_array,
-                                               cutoff=cutoff,
-                                               discard_key=discard_key,
-                                               num_threads=num_threads)
+    try:
 
-    # Run multithreaded. This will return a list of keep_arrays for each 
-    # time run. The last keep array will have the last thread to be launched,
-    # final values
-    keep_arrays = threads.thread_manager(kwargs_list,
-                                         _redundancy_thread_function,
-                                         num_threads,
-                                         progress_bar=progress_bar,
-                                         pass_lock=True,
-                                         shared_kwarg="keep_array")
+        if partition_column is not None:
+            partition_array = np.array(df.loc[df.keep,partition_column])
+            keep_array = _partitioned_redundancy(sequence_array=sequence_array,
+                                                 quality_array=quality_array,
+                                                 partition_array=partition_array,
+                                                 cutoff=cutoff,
+                                                 discard_key=discard_key,
+                                                 method=method,
+                                                 sketch_size=sketch_size,
+                                                 sketch_bands=sketch_bands,
+                                                 num_threads=num_threads,
+                                                 progress_bar=progress_bar,
+                                                 identity_cache=identity_cache)
+
+        elif method == "sketch":
+            keep_array = _sketch_redundancy(sequence_array=sequence_array,
+                                            quality_array=quality_array,
+                                            cutoff=cutoff,
+                                            discard_key=discard_key,
+                                            sketch_size=sketch_size,
+                                            sketch_bands=sketch_bands,
+                                            num_threads=num_threads,
+                                            progress_bar=progress_bar,
+                                            identity_cache=identity_cache)
+
+        elif method == "greedy":
+            keep_array = _greedy_redundancy(sequence_array=sequence_array,
+                                            quality_array=quality_array,
+                                            cutoff=cutoff,
+                                            discard_key=discard_key,
+                                            num_threads=num_threads,
+                                            progress_bar=progress_bar,
+                                            identity_cache=identity_cache)
 
-    # Get keep_array from outputs
-    keep_array = np.array(keep_arrays[-1],dtype=bool)
+        else:
+            keep_array = _exhaustive_redundancy(sequence_array=sequence_array,
+                                                quality_array=quality_array,
+                                                cutoff=cutoff,
+                                                discard_key=discard_key,
+                                                num_threads=num_threads,
+                                                progress_bar=progress_bar,
+                                                identity_cache=identity_cache)
+
+        # Report how many of the truly redundant pairs the sketch finds
+        if method == "sketch" and not silent:
+            recall = _get_sketch_recall(sequence_array,
+                                        cutoff=cutoff,
+                                        sketch_size=sketch_size,
+                                        sketch_bands=sketch_bands,
+                                        sample_size=_SKETCH_RECALL_SAMPLE,
+                                        num_threads=num_threads,
+                                        identity_cache=identity_cache)
+            print(f"Sketch recall on a sample of {recall['sample_size']} "
+                  f"sequences: found {recall['num_found']} of "
+                  f"{recall['num_pairs']} redundant pairs "
+                  f"({100*recall['recall']:.1f}%).",flush=True)
+
+        if identity_cache is not None and not silent:
+            hits, misses = identity_cache.get_counts()
+            print(f"Identity cache: {hits} hits, {misses} misses.",flush=True)
+
+    finally:
+        if identity_cache is not None:
+            identity_cache.close()
 
     # Update keep array
     df.loc[df.keep,"keep"] = keep_array
@@ -502,6 +1916,7 @@ def find_redundancy_cutoff(df,
                            step_bias=0.75,
                            target_length_cutoff=0.25,
                            discard_key=False,
+                           identity_cache=None,
                            num_threads=-1):
     """
     Find a redundancy cutoff that, when applied to df, will yield approximately
@@ -533,6 +1948,9 @@ def find_redundancy_cutoff(df,
         disable, set to None.
     discard_key : bool, default=False
         whether or not to discard key sequences when doing the optimization
+    identity_cache : str, optional
+        directory holding an on-disk cache of pairwise alignment scores (see
+        remove_redundancy).
     num_threads : int, default=-1
         number of threads to use. If -1, use all available
 
@@ -595,18 +2013,37 @@ def find_redundancy_cutoff(df,
 
     # Figure out our target number of sequences for the reduced dataset 
     scaled_target_seq_number = int(np.round(sample_fx*target_seq_number,0))
+
+    # Calculate the identities between all sequences in the sample once. Each
+    # cutoff we try is then just a threshold over this sparse matrix rather
+    # than a new round of alignments.
+    df, all_quality_array = _get_quality_array(df.copy(),
+                                               target_length_cutoff=target_length_cutoff)
+    keep_mask = np.array(df.keep,dtype=bool)
+    sequence_array = np.array(df.loc[keep_mask,"sequence"])
+    quality_array = all_quality_array[keep_mask]
+
+    identity_cache = _get_identity_cache(identity_cache)
+    try:
+        pair_i, pair_j, identity = _get_identity_matrix(sequence_array,
+                                                        min_cutoff=min_cutoff,
+                                                        num_threads=num_threads,
+                                                        identity_cache=identity_cache)
+    finally:
+        if identity_cache is not None:
+            identity_cache.close()
     
     pbar = tqdm(total=(2 + max_iterations))
     
     with pbar:
     
-        max_df = remove_redundancy(df=df.copy(),
-                                   cutoff=max_cutoff,
-                                   target_length_cutoff=target_length_cutoff,
-                                   discard_key=discard_key,
-                                   silent=True,
-                                   num_threads=num_threads)
-        num_max = np.sum(max_df.keep)
+        keep_array = _apply_identity_cutoff(pair_i,
+                                            pair_j,
+                                            identity,
+                                            quality_array,
+                                            cutoff=max_cutoff,
+                                            discard_key=discard_key)
+        num_max = np.sum(keep_array)
         pbar.n = pbar.n + 1
         pbar.refresh()
 
@@ -615,13 +2052,13 @@ def find_redundancy_cutoff(df,
             pbar.refresh()
             return max_cutoff
 
-        min_df = remove_redundancy(df=df.copy(),
-                                   cutoff=min_cutoff,
-                                   target_length_cutoff=target_length_cutoff,
-                                   discard_key=discard_key,
-                                   silent=True,
-                                   num_threads=num_threads)
-        num_min = np.sum(min_df.keep)
+        keep_array = _apply_identity_cutoff(pair_i,
+                                            pair_j,
+                                            identity,
+                                            quality_array,
+                                            cutoff=min_cutoff,
+                                            discard_key=discard_key)
+        num_min = np.sum(keep_array)
 
         pbar.n = pbar.n + 1
         pbar.refresh()
@@ -655,13 +2092,13 @@ def find_redundancy_cutoff(df,
 
                     new_cutoff = (pairs[i-1][1] - pairs[i][1])*step_bias + pairs[i][1]
 
-                    this_df = remove_redundancy(df=df.copy(),
-                                                cutoff=new_cutoff,
-                                                target_length_cutoff=target_length_cutoff,
-                                                discard_key=discard_key,
-                                                silent=True,
-                                                num_threads=num_threads)
-                    num_this = np.sum(this_df.keep)
+                    keep_array = _apply_identity_cutoff(pair_i,
+                                                        pair_j,
+                                                        identity,
+                                                        quality_array,
+                                                        cutoff=new_cutoff,
+                                                        discard_key=discard_key)
+                    num_this = np.sum(keep_array)
                     this_diff = num_this - scaled_target_seq_number
 
                     pairs.append((this_diff,new_cutoff))
@@ -4,6 +4,9 @@ Shrink the sequence database in a rational way.
 import topiary
 from topiary._private import check
 from topiary._private import interface
+from topiary._private import installed
+from topiary._private import threads
+from topiary._private.alignment_matrix import AlignmentMatrix
 from topiary.quality.taxonomic import get_merge_blocks
 from topiary.quality.redundancy import remove_redundancy
 from topiary.quality.redundancy import find_redundancy_cutoff
@@ -12,7 +15,11 @@ from topiary.quality.alignment import score_alignment
 import numpy as np
 from tqdm.auto import tqdm
 
-def shrink_in_species(df,redundancy_cutoff=0.98):
+def shrink_in_species(df,
+                      redundancy_cutoff=0.98,
+                      redundancy_method="exhaustive",
+                      sketch_size=128,
+                      sketch_bands=32):
     """
     Lower sequence redundancy within individual species, ignoring paralog
     annotation.
@@ -24,6 +31,14 @@ def shrink_in_species(df,redundancy_cutoff=0.98):
     redundancy_cutoff : float, default=0.98
         merge sequences that have identities greater than or equal to
         redundancy_cutoff.
+    redundancy_method : str, default="exhaustive"
+        how to compare sequences when removing redundancy: "exhaustive",
+        "greedy", or "sketch". See topiary.quality.remove_redundancy.
+    sketch_size : int, default=128
+        number of hashes in each MinHash signature (redundancy_method="sketch")
+    sketch_bands : int, default=32
+        number of LSH bands (redundancy_method="sketch"). Must evenly divide
+        sketch_size.
 
     Returns
     -------
@@ -38,37 +53,17 @@ def shrink_in_species(df,redundancy_cutoff=0.98):
                                           minimum_allowed=0,
                                           maximum_allowed=1)
 
-    # Get uid blocks for kept sequences from unique species in dataframe
-    kept_df = df.loc[df.keep,:]
-    species = np.unique(kept_df.loc[:,"species"])
-    merge_blocks = []
-    for s in species:
-        merge_blocks.append(kept_df.loc[kept_df["species"] == s,"uid"])
+    # Remove redundant sequences within each species. Species are independent
+    # and run in parallel.
+    df = remove_redundancy(df,
+                           cutoff=redundancy_cutoff,
+                           discard_key=True,
+                           method=redundancy_method,
+                           sketch_size=sketch_size,
+                           sketch_bands=sketch_bands,
+                           only_in_species=True,
+                           silent=True)
 
-    # Figure out how many merge steps we're doing
-    num_to_merge = sum([len(m) for m in merge_blocks])
-    with tqdm(total=num_to_merge) as pbar:
-
-        uid_to_keep = []
-
-        # Remove redundant sequences within each merge block
-        for uid in merge_blocks:
-
-            this_mask = df.loc[:,"uid"].isin(uid)
-            this_df = df.loc[this_mask,:]
-
-            this_df = remove_redundancy(this_df,
-                                        cutoff=redundancy_cutoff,
-                                        silent=True,
-                                        discard_key=True)
-
-            uid_to_keep.extend(this_df.loc[this_df.keep,"uid"])
-            pbar.update(n=len(uid))
-
-    # Update dataframe keep with merge results
-    keep_mask = df.loc[:,"uid"].isin(uid_to_keep)
-    df.loc[:,"keep"] = False
-    df.loc[keep_mask,"keep"] = True
     if "always_keep" in df:
         df.loc[df.always_keep,"keep"] = True
 
@@ -79,7 +74,10 @@ def shrink_redundant(df,
                      species_tree_aware=True,
                      weighted_paralog_split=False,
                      merge_block_size=50,
-                     redundancy_cutoff=0.98):
+                     redundancy_cutoff=0.98,
+                     redundancy_method="exhaustive",
+                     sketch_size=128,
+                     sketch_bands=32):
     """
     Lower sequence redundancy by sequence identity within taxonomically informed
     blocks.
@@ -104,6 +102,14 @@ def shrink_redundant(df,
     redundancy_cutoff : float, default=0.98
         merge sequences that have identities greater than or equal to
         redundancy_cutoff.
+    redundancy_method : str, default="exhaustive"
+        how to compare sequences when removing redundancy: "exhaustive",
+        "greedy", or "sketch". See topiary.quality.remove_redundancy.
+    sketch_size : int, default=128
+        number of hashes in each MinHash signature (redundancy_method="sketch")
+    sketch_bands : int, default=32
+        number of LSH bands (redundancy_method="sketch"). Must evenly divide
+        sketch_size.
 
     Returns
     -------
@@ -178,6 +184,9 @@ def shrink_redundant(df,
 
                 this_df = remove_redundancy(this_df,
                                             cutoff=redundancy_cutoff,
+                                            method=redundancy_method,
+                                            sketch_size=sketch_size,
+                                            sketch_bands=sketch_bands,
                                             silent=silent_redundancy)
 
                 uid_to_keep.extend(this_df.loc[this_df.keep,"uid"])
@@ -193,13 +202,79 @@ def shrink_redundant(df,
     return df
 
 
+def _get_muscle_thread_args(muscle_threads):
+    """
+    Get muscle command line arguments that set the number of threads. Only
+    muscle >= 5 takes -threads; return an empty list for older versions.
+    """
+
+    _, muscle_version = installed.check_muscle()
+    try:
+        if int(muscle_version[0]) >= 5:
+            return ["-threads",f"{muscle_threads}"]
+    except (ValueError,TypeError):
+        pass
+
+    return []
+
+
+def _align_block_thread(df,muscle_cmd_args):
+    """
+    Align a single merge block with muscle super5. Called by thread_manager.
+    """
+
+    return topiary.align(df,
+                         super5=True,
+                         silent=True,
+                         muscle_cmd_args=muscle_cmd_args)
+
+
+def _align_blocks(block_dfs,num_threads=-1):
+    """
+    Align merge blocks independently, running a pool of muscle processes that
+    share the available cores. Each muscle process gets an even share of the
+    cores through its -threads argument (muscle >= 5 only).
+
+    Parameters
+    ----------
+    block_dfs : list
+        list of topiary dataframes, one per merge block
+    num_threads : int, default=-1
+        total number of cores to use. if -1, use all available.
+
+    Returns
+    -------
+    aligned_dfs : list
+        list of dataframes with an 'alignment' column, in the same order as
+        block_dfs
+    """
+
+    if len(block_dfs) == 0:
+        return []
+
+    num_threads = threads.get_num_threads(num_threads)
+    num_processes = min(num_threads,len(block_dfs))
+
+    muscle_threads = max(1,num_threads//num_processes)
+    muscle_cmd_args = _get_muscle_thread_args(muscle_threads)
+
+    kwargs_list = [{"df":b,"muscle_cmd_args":muscle_cmd_args}
+                   for b in block_dfs]
+
+    return threads.thread_manager(kwargs_list,
+                                  _align_block_thread,
+                                  num_processes)
+
+
 def shrink_aligners(df,
                     target_seq_number,
                     paralog_column="recip_paralog",
                     species_tree_aware=True,
                     weighted_paralog_split=False,
                     sparse_column_cutoff=0.80,
-                    align_trim=(0.05,0.95)):
+                    align_trim=(0.05,0.95),
+                    align_mode="block",
+                    num_threads=-1):
     """
     Select sequences that align best within taxonomically informed blocks.
 
@@ -227,6 +302,15 @@ def shrink_aligners(df,
         of the alignment. Interpreted like a slice, but with percentages.
         (0.0,1.0) would not trim; (0.05,0,98) would trim the first 0.05 off the
         front and the last 0.02 off the back.
+    align_mode : str, default="block"
+        how to get alignments to score. "block" aligns each merge block
+        independently, running the muscle jobs in parallel. "global" aligns
+        all kept sequences once and scores each block on its rows of that
+        alignment (dropping columns that are only gaps within the block). If
+        the dataframe already has an 'alignment' column, it is used in both
+        modes.
+    num_threads : int, default=-1
+        number of cores to use for alignment. if -1, use all available.
 
     Returns
     -------
@@ -237,6 +321,13 @@ def shrink_aligners(df,
     species_tree_aware = check.check_bool(species_tree_aware,
                                           "species_tree_aware")
 
+    if align_mode not in ["block","global"]:
+        err = f"\nalign_mode '{align_mode}' not recognized. Should be 'block'\n"
+        err += "or 'global'.\n\n"
+        raise ValueError(err)
+
+    num_threads = threads.get_num_threads(num_threads)
+
     # Decide whether to generate species-aware merge blocks
     if species_tree_aware:
         dummy_merge_blocks = False
@@ -254,80 +345,92 @@ def shrink_aligners(df,
                                     weighted_paralog_split=weighted_paralog_split)
 
     # --------------------------------------------------------------------------
-    # Merge within each merge block according to sequences that align the best
+    # Take key species sequences from each merge block and collect the blocks
+    # that still have budget left
+
+    uid_to_keep = []
+    block_dfs = []
+    block_budgets = []
 
-    merge_timings = []
+    # Go through each paralog
     for p in merge_blocks:
+
+        # If there was a dummy merge, look at the whole df
+        if p is None:
+            paralog_df = df.copy()
+        else:
+            paralog_df = df.loc[df[paralog_column] == p,:]
+
         for m in merge_blocks[p]:
-            N = len(m[1])
-            if N == 0:
-                N = 1
-            else:
-                N = int(np.round(N*np.log(N),0)) + 1
-            merge_timings.append(N)
-
-    pbar = tqdm(total=sum(merge_timings))
-    with pbar:
 
-        uid_to_keep = []
-        counter = 0
+            budget = m[0]
+            uid = m[1]
 
-        # Go through each paralog
-        for p in merge_blocks:
+            this_df = paralog_df.loc[paralog_df.loc[:,"uid"].isin(uid),:]
 
-            # If there was a dummy merge, look at the whole df
-            if p is None:
-                paralog_df = df.copy()
-            else:
-                paralog_df = df.loc[df[paralog_column] == p,:]
+            # If any key_species sequences in the block, take them.
+            in_species_mask = this_df["key_species"]
+            this_uid = list(this_df.loc[in_species_mask,"uid"])
+            uid_to_keep.extend(this_uid)
 
-            # Merge each merge block based on 1) whether sequences are from key
-            # species and then 2) which align best.
-            for m in merge_blocks[p]:
+            # Update budget and, if budget exhausted, continue to next block
+            budget -= len(this_uid)
+            if budget < 1:
+                continue
 
-                budget = m[0]
-                uid = m[1]
+            # Create new dataframe that now has all key species entries for
+            # this paralog, as well as the block sequences
+            new_mask = np.logical_or(paralog_df.loc[:,"uid"].isin(uid),
+                                     paralog_df["key_species"])
+
+            block_dfs.append(paralog_df.loc[new_mask,:])
+            block_budgets.append(budget)
 
-                this_df = paralog_df.loc[paralog_df.loc[:,"uid"].isin(uid),:]
+    # --------------------------------------------------------------------------
+    # Get alignments to score
 
-                # If any key_species sequences in the block, take them.
-                in_species_mask = this_df["key_species"]
-                this_uid = list(this_df.loc[in_species_mask,"uid"])
-                uid_to_keep.extend(this_uid)
+    alignment_matrix = None
+    if len(block_dfs) > 0:
 
-                # Update budget and, if budget exhausted, continue to next block
-                budget -= len(this_uid)
-                if budget < 1:
-                    pbar.update(n=merge_timings[counter])
-                    counter += 1
-                    continue
+        if align_mode == "global":
 
-                # Create new dataframe that now has all key species entries for
-                # this paralog, as well as the block sequences
-                new_mask = np.logical_or(paralog_df.loc[:,"uid"].isin(uid),
-                                         paralog_df["key_species"])
-                this_df = paralog_df.loc[new_mask,:]
+            # Align every kept sequence once (unless already aligned). Blocks
+            # are scored on their rows of this alignment.
+            kept_df = df.loc[df.keep,:]
+            if "alignment" not in kept_df.columns:
+                muscle_cmd_args = _get_muscle_thread_args(num_threads)
+                kept_df = topiary.align(kept_df,
+                                        super5=True,
+                                        silent=True,
+                                        muscle_cmd_args=muscle_cmd_args)
+            alignment_matrix = AlignmentMatrix.from_dataframe(kept_df)
+
+        elif "alignment" not in df.columns:
+            block_dfs = _align_blocks(block_dfs,num_threads=num_threads)
+
+    # --------------------------------------------------------------------------
+    # Within each merge block, take the sequences that align the best
 
-                # Score alignment
-                this_df = score_alignment(this_df,
-                                          align_trim=align_trim,
-                                          sparse_column_cutoff=sparse_column_cutoff,
-                                          silent=True)
+    for this_df, budget in zip(tqdm(block_dfs),block_budgets):
 
-                # Drop the key species from the alignment
-                this_df = this_df.loc[np.logical_not(this_df["key_species"]),:]
+        # Score alignment
+        this_df = score_alignment(this_df,
+                                  align_trim=align_trim,
+                                  sparse_column_cutoff=sparse_column_cutoff,
+                                  silent=True,
+                                  alignment_matrix=alignment_matrix)
 
-                # Sort by best aligner
-                a = np.array(this_df.fx_missing_dense/np.sum(this_df.fx_missing_dense))
-                b = np.array(this_df.sparse_run_length/np.sum(this_df.sparse_run_length))
+        # Drop the key species from the alignment
+        this_df = this_df.loc[np.logical_not(this_df["key_species"]),:]
 
-                # Get the uid for the best aligners
-                sort_order = np.argsort(a + b)
-                this_uid = np.array(this_df.uid.iloc[sort_order])[:budget]
-                uid_to_keep.extend(this_uid)
+        # Sort by best aligner
+        a = np.array(this_df.fx_missing_dense/np.sum(this_df.fx_missing_dense))
+        b = np.array(this_df.sparse_run_length/np.sum(this_df.sparse_run_length))
 
-                pbar.update(n=merge_timings[counter])
-                counter += 1
+        # Get the uid for the best aligners
+        sort_order = np.argsort(a + b)
+        this_uid = np.array(this_df.uid.iloc[sort_order])[:budget]
+        uid_to_keep.extend(this_uid)
 
     # Update dataframe keep with merge results
     keep_mask = df.loc[:,"uid"].isin(uid_to_keep)
@@ -345,10 +448,15 @@ def shrink_dataset(df,
                    max_seq_number=500,
                    species_tree_aware=True,
                    redundancy_cutoff=0.96,
+                   redundancy_method="exhaustive",
+                   sketch_size=128,
+                   sketch_bands=32,
                    merge_block_size=50,
                    weighted_paralog_split=False,
                    sparse_column_cutoff=0.80,
-                   align_trim=(0.05,0.95)):
+                   align_trim=(0.05,0.95),
+                   align_mode="block",
+                   num_threads=-1):
     """
     Select a subset of sequences from a topiary dataframe in a rational way.
 
@@ -372,6 +480,18 @@ def shrink_dataset(df,
     redundancy_cutoff : float, default=0.98
         merge sequences from closely related species with sequence identity
         above cutoff.
+    redundancy_method : str, default="exhaustive"
+        how to compare sequences when removing redundancy: "exhaustive",
+        "greedy", or "sketch". "sketch" only aligns pairs of sequences
+        proposed by MinHash sketches, which is much faster for very large
+        datasets (tens of thousands of sequences) but can miss redundant
+        pairs. It reports its recall against "exhaustive" on a sample of the
+        sequences. See topiary.quality.remove_redundancy.
+    sketch_size : int, default=128
+        number of hashes in each MinHash signature (redundancy_method="sketch")
+    sketch_bands : int, default=32
+        number of LSH bands (redundancy_method="sketch"). Must evenly divide
+        sketch_size.
     merge_block_size : int, default=50
         create blocks of paralogs merge_block_size out of the species tree
         to do merging based on sequence identity.
@@ -388,6 +508,12 @@ def shrink_dataset(df,
         of the alignment. Interpreted like a slice, but with percentages.
         (0.0,1.0) would not trim; (0.05,0,98) would trim the first 0.05 off the
         front and the last 0.02 off the back.
+    align_mode : str, default="block"
+        how to get alignments for selecting the best aligners. "block" aligns
+        each merge block independently (in parallel); "global" aligns all kept
+        sequences once and scores each block on its rows of that alignment.
+    num_threads : int, default=-1
+        number of cores to use for alignment. if -1, use all available.
     """
 
     # --------------------------------------------------------------------------
@@ -457,7 +583,11 @@ def shrink_dataset(df,
 
     print("Removing redundant sequences within species.",flush=True)
 
-    df = shrink_in_species(df,redundancy_cutoff=redundancy_cutoff)
+    df = shrink_in_species(df,
+                           redundancy_cutoff=redundancy_cutoff,
+                           redundancy_method=redundancy_method,
+                           sketch_size=sketch_size,
+                           sketch_bands=sketch_bands)
 
     # Sanity check -- make sure something is left.
     if np.sum(df.keep) == 0:
@@ -484,7 +614,10 @@ def shrink_dataset(df,
                             species_tree_aware=species_tree_aware,
                             weighted_paralog_split=False,
                             merge_block_size=merge_block_size,
-                            redundancy_cutoff=this_redundancy_cutoff)
+                            redundancy_cutoff=this_redundancy_cutoff,
+                            redundancy_method=redundancy_method,
+                            sketch_size=sketch_size,
+                            sketch_bands=sketch_bands)
 
     # Sanity check -- make sure something is left.
     if np.sum(df.keep) == 0:
@@ -505,7 +638,9 @@ def shrink_dataset(df,
                         species_tree_aware=species_tree_aware,
                         weighted_paralog_split=weighted_paralog_split,
                         sparse_column_cutoff=sparse_column_cutoff,
-                        align_trim=align_trim)
+                        align_trim=align_trim,
+                        align_mode=align_mode,
+                        num_threads=num_threads)
 
     current_keep = np.sum(df.keep)
     print(f"Number of sequences: {current_keep}",flush=True)
@@ -0,0 +1,263 @@
+"""
+MinHash sketches and locality sensitive hashing (LSH) to quickly propose
+pairs of similar sequences in very large datasets.
+
+Each sequence is reduced to the set of its overlapping k-mers. A MinHash
+signature holds, for each of sketch_size hash functions, the minimum hash over
+the sequence's k-mers. The fraction of signature entries two sequences share
+estimates the Jaccard similarity of their k-mer sets. Signatures are then cut
+into bands; two sequences that have identical signatures in any band become a
+candidate pair. With b bands of r rows, a pair with Jaccard similarity J is
+proposed with probability 1 - (1 - J^r)^b.
+"""
+
+from topiary._private import check
+
+import numpy as np
+
+# Maximum number of k-mers x hashes to hold in memory at once
+_CHUNK_SIZE = 2**22
+
+def _mix(x):
+    """
+    splitmix64 finalizer. Scrambles uint64 values; arithmetic wraps.
+
+    Parameters
+    ----------
+    x : numpy.ndarray
+        uint64 array
+
+    Returns
+    -------
+    mixed : numpy.ndarray
+        uint64 array of scrambled values
+    """
+
+    x = x + np.uint64(0x9E3779B97F4A7C15)
+    x = (x ^ (x >> np.uint64(30)))*np.uint64(0xBF58476D1CE4E5B9)
+    x = (x ^ (x >> np.uint64(27)))*np.uint64(0x94D049BB133111EB)
+
+    return x ^ (x >> np.uint64(31))
+
+def _get_kmer_codes(sequence_array,kmer_size):
+    """
+    Encode all overlapping k-mers from all sequences as uint64 integers.
+
+    Parameters
+    ----------
+    sequence_array : numpy.ndarray
+        array of sequences (strings)
+    kmer_size : int
+        length of k-mers. Sequences shorter than kmer_size are treated as a
+        single k-mer.
+
+    Returns
+    -------
+    codes : numpy.ndarray
+        uint64 code for each k-mer, grouped by sequence
+    starts : numpy.ndarray
+        index in codes of the first k-mer of each sequence
+    num_kmers : numpy.ndarray
+        number of k-mers in each sequence
+    """
+
+    lengths = np.array([len(s) for s in sequence_array],dtype=int)
+    seq_starts = np.zeros(len(lengths),dtype=int)
+    seq_starts[1:] = np.cumsum(lengths)[:-1]
+
+    # All sequences as one byte array, padded so every k-mer window is in
+    # bounds
+    joined = "".join(sequence_array).encode()
+    all_bytes = np.zeros(len(joined) + kmer_size,dtype=np.uint64)
+    all_bytes[:len(joined)] = np.frombuffer(joined,dtype=np.uint8)
+
+    # Position of each residue within its sequence
+    seq_index = np.repeat(np.arange(len(lengths)),lengths)
+    offset = np.arange(len(joined)) - seq_starts[seq_index]
+
+    # k-mers start at offsets 0..length-kmer_size. Sequences shorter than
+    # kmer_size get a single k-mer at offset 0.
+    num_kmers = np.maximum(lengths - kmer_size + 1,1)
+    num_kmers[lengths == 0] = 0
+    is_start = offset < num_kmers[seq_index]
+    positions = np.nonzero(is_start)[0]
+
+    # Pack bytes into codes, zeroing bytes past the end of each sequence
+    remaining = lengths[seq_index[positions]] - offset[positions]
+    codes = np.zeros(len(positions),dtype=np.uint64)
+    for t in range(kmer_size):
+        b = all_bytes[positions + t].copy()
+        b[remaining <= t] = 0
+        codes |= b << np.uint64(8*t)
+
+    starts = np.zeros(len(num_kmers),dtype=int)
+    starts[1:] = np.cumsum(num_kmers)[:-1]
+
+    return codes, starts, num_kmers
+
+def get_minhash_signatures(sequence_array,
+                           sketch_size=128,
+                           kmer_size=4,
+                           seed=0):
+    """
+    Calculate a MinHash signature for each sequence.
+
+    Parameters
+    ----------
+    sequence_array : numpy.ndarray
+        array of sequences (strings)
+    sketch_size : int, default=128
+        number of hash functions (entries in each signature)
+    kmer_size : int, default=4
+        length of k-mers. must be between 1 and 8.
+    seed : int, default=0
+        seed used to generate the hash functions. Signatures are only
+        comparable if they were made with the same seed.
+
+    Returns
+    -------
+    signatures : numpy.ndarray
+        uint64 array with shape (num_sequences,sketch_size). Empty sequences
+        have a signature of all 2^64 - 1.
+    """
+
+    sketch_size = check.check_int(sketch_size,"sketch_size",minimum_allowed=1)
+    kmer_size = check.check_int(kmer_size,"kmer_size",
+                                minimum_allowed=1,maximum_allowed=8)
+
+    codes, starts, num_kmers = _get_kmer_codes(sequence_array,kmer_size)
+
+    # Scramble k-mer codes once. Each hash function is then a cheap
+    # permutation of the scrambled code: xor with a seed and multiply by an
+    # odd number (modulo 2^64).
+    codes = _mix(codes)
+
+    rng = np.random.default_rng(seed)
+    hash_seeds = rng.integers(0,np.iinfo(np.uint64).max,size=sketch_size,
+                              dtype=np.uint64,endpoint=True)
+    hash_multipliers = rng.integers(0,np.iinfo(np.uint64).max,size=sketch_size,
+                                    dtype=np.uint64,endpoint=True)
+    hash_multipliers |= np.uint64(1)
+
+    signatures = np.full((len(num_kmers),sketch_size),
+                         np.iinfo(np.uint64).max,
+                         dtype=np.uint64)
+
+    # Work through sequences in chunks so the k-mers x hashes array stays a
+    # manageable size
+    has_kmers = np.nonzero(num_kmers > 0)[0]
+    max_kmers = max(1,_CHUNK_SIZE//sketch_size)
+    chunk_start = 0
+    while chunk_start < len(has_kmers):
+
+        # Take sequences until we hit max_kmers (always at least one)
+        ends = starts[has_kmers[chunk_start:]] + num_kmers[has_kmers[chunk_start:]]
+        first = starts[has_kmers[chunk_start]]
+        chunk_end = chunk_start + max(1,np.searchsorted(ends - first,max_kmers,side="right"))
+
+        seqs = has_kmers[chunk_start:chunk_end]
+        lo = starts[seqs[0]]
+        hi = starts[seqs[-1]] + num_kmers[seqs[-1]]
+
+        hashed = (codes[lo:hi,np.newaxis] ^ hash_seeds[np.newaxis,:])
+        hashed *= hash_multipliers[np.newaxis,:]
+        signatures[seqs] = np.minimum.reduceat(hashed,starts[seqs] - lo,axis=0)
+
+        chunk_start = chunk_end
+
+    return signatures
+
+def _get_group_pairs(keys):
+    """
+    Get all pairs of indexes that share the same key.
+
+    Parameters
+    ----------
+    keys : numpy.ndarray
+        1D array of keys
+
+    Returns
+    -------
+    pair_i : numpy.ndarray
+        first index of each pair
+    pair_j : numpy.ndarray
+        second index of each pair (pair_i < pair_j)
+    """
+
+    order = np.argsort(keys,kind="stable")
+    sorted_keys = keys[order]
+
+    boundaries = np.nonzero(sorted_keys[1:] != sorted_keys[:-1])[0] + 1
+    group_starts = np.concatenate(([0],boundaries))
+    group_sizes = np.diff(np.concatenate((group_starts,[len(keys)])))
+
+    pair_i = [np.zeros(0,dtype=int)]
+    pair_j = [np.zeros(0,dtype=int)]
+
+    # Handle all groups of the same size at once
+    for size in np.unique(group_sizes[group_sizes > 1]):
+
+        these_starts = group_starts[group_sizes == size]
+        members = order[these_starts[:,np.newaxis] + np.arange(size)[np.newaxis,:]]
+        members = np.sort(members,axis=1)
+
+        a, b = np.triu_indices(size,k=1)
+        pair_i.append(members[:,a].ravel())
+        pair_j.append(members[:,b].ravel())
+
+    return np.concatenate(pair_i), np.concatenate(pair_j)
+
+def get_lsh_pairs(signatures,num_bands=32):
+    """
+    Propose candidate pairs of similar sequences from their MinHash signatures
+    by locality sensitive hashing.
+
+    Parameters
+    ----------
+    signatures : numpy.ndarray
+        signatures from get_minhash_signatures
+    num_bands : int, default=32
+        number of bands to cut each signature into. Must evenly divide the
+        sketch size. More bands (fewer rows per band) give higher recall at
+        lower similarity but more candidate pairs.
+
+    Returns
+    -------
+    pair_i : numpy.ndarray
+        index i for each candidate pair (i < j). Pairs are sorted by i, then j.
+    pair_j : numpy.ndarray
+        index j for each candidate pair
+    """
+
+    num_seqs, sketch_size = signatures.shape
+
+    num_bands = check.check_int(num_bands,"num_bands",minimum_allowed=1)
+    if sketch_size % num_bands != 0:
+        err = f"\nnum_bands ({num_bands}) must evenly divide the sketch size\n"
+        err += f"({sketch_size}).\n\n"
+        raise ValueError(err)
+
+    rows = sketch_size//num_bands
+
+    # Empty sequences do not become candidates
+    empty = np.all(signatures == np.iinfo(np.uint64).max,axis=1)
+
+    encoded = []
+    for b in range(num_bands):
+
+        # Hash rows of the band into a single key
+        band = signatures[:,(b*rows):((b + 1)*rows)]
+        keys = np.full(num_seqs,b,dtype=np.uint64)
+        for r in range(rows):
+            keys = _mix(keys ^ band[:,r])
+
+        # Give empty sequences unique keys
+        keys[empty] = np.arange(np.sum(empty),dtype=np.uint64)
+
+        pair_i, pair_j = _get_group_pairs(keys)
+        encoded.append(pair_i*num_seqs + pair_j)
+
+    # Unique pairs, sorted by i then j
+    encoded = np.unique(np.concatenate(encoded))
+
+    return encoded//num_seqs, encoded % num_seqs
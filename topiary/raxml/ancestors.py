@@ -11,6 +11,7 @@ from topiary._private.interface import copy_input_file
 from topiary._private.interface import create_new_dir
 from topiary._private import Supervisor
 from topiary._private import run_cleanly
+from topiary._private.alignment_matrix import AlignmentMatrix
 
 from topiary.pastml import get_ancestral_gaps
 
@@ -121,9 +122,10 @@ def _get_bad_columns(phy_file):
 
     Parameters
     ----------
-    phy_file : str
-        .phy file used for the analysis. parses assuming sequence names and
-        alignments are on separate lines (what topiary uses and raxml dumps out).
+    phy_file : str or AlignmentMatrix
+        .phy file used for the analysis (or the alignment already loaded from
+        it). parses assuming sequence names and alignments are on separate
+        lines (what topiary uses and raxml dumps out).
 
     Returns
     -------
@@ -131,38 +133,13 @@ def _get_bad_columns(phy_file):
         integer array indexing bad columns in phy file.
     """
 
-    # Load the phy file into a sequence array
-    counter = 0
-    name = None
-    out = {}
-    with open(phy_file) as f:
-        for line in f:
-
-            # Skip first two lines
-            if counter < 2:
-                counter += 1
-                continue
-
-            # Alternate between name and sequence lines.
-            if name is None:
-                name = line.strip()
-                continue
-
-            out[name] = line.strip()
-            name = None
-
-    # Convert to an array
-    seq_array = []
-    for k in out:
-        seq_array.append(np.array(list(out[k])))
-    seq_array = np.array(seq_array)
+    if issubclass(type(phy_file),AlignmentMatrix):
+        alignment_matrix = phy_file
+    else:
+        alignment_matrix = AlignmentMatrix.from_file(phy_file)
 
     # Get columns in array that only have {"-","X"}
-    bad_values = set({"-","X"})
-    bad_columns = []
-    for i in range(seq_array.shape[1]):
-        if set(seq_array[:,i]).issubset(bad_values):
-            bad_columns.append(i)
+    bad_columns = np.nonzero(alignment_matrix.gap_or_x_only_columns)[0]
 
     return np.array(bad_columns,dtype=int)
 
@@ -207,11 +184,14 @@ def _parse_raxml_anc_output(df,
     cwd = os.getcwd()
     os.chdir(run_directory)
 
+    # Read the alignment once for the gap and bad column calculations
+    alignment_matrix = AlignmentMatrix.from_file(alignment_file)
+
     # Get gaps, reconstructed by ACR
-    gap_anc_dict = get_ancestral_gaps(alignment_file,tree_file_with_labels)
+    gap_anc_dict = get_ancestral_gaps(alignment_matrix,tree_file_with_labels)
 
     # Get indexes of columns that RAXML will have dropped
-    bad_columns = _get_bad_columns(alignment_file)
+    bad_columns = _get_bad_columns(alignment_matrix)
 
     # Read pp file into a list of ancestors (anc_list) and posterior
     # probabilities for amino acids at each site